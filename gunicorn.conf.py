@@ -0,0 +1,84 @@
+"""
+Configuración de gunicorn para ReleCloud
+
+gunicorn lee este fichero al arrancar desde la raíz del proyecto.
+
+Uso:
+    gunicorn project.wsgi
+    GUNICORN_WORKERS=2 GUNICORN_THREADS=4 gunicorn project.wsgi
+    gunicorn --worker-class uvicorn.workers.UvicornWorker project.asgi:application
+
+    - preload_app: la aplicación se carga y se calienta (relecloud/warmup.py)
+      en el proceso maestro antes del fork. Los workers la heredan por
+      copy-on-write y la primera petición no paga imports, resolver de
+      URLs, plantillas ni snapshot del catálogo
+    - workers y threads según las CPUs: 2 * CPUs + 1 workers; con más de un
+      hilo por worker se usa el worker gthread
+    - max_requests con jitter: cada worker se recicla tras unas
+      GUNICORN_MAX_REQUESTS peticiones (acota fugas de memoria); el jitter
+      evita que todos se reinicien a la vez. Con preload_app el worker nuevo
+      sale ya caliente del maestro
+    - log del ciclo de vida: tiempo del warmup, de cada worker hasta estar
+      listo y vida y peticiones atendidas de cada worker al salir
+
+Todas las opciones se pueden cambiar con variables de entorno (o .env).
+"""
+import multiprocessing
+import os
+import sys
+import time
+
+import decouple
+
+
+# Sin importar `config` con ese nombre: gunicorn trataría la variable como su opción --config
+CPUS = multiprocessing.cpu_count()
+
+bind = decouple.config('GUNICORN_BIND', default=f"0.0.0.0:{decouple.config('PORT', default=8000)}")
+workers = decouple.config('GUNICORN_WORKERS', default=2 * CPUS + 1, cast=int)
+threads = decouple.config('GUNICORN_THREADS', default=2, cast=int)
+worker_class = decouple.config('GUNICORN_WORKER_CLASS', default='gthread' if threads > 1 else 'sync')
+preload_app = decouple.config('GUNICORN_PRELOAD', default=True, cast=bool)
+
+max_requests = decouple.config('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = decouple.config('GUNICORN_MAX_REQUESTS_JITTER', default=max_requests // 10, cast=int)
+
+timeout = decouple.config('GUNICORN_TIMEOUT', default=30, cast=int)
+graceful_timeout = decouple.config('GUNICORN_GRACEFUL_TIMEOUT', default=30, cast=int)
+keepalive = decouple.config('GUNICORN_KEEPALIVE', default=5, cast=int)
+
+# Latido de los workers en memoria: en contenedores /tmp puede ser un disco lento
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = decouple.config('GUNICORN_ACCESS_LOG', default=None)
+loglevel = decouple.config('GUNICORN_LOG_LEVEL', default='info')
+
+
+def when_ready(server):
+    """En el maestro, con la aplicación ya cargada: configuración efectiva y resumen del warmup"""
+    cfg = server.cfg
+    warmup = sys.modules.get('relecloud.warmup')
+    if warmup is not None and warmup.report:
+        steps = ', '.join(f'{name} {ms:.0f} ms' for name, ms in warmup.report.items())
+    else:
+        steps = 'desactivado' if cfg.preload_app else 'en cada worker (sin preload_app)'
+    server.log.info(
+        f'ReleCloud: {cfg.workers} workers {cfg.worker_class_str} x {cfg.threads} hilos, '
+        f'max_requests {cfg.max_requests}±{cfg.max_requests_jitter}, warmup: {steps}'
+    )
+
+
+def pre_fork(server, worker):
+    worker.forked_at = time.monotonic()
+
+
+def post_worker_init(worker):
+    worker.ready_at = time.monotonic()
+    worker.log.info(f'Worker {worker.pid} listo en {(worker.ready_at - worker.forked_at) * 1000:.0f} ms')
+
+
+def worker_exit(server, worker):
+    ready_at = getattr(worker, 'ready_at', None)
+    uptime = f'{time.monotonic() - ready_at:.0f} s' if ready_at is not None else 'sin llegar a estar listo'
+    server.log.info(f'Worker {worker.pid} sale tras {uptime} y {worker.nr} peticiones')
@@ -12,5 +12,19 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+# Vistas asíncronas (relecloud/async_views.py). Las conexiones no se reutilizan:
+# con ASGI cada petición usa su propio hilo para el ORM y una conexión
+# persistente quedaría abierta en un hilo que no vuelve a usarse.
+os.environ.setdefault('ASYNC_VIEWS', 'True')
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
+
+# 103 Early Hints con los servidores ASGI que los admiten (ver relecloud/preload.py)
+from relecloud.preload import EarlyHintsASGIMiddleware  # noqa: E402
+from relecloud.warmup import warm_up  # noqa: E402
+
+application = EarlyHintsASGIMiddleware(application)
+
+# Como en project/wsgi.py: calentar antes de atender peticiones
+warm_up()
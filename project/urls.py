@@ -17,11 +17,18 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+
+from relecloud import media
+
+# Con ASGI, las vistas asíncronas (ver relecloud/async_views.py)
 urlpatterns = [
-    path('', include('relecloud.urls')),
+    path('', include('relecloud.async_urls' if settings.ASYNC_VIEWS else 'relecloud.urls')),
     path('admin/', admin.site.urls),
 ]
 
-# Servir archivos estáticos y media
+# Servir archivos estáticos (solo con DEBUG; en producción los sirve WhiteNoise)
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# Media: también en producción, con Range, condicionales y caché (ver relecloud/media.py)
+if media.get_media_serving_settings()['ENABLED']:
+    urlpatterns += [path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", media.serve, name='media')]
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
 
 application = get_wsgi_application()
+
+# Con gunicorn --preload (ver gunicorn.conf.py) este módulo se importa en el
+# proceso maestro: URLs, plantillas, manifiesto de estáticos y snapshot del
+# catálogo se preparan una vez y los workers los heredan (relecloud/warmup.py)
+from relecloud.warmup import warm_up  # noqa: E402
+
+warm_up(application)
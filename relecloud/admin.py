@@ -4,8 +4,13 @@ from . import models
 
 # Register your models here.
 admin.site.register(models.Cruise)
-# Destination registered below with decorator
-admin.site.register(models.InfoRequest)
+# Destination, InfoRequest y Review registrados abajo con decorador
+
+
+@admin.register(models.InfoRequest)
+class InfoRequestAdmin(admin.ModelAdmin):
+    # __str__ muestra el nombre del crucero: sin select_related sería una consulta por fila
+    list_select_related = ('cruise',)
 
 @admin.register(models.Destination)
 class DestinationAdmin(admin.ModelAdmin):
@@ -21,6 +26,7 @@ class DestinationAdmin(admin.ModelAdmin):
 @admin.register(models.Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ('user', 'destination', 'rating', 'created_at', 'has_comment')
+    list_select_related = ('user', 'destination')
     list_filter = ('rating', 'created_at', 'destination')
     search_fields = ('user__username', 'destination__name', 'comment')
     readonly_fields = ('created_at',)
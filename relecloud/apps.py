@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class RelecloudConfig(AppConfig):
     name = 'relecloud'
+
+    def ready(self):
+        from . import checks, latency, signals, slow_queries, timeouts  # noqa: F401 (checks y signals se registran al importarse)
+
+        connection_created.connect(slow_queries.install, dispatch_uid='relecloud.slow_queries')
+        connection_created.connect(latency.install, dispatch_uid='relecloud.latency')
+        connection_created.connect(timeouts.install, dispatch_uid='relecloud.timeouts')
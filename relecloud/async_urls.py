@@ -0,0 +1,24 @@
+"""
+URLs de ReleCloud con las vistas asíncronas (ver relecloud/async_views.py)
+
+Mismas rutas y nombres que relecloud/urls.py; project/urls.py incluye este
+módulo cuando settings.ASYNC_VIEWS es True.
+"""
+from django.urls import path
+from django.contrib.auth import views as auth_views
+
+from . import async_views, views
+
+urlpatterns = [
+    path('', async_views.index, name='index'),
+    path('about', async_views.about, name='about'),
+    path('destinations/', async_views.destinations, name='destinations'),
+    path('destination/<int:pk>', async_views.destination_detail, name='destination_detail'),
+    path('destination/<int:pk>/review/create/', async_views.review_create, name='review_create'),
+    path('cruise/<int:pk>', async_views.cruise_detail, name='cruise_detail'),
+    path('info_request', async_views.info_request, name='info_request'),
+    path('registro/', async_views.registro, name='registro'),
+    path('login/', async_views.login, name='login'),
+    path('logout/', auth_views.LogoutView.as_view(), name='logout'),
+    path('perf/metrics/', views.perf_metrics, name='perf_metrics'),
+]
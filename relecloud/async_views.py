@@ -0,0 +1,245 @@
+"""
+Vistas asíncronas de ReleCloud para el despliegue ASGI
+
+Mismas páginas, plantillas y mensajes que relecloud/views.py, escritas como
+corrutinas. Con un servidor ASGI (uvicorn, ver project/asgi.py) una petición
+que espera a la base de datos o al servidor de correo no ocupa un worker: el
+bucle de eventos sigue atendiendo otras mientras tanto.
+
+    - el catálogo sale del snapshot en memoria (catalog.aget_snapshot()); la
+      comprobación de la versión usa el ORM asíncrono
+    - el listado de destinos se envía con un iterador asíncrono
+      (streaming.astream_template())
+    - las reglas de negocio (quién puede publicar una review, el aviso si
+      falla el correo, los errores de un registro repetido) son las de
+      relecloud/services.py, las mismas que usan las vistas síncronas; las
+      comprobaciones de la review usan el ORM asíncrono (areview_denial())
+    - lo que no tiene versión asíncrona en Django (validar un ModelForm,
+      guardar en una transacción con retry_on_locked, renderizar un select
+      con los cruceros) va a un hilo con sync_to_async
+    - el correo de info_request se envía en un hilo del pool
+      (services.anotify_info_request)
+
+Las URLs están en relecloud/async_urls.py; project/urls.py las usa cuando
+settings.ASYNC_VIEWS es True (por defecto con project.asgi). Logout, el
+admin y perf_metrics siguen siendo vistas síncronas.
+
+El login y el registro calculan el hash de la contraseña en un hilo del pool
+(ver relecloud/hashers.py), no en el bucle de eventos ni en el hilo único
+que comparten las vistas síncronas con ASGI.
+
+Los POST de info_request, review_create y registro pasan por el mismo límite
+por cliente que las vistas síncronas (@rate_limit, ver relecloud/ratelimit.py).
+
+Las vistas del catálogo no aplican el enrutado a réplicas ni el timeout por
+sentencia de las síncronas: leen del snapshot en memoria y, como mucho, la
+fila de CatalogVersion. Los guardados sí llevan timeout y reintento.
+"""
+import logging
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import REDIRECT_FIELD_NAME, alogin
+from django.contrib.auth.views import redirect_to_login
+from django.forms import modelform_factory
+from django.http import Http404
+from django.shortcuts import aget_object_or_404, redirect, render
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.cache import never_cache
+from django.views.decorators.debug import sensitive_post_parameters
+
+from . import catalog, models, services, streaming
+from .forms import AsyncAuthenticationForm, RegistroUsuarioForm, ReviewForm
+from .ratelimit import rate_limit
+from .retry import retry_on_locked
+from .timeouts import get_default_timeout, statement_timeout
+from .views import InfoRequestCreate, RegistroUsuarioCreate
+
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+InfoRequestForm = modelform_factory(models.InfoRequest, fields=InfoRequestCreate.fields)
+
+# render() con un formulario cuyos campos consultan la base de datos (el select de cruceros)
+arender = sync_to_async(render)
+
+
+async def load_user(request):
+    """
+    Resuelve request.user con el ORM asíncrono.
+
+    AuthenticationMiddleware deja un usuario perezoso que se carga con una
+    consulta síncrona la primera vez que se usa (p. ej. la barra de
+    navegación), algo que no se puede hacer en el bucle de eventos.
+    """
+    request.user = await request.auser()
+    return request.user
+
+
+def login_required(view):
+    """
+    Redirige a los anónimos al login (como LoginRequiredMixin). Va por fuera
+    de @rate_limit, igual que LoginRequiredMixin va antes de RateLimitMixin en
+    las vistas síncronas: un anónimo no gasta tokens de su IP.
+    """
+    @wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        user = await load_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapped
+
+
+@retry_on_locked
+def save_form(form):
+    """form.save() en una transacción reintentable y con timeout por sentencia (en un hilo)"""
+    with statement_timeout(get_default_timeout()):
+        return form.save()
+
+
+async def index(request):
+    await load_user(request)
+    return render(request, 'index.html')
+
+
+async def about(request):
+    await load_user(request)
+    return render(request, 'about.html')
+
+
+async def destinations(request):
+    """
+    Listado de destinos en streaming (versión asíncrona de views.destinations)
+    """
+    await load_user(request)
+    snapshot = None
+    try:
+        snapshot = await catalog.aget_snapshot()
+        all_destinations = snapshot.ranking
+    except Exception as e:
+        # Si hay error (ej: tabla no existe), obtener destinos sin anotaciones
+        logger.error(f"Error al obtener el snapshot del catálogo: {e}")
+        all_destinations = models.Destination.objects.all()
+
+    return streaming.astream_template(
+        request, 'destinations.html', {'catalog_snapshot': snapshot},
+        rows=all_destinations, row_template='partials/destination_rows.html',
+    )
+
+
+async def catalog_detail(request, pk, lookup, model, template_name):
+    """Detalle de un destino o crucero del snapshot, con el contexto de CatalogSnapshotMixin"""
+    await load_user(request)
+    snapshot = await catalog.aget_snapshot()
+    record = getattr(snapshot, lookup)(pk)
+    if record is None:
+        raise Http404(f'No existe {model._meta.verbose_name} con id {pk}')
+    return render(request, template_name, {'object': record, lookup: record, 'catalog_snapshot': snapshot})
+
+
+async def destination_detail(request, pk):
+    return await catalog_detail(request, pk, 'destination', models.Destination, 'destination_detail.html')
+
+
+async def cruise_detail(request, pk):
+    return await catalog_detail(request, pk, 'cruise', models.Cruise, 'cruise_detail.html')
+
+
+@login_required
+@rate_limit('info_request')
+async def info_request(request):
+    """
+    Solicitud de información (versión asíncrona de views.InfoRequestCreate).
+
+    La solicitud se guarda siempre; el correo se envía después, en un hilo,
+    y si falla solo se muestra un aviso.
+    """
+    if request.method != 'POST':
+        return await arender(request, 'info_request_create.html', {'form': InfoRequestForm()})
+
+    form = InfoRequestForm(request.POST)
+    if not await sync_to_async(form.is_valid)():
+        return await arender(request, 'info_request_create.html', {'form': form})
+
+    info = await sync_to_async(save_form)(form)
+    messages.success(request, InfoRequestCreate.success_message % form.cleaned_data)
+    await services.anotify_info_request(request, info)
+    return redirect('index')
+
+
+@rate_limit('registro')
+async def registro(request):
+    """Registro de usuarios (versión asíncrona de views.RegistroUsuarioCreate)"""
+    await load_user(request)
+    if request.method != 'POST':
+        return render(request, 'registro.html', {'form': RegistroUsuarioForm()})
+
+    form = RegistroUsuarioForm(request.POST)
+    # La validación de contraseñas lee la lista de contraseñas comunes
+    if not await sync_to_async(form.is_valid)():
+        return render(request, 'registro.html', {'form': form})
+    await form.ahash_password()
+    # Los errores de un username o email repetido pueden consultar si el otro campo también lo está
+    if await sync_to_async(services.save_registration)(form, partial(save_form, form)) is None:
+        return render(request, 'registro.html', {'form': form})
+    messages.success(request, RegistroUsuarioCreate.success_message % form.cleaned_data)
+    return redirect('index')
+
+
+@sensitive_post_parameters()
+@never_cache
+async def login(request):
+    """
+    Inicio de sesión (versión asíncrona de auth_views.LoginView, misma
+    plantilla): la contraseña se comprueba con CachedModelBackend.aauthenticate()
+    """
+    await load_user(request)
+    if request.method != 'POST':
+        return render(request, 'login.html', {'form': AsyncAuthenticationForm(request)})
+
+    form = AsyncAuthenticationForm(request, data=request.POST)
+    if not await form.ais_valid():
+        return render(request, 'login.html', {'form': form})
+    await alogin(request, form.get_user())
+
+    next_url = request.POST.get(REDIRECT_FIELD_NAME, request.GET.get(REDIRECT_FIELD_NAME, ''))
+    if url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()):
+        return redirect(next_url)
+    return redirect(settings.LOGIN_REDIRECT_URL)
+
+
+@login_required
+@rate_limit('review_create')
+async def review_create(request, pk):
+    """
+    Alta de reviews (versión asíncrona de views.ReviewCreateView): el usuario
+    debe tener una compra (InfoRequest) de un crucero con el destino y no
+    haber enviado ya una review.
+    """
+    destination = await aget_object_or_404(models.Destination, pk=pk)
+    user = request.user
+
+    if request.method != 'POST':
+        return render(request, 'review_create.html', {'form': ReviewForm(), 'destination': destination})
+
+    form = ReviewForm(request.POST)
+    if not await sync_to_async(form.is_valid)():
+        return render(request, 'review_create.html', {'form': form, 'destination': destination})
+
+    denial = await services.areview_denial(user, destination)
+    if denial:
+        messages.error(request, denial)
+        return redirect('destination_detail', pk=destination.pk)
+
+    error = await sync_to_async(services.review_validation_error)(form, user, destination)
+    if error:
+        messages.error(request, error)
+        return render(request, 'review_create.html', {'form': form, 'destination': destination})
+
+    messages.success(request, services.REVIEW_SUCCESS_MESSAGE)
+    await sync_to_async(save_form)(form)
+    return redirect('destination_detail', pk=destination.pk)
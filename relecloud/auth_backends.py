@@ -0,0 +1,113 @@
+"""
+Backend de autenticación con el usuario autenticado en caché para ReleCloud
+
+AuthenticationMiddleware carga en cada petición el Usuario de la sesión con
+una consulta (backend.get_user()). CachedModelBackend es el ModelBackend de
+Django con esa lectura en la caché (alias CACHE_ALIAS) durante TIMEOUT
+segundos:
+
+    - Se invalida al guardar o borrar el Usuario (ver relecloud/signals.py):
+      cambio de contraseña, de datos, is_active, el last_login de cada login
+    - Con la contraseña en caché, la comprobación del hash de sesión de
+      Django sigue funcionando: tras un cambio de contraseña (y la
+      invalidación) las demás sesiones del usuario se cierran
+    - Las actualizaciones que no envían señales (QuerySet.update(),
+      bulk_update) no invalidan: el usuario puede tardar TIMEOUT segundos en
+      reflejarlas
+    - CACHE_ALIAS debe ser una caché compartida sin L1 (en settings, 'shared'):
+      con el TieredCache (ver relecloud/caching.py) la invalidación solo
+      vaciaría el L1 del worker que guarda el usuario, y los demás servirían
+      el anterior hasta L1_TIMEOUT segundos
+    - La autenticación (login) y los permisos son los de ModelBackend
+
+Junto con SESSION_ENGINE cached_db (o signed_cookies), una petición
+autenticada no hace ninguna consulta antes de llegar a la vista.
+
+aauthenticate() (login de la vista asíncrona) calcula el hash de la
+contraseña en un hilo del pool en lugar de en el bucle de eventos (ver
+relecloud/hashers.py).
+
+Las sesiones iniciadas con otro backend (p. ej. el ModelBackend de Django)
+guardan su ruta en la sesión: al cambiar AUTHENTICATION_BACKENDS, esos
+usuarios tienen que volver a iniciar sesión una vez.
+
+Configuración en settings.AUTH_USER_CACHE (TIMEOUT, CACHE_ALIAS); TIMEOUT 0
+la desactiva.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+from .hashers import acheck_password, ahash_password
+
+
+UserModel = get_user_model()
+
+
+AUTH_USER_CACHE_DEFAULTS = {
+    'TIMEOUT': 60,
+    'CACHE_ALIAS': 'default',
+}
+
+
+def get_auth_user_cache_settings():
+    """Combina settings.AUTH_USER_CACHE con los valores por defecto"""
+    return {**AUTH_USER_CACHE_DEFAULTS, **getattr(settings, 'AUTH_USER_CACHE', {})}
+
+
+def user_cache_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def invalidate_user(user_id):
+    """Borra de la caché el usuario user_id"""
+    caches[get_auth_user_cache_settings()['CACHE_ALIAS']].delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend que guarda en caché el usuario que carga get_user()
+    """
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        # Como ModelBackend.aauthenticate(), con el hash fuera del bucle de eventos
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Un hash también para usuarios inexistentes, para no distinguirlos por el tiempo
+            await ahash_password(password)
+            return None
+        if await acheck_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        config = get_auth_user_cache_settings()
+        if config['TIMEOUT'] <= 0:
+            return super().get_user(user_id)
+        cache = caches[config['CACHE_ALIAS']]
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, config['TIMEOUT'])
+        return user
+
+    async def aget_user(self, user_id):
+        config = get_auth_user_cache_settings()
+        if config['TIMEOUT'] <= 0:
+            return await super().aget_user(user_id)
+        cache = caches[config['CACHE_ALIAS']]
+        key = user_cache_key(user_id)
+        user = await cache.aget(key)
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is not None:
+                await cache.aset(key, user, config['TIMEOUT'])
+        return user
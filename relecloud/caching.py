@@ -0,0 +1,286 @@
+"""
+Caché en dos niveles con protección frente a estampidas para ReleCloud
+
+Contiene:
+    - TieredCache: backend de caché (settings.CACHES) con un L1 en memoria de
+      cada proceso (LRU acotado con TTL corto) delante de un L2 compartido
+      entre workers (otro alias de CACHES: fichero o base de datos en local,
+      Redis/Memcached en producción)
+    - get_or_recompute(): lectura con recálculo "single-flight" (un solo
+      worker recalcula una entrada caducada si el L2 tiene add() atómico; el
+      resto sirve el valor anterior mientras tanto) y caducidad anticipada
+      probabilística (XFetch: cuanto
+      más cerca de caducar y más caro de calcular, más probable que una
+      petición lo recalcule antes de tiempo)
+    - Contadores de aciertos/fallos/valores obsoletos por caché, expuestos en
+      la vista perf_metrics, y en la petición en curso (Server-Timing)
+
+Un delete() o set() en un worker no llega al L1 de los demás: cada L1 puede
+servir un valor antiguo durante como mucho L1_TIMEOUT segundos.
+"""
+import logging
+import math
+import pickle
+import random
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from django.core.cache import cache as default_cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+
+# Configurar logger para este módulo
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Segundos que se sigue sirviendo un valor caducado mientras otro worker lo recalcula
+DEFAULT_STALE_TTL = 300
+# Duración máxima del cerrojo de recálculo (si el worker muere, otro lo retoma)
+LOCK_TIMEOUT = 30
+# Espera máxima cuando no hay valor anterior que servir y otro worker está recalculando
+WAIT_TIMEOUT = 2.0
+WAIT_INTERVAL = 0.05
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(cache_name, event):
+    with _stats_lock:
+        _stats[cache_name, event] += 1
+
+
+def cache_stats():
+    """Contadores de este proceso por caché: {nombre: {evento: n}}"""
+    with _stats_lock:
+        result = {}
+        for (cache_name, event), count in sorted(_stats.items()):
+            result.setdefault(cache_name, {})[event] = count
+        return result
+
+
+def reset_cache_stats():
+    """Vacía los contadores (útil en tests)"""
+    with _stats_lock:
+        _stats.clear()
+
+
+class LRUCache:
+    """
+    Caché en memoria acotada a `max_entries`, con TTL por entrada.
+
+    Guarda los valores serializados con pickle, como LocMemCache, para que
+    quien los lee no pueda modificar el objeto compartido.
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, payload = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+        return pickle.loads(payload)
+
+    def set(self, key, value, ttl):
+        if ttl is not None and ttl <= 0:
+            self.delete(key)
+            return
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        expires_at = math.inf if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, payload)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache(BaseCache):
+    """
+    Backend de caché L1 (memoria del proceso) + L2 (alias compartido).
+
+    LOCATION es el alias de CACHES que hace de L2. OPTIONS:
+        L1_MAX_ENTRIES  entradas del LRU de cada proceso (por defecto 1000)
+        L1_TIMEOUT      segundos máximos de una entrada en L1 (por defecto 5)
+
+    Las operaciones atómicas (add, incr, decr) se resuelven en el L2, que es
+    el que comparten los workers, y solo son atómicas entre procesos si lo es
+    el backend del L2: Redis y Memcached sí; FileBasedCache no (su add() es
+    has_key() seguido de set(), y dos workers pueden obtener True a la vez).
+    """
+
+    def __init__(self, location, params):
+        options = dict(params.get('OPTIONS', {}))
+        l1_max_entries = options.pop('L1_MAX_ENTRIES', 1000)
+        self.l1_timeout = options.pop('L1_TIMEOUT', 5)
+        super().__init__({**params, 'OPTIONS': options})
+        self.l2_alias = location
+        self.l1 = LRUCache(l1_max_entries)
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def _l1_key(self, key, version):
+        return self.make_and_validate_key(key, version=version)
+
+    def _l1_ttl(self, timeout):
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        if timeout is None:
+            return self.l1_timeout
+        return min(self.l1_timeout, timeout)
+
+    def _l2_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def get(self, key, default=None, version=None):
+        l1_key = self._l1_key(key, version)
+        value = self.l1.get(l1_key, _MISSING)
+        if value is not _MISSING:
+            _count(self.l2_alias, 'l1_hit')
+            return value
+
+        value = self.l2.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            _count(self.l2_alias, 'miss')
+            return default
+        _count(self.l2_alias, 'l2_hit')
+        self.l1.set(l1_key, value, self.l1_timeout)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout=self._l2_timeout(timeout), version=version)
+        self.l1.set(self._l1_key(key, version), value, self._l1_ttl(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout=self._l2_timeout(timeout), version=version)
+        if added:
+            self.l1.set(self._l1_key(key, version), value, self._l1_ttl(timeout))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout=self._l2_timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self.l1.delete(self._l1_key(key, version))
+        return self.l2.delete(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self.l1.delete(self._l1_key(key, version))
+        return self.l2.incr(key, delta, version=version)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+
+class CachedValue:
+    """Valor guardado por get_or_recompute, con su caducidad lógica y su coste"""
+    __slots__ = ('value', 'expires_at', 'delta')
+
+    def __init__(self, value, expires_at, delta):
+        self.value = value
+        self.expires_at = expires_at
+        self.delta = delta
+
+    def __getstate__(self):
+        return (self.value, self.expires_at, self.delta)
+
+    def __setstate__(self, state):
+        self.value, self.expires_at, self.delta = state
+
+    def should_refresh(self, now, beta):
+        """Caducado, o caducidad anticipada XFetch: now - delta·beta·ln(rand) >= expires_at"""
+        if now >= self.expires_at:
+            return True
+        if beta <= 0 or self.delta <= 0:
+            return False
+        return now - self.delta * beta * math.log(1.0 - random.random()) >= self.expires_at
+
+
+def get_or_recompute(key, compute, timeout, cache=None, stale_ttl=DEFAULT_STALE_TTL, beta=1.0):
+    """
+    Retorna el valor de `key`, recalculándolo con `compute()` si hace falta.
+
+    El valor se considera fresco durante `timeout` segundos y se conserva
+    `stale_ttl` segundos más. Cuando hay que recalcularlo (caducado, o por
+    caducidad anticipada con factor `beta`; 0 la desactiva), solo el worker
+    que obtiene el cerrojo en la caché compartida lo recalcula; el resto
+    sirve el valor obsoleto. Sin valor anterior, los demás esperan hasta
+    WAIT_TIMEOUT segundos a que aparezca y, si no, lo calculan ellos.
+
+    El cerrojo es un cache.add(): entre procesos solo es exclusivo con un L2
+    de add() atómico (Redis o Memcached). Con la caché en ficheros por defecto
+    es un mejor esfuerzo: de vez en cuando dos workers recalculan la misma
+    entrada a la vez.
+    """
+    cache = cache or default_cache
+    name = key.split(':', 1)[0]
+    entry = cache.get(key)
+    now = time.time()
+
+    if entry is not None and not entry.should_refresh(now, beta):
+        _count(name, 'hit')
+        metrics.record_cache_lookup(True)
+        return entry.value
+
+    lock_key = f'{key}:lock'
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, LOCK_TIMEOUT):
+        try:
+            return _recompute(cache, key, compute, timeout, stale_ttl, name, early=entry is not None)
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    if entry is not None:
+        _count(name, 'stale')
+        metrics.record_cache_stale()
+        return entry.value
+
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            _count(name, 'hit')
+            metrics.record_cache_lookup(True)
+            return entry.value
+
+    logger.warning(f'Caché: sin valor de {key} tras esperar {WAIT_TIMEOUT}s al recálculo de otro worker')
+    return _recompute(cache, key, compute, timeout, stale_ttl, name, early=False)
+
+
+def _recompute(cache, key, compute, timeout, stale_ttl, name, early):
+    _count(name, 'early_refresh' if early else 'miss')
+    metrics.record_cache_lookup(False)
+    started = time.time()
+    value = compute()
+    finished = time.time()
+    cache.set(key, CachedValue(value, finished + timeout, finished - started), timeout + stale_ttl)
+    return value
+
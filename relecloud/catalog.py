@@ -0,0 +1,419 @@
+"""
+Snapshot inmutable del catálogo en memoria de cada proceso para ReleCloud
+
+El catálogo (destinos, cruceros, sus relaciones y la puntuación de cada
+destino) cambia muy poco y se lee en cada página del catálogo. En lugar de
+consultarlo en cada petición, cada proceso mantiene un CatalogSnapshot:
+
+    - Registros compactos e inmutables (__slots__) en diccionarios por id,
+      con la adyacencia crucero <-> destino ya resuelta en tuplas y el
+      ranking de destinos precalculado
+    - Versionado con CatalogVersion: cualquier cambio del catálogo incrementa
+      el contador de la fila CATALOG_VERSION_PK en su misma transacción, y
+      cualquier cambio de reviews el de RATINGS_VERSION_PK (ver
+      relecloud/signals.py, bump_catalog_version y bump_ratings_version).
+      get_snapshot() consulta ambas versiones como mucho una vez cada
+      CHECK_INTERVAL_MS. Si ha cambiado el catálogo, reconstruye el snapshot
+      (cuatro consultas); si solo han cambiado las reviews, lo copia con las
+      puntuaciones nuevas (una consulta). Sustituye la referencia de forma
+      atómica; las peticiones en curso siguen usando el anterior
+    - Un solo hilo reconstruye; los demás sirven el snapshot anterior. Si la
+      base de datos falla durante la reconstrucción, se sigue sirviendo el
+      anterior
+    - aget_snapshot(): la misma comprobación para las vistas asíncronas, con
+      el ORM asíncrono; solo la reconstrucción pasa a un hilo
+    - preload_snapshot(): con gunicorn --preload el snapshot se construye en
+      el proceso maestro antes del fork y los workers lo comparten por
+      copy-on-write (gc.freeze() evita que el recolector toque sus páginas)
+    - La versión del snapshot forma parte de las claves de los fragmentos de
+      plantilla cacheados con {% catalogcache %} (ver
+      relecloud/templatetags/catalog_cache.py)
+
+Configuración: settings.CATALOG_SNAPSHOT.
+"""
+import gc
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Avg, Count, F
+from django.utils import timezone
+
+from .models import CatalogVersion, Cruise, Destination, Review
+
+
+# Configurar logger para este módulo
+logger = logging.getLogger(__name__)
+
+CATALOG_SNAPSHOT_DEFAULTS = {
+    'CHECK_INTERVAL_MS': 1000,
+    'PRELOAD': True,
+    'FRAGMENT_TIMEOUT': 3600,
+}
+
+CATALOG_VERSION_PK = 1
+
+# Versión de las puntuaciones: una review nueva solo recalcula las medias
+RATINGS_VERSION_PK = 2
+
+
+def get_catalog_snapshot_settings():
+    """Combina settings.CATALOG_SNAPSHOT con los valores por defecto"""
+    return {**CATALOG_SNAPSHOT_DEFAULTS, **getattr(settings, 'CATALOG_SNAPSHOT', {})}
+
+
+class _Record:
+    """Base de los registros del snapshot: sin __dict__ e inmutables tras construirse"""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} es inmutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} es inmutable')
+
+    @classmethod
+    def build(cls, **values):
+        """Crea un registro con todos sus campos (benchmarks y tests)"""
+        return _init(cls(), **values)
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.id}: {self.name}>'
+
+
+class DestinationRecord(_Record):
+    """Destino del snapshot, con su puntuación y sus cruceros"""
+    __slots__ = ('id', 'name', 'description', 'image_url', 'avg_rating', 'review_count', 'cruises')
+
+
+class CruiseRecord(_Record):
+    """Crucero del snapshot, con sus destinos"""
+    __slots__ = ('id', 'name', 'description', 'destinations')
+
+
+def _init(record, **values):
+    for name, value in values.items():
+        object.__setattr__(record, name, value)
+    return record
+
+
+class CatalogSnapshot:
+    """
+    Catálogo completo en un instante (versión `token` del catálogo y
+    `ratings_token` de las puntuaciones).
+
+    Los registros se guardan en diccionarios por id: la memoria depende del
+    número de registros, no de los ids (puede haber huecos grandes).
+    """
+    __slots__ = ('token', 'ratings_token', 'destinations', 'cruises', 'ranking', 'built_at')
+
+    def __init__(self, token, destinations, cruises, ratings_token=None):
+        self.token = token
+        self.ratings_token = ratings_token
+        self.destinations = {record.id: record for record in destinations}
+        self.cruises = {record.id: record for record in cruises}
+        # Más reviews primero, luego mejor puntuación (sin puntuación al final)
+        self.ranking = tuple(sorted(
+            destinations,
+            key=lambda d: (-d.review_count, d.avg_rating is None, -(d.avg_rating or 0), d.id),
+        ))
+        self.built_at = time.time()
+
+    @property
+    def tokens(self):
+        """(token, ratings_token), como los retorna read_versions()"""
+        return self.token, self.ratings_token
+
+    @property
+    def version_key(self):
+        """Versión en forma de texto, para claves de caché (ver templatetags/catalog_cache.py)"""
+        return f'{_token_key(self.token)}.{_token_key(self.ratings_token)}'
+
+    def destination(self, pk):
+        """Destino con id `pk` o None"""
+        return _lookup(self.destinations, pk)
+
+    def cruise(self, pk):
+        """Crucero con id `pk` o None"""
+        return _lookup(self.cruises, pk)
+
+
+def _lookup(table, pk):
+    try:
+        return table.get(int(pk))
+    except (TypeError, ValueError):
+        return None
+
+
+def _token_key(token):
+    if token is None:
+        return '0'
+    version, changed_at = token
+    return f'{version}-{changed_at.timestamp():.6f}'
+
+
+def _version_rows(using):
+    return CatalogVersion.objects.using(using).filter(
+        pk__in=(CATALOG_VERSION_PK, RATINGS_VERSION_PK),
+    ).values_list('pk', 'version', 'changed_at')
+
+
+def _tokens(rows):
+    tokens = {pk: (version, changed_at) for pk, version, changed_at in rows}
+    return tokens.get(CATALOG_VERSION_PK), tokens.get(RATINGS_VERSION_PK)
+
+
+def read_versions(using=None):
+    """
+    Tokens de versión actuales (catálogo, puntuaciones) con una consulta;
+    cada uno es (version, changed_at), o None sin fila
+    """
+    return _tokens(list(_version_rows(using)))
+
+
+async def aread_versions(using=None):
+    """Versión asíncrona de read_versions()"""
+    return _tokens([row async for row in _version_rows(using)])
+
+
+def read_ratings(using=None):
+    """{destination_id: {'avg_rating', 'review_count'}} de los destinos con reviews, con una consulta"""
+    return {
+        row['destination_id']: row
+        for row in Review.objects.using(using).order_by().values('destination_id').annotate(
+            avg_rating=Avg('rating'), review_count=Count('id'),
+        )
+    }
+
+
+def _destination(ratings, **values):
+    rating = ratings.get(values['id'], {})
+    return _init(
+        DestinationRecord(), avg_rating=rating.get('avg_rating'), review_count=rating.get('review_count', 0), **values,
+    )
+
+
+def _link(tokens, destinations, cruises, links):
+    """Enlaza los registros con los pares (cruise_id, destination_id) de links y crea el snapshot"""
+    cruise_ids = {pk: [] for pk in destinations}
+    destination_ids = {pk: [] for pk in cruises}
+    for cruise_id, destination_id in links:
+        destination_ids[cruise_id].append(destination_id)
+        cruise_ids[destination_id].append(cruise_id)
+
+    for pk, record in destinations.items():
+        _init(record, cruises=tuple(cruises[cruise_id] for cruise_id in cruise_ids[pk]))
+    for pk, record in cruises.items():
+        _init(record, destinations=tuple(destinations[destination_id] for destination_id in destination_ids[pk]))
+
+    token, ratings_token = tokens
+    return CatalogSnapshot(token, list(destinations.values()), list(cruises.values()), ratings_token=ratings_token)
+
+
+def build_snapshot(tokens, using=None):
+    """
+    Construye un CatalogSnapshot para las versiones `tokens` (las de
+    read_versions()) con cuatro consultas, independientes del tamaño del
+    catálogo.
+
+    `tokens` debe leerse antes que los datos: si el catálogo cambia entre
+    ambas lecturas, el snapshot tiene datos más nuevos que su versión y se
+    reconstruye en la siguiente comprobación (nunca se queda atrasado).
+    """
+    ratings = read_ratings(using)
+    destinations = {
+        row['id']: _destination(
+            ratings, id=row['id'], name=row['name'], description=row['description'],
+            image_url=Destination(**row).image_url,
+        )
+        for row in Destination.objects.using(using).order_by('pk').values('id', 'name', 'description', 'image')
+    }
+    cruises = {
+        row['id']: _init(CruiseRecord(), **row)
+        for row in Cruise.objects.using(using).order_by('pk').values('id', 'name', 'description')
+    }
+    links = Cruise.destinations.through.objects.using(using).order_by('cruise_id', 'destination_id')
+    return _link(tokens, destinations, cruises, links.values_list('cruise_id', 'destination_id'))
+
+
+def rerate_snapshot(snapshot, tokens, using=None):
+    """
+    Copia de `snapshot` con las puntuaciones de las versiones `tokens`: una
+    consulta, sin volver a leer destinos, cruceros ni sus relaciones.
+    """
+    ratings = read_ratings(using)
+    destinations = {
+        pk: _destination(
+            ratings, id=pk, name=record.name, description=record.description, image_url=record.image_url,
+        )
+        for pk, record in snapshot.destinations.items()
+    }
+    cruises = {
+        pk: _init(CruiseRecord(), id=pk, name=record.name, description=record.description)
+        for pk, record in snapshot.cruises.items()
+    }
+    links = [(cruise.id, destination.id) for cruise in snapshot.cruises.values() for destination in cruise.destinations]
+    return _link(tokens, destinations, cruises, links)
+
+
+# Snapshot vigente del proceso; se sustituye entero, nunca se modifica
+_current = None
+_next_check = 0.0
+_rebuild_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    Retorna el snapshot vigente, comprobando la versión del catálogo como
+    mucho una vez cada CHECK_INTERVAL_MS.
+
+    Raises:
+        DatabaseError: Si no hay snapshot previo y la base de datos no responde
+    """
+    global _next_check
+    snapshot = _current
+    now = time.monotonic()
+    if snapshot is not None and now < _next_check:
+        return snapshot
+
+    try:
+        tokens = read_versions()
+    except DatabaseError as e:
+        if snapshot is None:
+            raise
+        logger.warning(f'Catálogo: no se pudo comprobar la versión, se sirve el snapshot anterior: {e}')
+        return snapshot
+
+    if snapshot is not None and snapshot.tokens == tokens:
+        _next_check = now + get_catalog_snapshot_settings()['CHECK_INTERVAL_MS'] / 1000
+        return snapshot
+    return _refresh(tokens, snapshot)
+
+
+async def aget_snapshot():
+    """
+    Versión asíncrona de get_snapshot(). Mientras el snapshot está vigente no
+    hay ninguna espera; la versión se lee con el ORM asíncrono y solo la
+    reconstrucción (consultas y cálculo del ranking) va a un hilo.
+    """
+    global _next_check
+    snapshot = _current
+    now = time.monotonic()
+    if snapshot is not None and now < _next_check:
+        return snapshot
+
+    try:
+        tokens = await aread_versions()
+    except DatabaseError as e:
+        if snapshot is None:
+            raise
+        logger.warning(f'Catálogo: no se pudo comprobar la versión, se sirve el snapshot anterior: {e}')
+        return snapshot
+
+    if snapshot is not None and snapshot.tokens == tokens:
+        _next_check = now + get_catalog_snapshot_settings()['CHECK_INTERVAL_MS'] / 1000
+        return snapshot
+    return await sync_to_async(_refresh)(tokens, snapshot)
+
+
+def _refresh(tokens, snapshot):
+    global _current, _next_check
+    # Con un snapshot que servir no se espera a que otro hilo termine de reconstruir
+    if not _rebuild_lock.acquire(blocking=snapshot is None):
+        return snapshot
+    try:
+        if _current is not None and _current.tokens == tokens:
+            return _current
+        # Si el catálogo no ha cambiado, basta con recalcular las puntuaciones
+        rerate = _current is not None and _current.token == tokens[0]
+        started = time.perf_counter()
+        try:
+            fresh = rerate_snapshot(_current, tokens) if rerate else build_snapshot(tokens)
+        except DatabaseError as e:
+            if snapshot is None:
+                raise
+            logger.warning(f'Catálogo: error al reconstruir el snapshot, se sirve el anterior: {e}')
+            return snapshot
+        _current = fresh
+        _next_check = time.monotonic() + get_catalog_snapshot_settings()['CHECK_INTERVAL_MS'] / 1000
+        token, ratings_token = tokens
+        logger.info(
+            f'Catálogo: snapshot v{token[0] if token else 0}.{ratings_token[0] if ratings_token else 0} '
+            f'con {len(fresh.ranking)} destinos {"con puntuaciones nuevas" if rerate else "construido"} '
+            f'en {(time.perf_counter() - started) * 1000:.1f} ms'
+        )
+        return fresh
+    finally:
+        _rebuild_lock.release()
+
+
+def _expire_check():
+    global _next_check
+    _next_check = 0.0
+
+
+def reset_snapshot():
+    """Descarta el snapshot del proceso (tests)"""
+    global _current
+    with _rebuild_lock:
+        _current = None
+        _expire_check()
+
+
+def _bump(pk, using):
+    updated = CatalogVersion.objects.using(using).filter(pk=pk).update(
+        version=F('version') + 1, changed_at=timezone.now(),
+    )
+    if not updated:
+        CatalogVersion.objects.using(using).get_or_create(pk=pk, defaults={'version': 1})
+    transaction.on_commit(_expire_check, using=using)
+
+
+def bump_catalog_version(using=None):
+    """
+    Incrementa la versión del catálogo dentro de la transacción en curso.
+
+    Los demás procesos verán el cambio en su siguiente comprobación (como
+    mucho CHECK_INTERVAL_MS después del commit) y reconstruirán su snapshot;
+    este proceso lo comprueba en su siguiente petición.
+    """
+    _bump(CATALOG_VERSION_PK, using)
+
+
+def bump_ratings_version(using=None):
+    """
+    Incrementa la versión de las puntuaciones (reviews) dentro de la
+    transacción en curso: los procesos solo recalculan las medias.
+    """
+    _bump(RATINGS_VERSION_PK, using)
+
+
+def preload_snapshot():
+    """
+    Construye el snapshot antes del fork de los workers (gunicorn --preload).
+
+    Cierra después las conexiones (no deben compartirse entre procesos) y
+    congela el recolector de basura para que no escriba en las páginas
+    compartidas por copy-on-write.
+    """
+    if not get_catalog_snapshot_settings()['PRELOAD']:
+        return None
+    try:
+        snapshot = get_snapshot()
+    except DatabaseError as e:
+        logger.warning(f'Catálogo: no se pudo precargar el snapshot: {e}')
+        return None
+    finally:
+        connections.close_all()
+    gc.freeze()
+    return snapshot
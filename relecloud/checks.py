@@ -0,0 +1,63 @@
+"""
+Comprobaciones del sistema de ReleCloud (python manage.py check)
+
+settings.py no exige las variables del correo al importarse, para que los
+comandos y scripts que no envían correo arranquen sin ellas. Si falta
+alguna, el aviso relecloud.W001 aparece al ejecutar cualquier comando y el
+envío de correos de services.py fallará (y lo registrará en el log).
+
+relecloud.W002 avisa si el coste del hash de contraseñas configurado queda
+por debajo del mínimo (ver relecloud/hashers.py), y relecloud.E001 de las
+reglas de RATE_LIMIT que no tienen el formato 'N/periodo'.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from .hashers import MINIMUM_WORK, WORK_SETTINGS, get_password_hashing_settings
+from .ratelimit import get_rate_limit_settings, parse_rate
+
+
+REQUIRED_EMAIL_SETTINGS = ['EMAIL_HOST_USER', 'EMAIL_HOST_PASSWORD', 'NOTIFY_EMAIL']
+
+
+@register('email')
+def check_email_settings(app_configs=None, **kwargs):
+    """Avisa de las variables de correo sin valor"""
+    missing = [name for name in REQUIRED_EMAIL_SETTINGS if not getattr(settings, name, '')]
+    if not missing:
+        return []
+    return [Warning(
+        f"Faltan las variables de correo {', '.join(missing)}: no se enviarán los correos de las solicitudes de información",
+        hint='Defínelas en el entorno o en el fichero .env.',
+        id='relecloud.W001',
+    )]
+
+
+@register(Tags.security)
+def check_password_hashing(app_configs=None, **kwargs):
+    """Avisa si el coste del hash de contraseñas está por debajo del mínimo (ver relecloud/hashers.py)"""
+    config = get_password_hashing_settings()
+    algorithm = config['ALGORITHM']
+    name = WORK_SETTINGS.get(algorithm)
+    if name is None or config[name] >= MINIMUM_WORK[algorithm]:
+        return []
+    return [Warning(
+        f'PASSWORD_HASHING {name}={config[name]} está por debajo del mínimo recomendado para '
+        f'{algorithm} ({MINIMUM_WORK[algorithm]})',
+        hint='python manage.py bench_password_hashing recomienda un valor para esta máquina.',
+        id='relecloud.W002',
+    )]
+
+
+@register()
+def check_rate_limits(app_configs=None, **kwargs):
+    """Comprueba el formato de las reglas de settings.RATE_LIMIT (ver relecloud/ratelimit.py)"""
+    errors = []
+    for scope, rate in get_rate_limit_settings()['RATES'].items():
+        if not rate:
+            continue
+        try:
+            parse_rate(rate)
+        except ValueError as e:
+            errors.append(Error(f'RATE_LIMIT: regla {scope}: {e}', id='relecloud.E001'))
+    return errors
@@ -1,25 +1,47 @@
 from django import forms
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth import aauthenticate
+from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Lower
+from . import hashers
 from .models import Usuario, Review
 
 
 class RegistroUsuarioForm(UserCreationForm):
+    """
+    Formulario de registro de usuarios.
+
+    La unicidad de username y email (sin distinguir mayúsculas) no se
+    comprueba con consultas antes de insertar: la garantizan los índices
+    únicos de Usuario.Meta.constraints, también con registros simultáneos.
+    save() inserta directamente y, si choca con un índice, la vista llama a
+    add_unique_error() para mostrar el mismo error en el campo.
+
+    La vista asíncrona calcula antes el hash de la contraseña en un hilo del
+    pool con ahash_password(); save() lo reutiliza.
+    """
+    # Campo: (índice único sin distinguir mayúsculas, mensaje)
+    UNIQUE_FIELDS = {
+        'username': ('usuario_username_lower_unique', 'Este nombre de usuario ya está en uso.'),
+        'email': ('usuario_email_lower_unique', 'Este correo electrónico ya está registrado.'),
+    }
+    # Hash de password1 calculado por ahash_password()
+    password_hash = None
+
     class Meta:
         model = Usuario
         fields = ('username', 'first_name', 'last_name', 'email', 'telefono', 'password1', 'password2')
     
     def clean_email(self):
         email = self.cleaned_data.get('email')
-        if Usuario.objects.filter(email=email).exists():
-            raise ValidationError('Este correo electrónico ya está registrado.')
-        return email
+        # Sin la comprobación de unicidad del modelo (ver _get_validation_exclusions)
+        return Usuario._meta.get_field('email').clean(email, self.instance)
     
     def clean_username(self):
         username = self.cleaned_data.get('username')
-        if Usuario.objects.filter(username=username).exists():
-            raise ValidationError('Este nombre de usuario ya está en uso.')
-        return username
+        return Usuario._meta.get_field('username').clean(username, self.instance)
     
     def clean_first_name(self):
         first_name = self.cleaned_data.get('first_name')
@@ -33,6 +55,91 @@ class RegistroUsuarioForm(UserCreationForm):
             raise ValidationError('Los apellidos son obligatorios.')
         return last_name
 
+    def _get_validation_exclusions(self):
+        # Ni validate_unique ni los UniqueConstraint de estos campos: serían una
+        # consulta por campo antes del INSERT. Sus validadores se ejecutan en clean_<campo>
+        return super()._get_validation_exclusions() | set(self.UNIQUE_FIELDS)
+
+    def save(self, commit=True):
+        if not commit:
+            return super().save(commit=False)
+        # En un savepoint: si el INSERT choca con un índice único, la
+        # transacción exterior sigue siendo utilizable para mostrar el error
+        with transaction.atomic():
+            return super().save()
+
+    async def ahash_password(self):
+        """Calcula el hash de password1 fuera del bucle de eventos (tras is_valid())"""
+        self.password_hash = await hashers.ahash_password(self.cleaned_data['password1'])
+
+    def set_password_and_save(self, user, password_field_name='password1', commit=True):
+        if self.password_hash is None:
+            return super().set_password_and_save(user, password_field_name, commit)
+        user.password = self.password_hash
+        if commit:
+            user.save()
+        return user
+
+    def add_unique_error(self, error):
+        """
+        Añade a los campos repetidos los errores de un IntegrityError de save().
+
+        Retorna False si el error no es de ninguno de los índices únicos de
+        UNIQUE_FIELDS (quien llama debe relanzarlo).
+        """
+        message = str(error)
+        table = Usuario._meta.db_table
+        # El índice funcional o, para un duplicado exacto de username, su índice
+        # UNIQUE de columna (SQLite: tabla.columna; PostgreSQL: tabla_columna_key)
+        clashes = [
+            field for field, (constraint, _) in self.UNIQUE_FIELDS.items()
+            if constraint in message or f'{table}.{field}' in message or f'{table}_{field}_key' in message
+        ]
+        if not clashes:
+            return False
+        # La base de datos solo informa del primer índice con el que choca el
+        # INSERT: solo en este caso, una consulta por cada otro campo
+        for field in self.UNIQUE_FIELDS:
+            if field not in clashes and self._value_taken(field):
+                clashes.append(field)
+        for field, (_, text) in self.UNIQUE_FIELDS.items():
+            if field in clashes:
+                self.add_error(field, text)
+        return True
+
+    def _value_taken(self, field):
+        """True si otro usuario tiene ya el valor de field (sin distinguir mayúsculas, como el índice)"""
+        value = self.cleaned_data.get(field)
+        return value is not None and Usuario.objects.alias(
+            value_lower=Lower(field),
+        ).filter(value_lower=Lower(Value(value))).exists()
+
+
+class AsyncAuthenticationForm(AuthenticationForm):
+    """
+    AuthenticationForm para la vista de login asíncrona.
+
+    is_valid() solo valida los campos; ais_valid() autentica además con
+    aauthenticate(), que calcula el hash en un hilo del pool.
+    """
+
+    def clean(self):
+        return self.cleaned_data
+
+    async def ais_valid(self):
+        if not self.is_valid():
+            return False
+        self.user_cache = await aauthenticate(
+            self.request, username=self.cleaned_data['username'], password=self.cleaned_data['password'],
+        )
+        try:
+            if self.user_cache is None:
+                raise self.get_invalid_login_error()
+            self.confirm_login_allowed(self.user_cache)
+        except ValidationError as e:
+            self.add_error(None, e)
+        return not self.errors
+
 
 class ReviewForm(forms.ModelForm):
     """
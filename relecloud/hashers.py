@@ -0,0 +1,118 @@
+"""
+Política de hash de contraseñas de ReleCloud
+
+Login y registro calculan un hash de la contraseña. Con el PBKDF2 de Django
+5.2 (1.000.000 de iteraciones) son ~0,5 s de CPU por login en un núcleo de
+la máquina de despliegue. El algoritmo y su coste se configuran en
+settings.PASSWORD_HASHING:
+
+    ALGORITHM            pbkdf2_sha256 o scrypt: el hasher preferido, el
+                         primero de PASSWORD_HASHERS
+    PBKDF2_ITERATIONS    iteraciones de TunedPBKDF2PasswordHasher
+    SCRYPT_WORK_FACTOR   N de TunedScryptPasswordHasher (potencia de 2)
+
+python manage.py bench_password_hashing mide el tiempo por hash de cada
+algoritmo y coste en la máquina y recomienda valores para una latencia
+objetivo sin bajar de MINIMUM_WORK (los mínimos de OWASP). La comprobación
+relecloud.W002 avisa si la configuración queda por debajo.
+
+Los hashes guardados se actualizan solos: al iniciar sesión, Django vuelve a
+calcular el hash con el hasher preferido si el guardado usa otro algoritmo u
+otro coste (must_update()). Los demás hashers de PASSWORD_HASHERS solo
+verifican contraseñas antiguas.
+
+Con ASGI, acheck_password() y ahash_password() calculan el hash en un hilo
+del pool (sync_to_async con thread_sensitive=False): hashlib libera el GIL,
+así que los logins simultáneos no bloquean el bucle de eventos ni esperan
+unos a otros en el hilo compartido de las vistas síncronas. En Django 5.2,
+AbstractBaseUser.acheck_password() verifica en el propio bucle.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, ScryptPasswordHasher, make_password, verify_password
+from django.utils.module_loading import import_string
+
+
+# Los costes de Django: bajarlos es una decisión explícita de la configuración
+# (con bench_password_hashing), porque must_update() recalcula los hashes
+# guardados con el coste nuevo en el siguiente login
+PASSWORD_HASHING_DEFAULTS = {
+    'ALGORITHM': 'pbkdf2_sha256',
+    'PBKDF2_ITERATIONS': PBKDF2PasswordHasher.iterations,
+    'SCRYPT_WORK_FACTOR': ScryptPasswordHasher.work_factor,
+}
+
+# Coste mínimo por algoritmo: OWASP Password Storage Cheat Sheet para
+# PBKDF2-HMAC-SHA256 y para scrypt con r=8, p=5 (los de Django)
+MINIMUM_WORK = {
+    'pbkdf2_sha256': 600_000,
+    'scrypt': 2 ** 14,
+}
+
+# Parámetro de coste de cada algoritmo en settings.PASSWORD_HASHING
+WORK_SETTINGS = {
+    'pbkdf2_sha256': 'PBKDF2_ITERATIONS',
+    'scrypt': 'SCRYPT_WORK_FACTOR',
+}
+
+
+def get_password_hashing_settings():
+    """Combina settings.PASSWORD_HASHING con los valores por defecto"""
+    return {**PASSWORD_HASHING_DEFAULTS, **getattr(settings, 'PASSWORD_HASHING', {})}
+
+
+def preferred_first(hashers, algorithm):
+    """Las rutas de hashers con la del algoritmo algorithm primero (el preferido por Django)"""
+    return sorted(hashers, key=lambda path: import_string(path).algorithm != algorithm)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 con las iteraciones de settings.PASSWORD_HASHING.
+
+    Mismo formato que el hasher de Django: verifica los hashes que ya hay y
+    must_update() pide recalcular los que tienen otro número de iteraciones.
+    """
+
+    @property
+    def iterations(self):
+        return get_password_hashing_settings()['PBKDF2_ITERATIONS']
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """
+    scrypt con el N de settings.PASSWORD_HASHING.
+
+    Con N >= 2**15, el límite de memoria por defecto de OpenSSL (32 MB) no
+    basta: maxmem deja el doble de lo que necesita.
+    """
+
+    @property
+    def work_factor(self):
+        return get_password_hashing_settings()['SCRYPT_WORK_FACTOR']
+
+    @property
+    def maxmem(self):
+        return 2 * 128 * self.work_factor * self.block_size
+
+
+async def ahash_password(raw_password):
+    """make_password() en un hilo del pool"""
+    return await sync_to_async(make_password, thread_sensitive=False)(raw_password)
+
+
+async def acheck_password(user, raw_password):
+    """
+    user.acheck_password() con el hash en un hilo del pool.
+
+    Si la contraseña es correcta y el hash guardado usa otro algoritmo u otro
+    coste, lo recalcula con el hasher preferido y lo guarda, como
+    check_password().
+    """
+    is_correct, must_update = await sync_to_async(verify_password, thread_sensitive=False)(
+        raw_password, user.password,
+    )
+    if is_correct and must_update:
+        user.password = await ahash_password(raw_password)
+        await user.asave(update_fields=['password'])
+    return is_correct
@@ -0,0 +1,312 @@
+"""
+Asesor de índices para ReleCloud
+
+Ejecuta QuerySet.explain() sobre un catálogo con las consultas reales de la
+aplicación (vistas, formularios, modelos y admin) contra la base de datos
+actual y marca los problemas del plan:
+
+    - recorridos completos de tabla (SQLite: "SCAN tabla" sin índice,
+      PostgreSQL: "Seq Scan on tabla")
+    - ordenaciones en un B-tree temporal (SQLite: "USE TEMP B-TREE FOR ORDER BY",
+      PostgreSQL: nodo "Sort")
+    - filtros residuales: la tabla se busca por un índice que no incluye
+      todas las columnas filtradas por igualdad (solo SQLite, donde el plan
+      indica las columnas usadas: "SEARCH t USING INDEX i (col=?)")
+
+Para cada problema propone un índice con las columnas filtradas por igualdad
+en esa tabla, seguidas de las columnas de ordenación cuando el problema es
+la ordenación. Las propuestas se pueden escribir como migración con
+build_migration() (ver manage.py index_advice --emit-migration).
+"""
+import re
+from dataclasses import dataclass, field
+
+from django.db import connections, models
+from django.db.migrations import AddIndex, Migration
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+from django.db.models import Value
+from django.db.models.expressions import Col
+from django.db.models.functions import Lower
+from django.db.models.sql.where import AND, WhereNode
+
+from .models import Cruise, Destination, InfoRequest, Review, Usuario
+
+
+EQUALITY_LOOKUPS = {'exact', 'iexact', 'in'}
+
+_SQLITE_SCAN = re.compile(r'\bSCAN (\w+)(?!\w| USING)')
+_SQLITE_SEARCH = re.compile(r'\bSEARCH (\w+) USING (?:COVERING )?INDEX \w+ \((.*)\)')
+_SQLITE_TEMP_BTREE = re.compile(r'USE TEMP B-TREE FOR ((?:RIGHT PART|LAST TERM) OF )?(ORDER BY|GROUP BY|DISTINCT)')
+_PG_SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+_PG_SORT = re.compile(r'->\s+Sort\b|^Sort\b')
+
+# La tabla intermedia del M2M no es un modelo propio: sus índices los crea Django
+_TABLES = {model._meta.db_table: model for model in (Cruise, Destination, InfoRequest, Review, Usuario)}
+
+
+@dataclass
+class Sample:
+    """Objetos reales de la base de datos con los que se construyen las consultas"""
+    destination: Destination
+    cruise: Cruise
+    user: Usuario
+
+
+@dataclass
+class Finding:
+    """Paso relevante del plan de una consulta del catálogo"""
+    kind: str  # 'scan', 'search', 'sort', 'partial-sort' o 'group'
+    table: str
+    detail: str
+    columns: tuple = ()  # columnas del índice usado (solo 'search')
+
+
+@dataclass
+class Proposal:
+    """Índice propuesto para una tabla"""
+    model: type
+    fields: tuple
+    reasons: list = field(default_factory=list)
+
+    def as_index(self):
+        index = models.Index(fields=list(self.fields))
+        index.set_name_with_model(self.model)
+        return index
+
+    def as_code(self):
+        return f'models.Index(fields={list(self.fields)!r})'
+
+
+@dataclass
+class Advice:
+    """Resultado del análisis de una consulta del catálogo"""
+    name: str
+    source: str
+    plan: list
+    findings: list
+    notes: list = field(default_factory=list)
+
+
+def query_catalogue():
+    """
+    Consultas reales de la aplicación: (nombre, origen, función(sample) -> QuerySet).
+
+    Los .exists() de la aplicación se representan con .order_by()[:1] (exists()
+    descarta la ordenación) para poder obtener su plan con explain().
+    """
+    return [
+        ('destinations', 'views.destinations', lambda s: Destination.objects.annotate(
+            avg_rating=models.Avg('reviews__rating'),
+            review_count=models.Count('reviews'),
+        ).order_by('-review_count', '-avg_rating')),
+        ('destination_detail', 'views.DestinationDetailView.get_queryset', lambda s: Destination.objects.annotate(
+            avg_rating=models.Avg('reviews__rating'),
+            review_count=models.Count('reviews'),
+        ).filter(pk=s.destination.pk)),
+        ('destination_detail_reviews', "views.DestinationDetailView (prefetch 'reviews__user')",
+         lambda s: Review.objects.filter(destination__in=[s.destination.pk])),
+        ('cruise_destinations', 'cruise_detail.html (cruise.destinations.all)',
+         lambda s: s.cruise.destinations.all()),
+        ('destination_cruises', 'destination_detail.html (destination.cruises.all)',
+         lambda s: s.destination.cruises.all()),
+        ('rating_distribution', 'models.Destination.get_rating_distribution',
+         lambda s: s.destination.get_rating_distribution()),
+        ('review_duplicate_check', 'views.ReviewCreateView.form_valid (review existente)',
+         lambda s: Review.objects.filter(user=s.user, destination=s.destination).order_by()[:1]),
+        ('review_purchase_check', 'views.ReviewCreateView.form_valid (compra)',
+         lambda s: InfoRequest.objects.filter(email=s.user.email, cruise__destinations=s.destination).order_by()[:1]),
+        ('registro_email_taken', 'forms.RegistroUsuarioForm._value_taken (tras un IntegrityError)',
+         lambda s: Usuario.objects.alias(value_lower=Lower('email')).filter(
+             value_lower=Lower(Value(s.user.email))).order_by()[:1]),
+        ('registro_username_taken', 'forms.RegistroUsuarioForm._value_taken (tras un IntegrityError)',
+         lambda s: Usuario.objects.alias(value_lower=Lower('username')).filter(
+             value_lower=Lower(Value(s.user.username))).order_by()[:1]),
+        ('admin_review_changelist', 'admin.ReviewAdmin (changelist)',
+         lambda s: Review.objects.select_related('user', 'destination').order_by('-created_at', '-pk')[:100]),
+        ('admin_review_by_destination', 'admin.ReviewAdmin (list_filter destination)',
+         lambda s: Review.objects.filter(destination=s.destination).order_by('-created_at', '-pk')[:100]),
+        ('admin_inforequest_changelist', 'admin.InfoRequestAdmin (changelist)',
+         lambda s: InfoRequest.objects.select_related('cruise').order_by('-id')[:100]),
+    ]
+
+
+def get_sample(using='default'):
+    """Elige objetos reales para las consultas; None si la base de datos está vacía"""
+    review = (
+        Review.objects.using(using)
+        .filter(destination__cruises__isnull=False)
+        .select_related('destination', 'user')
+        .order_by('pk')
+        .first()
+    )
+    if review is None:
+        return None
+    cruise = review.destination.cruises.order_by('pk').first()
+    return Sample(destination=review.destination, cruise=cruise, user=review.user)
+
+
+def analyze_plan(plan, vendor):
+    """Extrae los recorridos completos, búsquedas por índice y ordenaciones de un plan"""
+    findings = []
+    for line in plan:
+        detail = line.strip()
+        if vendor == 'postgresql':
+            scan = _PG_SEQ_SCAN.search(line)
+            if scan:
+                findings.append(Finding('scan', scan.group(1), detail))
+            if _PG_SORT.search(detail):
+                findings.append(Finding('sort', None, detail))
+            continue
+
+        scan, search, btree = _SQLITE_SCAN.search(line), _SQLITE_SEARCH.search(line), _SQLITE_TEMP_BTREE.search(line)
+        if scan:
+            findings.append(Finding('scan', scan.group(1), detail))
+        elif search:
+            columns = tuple(re.findall(r'(\w+)[=<>]', search.group(2)))
+            findings.append(Finding('search', search.group(1), detail, columns))
+        elif btree:
+            if btree.group(2) != 'ORDER BY':
+                findings.append(Finding('group', None, detail))
+            elif btree.group(1):
+                findings.append(Finding('partial-sort', None, detail))
+            else:
+                findings.append(Finding('sort', None, detail))
+    return findings
+
+
+def equality_fields(query, table):
+    """Campos de `table` filtrados por igualdad en el WHERE (solo ramas AND)"""
+    found = []
+
+    def walk(node):
+        if node.connector != AND or node.negated:
+            return
+        for child in node.children:
+            if isinstance(child, WhereNode):
+                walk(child)
+            elif (getattr(child, 'lookup_name', None) in EQUALITY_LOOKUPS
+                  and isinstance(child.lhs, Col)
+                  and child.lhs.target.model._meta.db_table == table
+                  and child.lhs.target not in found):
+                found.append(child.lhs.target)
+
+    walk(query.where)
+    return found
+
+
+def ordering_fields(queryset):
+    """Campos del modelo base por los que se ordena (None si ordena por anotaciones)"""
+    query = queryset.query
+    ordering = query.order_by or (query.default_ordering and queryset.model._meta.ordering) or ()
+    fields = []
+    for name in ordering:
+        if not isinstance(name, str):
+            return None
+        bare = name.lstrip('-')
+        if bare == 'pk':
+            continue
+        try:
+            model_field = queryset.model._meta.get_field(bare)
+        except Exception:
+            return None
+        if not model_field.concrete:
+            return None
+        fields.append(name[0] == '-' and f'-{model_field.name}' or model_field.name)
+    return fields
+
+
+def _unindexed_first(model, fields):
+    """Ordena los campos poniendo primero los que encabezan menos índices existentes"""
+    leading = [index.fields[0].lstrip('-') for index in model._meta.indexes]
+    leading += [f.name for f in model._meta.local_concrete_fields if f.unique or f.db_index]
+    return sorted(fields, key=lambda f: leading.count(f.name))
+
+
+def _is_covered(model, fields):
+    """True si un índice existente (o una restricción única) empieza por esas columnas"""
+    wanted = [f.lstrip('-') for f in fields]
+    candidates = [[f.lstrip('-') for f in index.fields] for index in model._meta.indexes]
+    candidates += [list(constraint.fields) for constraint in model._meta.total_unique_constraints]
+    candidates += [[f.name] for f in model._meta.local_concrete_fields if f.unique or f.db_index]
+    return any(candidate[:len(wanted)] == wanted for candidate in candidates)
+
+
+def advise_query(name, source, queryset, plan, vendor):
+    """
+    Analiza el plan de una consulta del catálogo.
+
+    Returns:
+        tuple: (Advice, lista de (modelo, campos, motivo) para los índices propuestos)
+    """
+    advice = Advice(name, source, plan, analyze_plan(plan, vendor))
+    wanted = []
+    for finding in advice.findings:
+        if finding.kind in ('scan', 'search'):
+            model = _TABLES.get(finding.table)
+            fields = equality_fields(queryset.query, finding.table)
+            if finding.kind == 'search':
+                if model is None or all(f.column in finding.columns for f in fields):
+                    continue
+                advice.notes.append(f'{finding.table}: filtro residual fuera del índice usado')
+            elif model is None or not fields:
+                advice.notes.append(f'{finding.table}: recorrido completo sin filtro por igualdad')
+                continue
+            fields = [f.name for f in _unindexed_first(model, fields)]
+        elif finding.kind == 'sort':
+            model = queryset.model
+            order = ordering_fields(queryset)
+            if not order:
+                advice.notes.append('ordenación por anotaciones: no se resuelve con un índice')
+                continue
+            fields = [f.name for f in equality_fields(queryset.query, model._meta.db_table)]
+            fields += [f for f in order if f.lstrip('-') not in fields]
+        elif finding.kind == 'partial-sort':
+            advice.notes.append('ordenación parcial (desempate por pk): coste despreciable')
+            continue
+        else:
+            advice.notes.append('agrupación en B-tree temporal (GROUP BY/DISTINCT)')
+            continue
+
+        if _is_covered(model, fields):
+            advice.notes.append(f'{model.__name__}{fields}: ya existe un índice, el planificador no lo usa')
+            continue
+        wanted.append((model, tuple(fields), f'{name}: {finding.detail}'))
+    return advice, wanted
+
+
+def advise(using='default', sample=None):
+    """
+    Analiza el catálogo de consultas.
+
+    Returns:
+        tuple: (lista de Advice, lista de Proposal sin duplicados)
+    """
+    vendor = connections[using].vendor
+    sample = sample or get_sample(using)
+    if sample is None:
+        raise ValueError('La base de datos no tiene reviews de destinos con crucero: no hay datos que analizar')
+
+    results = []
+    proposals = {}
+    for name, source, build in query_catalogue():
+        queryset = build(sample).using(using)
+        advice, wanted = advise_query(name, source, queryset, queryset.explain().splitlines(), vendor)
+        for model, fields, reason in wanted:
+            proposals.setdefault((model, fields), Proposal(model, fields)).reasons.append(reason)
+        results.append(advice)
+    return results, list(proposals.values())
+
+
+def build_migration(proposals, app_label='relecloud', name='index_advice'):
+    """Retorna un MigrationWriter con un AddIndex por propuesta, tras la última migración"""
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    leaf = sorted(loader.graph.leaf_nodes(app_label))[-1]
+    number = int(leaf[1].split('_')[0]) + 1
+    migration = Migration(f'{number:04d}_{name}', app_label)
+    migration.dependencies = [leaf]
+    migration.operations = [
+        AddIndex(model_name=proposal.model._meta.model_name, index=proposal.as_index())
+        for proposal in proposals
+    ]
+    return MigrationWriter(migration)
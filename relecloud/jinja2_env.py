@@ -0,0 +1,52 @@
+"""
+Entorno Jinja2 de ReleCloud (opcional, TEMPLATE_ENGINE=jinja2)
+
+Expone a las plantillas de relecloud/jinja2/ lo que las plantillas de
+Django obtienen de sus etiquetas y filtros:
+
+    static('ruta')                 {% static 'ruta' %}
+    url('nombre', *args)           {% url 'nombre' args %}
+    valor|floatformat(1)           {{ valor|floatformat:1 }}
+    {% call catalogcache('nombre', id) %}...{% endcall %}
+                                   {% catalogcache nombre id %}...{% endcatalogcache %}
+    critical_css()                 {% critical_css %}
+    stylesheet('ruta')             {% stylesheet 'ruta' %}
+    picture('ruta', alt='...')     {% picture 'ruta' alt='...' %}
+
+csrf_input, request y las variables de los context processors (user,
+messages) las añade el backend Jinja2 de Django.
+"""
+from django.templatetags.static import static
+from django.template.defaultfilters import floatformat
+from django.urls import reverse
+from jinja2 import Environment, pass_context
+
+from .templatetags.catalog_cache import CURRENT_SNAPSHOT, render_fragment
+from .templatetags.static_build import critical_css, picture, stylesheet
+
+
+def url(name, *args):
+    return reverse(name, args=args)
+
+
+@pass_context
+def catalogcache(context, name, *vary_on, caller):
+    # Claves distintas a las de las plantillas de Django: el HTML es
+    # equivalente, pero no idéntico byte a byte
+    return render_fragment(f'jinja2.{name}', vary_on, caller, snapshot=context.get('catalog_snapshot', CURRENT_SNAPSHOT))
+
+
+def environment(**options):
+    options.setdefault('trim_blocks', True)
+    options.setdefault('lstrip_blocks', True)
+    env = Environment(**options)
+    env.globals.update({
+        'static': static,
+        'url': url,
+        'catalogcache': catalogcache,
+        'critical_css': critical_css,
+        'stylesheet': stylesheet,
+        'picture': picture,
+    })
+    env.filters['floatformat'] = floatformat
+    return env
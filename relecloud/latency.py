@@ -0,0 +1,35 @@
+"""
+Latencia de E/S simulada para las pruebas de carga
+
+Con SQLite en local cada consulta tarda microsegundos y no se ve la
+diferencia entre un worker que espera bloqueado y un bucle de eventos que
+atiende otras peticiones mientras espera. Con settings.SIMULATED_IO_LATENCY_MS
+mayor que 0, cada consulta SQL duerme ese tiempo antes de ejecutarse, como
+si la base de datos estuviera en otra máquina (ver manage.py bench_concurrency).
+
+Se instala en cada conexión nueva (señal connection_created, ver apps.py).
+No se usa en ningún despliegue real.
+"""
+import time
+
+from django.conf import settings
+
+
+class SimulatedLatency:
+    """Wrapper de ejecución que espera seconds antes de cada consulta"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.seconds)
+        return execute(sql, params, many, context)
+
+
+def install(sender, connection, **kwargs):
+    """Receptor de connection_created: añade la latencia a la nueva conexión"""
+    latency_ms = getattr(settings, 'SIMULATED_IO_LATENCY_MS', 0)
+    if latency_ms <= 0:
+        return
+    if not any(isinstance(wrapper, SimulatedLatency) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.insert(0, SimulatedLatency(latency_ms / 1000))
@@ -0,0 +1,97 @@
+"""
+Comando de gestión de Django que cuenta las consultas SQL por petición de un
+usuario autenticado con cada configuración de sesiones y autenticación.
+
+Uso:
+    python manage.py bench_auth_queries                        # detalle de un destino, 20 peticiones
+    python manage.py bench_auth_queries --requests 100
+    python manage.py bench_auth_queries --path /destinations/
+
+Configuraciones:
+
+    db              sesiones en la base de datos y ModelBackend (lo que
+                    Django hace por defecto): una consulta para la sesión y
+                    otra para el usuario en cada petición
+    cached_db       sesiones cached_db y CachedModelBackend (ver
+                    relecloud/auth_backends.py): sesión y usuario desde la
+                    caché
+    signed_cookies  sesión firmada en la cookie y CachedModelBackend
+
+Cada configuración inicia sesión con un usuario de un catálogo sintético
+pequeño y pide --path --requests veces con el cliente de tests de Django.
+Se muestran las consultas de la primera petición (cachés vacías) y la
+mediana de consultas y de tiempo de las siguientes. La caché es un
+LocMemCache, la versión del catálogo se comprueba en cada petición (una
+consulta en todas las configuraciones) y todo se deshace al terminar.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from relecloud import catalog
+from relecloud.synthetic import build_catalog
+
+
+CONFIGURATIONS = {
+    'db': ('django.contrib.sessions.backends.db', 'django.contrib.auth.backends.ModelBackend'),
+    'cached_db': ('django.contrib.sessions.backends.cached_db', 'relecloud.auth_backends.CachedModelBackend'),
+    'signed_cookies': ('django.contrib.sessions.backends.signed_cookies', 'relecloud.auth_backends.CachedModelBackend'),
+}
+
+BENCH_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-auth'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-auth-shared'},
+}
+
+
+def measure(path, user, requests):
+    """Lista de (consultas, ms) de cada petición de user a path"""
+    client = Client()
+    client.force_login(user)
+    samples = []
+    for _ in range(requests):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(path)
+            elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            raise CommandError(f'{path} respondió {response.status_code}')
+        samples.append((len(queries), elapsed))
+    return samples
+
+
+class Command(BaseCommand):
+    help = 'Consultas SQL por petición autenticada con sesiones en base de datos, cached_db y cookies firmadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Peticiones por configuración (por defecto: 20).')
+        parser.add_argument('--path', help='Ruta a pedir (por defecto: el detalle de un destino sintético).')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError('--requests debe ser al menos 2')
+
+        self.stdout.write(f"{'configuración':<16} {'1ª petición':>12} {'consultas':>10} {'ms':>8}")
+        with transaction.atomic():
+            data = build_catalog(destinations=5, cruises=2, users=3, reviews_per_destination=2, prefix='bench-auth')
+            path = options['path'] or reverse('destination_detail', args=[data.destinations[0].pk])
+            for name, (session_engine, backend) in CONFIGURATIONS.items():
+                catalog.reset_snapshot()
+                with override_settings(
+                    SESSION_ENGINE=session_engine, AUTHENTICATION_BACKENDS=[backend], CACHES=BENCH_CACHES,
+                    ALLOWED_HOSTS=['testserver'], CATALOG_SNAPSHOT={'CHECK_INTERVAL_MS': 0},
+                ):
+                    samples = measure(path, data.users[0], options['requests'])
+                warm = samples[1:]
+                self.stdout.write(
+                    f'{name:<16} {samples[0][0]:>12} {statistics.median(q for q, _ in warm):>10g} '
+                    f'{statistics.median(ms for _, ms in warm):>8.2f}'
+                )
+            transaction.set_rollback(True)
+        catalog.reset_snapshot()
+        self.stdout.write(f'\n{path}, {options["requests"] - 1} peticiones tras la primera')
@@ -0,0 +1,185 @@
+"""
+Comando de gestión de Django que compara el throughput del despliegue WSGI
+(gunicorn con workers síncronos y las vistas de relecloud/views.py) con el
+ASGI (gunicorn con workers de uvicorn y las vistas de relecloud/async_views.py)
+con el mismo número de workers y E/S lenta simulada.
+
+Uso:
+    python manage.py collectstatic --noinput
+    python manage.py bench_concurrency                         # 4 workers, 50 ms por consulta, 64 clientes
+    python manage.py bench_concurrency --latency 100 --concurrency 128 --seconds 20
+    python manage.py bench_concurrency --path /destinations/
+    python manage.py bench_concurrency --server asgi           # solo uno de los dos
+
+Cada servidor arranca en un subproceso sobre una copia temporal de la base
+de datos SQLite actual (migrada), con DEBUG=False y:
+
+    SIMULATED_IO_LATENCY_MS             cada consulta SQL espera --latency ms
+                                        (ver relecloud/latency.py), como una
+                                        base de datos en otra máquina
+    CATALOG_SNAPSHOT_CHECK_INTERVAL_MS  0: cada petición comprueba la versión
+                                        del catálogo, una consulta como mínimo
+
+Durante --seconds, --concurrency clientes piden --path (por defecto el
+detalle del primer destino) sin pausa. Un worker síncrono atiende una
+petición cada vez y queda bloqueado mientras espera a la base de datos; un
+worker de uvicorn sigue atendiendo otras peticiones. Se muestran las
+peticiones por segundo y las latencias p50 y p95.
+"""
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from relecloud.models import Destination
+
+
+SERVERS = {
+    'wsgi': ['project.wsgi'],
+    'asgi': ['--worker-class', 'uvicorn.workers.UvicornWorker', 'project.asgi:application'],
+}
+
+# Variables de entorno comunes a los dos servidores
+BENCH_ENV = {
+    'DEBUG': 'False',
+    'CATALOG_SNAPSHOT_CHECK_INTERVAL_MS': '0',
+    'PERF_METRICS_LOG': 'False',
+    'SLOW_QUERY_LOG_ENABLED': 'False',
+}
+
+
+def wait_until_ready(url, process, timeout=30.0, interval=0.2):
+    """Espera a que el servidor responda; CommandError si termina o no arranca a tiempo"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f'El servidor terminó al arrancar (código {process.returncode})')
+        try:
+            with urlopen(url, timeout=5) as response:
+                response.read()
+            return
+        except (URLError, ConnectionError):
+            time.sleep(interval)
+    raise CommandError(f'El servidor no respondió en {timeout:g} s')
+
+
+def load(url, concurrency, seconds):
+    """(latencias en ms de las peticiones correctas, errores) de concurrency clientes durante seconds"""
+    deadline = time.monotonic() + seconds
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def client():
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                with urlopen(url, timeout=30) as response:
+                    response.read()
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    latencies.append(elapsed)
+            except OSError as e:
+                with lock:
+                    errors.append(e)
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    return latencies, errors
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+class Command(BaseCommand):
+    help = 'Compara el throughput de gunicorn WSGI y gunicorn + uvicorn ASGI con E/S lenta simulada'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server', choices=sorted(SERVERS), action='append',
+            help='Servidor a medir; se puede repetir (por defecto: los dos).',
+        )
+        parser.add_argument('--workers', type=int, default=4, help='Workers de gunicorn (por defecto: 4).')
+        parser.add_argument(
+            '--latency', type=float, default=50,
+            help='Latencia simulada por consulta SQL, en ms (por defecto: 50).',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=64,
+            help='Clientes simultáneos (por defecto: 64).',
+        )
+        parser.add_argument('--seconds', type=float, default=10, help='Duración de cada medida (por defecto: 10).')
+        parser.add_argument('--path', help='Ruta a pedir (por defecto: el detalle del primer destino).')
+        parser.add_argument('--port', type=int, default=8765, help='Puerto local de los servidores (por defecto: 8765).')
+
+    def handle(self, *args, **options):
+        for name in ('workers', 'concurrency'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} debe ser al menos 1')
+        database = settings.DATABASES['default']
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('bench_concurrency trabaja sobre una copia de la base de datos SQLite')
+        if not os.path.exists(os.path.join(settings.STATIC_ROOT, 'staticfiles.json')):
+            raise CommandError('Falta el manifiesto de estáticos: ejecuta antes python manage.py collectstatic')
+
+        path = options['path']
+        if path is None:
+            pk = Destination.objects.values_list('pk', flat=True).order_by('pk').first()
+            if pk is None:
+                raise CommandError('No hay destinos: indica una ruta con --path')
+            path = f'/destination/{pk}'
+        url = f'http://127.0.0.1:{options["port"]}{path}'
+
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            copy = os.path.join(directory, 'bench.sqlite3')
+            shutil.copyfile(database['NAME'], copy)
+            env = {
+                **os.environ, **BENCH_ENV,
+                'DATABASE_URL': f'sqlite:///{copy}',
+                'SIMULATED_IO_LATENCY_MS': str(options['latency']),
+            }
+            subprocess.run(
+                [sys.executable, 'manage.py', 'migrate', '--noinput', '-v', '0'],
+                cwd=settings.BASE_DIR, env={**env, 'SIMULATED_IO_LATENCY_MS': '0'}, check=True,
+            )
+            for server in options['server'] or list(SERVERS):
+                self.stderr.write(f'Midiendo {server}...')
+                results[server] = self._measure(server, url, env, options)
+
+        self.stdout.write(
+            f'{url} ({options["workers"]} workers, {options["latency"]:g} ms por consulta, '
+            f'{options["concurrency"]} clientes, {options["seconds"]:g} s)'
+        )
+        self.stdout.write(f"{'servidor':<9} {'peticiones':>10} {'errores':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for server, (latencies, errors) in results.items():
+            self.stdout.write(
+                f'{server:<9} {len(latencies):>10} {len(errors):>8} {len(latencies) / options["seconds"]:>8.1f} '
+                f'{statistics.median(latencies) if latencies else 0:>8.1f} {percentile(latencies, 0.95):>8.1f}'
+            )
+
+    def _measure(self, server, url, env, options):
+        command = [
+            sys.executable, '-m', 'gunicorn', '--workers', str(options['workers']),
+            '--bind', f'127.0.0.1:{options["port"]}', '--log-level', 'warning', *SERVERS[server],
+        ]
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+        try:
+            wait_until_ready(url, process)
+            load(url, options['concurrency'], 1)  # calentamiento de todos los workers
+            return load(url, options['concurrency'], options['seconds'])
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
@@ -0,0 +1,171 @@
+"""
+Comando de gestión de Django que mide el coste del hash de contraseñas en
+esta máquina y recomienda la configuración de PASSWORD_HASHING para una
+latencia objetivo.
+
+Uso:
+    python manage.py bench_password_hashing                    # objetivo 250 ms por hash
+    python manage.py bench_password_hashing --target-ms 100 --repeat 5
+    python manage.py bench_password_hashing --algorithm pbkdf2_sha256 --logins 20
+
+Para cada algoritmo (pbkdf2_sha256 y scrypt) se mide la mediana de --repeat
+hashes con varios costes: el de Django, el mínimo (MINIMUM_WORK en
+relecloud/hashers.py), el configurado y el recomendado. El tiempo crece
+linealmente con el coste, así que la recomendación es el mayor coste que
+cabe en --target-ms según el tiempo medido con el mínimo: las iteraciones
+de PBKDF2 en múltiplos de 10.000 y el N de scrypt en potencias de 2. Nunca
+baja del mínimo: si el mínimo ya supera el objetivo, se recomienda el mínimo
+y se indica.
+
+"hashes/s" (1000 / ms) estima los logins por segundo de un núcleo contando
+solo el hash. Después, con el PBKDF2 de Django, con la configuración actual y
+con la recomendada de cada algoritmo, se hacen --logins logins con el
+cliente de tests de Django (POST a /login/ de un usuario de prueba, en una
+transacción que se deshace al terminar) y se muestran los logins por
+segundo de un núcleo, con sesión, consultas y redirección incluidas.
+"""
+import math
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, ScryptPasswordHasher, get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from relecloud.hashers import MINIMUM_WORK, WORK_SETTINGS, get_password_hashing_settings, preferred_first
+from relecloud.models import Usuario
+
+
+PASSWORD = 'Cohete.2024!'
+
+DJANGO_WORK = {
+    'pbkdf2_sha256': PBKDF2PasswordHasher.iterations,
+    'scrypt': ScryptPasswordHasher.work_factor,
+}
+
+BENCH_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-hashing'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-hashing-shared'},
+}
+
+
+def policy(algorithm, work):
+    """PASSWORD_HASHING y PASSWORD_HASHERS con algorithm como hasher preferido y coste work"""
+    return {
+        'PASSWORD_HASHING': {**get_password_hashing_settings(), 'ALGORITHM': algorithm, WORK_SETTINGS[algorithm]: work},
+        'PASSWORD_HASHERS': preferred_first(settings.PASSWORD_HASHERS, algorithm),
+    }
+
+
+def recommend(algorithm, minimum_ms, target_ms):
+    """Mayor coste de algorithm que cabe en target_ms si el mínimo tarda minimum_ms (nunca menos del mínimo)"""
+    minimum = MINIMUM_WORK[algorithm]
+    work = minimum * target_ms / minimum_ms
+    if algorithm == 'scrypt':
+        work = 2 ** math.floor(math.log2(work)) if work >= 1 else 0
+    else:
+        work = int(work) // 10_000 * 10_000
+    return max(work, minimum)
+
+
+def time_hash(algorithm, work, repeat):
+    """Mediana en ms de repeat hashes con algorithm y coste work"""
+    with override_settings(**policy(algorithm, work)):
+        hasher = get_hasher(algorithm)
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            hasher.encode(PASSWORD, hasher.salt())
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def login_rate(user, logins):
+    """Logins por segundo de user en /login/ con el cliente de tests (un núcleo)"""
+    client = Client()
+    user.set_password(PASSWORD)
+    user.save(update_fields=['password'])
+    started = time.perf_counter()
+    for _ in range(logins):
+        response = client.post(reverse('login'), {'username': user.username, 'password': PASSWORD})
+        if response.status_code != 302:
+            raise CommandError(f'/login/ respondió {response.status_code}')
+    return logins / (time.perf_counter() - started)
+
+
+class Command(BaseCommand):
+    help = 'Tiempo por hash de contraseña por algoritmo y coste, recomendación para una latencia objetivo y logins/s'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--algorithm', action='append', choices=list(WORK_SETTINGS),
+            help='Algoritmo a medir; se puede repetir (por defecto: todos).',
+        )
+        parser.add_argument('--target-ms', type=float, default=250, help='Latencia objetivo por hash (por defecto: 250).')
+        parser.add_argument('--repeat', type=int, default=5, help='Hashes por coste medido (por defecto: 5).')
+        parser.add_argument('--logins', type=int, default=10, help='Logins por configuración (por defecto: 10; 0 = sin logins).')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat debe ser al menos 1')
+        if options['target_ms'] <= 0:
+            raise CommandError('--target-ms debe ser mayor que 0')
+        configured = get_password_hashing_settings()
+        algorithms = options['algorithm'] or list(WORK_SETTINGS)
+
+        self.stdout.write(f"{'algoritmo':<15} {'coste':>10} {'ms por hash':>12} {'hashes/s':>9}")
+        recommended = {}
+        for algorithm in algorithms:
+            minimum = MINIMUM_WORK[algorithm]
+            measured = {minimum: time_hash(algorithm, minimum, options['repeat'])}
+            recommended[algorithm] = recommend(algorithm, measured[minimum], options['target_ms'])
+            labels = {}
+            for work, label in (
+                (minimum, 'mínimo'), (DJANGO_WORK[algorithm], 'Django'),
+                (configured[WORK_SETTINGS[algorithm]], 'configurado'), (recommended[algorithm], 'recomendado'),
+            ):
+                labels.setdefault(work, []).append(label)
+            for work in sorted(labels):
+                if work not in measured:
+                    measured[work] = time_hash(algorithm, work, options['repeat'])
+                self.stdout.write(
+                    f'{algorithm:<15} {work:>10} {measured[work]:>12.1f} {1000 / measured[work]:>9.1f}  '
+                    f'{", ".join(labels[work])}'
+                )
+            if measured[minimum] > options['target_ms']:
+                self.stdout.write(
+                    f'  {algorithm}: el mínimo ({minimum}) ya tarda {measured[minimum]:.0f} ms, '
+                    f'más que el objetivo de {options["target_ms"]:g} ms'
+                )
+
+        self.stdout.write(f'\nRecomendado para {options["target_ms"]:g} ms por hash:')
+        for algorithm, work in recommended.items():
+            self.stdout.write(
+                f'    PASSWORD_HASH_ALGORITHM={algorithm} '
+                f'PASSWORD_{WORK_SETTINGS[algorithm]}={work}'
+            )
+
+        if options['logins'] > 0:
+            self._login_rates(configured, recommended, options['logins'])
+
+    def _login_rates(self, configured, recommended, logins):
+        policies = {('pbkdf2_sha256', DJANGO_WORK['pbkdf2_sha256']): ['Django']}
+        policies.setdefault((configured['ALGORITHM'], configured[WORK_SETTINGS[configured['ALGORITHM']]]), []).append(
+            'configurado'
+        )
+        for algorithm, work in recommended.items():
+            policies.setdefault((algorithm, work), []).append('recomendado')
+
+        self.stdout.write(f"\n{'algoritmo':<15} {'coste':>10} {'logins/s':>9}")
+        with transaction.atomic():
+            user = Usuario.objects.create_user(username='bench-hashing', email='bench-hashing@example.com')
+            for (algorithm, work), labels in policies.items():
+                with override_settings(**policy(algorithm, work), CACHES=BENCH_CACHES, ALLOWED_HOSTS=['testserver']):
+                    rate = login_rate(user, logins)
+                self.stdout.write(f'{algorithm:<15} {work:>10} {rate:>9.2f}  {", ".join(labels)}')
+            transaction.set_rollback(True)
+        self.stdout.write(f'\n{logins} logins por configuración en un solo hilo (un núcleo)')
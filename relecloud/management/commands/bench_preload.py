@@ -0,0 +1,180 @@
+"""
+Comando de gestión de Django que mide cuánto adelantan la cabecera Link y
+el 103 Early Hints (ver relecloud/preload.py) la carga de lo que una página
+necesita para pintarse, contra un servidor en marcha.
+
+Uso:
+    python manage.py collectstatic --noinput
+    DEBUG=False python manage.py runserver                 # en otra terminal
+    python manage.py bench_preload                          # http://localhost:8000/
+    python manage.py bench_preload --url http://localhost:8000/about --rtt 100 --kbps 5000
+
+Emula un navegador con 6 conexiones que descarga todos los recursos de la
+página; se considera que puede pintarla cuando tiene el HTML, sus hojas de
+estilo, las imágenes de fondo del CSS incrustado y de las hojas y las
+imágenes con fetchpriority="high" (la fuente WebP de un <picture>). En
+localhost no hay red, así que cada petición espera --rtt ms antes de salir
+y su cuerpo tarda lo que tardaría a --kbps kbit/s. Escenarios:
+
+    sin hints   las hojas y las imágenes se descubren al leer el HTML y las
+                imágenes de fondo al leer cada hoja
+    Link        los estáticos de la cabecera Link se piden al recibir las
+                cabeceras de la respuesta, antes de leer el HTML
+    103         se piden un RTT después de enviar la petición (cuando llega
+                el 103), sin esperar a la vista. Es una simulación con los
+                links de la cabecera Link: runserver y gunicorn no envían 103
+
+Se muestra la mediana del tiempo hasta tener el HTML y hasta poder pintar.
+"""
+import gzip
+import posixpath
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import quote, urljoin, urlsplit
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+from relecloud.management.commands.static_weight import PageResources, background_images
+
+
+MODES = ['sin hints', 'Link', '103']
+
+# Como un navegador: la versión comprimida de los estáticos si WhiteNoise la tiene
+BROWSER_HEADERS = {'Accept-Encoding': 'gzip'}
+
+
+def read(response, kbps):
+    """Cuerpo descomprimido de la respuesta, tras el tiempo de transferirlo a kbps"""
+    with response:
+        body = response.read()
+    time.sleep(len(body) * 8 / (kbps * 1000))
+    if response.headers.get('Content-Encoding') == 'gzip':
+        body = gzip.decompress(body)
+    return body
+
+
+def parse_link_header(value):
+    """URLs con rel=preload de una cabecera Link"""
+    urls = []
+    for link in filter(None, (part.strip() for part in value.split(','))):
+        url, _, params = link.partition(';')
+        if 'rel=preload' in params.replace(' ', ''):
+            urls.append(url.strip().strip('<>'))
+    return urls
+
+
+class Browser:
+    """Descargas en paralelo con latencia simulada; cada URL se pide una sola vez"""
+
+    def __init__(self, started, rtt, kbps, connections=6):
+        self.started = started
+        self.rtt = rtt
+        self.kbps = kbps
+        self.pool = ThreadPoolExecutor(connections)
+        self.requests = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, url, delay=0.0):
+        with self._lock:
+            if url not in self.requests:
+                self.requests[url] = self.pool.submit(self._get, url, delay)
+            return self.requests[url]
+
+    def _get(self, url, delay):
+        time.sleep(delay + self.rtt)
+        body = read(urlopen(Request(quote(url, safe=':/?&=%'), headers=BROWSER_HEADERS)), self.kbps)
+        return body, time.perf_counter() - self.started
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def load_page(url, mode, rtt, kbps, hints):
+    """(html_ms, render_ms) de una carga de la página en el escenario mode"""
+    started = time.perf_counter()
+    browser = Browser(started, rtt, kbps)
+    try:
+        if mode == '103':
+            for link in hints:
+                browser.fetch(urljoin(url, link), delay=rtt)
+
+        time.sleep(rtt)
+        response = urlopen(Request(url, headers=BROWSER_HEADERS))
+        if mode == 'Link':
+            for link in parse_link_header(response.headers.get('Link', '')):
+                browser.fetch(urljoin(url, link))
+        body = read(response, kbps)
+        html_done = time.perf_counter() - started
+
+        page = PageResources()
+        page.feed(body.decode('utf-8'))
+        # Como el navegador, primero lo que bloquea el render y luego el resto de imágenes
+        stylesheets = {href: browser.fetch(urljoin(url, href)) for href in page.stylesheets}
+        critical = [browser.fetch(urljoin(url, src)) for src in page.priority_images]
+        for css in page.inline_css:
+            critical += [browser.fetch(urljoin(url, image)) for image in background_images(css, '/')]
+        for src in page.images:
+            browser.fetch(urljoin(url, src))
+        for href, stylesheet in stylesheets.items():
+            css = stylesheet.result()[0].decode('utf-8')
+            base = posixpath.dirname(urlsplit(urljoin(url, href)).path) + '/'
+            critical.append(stylesheet)
+            critical += [browser.fetch(urljoin(url, image)) for image in background_images(css, base)]
+        wait(critical)
+        render_done = max([html_done, *(future.result()[1] for future in critical)])
+    finally:
+        browser.close()
+    return html_done * 1000, render_done * 1000
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo hasta poder pintar una página sin hints, con cabecera Link y con 103 Early Hints'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default='http://localhost:8000/',
+            help='Página de un servidor en marcha (por defecto: http://localhost:8000/).',
+        )
+        parser.add_argument(
+            '--rtt', type=float, default=50,
+            help='Latencia de ida y vuelta simulada por petición, en ms (por defecto: 50).',
+        )
+        parser.add_argument(
+            '--kbps', type=float, default=10000,
+            help='Ancho de banda simulado por conexión, en kbit/s (por defecto: 10000).',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Cargas por escenario; se toma la mediana (por defecto: 5).',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat debe ser al menos 1')
+        if options['kbps'] <= 0:
+            raise CommandError('--kbps debe ser positivo')
+        url, rtt, kbps = options['url'], options['rtt'] / 1000, options['kbps']
+
+        try:
+            with urlopen(url) as response:
+                hints = parse_link_header(response.headers.get('Link', ''))
+            if not hints:
+                self.stderr.write(f'{url} no envía cabecera Link: los tres escenarios serán iguales')
+            results = {}
+            for mode in MODES:
+                load_page(url, mode, rtt, kbps, hints)  # calentamiento
+                results[mode] = [load_page(url, mode, rtt, kbps, hints) for _ in range(options['repeat'])]
+        except OSError as e:
+            raise CommandError(f'No se pudo medir {url}: {e}')
+
+        self.stdout.write(
+            f'{url} (RTT simulado: {options["rtt"]:g} ms, {kbps:g} kbit/s por conexión, {len(hints)} links de preload)'
+        )
+        self.stdout.write(f"{'escenario':<10} {'HTML ms':>9} {'render ms':>10} {'mejora':>8}")
+        baseline = statistics.median(render for _, render in results['sin hints'])
+        for mode in MODES:
+            html, render = (statistics.median(values) for values in zip(*results[mode]))
+            self.stdout.write(f'{mode:<10} {html:>9.1f} {render:>10.1f} {render / baseline - 1:>+8.1%}')
@@ -0,0 +1,97 @@
+"""
+Comando de gestión de Django que mide el coste por petición del límite de
+peticiones (relecloud/ratelimit.py).
+
+Uso:
+    python manage.py bench_rate_limit                          # 100.000 llamadas por caso en L1
+    python manage.py bench_rate_limit --iterations 500000 --shared-iterations 5000
+    python manage.py bench_rate_limit --cache shared           # viajes a otro alias de CACHES
+
+Casos:
+
+    check() con L1      lo que añade RateLimitMixin / @rate_limit a un POST:
+                        regla de settings, clave del cliente y un token del
+                        préstamo del L1
+    L1 permitido        TokenBucketLimiter.hit() con tokens prestados en el L1
+    L1 rechazado        hit() de un cliente rechazado hasta su Retry-After
+    caché compartida    hit() que va siempre a la caché (préstamo de 1 token):
+                        incr y touch en el alias --cache (por defecto el de
+                        RATE_LIMIT)
+
+Se muestran los microsegundos por llamada. Las claves de la caché
+compartida son de un solo uso y se borran al terminar.
+"""
+import time
+import uuid
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from relecloud import ratelimit
+
+
+def per_call_us(func, iterations):
+    """Microsegundos por llamada de func() en iterations llamadas"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+class Command(BaseCommand):
+    help = 'Microsegundos por petición del límite de peticiones, con el L1 y con la caché compartida'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100_000, help='Llamadas por caso con el L1 (por defecto: 100000).')
+        parser.add_argument(
+            '--shared-iterations', type=int, default=2000,
+            help='Llamadas del caso de la caché compartida (por defecto: 2000).',
+        )
+        parser.add_argument('--cache', help='Alias de CACHES del caso de la caché compartida (por defecto: el de RATE_LIMIT).')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['shared_iterations'] < 1:
+            raise CommandError('--iterations y --shared-iterations deben ser al menos 1')
+        alias = options['cache'] or ratelimit.get_rate_limit_settings()['CACHE_ALIAS']
+        iterations = options['iterations']
+        run = uuid.uuid4().hex[:8]
+        ratelimit.reset_limiters()
+
+        request = RequestFactory().post('/info_request', REMOTE_ADDR='203.0.113.7')
+        request.user = AnonymousUser()
+        config = {**ratelimit.get_rate_limit_settings(), 'ENABLED': True, 'RATES': {'bench': '1000000/s'},
+                  'L1_LEASE_FRACTION': 1, 'L1_LEASE_TTL': 60}
+        with override_settings(RATE_LIMIT=config):
+            ratelimit.check(request, 'bench')
+            check_us = per_call_us(lambda: ratelimit.check(request, 'bench'), iterations)
+
+        allowed = ratelimit.TokenBucketLimiter('bench', 1_000_000, 1, cache_alias=alias, lease_fraction=1, lease_ttl=60)
+        allowed.hit(f'{run}:allowed')
+        allowed_us = per_call_us(lambda: allowed.hit(f'{run}:allowed'), iterations)
+
+        denied = ratelimit.TokenBucketLimiter('bench', 1, 3600, cache_alias=alias)
+        denied.hit(f'{run}:denied')
+        if denied.hit(f'{run}:denied') is None:
+            raise CommandError(f'La caché {alias} no guarda el estado de los buckets (¿DummyCache?)')
+        denied_us = per_call_us(lambda: denied.hit(f'{run}:denied'), iterations)
+
+        shared = ratelimit.TokenBucketLimiter('bench', 1_000_000, 1, cache_alias=alias, lease_fraction=0)
+        shared_us = per_call_us(lambda: shared.hit(f'{run}:shared'), options['shared_iterations'])
+
+        for key in ('allowed', 'denied', 'shared'):
+            caches[alias].delete(f'ratelimit:bench:{run}:{key}')
+        ratelimit.reset_limiters()
+
+        self.stdout.write(f"{'caso':<20} {'µs por llamada':>15}")
+        for label, value in (
+            ('check() con L1', check_us), ('L1 permitido', allowed_us),
+            ('L1 rechazado', denied_us), ('caché compartida', shared_us),
+        ):
+            self.stdout.write(f'{label:<20} {value:>15.2f}')
+        self.stdout.write(
+            f"\n{iterations} llamadas por caso en L1, {options['shared_iterations']} a la caché '{alias}' "
+            f"({caches[alias].__class__.__name__})"
+        )
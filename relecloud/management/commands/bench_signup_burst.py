@@ -0,0 +1,156 @@
+"""
+Comando de gestión de Django que lanza una ráfaga de registros simultáneos
+contra gunicorn y comprueba que no se crean cuentas duplicadas.
+
+Uso:
+    python manage.py collectstatic --noinput
+    python manage.py bench_signup_burst                        # 32 clientes, 8 cuentas, 4 workers
+    python manage.py bench_signup_burst --clients 64 --accounts 4
+
+El servidor arranca en un subproceso sobre una copia temporal de la base de
+datos SQLite actual (migrada), con DEBUG=False. Cada cuenta la intentan
+registrar --clients / --accounts clientes a la vez, cada uno con el mismo
+username y email escritos con otras mayúsculas (burst3, Burst3, BURST3...).
+Todos los clientes cargan antes el formulario (cookie y token CSRF) y
+envían el POST a la vez.
+
+Se muestran los registros aceptados y rechazados, la mediana de consultas
+SQL de cada tipo de respuesta (de la cabecera Server-Timing, ver
+relecloud/middleware.py) y las cuentas duplicadas que quedan en la base de
+datos (mismo email o username sin distinguir mayúsculas), que deben ser 0.
+"""
+import os
+import re
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .bench_concurrency import BENCH_ENV, wait_until_ready
+
+
+PASSWORD = 'Cohete.2024!'
+
+_CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+_DB_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+class NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def spelling(name, variant):
+    """name con otras mayúsculas: 0 igual, 1 capitalizado, 2 en mayúsculas, 3 alternando..."""
+    if variant % 4 == 0:
+        return name
+    if variant % 4 == 1:
+        return name.capitalize()
+    if variant % 4 == 2:
+        return name.upper()
+    return ''.join(c.upper() if i % 2 else c for i, c in enumerate(name))
+
+
+def signup(base_url, account, variant, barrier):
+    """(código de estado, consultas SQL del POST) de un registro de la cuenta account"""
+    opener = build_opener(HTTPCookieProcessor(CookieJar()), NoRedirect)
+    with opener.open(f'{base_url}/registro/', timeout=60) as response:
+        token = _CSRF_INPUT.search(response.read().decode()).group(1)
+    name = f'burst{account}'
+    data = urlencode({
+        'csrfmiddlewaretoken': token, 'username': spelling(name, variant), 'first_name': 'Ráfaga',
+        'last_name': str(account), 'email': spelling(f'{name}@example.com', variant),
+        'password1': PASSWORD, 'password2': PASSWORD,
+    }).encode()
+    request = Request(f'{base_url}/registro/', data=data, headers={'Referer': f'{base_url}/registro/'})
+    barrier.wait()
+    try:
+        response = opener.open(request, timeout=60)
+    except HTTPError as e:  # 302 (sin seguir la redirección) y errores
+        response = e
+    with response:
+        match = _DB_QUERIES.search(response.headers.get('Server-Timing', ''))
+        return response.status, int(match.group(1)) if match else None
+
+
+def duplicates(database):
+    """Cuentas de la ráfaga con el email o el username de otra anterior, sin distinguir mayúsculas"""
+    with sqlite3.connect(database) as connection:
+        return connection.execute(
+            "SELECT COUNT(*) FROM relecloud_usuario AS a WHERE lower(a.username) LIKE 'burst%' AND EXISTS ("
+            "SELECT 1 FROM relecloud_usuario AS b WHERE b.id < a.id AND "
+            "(lower(b.username) = lower(a.username) OR lower(b.email) = lower(a.email)))"
+        ).fetchone()[0]
+
+
+class Command(BaseCommand):
+    help = 'Ráfaga de registros simultáneos: consultas por registro y cuentas duplicadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=32, help='Registros simultáneos (por defecto: 32).')
+        parser.add_argument('--accounts', type=int, default=8, help='Cuentas distintas (por defecto: 8).')
+        parser.add_argument('--workers', type=int, default=4, help='Workers de gunicorn (por defecto: 4).')
+        parser.add_argument('--port', type=int, default=8767, help='Puerto local de gunicorn (por defecto: 8767).')
+
+    def handle(self, *args, **options):
+        for name in ('clients', 'accounts', 'workers'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} debe ser al menos 1')
+        database = settings.DATABASES['default']
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('bench_signup_burst trabaja sobre una copia de la base de datos SQLite')
+        if not os.path.exists(os.path.join(settings.STATIC_ROOT, 'staticfiles.json')):
+            raise CommandError('Falta el manifiesto de estáticos: ejecuta antes python manage.py collectstatic')
+
+        base_url = f'http://127.0.0.1:{options["port"]}'
+        with tempfile.TemporaryDirectory() as directory:
+            copy = os.path.join(directory, 'bench.sqlite3')
+            shutil.copyfile(database['NAME'], copy)
+            env = {**os.environ, **BENCH_ENV, 'DATABASE_URL': f'sqlite:///{copy}', 'WARMUP_ENABLED': 'False'}
+            subprocess.run(
+                [sys.executable, 'manage.py', 'migrate', '--noinput', '-v', '0'],
+                cwd=settings.BASE_DIR, env=env, check=True,
+            )
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '--workers', str(options['workers']),
+                 '--bind', f'127.0.0.1:{options["port"]}', '--log-level', 'warning', 'project.wsgi'],
+                cwd=settings.BASE_DIR, env=env,
+            )
+            try:
+                wait_until_ready(f'{base_url}/registro/', process)
+                barrier = threading.Barrier(options['clients'])
+                with ThreadPoolExecutor(options['clients']) as pool:
+                    futures = [
+                        pool.submit(signup, base_url, i % options['accounts'], i // options['accounts'], barrier)
+                        for i in range(options['clients'])
+                    ]
+                    results = [future.result() for future in futures]
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+            duplicated = duplicates(copy)
+
+        accepted = [queries for status, queries in results if status == 302]
+        rejected = [queries for status, queries in results if status == 200]
+        errors = len(results) - len(accepted) - len(rejected)
+        self.stdout.write(
+            f'{options["clients"]} registros simultáneos de {options["accounts"]} cuentas '
+            f'({options["workers"]} workers)'
+        )
+        self.stdout.write(f"{'respuesta':<12} {'registros':>10} {'consultas':>10}")
+        for label, queries in (('aceptado', accepted), ('rechazado', rejected)):
+            median = f'{statistics.median(queries):g}' if queries and None not in queries else '-'
+            self.stdout.write(f'{label:<12} {len(queries):>10} {median:>10}')
+        self.stdout.write(f"{'error':<12} {errors:>10}")
+        self.stdout.write(f'\nCuentas duplicadas: {duplicated}')
@@ -0,0 +1,227 @@
+"""
+Comando de gestión de Django que mide el rendimiento de SQLite con tráfico
+concurrente mixto de lecturas y escrituras, con la configuración por defecto
+y con el perfil ajustado de relecloud/db_profile.py.
+
+Uso:
+    python manage.py bench_sqlite_concurrency                      # ambos perfiles, 4 procesos, 5 s
+    python manage.py bench_sqlite_concurrency --workers 8 --seconds 10
+    python manage.py bench_sqlite_concurrency --write-ratio 0.5    # la mitad de las operaciones escriben
+    python manage.py bench_sqlite_concurrency --profile tuned      # solo el perfil ajustado
+
+Cada perfil trabaja sobre una copia temporal de la base de datos actual (los
+datos confirmados), nunca sobre la original. Los procesos imitan a varios
+workers de gunicorn:
+
+    - lectura: la consulta del listado de destinos (vista destinations)
+    - escritura: comprobación + INSERT de una solicitud de información, en
+      una transacción (como InfoRequestCreate y ReviewCreateView)
+
+Perfiles:
+    baseline: journal_mode=DELETE, BEGIN diferido, sin reintentos
+    tuned:    SQLITE_PRAGMAS (WAL, synchronous=NORMAL, mmap...), BEGIN IMMEDIATE
+              y reintento con espera exponencial (relecloud/retry.py)
+"""
+import multiprocessing
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Avg, Count
+
+from relecloud.db_profile import SQLITE_PRAGMAS
+from relecloud.models import Cruise, Destination
+from relecloud.retry import DEFAULT_ATTEMPTS, LOCK_ERRORS, backoff_delay
+
+
+# Timeout por defecto del módulo sqlite3 (el que usa Django si no se configura)
+BASELINE_TIMEOUT = 5.0
+
+PROFILES = {
+    'baseline': {'pragmas': {'journal_mode': 'DELETE'}, 'begin': 'BEGIN', 'attempts': 1},
+    'tuned': {'pragmas': SQLITE_PRAGMAS, 'begin': 'BEGIN IMMEDIATE', 'attempts': DEFAULT_ATTEMPTS},
+}
+
+
+def _is_lock_error(error):
+    return any(message in str(error) for message in LOCK_ERRORS)
+
+
+def _connect(path, profile):
+    conn = sqlite3.connect(path, timeout=BASELINE_TIMEOUT, isolation_level=None)
+    for name, value in profile['pragmas'].items():
+        # journal_mode es persistente: se fija una vez al copiar la base de datos
+        if name != 'journal_mode':
+            conn.execute(f'PRAGMA {name}={value}')
+    return conn
+
+
+def _write(conn, profile, cruise_id, worker, sequence):
+    """Comprobación + INSERT en una transacción; devuelve el número de reintentos"""
+    email = f'bench-{worker}-{sequence % 50}@example.com'
+    for attempt in range(1, profile['attempts'] + 1):
+        try:
+            conn.execute(profile['begin'])
+            try:
+                conn.execute(
+                    'SELECT 1 FROM relecloud_inforequest WHERE email = ? AND cruise_id = ? LIMIT 1',
+                    [email, cruise_id],
+                ).fetchone()
+                conn.execute(
+                    'INSERT INTO relecloud_inforequest (name, email, notes, cruise_id) VALUES (?, ?, ?, ?)',
+                    ['Bench', email, 'Solicitud del benchmark de concurrencia', cruise_id],
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+            return attempt - 1
+        except sqlite3.OperationalError as e:
+            if not _is_lock_error(e) or attempt == profile['attempts']:
+                raise
+            time.sleep(backoff_delay(attempt))
+
+
+def _worker(path, profile_name, read_sql, cruise_id, write_ratio, seconds, worker, results):
+    """Proceso de carga: ejecuta operaciones mezcladas durante `seconds` segundos"""
+    profile = PROFILES[profile_name]
+    conn = _connect(path, profile)
+    rng = random.Random(worker)
+    stats = {'reads': [], 'writes': [], 'lock_errors': 0, 'other_errors': 0, 'retries': 0}
+
+    deadline = time.perf_counter() + seconds
+    sequence = 0
+    while time.perf_counter() < deadline:
+        sequence += 1
+        is_write = rng.random() < write_ratio
+        started = time.perf_counter()
+        try:
+            if is_write:
+                stats['retries'] += _write(conn, profile, cruise_id, worker, sequence)
+            else:
+                conn.execute(read_sql).fetchall()
+        except sqlite3.OperationalError as e:
+            stats['lock_errors' if _is_lock_error(e) else 'other_errors'] += 1
+            continue
+        stats['writes' if is_write else 'reads'].append(time.perf_counter() - started)
+
+    conn.close()
+    results.put(stats)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_benchmark(source, profile_name, workers=4, seconds=5.0, write_ratio=0.2):
+    """
+    Ejecuta el benchmark de un perfil sobre una copia de la conexión `source`.
+
+    Returns:
+        dict con operaciones por segundo, tasa de errores de bloqueo,
+        reintentos y latencias (ms) de lecturas y escrituras
+    """
+    cruise_id = Cruise.objects.using(source.alias).order_by('pk').values_list('pk', flat=True).first()
+    if cruise_id is None:
+        raise CommandError('La base de datos no tiene cruceros: carga datos antes de ejecutar el benchmark')
+
+    queryset = Destination.objects.using(source.alias).annotate(
+        avg_rating=Avg('reviews__rating'),
+        review_count=Count('reviews'),
+    ).order_by('-review_count', '-avg_rating')
+    sql, params = queryset.query.sql_with_params()
+    if params:
+        raise CommandError('La consulta de lectura no debería tener parámetros')
+
+    directory = tempfile.mkdtemp(prefix='relecloud-bench-')
+    try:
+        path = str(Path(directory) / 'bench.sqlite3')
+        source.ensure_connection()
+        copy = sqlite3.connect(path)
+        source.connection.backup(copy)
+        copy.execute(f"PRAGMA journal_mode={PROFILES[profile_name]['pragmas']['journal_mode']}")
+        copy.close()
+
+        # fork: los procesos solo usan sqlite3 y no tienen que volver a cargar Django
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [
+            context.Process(target=_worker, args=(
+                path, profile_name, sql, cruise_id, write_ratio, seconds, worker, results,
+            ))
+            for worker in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        stats = [results.get(timeout=seconds + 60) for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    reads = [t for s in stats for t in s['reads']]
+    writes = [t for s in stats for t in s['writes']]
+    lock_errors = sum(s['lock_errors'] for s in stats)
+    attempted = len(reads) + len(writes) + lock_errors + sum(s['other_errors'] for s in stats)
+    return {
+        'profile': profile_name,
+        'ops_per_second': (len(reads) + len(writes)) / seconds,
+        'reads': len(reads),
+        'writes': len(writes),
+        'lock_errors': lock_errors,
+        'other_errors': sum(s['other_errors'] for s in stats),
+        'lock_error_rate': lock_errors / attempted if attempted else 0.0,
+        'retries': sum(s['retries'] for s in stats),
+        'read_p50_ms': statistics.median(reads) * 1000 if reads else 0.0,
+        'read_p95_ms': _percentile(reads, 0.95) * 1000,
+        'write_p50_ms': statistics.median(writes) * 1000 if writes else 0.0,
+        'write_p95_ms': _percentile(writes, 0.95) * 1000,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Mide throughput y errores de bloqueo de SQLite con tráfico concurrente (perfil por defecto vs ajustado)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Alias de la base de datos a copiar')
+        parser.add_argument('--workers', type=int, default=4, help='Procesos concurrentes (por defecto 4)')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duración de cada perfil (por defecto 5)')
+        parser.add_argument('--write-ratio', type=float, default=0.2,
+                            help='Fracción de operaciones que escriben (por defecto 0.2)')
+        parser.add_argument('--profile', choices=['baseline', 'tuned', 'both'], default='both',
+                            help='Perfil a medir (por defecto ambos)')
+
+    def handle(self, *args, **options):
+        source = connections[options['database']]
+        if source.vendor != 'sqlite':
+            raise CommandError(f"La base de datos '{source.alias}' no es SQLite")
+        if not 0 <= options['write_ratio'] <= 1:
+            raise CommandError('--write-ratio debe estar entre 0 y 1')
+
+        names = ['baseline', 'tuned'] if options['profile'] == 'both' else [options['profile']]
+        self.stdout.write(
+            f"{options['workers']} procesos, {options['seconds']:g} s por perfil, "
+            f"{options['write_ratio']:.0%} escrituras\n"
+        )
+        self.stdout.write(
+            f"{'perfil':<10} {'ops/s':>9} {'lecturas':>9} {'escrit.':>8} {'bloqueos':>9} "
+            f"{'tasa':>7} {'reint.':>7} {'lect p50/p95 ms':>16} {'escr p50/p95 ms':>16}"
+        )
+        for name in names:
+            result = run_benchmark(source, name, options['workers'], options['seconds'], options['write_ratio'])
+            self.stdout.write(
+                f"{name:<10} {result['ops_per_second']:>9.1f} {result['reads']:>9} {result['writes']:>8} "
+                f"{result['lock_errors']:>9} {result['lock_error_rate']:>7.2%} {result['retries']:>7} "
+                f"{result['read_p50_ms']:>7.2f}/{result['read_p95_ms']:<8.2f}"
+                f"{result['write_p50_ms']:>7.2f}/{result['write_p95_ms']:<8.2f}"
+            )
@@ -0,0 +1,152 @@
+"""
+Comando de gestión de Django que mide el arranque en frío del proyecto:
+cada medida es un proceso de Python nuevo.
+
+Uso:
+    python manage.py collectstatic --noinput
+    python manage.py bench_startup                      # mediana de 5 arranques de cada caso
+    python manage.py bench_startup --repeat 10
+    python manage.py bench_startup --case check --case setup
+    python manage.py bench_startup --record v1.5        # guarda el resultado en el histórico
+
+Casos:
+
+    setup       python -c "django.setup()": lo que paga cada script suelto
+                (populate_images.py, verify_order.py, cleanup_*.py...)
+    check       python manage.py check: arranque de un comando de gestión
+                con las comprobaciones del sistema (URLconf, plantillas...)
+    gunicorn    desde que se lanza gunicorn con gunicorn.conf.py y un solo
+                worker hasta la primera respuesta de / (DEBUG=False, sobre
+                una copia temporal migrada de la base de datos SQLite;
+                incluye el warmup de relecloud/warmup.py en el maestro)
+
+Para ver qué módulos cuestan el tiempo: python manage.py startup_profile.
+
+--record añade el resultado, con su etiqueta, al histórico
+(BENCHMARK_DIR/startup.json) y lo compara con la entrada anterior.
+"""
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .bench_concurrency import wait_until_ready
+from .startup_profile import SETUP_CODE
+
+
+CASES = ['setup', 'check', 'gunicorn']
+HISTORY_NAME = 'startup.json'
+
+
+def time_command(arguments):
+    """ms que tarda en terminar python con arguments; CommandError si falla"""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *arguments], cwd=settings.BASE_DIR,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise CommandError(f"python {' '.join(arguments)} terminó con código {result.returncode}:\n{result.stderr[-2000:]}")
+    return elapsed
+
+
+def time_gunicorn(port, env):
+    """ms desde que se lanza gunicorn con env hasta la primera respuesta de /"""
+    command = [
+        sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--workers', '1',
+        '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'project.wsgi',
+    ]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+    try:
+        wait_until_ready(f'http://127.0.0.1:{port}/', process, interval=0.01)
+        return (time.perf_counter() - started) * 1000
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+class Command(BaseCommand):
+    help = 'Mide el arranque en frío de django.setup(), manage.py check y un worker de gunicorn'
+    requires_system_checks = []  # no influyen en la medida, que se hace en subprocesos
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--case', choices=CASES, action='append',
+            help='Caso a medir; se puede repetir (por defecto: todos).',
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Arranques por caso (por defecto: 5).')
+        parser.add_argument('--port', type=int, default=8766, help='Puerto local de gunicorn (por defecto: 8766).')
+        parser.add_argument('--record', metavar='LABEL', help='Guarda el resultado en el histórico con esta etiqueta.')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat debe ser al menos 1')
+        cases = options['case'] or CASES
+        database = settings.DATABASES['default']
+        if 'gunicorn' in cases:
+            if database['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError('El caso gunicorn trabaja sobre una copia de la base de datos SQLite')
+            if not os.path.exists(os.path.join(settings.STATIC_ROOT, 'staticfiles.json')):
+                raise CommandError('Falta el manifiesto de estáticos: ejecuta antes python manage.py collectstatic')
+
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            copy = os.path.join(directory, 'bench.sqlite3')
+            env = {**os.environ, 'DEBUG': 'False', 'DATABASE_URL': f'sqlite:///{copy}'}
+            if 'gunicorn' in cases:
+                shutil.copyfile(database['NAME'], copy)
+                subprocess.run(
+                    [sys.executable, 'manage.py', 'migrate', '--noinput', '-v', '0'],
+                    cwd=settings.BASE_DIR, env=env, check=True,
+                )
+            measures = {
+                'setup': lambda: time_command(['-c', SETUP_CODE]),
+                'check': lambda: time_command(['manage.py', 'check']),
+                'gunicorn': lambda: time_gunicorn(options['port'], env),
+            }
+            self.stdout.write(f"{'caso':<10} {'mediana ms':>11} {'mín ms':>8} {'máx ms':>8}")
+            for case in cases:
+                samples = [measures[case]() for _ in range(options['repeat'])]
+                results[case] = statistics.median(samples)
+                self.stdout.write(f'{case:<10} {results[case]:>11.1f} {min(samples):>8.1f} {max(samples):>8.1f}')
+
+        if options['record']:
+            self._record(options['record'], results)
+
+    def _record(self, label, results):
+        """Añade el resultado al histórico y muestra la variación respecto a la entrada anterior"""
+        path = Path(settings.BENCHMARK_DIR) / HISTORY_NAME
+        history = json.loads(path.read_text(encoding='utf-8')) if path.exists() else []
+        previous = history[-1] if history else None
+        history.append({
+            'label': label,
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'median_ms': {case: round(ms, 1) for case, ms in results.items()},
+        })
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(history, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        self.stdout.write(f"\nResultado '{label}' guardado en {path}")
+
+        if previous is None:
+            return
+        for case, ms in results.items():
+            before = previous['median_ms'].get(case)
+            if before:
+                self.stdout.write(
+                    f"  {case}: {before:.1f} -> {ms:.1f} ms ({ms / before - 1:+.1%} respecto a '{previous['label']}')"
+                )
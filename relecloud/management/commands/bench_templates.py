@@ -0,0 +1,212 @@
+"""
+Comando de gestión de Django que mide el coste de renderizar
+destinations.html con catálogos de distinto tamaño, con el motor de
+plantillas de Django y con Jinja2 (si está instalado).
+
+Uso:
+    python manage.py bench_templates                            # 10, 1000 y 10000 destinos, ambos motores
+    python manage.py bench_templates --sizes 10 100 --repeat 3
+    python manage.py bench_templates --engine django
+    python manage.py bench_templates --record v1.4              # guarda el resultado en el histórico
+
+Los destinos son registros del snapshot del catálogo construidos en memoria
+(sin base de datos). La página se renderiza completa, cabecera y filas por
+trozos (ver relecloud/streaming.py), y los fragmentos {% catalogcache %}
+se renderizan siempre (caché desactivada durante la medida). Para cada
+motor se muestra la mediana de cada tamaño y el coste por fila (pendiente
+de la recta de mínimos cuadrados tiempo ~ filas), que es el número a
+vigilar entre versiones.
+
+--record añade el resultado, con su etiqueta, al histórico
+(BENCHMARK_DIR/template_render.json) y lo compara con la entrada anterior.
+"""
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.template.utils import InvalidTemplateEngineError
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils.module_loading import import_string
+
+from relecloud.catalog import CatalogSnapshot, DestinationRecord
+from relecloud.streaming import iter_page
+
+
+DEFAULT_SIZES = [10, 1000, 10000]
+TEMPLATE_NAME = 'destinations.html'
+ROW_TEMPLATE = 'partials/destination_rows.html'
+HISTORY_NAME = 'template_render.json'
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def synthetic_snapshot(size):
+    """Snapshot con `size` destinos; uno de cada tres sin reviews"""
+    destinations = [
+        DestinationRecord.build(
+            id=i,
+            name=f'Destino {i}',
+            description=f'Destino sintético número {i}',
+            image_url='https://via.placeholder.com/400x300?text=No+Image',
+            avg_rating=None if i % 3 == 0 else 1 + (i % 40) / 10,
+            review_count=0 if i % 3 == 0 else i % 50 + 1,
+            cruises=(),
+        )
+        for i in range(1, size + 1)
+    ]
+    return CatalogSnapshot(None, destinations, [])
+
+
+def get_engine(name):
+    """Motor configurado en TEMPLATES, o el de JINJA2_TEMPLATES si Jinja2 no está activo"""
+    try:
+        return engines[name]
+    except InvalidTemplateEngineError:
+        if name != 'jinja2':
+            raise
+    params = dict(settings.JINJA2_TEMPLATES)
+    return import_string(params.pop('BACKEND'))(params)
+
+
+def available_engines():
+    names = ['django']
+    try:
+        import jinja2  # noqa: F401
+        names.append('jinja2')
+    except ImportError:
+        pass
+    return names
+
+
+def least_squares(points):
+    """(pendiente, ordenada en el origen) de la recta que mejor ajusta los puntos (x, y)"""
+    xs, ys = zip(*points)
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator if denominator else 0.0
+    return slope, mean_y - slope * mean_x
+
+
+def run_benchmark(engine_name, sizes, repeat):
+    """
+    Renderiza destinations.html `repeat` veces por tamaño.
+
+    Returns:
+        dict: mediana en ms por tamaño, coste por fila (µs) y coste fijo (ms)
+    """
+    engine = get_engine(engine_name)
+    page, row_template = engine.get_template(TEMPLATE_NAME), engine.get_template(ROW_TEMPLATE)
+    request = RequestFactory().get('/destinations/')
+    request.user = AnonymousUser()
+    medians = {}
+    with override_settings(CACHES=NO_CACHE):
+        for size in sizes:
+            snapshot = synthetic_snapshot(size)
+
+            def render():
+                return ''.join(iter_page(request, page, row_template, {'catalog_snapshot': snapshot}, snapshot.ranking))
+
+            render()  # calentamiento
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                render()
+                timings.append((time.perf_counter() - started) * 1000)
+            medians[size] = statistics.median(timings)
+
+    slope, intercept = least_squares(list(medians.items()))
+    return {'median_ms': medians, 'per_row_us': slope * 1000, 'base_ms': intercept}
+
+
+class Command(BaseCommand):
+    help = 'Mide el coste de renderizar destinations.html con distintos tamaños y motores de plantillas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=DEFAULT_SIZES, metavar='N',
+            help='Número de destinos de cada medida (por defecto: 10 1000 10000).',
+        )
+        parser.add_argument(
+            '--engine', choices=['django', 'jinja2', 'all'], default='all',
+            help='Motor de plantillas a medir (por defecto: todos los disponibles).',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Renders por tamaño; se toma la mediana (por defecto: 5).',
+        )
+        parser.add_argument(
+            '--record', metavar='ETIQUETA',
+            help='Guarda el resultado con esta etiqueta (p. ej. la versión) en el histórico.',
+        )
+
+    def handle(self, *args, **options):
+        sizes = sorted(set(options['sizes']))
+        if len(sizes) < 2 or sizes[0] < 1:
+            raise CommandError('--sizes necesita al menos dos tamaños positivos distintos')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat debe ser al menos 1')
+
+        names = available_engines() if options['engine'] == 'all' else [options['engine']]
+        if 'jinja2' in names and 'jinja2' not in available_engines():
+            raise CommandError('Jinja2 no está instalado (pip install Jinja2)')
+
+        self.stdout.write(
+            f"{'motor':<8} " + ' '.join(f'{f"{size} ms":>11}' for size in sizes)
+            + f" {'µs/fila':>9} {'fijo ms':>8}"
+        )
+        results = {}
+        for name in names:
+            result = run_benchmark(name, sizes, options['repeat'])
+            results[name] = result
+            self.stdout.write(
+                f'{name:<8} ' + ' '.join(f'{result["median_ms"][size]:>11.2f}' for size in sizes)
+                + f" {result['per_row_us']:>9.2f} {result['base_ms']:>8.2f}"
+            )
+
+        if options['record']:
+            self._record(options['record'], results)
+
+    def _record(self, label, results):
+        """Añade el resultado al histórico y muestra la variación respecto a la entrada anterior"""
+        path = Path(settings.BENCHMARK_DIR) / HISTORY_NAME
+        history = json.loads(path.read_text(encoding='utf-8')) if path.exists() else []
+        previous = history[-1] if history else None
+        history.append({
+            'label': label,
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'engines': {
+                name: {
+                    'per_row_us': round(result['per_row_us'], 3),
+                    'base_ms': round(result['base_ms'], 3),
+                    'median_ms': {str(size): round(ms, 3) for size, ms in result['median_ms'].items()},
+                }
+                for name, result in results.items()
+            },
+        })
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(history, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        self.stdout.write(f"\nResultado '{label}' guardado en {path}")
+
+        if previous is None:
+            return
+        for name, result in results.items():
+            before = previous['engines'].get(name)
+            if before and before['per_row_us'] > 0:
+                change = result['per_row_us'] / before['per_row_us'] - 1
+                self.stdout.write(
+                    f"  {name}: {before['per_row_us']:.2f} -> {result['per_row_us']:.2f} µs/fila "
+                    f"({change:+.1%} respecto a '{previous['label']}')"
+                )
@@ -0,0 +1,130 @@
+"""
+Comando de gestión de Django que mide el tiempo hasta el primer byte (TTFB)
+del listado de destinos, enviado entero (como antes) o en streaming (ver
+relecloud/streaming.py).
+
+Uso:
+    python manage.py bench_ttfb                                 # 10, 1000 y 10000 destinos
+    python manage.py bench_ttfb --sizes 100 5000 --repeat 3
+    python manage.py bench_ttfb --url http://localhost:8000/destinations/
+
+Sin --url, la página se renderiza en el proceso con destinos sintéticos
+(sin base de datos ni caché de fragmentos) y, para cada tamaño, se muestra
+la mediana del TTFB y del tiempo total de cada modo y el pico de memoria
+del render. Enviada entera, el TTFB es el tiempo total y la memoria crece
+con el número de filas; en streaming, el TTFB es el de la cabecera y la
+memoria se mantiene en un trozo de filas.
+
+Con --url se mide un servidor en marcha: TTFB hasta el primer byte del
+cuerpo y total hasta el último.
+"""
+import statistics
+import time
+import tracemalloc
+from urllib.request import urlopen
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template import loader
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from relecloud.management.commands.bench_templates import (
+    DEFAULT_SIZES, NO_CACHE, ROW_TEMPLATE, TEMPLATE_NAME, synthetic_snapshot,
+)
+from relecloud.streaming import iter_page
+
+
+def measure(render):
+    """(ttfb_ms, total_ms) de un render que devuelve un iterador de trozos"""
+    started = time.perf_counter()
+    chunks = render()
+    next(chunks, None)
+    ttfb = time.perf_counter() - started
+    for _ in chunks:
+        pass
+    return ttfb * 1000, (time.perf_counter() - started) * 1000
+
+
+def peak_memory(render):
+    """Pico de memoria (KiB) reservada mientras se consume el render"""
+    tracemalloc.start()
+    try:
+        for _ in render():
+            pass
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def measure_url(url):
+    """(ttfb_ms, total_ms) de una petición GET a un servidor en marcha"""
+    started = time.perf_counter()
+    with urlopen(url) as response:
+        response.read(1)
+        ttfb = time.perf_counter() - started
+        while response.read(64 * 1024):
+            pass
+    return ttfb * 1000, (time.perf_counter() - started) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Mide el TTFB del listado de destinos enviado entero y en streaming'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=DEFAULT_SIZES, metavar='N',
+            help='Número de destinos de cada medida (por defecto: 10 1000 10000).',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Medidas por tamaño y modo; se toma la mediana (por defecto: 5).',
+        )
+        parser.add_argument(
+            '--url',
+            help='Mide esta URL de un servidor en marcha en lugar de renderizar en el proceso.',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat debe ser al menos 1')
+        if options['url']:
+            self._bench_url(options['url'], options['repeat'])
+        else:
+            self._bench_render(sorted(set(options['sizes'])), options['repeat'])
+
+    def _bench_render(self, sizes, repeat):
+        page, row_template = loader.get_template(TEMPLATE_NAME), loader.get_template(ROW_TEMPLATE)
+        request = RequestFactory().get('/destinations/')
+        request.user = AnonymousUser()
+
+        self.stdout.write(
+            f"{'filas':>7} {'modo':<10} {'TTFB ms':>9} {'total ms':>9} {'pico KiB':>9}"
+        )
+        with override_settings(CACHES=NO_CACHE):
+            for size in sizes:
+                snapshot = synthetic_snapshot(size)
+
+                def streamed():
+                    return iter_page(request, page, row_template, {'catalog_snapshot': snapshot}, snapshot.ranking)
+
+                def buffered():
+                    return iter([''.join(streamed())])
+
+                for mode, render in (('entera', buffered), ('streaming', streamed)):
+                    measure(render)  # calentamiento
+                    ttfb, total = zip(*(measure(render) for _ in range(repeat)))
+                    self.stdout.write(
+                        f'{size:>7} {mode:<10} {statistics.median(ttfb):>9.2f} '
+                        f'{statistics.median(total):>9.2f} {peak_memory(render):>9.0f}'
+                    )
+
+    def _bench_url(self, url, repeat):
+        try:
+            measure_url(url)  # calentamiento
+            ttfb, total = zip(*(measure_url(url) for _ in range(repeat)))
+        except OSError as e:
+            raise CommandError(f'No se pudo medir {url}: {e}')
+        self.stdout.write(
+            f'{url}\n  TTFB: {statistics.median(ttfb):.2f} ms  total: {statistics.median(total):.2f} ms'
+        )
@@ -0,0 +1,43 @@
+"""
+Comando de gestión de Django para cargar fixtures JSONL grandes en bloque.
+
+Uso:
+    python manage.py bulk_loaddata fixture.jsonl [otro.jsonl ...] [--batch-size 1000]
+
+Los ficheros se generan con `python manage.py dumpdata --format jsonl`.
+A diferencia de loaddata, que guarda cada objeto con su propio INSERT,
+este comando lee el fichero en streaming e inserta lotes con bulk_create.
+Las señales pre_save/post_save NO se emiten.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from relecloud.snapshots import SnapshotError, bulk_load_jsonl
+
+
+class Command(BaseCommand):
+    help = 'Carga fixtures JSONL con inserciones en bloque (bulk_create)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixtures', nargs='+', help='Ficheros JSONL a cargar')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Objetos por INSERT')
+        parser.add_argument('--database', default='default', help='Alias de la base de datos')
+
+    def handle(self, *args, **options):
+        for fixture in options['fixtures']:
+            if not fixture.endswith('.jsonl'):
+                raise CommandError(f'{fixture}: solo se admiten fixtures .jsonl (use loaddata para el resto)')
+
+            started = time.perf_counter()
+            try:
+                counts = bulk_load_jsonl(fixture, using=options['database'], batch_size=options['batch_size'])
+            except (OSError, SnapshotError) as e:
+                raise CommandError(str(e))
+
+            total = sum(counts.values())
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ {fixture}: {total} objetos en {time.perf_counter() - started:.2f}s'
+            ))
+            for label, count in sorted(counts.items()):
+                self.stdout.write(f'   {label:<30} {count}')
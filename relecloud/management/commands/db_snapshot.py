@@ -0,0 +1,66 @@
+"""
+Comando de gestión de Django para crear y restaurar snapshots de la base de datos.
+
+Uso:
+    python manage.py db_snapshot create [--name seed] [--no-media]
+    python manage.py db_snapshot restore [--name seed] [--no-media]
+    python manage.py db_snapshot list
+
+Un snapshot contiene la base de datos ya migrada y sembrada (backup en línea
+de SQLite o pg_dump en formato custom) y una copia de MEDIA_ROOT, de modo que
+preparar un entorno se reduce a un único restore.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from relecloud.snapshots import SnapshotError, create_snapshot, list_snapshots, restore_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Crea, restaura o lista snapshots de la base de datos y de MEDIA_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['create', 'restore', 'list'], help='Acción a realizar')
+        parser.add_argument('--name', default='seed', help='Nombre del snapshot (por defecto: seed)')
+        parser.add_argument('--database', default='default', help='Alias de la base de datos')
+        parser.add_argument('--no-media', action='store_true', help='No copiar/restaurar MEDIA_ROOT')
+
+    def handle(self, *args, **options):
+        action = options['action']
+        if action == 'list':
+            self._list()
+            return
+
+        started = time.perf_counter()
+        try:
+            if action == 'create':
+                path = create_snapshot(
+                    name=options['name'],
+                    using=options['database'],
+                    include_media=not options['no_media'],
+                )
+                self.stdout.write(self.style.SUCCESS(f'✓ Snapshot creado en {path}'))
+            else:
+                restore_snapshot(
+                    name=options['name'],
+                    using=options['database'],
+                    include_media=not options['no_media'],
+                )
+                self.stdout.write(self.style.SUCCESS(f"✓ Snapshot '{options['name']}' restaurado"))
+        except SnapshotError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f'   Tiempo: {time.perf_counter() - started:.2f}s')
+
+    def _list(self):
+        """Muestra los snapshots disponibles"""
+        snapshots = list_snapshots()
+        if not snapshots:
+            self.stdout.write('No hay snapshots disponibles')
+            return
+        for manifest in snapshots:
+            media = 'con media' if manifest.get('media') else 'sin media'
+            self.stdout.write(
+                f"   {manifest['name']:<20} {manifest['vendor']:<12} {manifest['created_at']}  ({media})"
+            )
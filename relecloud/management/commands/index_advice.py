@@ -0,0 +1,73 @@
+"""
+Comando de gestión de Django que analiza los planes de las consultas de la
+aplicación y propone índices.
+
+Uso:
+    python manage.py index_advice                    # contra la base de datos actual
+    python manage.py index_advice --synthetic        # con un catálogo sintético grande (se descarta)
+    python manage.py index_advice --emit-migration   # escribe las propuestas como migración
+    python manage.py index_advice -v 2               # muestra también los planes completos
+
+Las propuestas se deben añadir además a Meta.indexes de cada modelo (el
+comando muestra el código); si no, makemigrations intentará eliminarlas.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from relecloud.index_advisor import advise, build_migration
+from relecloud.synthetic import build_catalog
+
+
+# Tamaño del catálogo sintético de --synthetic (el "large" de test_query_budget x5)
+SYNTHETIC_SIZE = dict(destinations=200, cruises=60, users=400, reviews_per_destination=40)
+
+
+class Command(BaseCommand):
+    help = 'Analiza los planes de ejecución de las consultas de la aplicación y propone índices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Alias de la base de datos')
+        parser.add_argument('--synthetic', action='store_true',
+                            help='Analizar con un catálogo sintético grande dentro de una transacción que se descarta')
+        parser.add_argument('--emit-migration', action='store_true',
+                            help='Escribir las propuestas como una migración de relecloud')
+        parser.add_argument('--name', default='index_advice', help='Sufijo del nombre de la migración')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        try:
+            if options['synthetic']:
+                with transaction.atomic(using=using):
+                    build_catalog(prefix='index-advice', **SYNTHETIC_SIZE)
+                    results, proposals = advise(using)
+                    transaction.set_rollback(True, using=using)
+            else:
+                results, proposals = advise(using)
+        except ValueError as e:
+            raise CommandError(f'{e}. Carga datos o usa --synthetic')
+
+        for advice in results:
+            status = self.style.WARNING('!') if advice.notes else self.style.SUCCESS('✓')
+            self.stdout.write(f'{status} {advice.name:<30} {advice.source}')
+            for note in advice.notes:
+                self.stdout.write(f'     - {note}')
+            if options['verbosity'] >= 2:
+                for line in advice.plan:
+                    self.stdout.write(f'       {line}')
+
+        if not proposals:
+            self.stdout.write(self.style.SUCCESS('\n✓ No se proponen índices nuevos'))
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\nÍndices propuestos ({len(proposals)}):'))
+        for proposal in proposals:
+            self.stdout.write(f'   {proposal.model.__name__}.Meta.indexes: {proposal.as_code()}')
+            for reason in proposal.reasons:
+                self.stdout.write(f'      {reason}')
+
+        if options['emit_migration']:
+            writer = build_migration(proposals, name=options['name'])
+            with open(writer.path, 'w', encoding='utf-8') as fh:
+                fh.write(writer.as_string())
+            self.stdout.write(self.style.SUCCESS(f'\n✓ Migración escrita en {writer.path}'))
+            self.stdout.write('   Añade los índices a Meta.indexes de cada modelo antes de aplicarla')
@@ -0,0 +1,29 @@
+"""
+Comando de gestión de Django que genera las variantes de los ficheros de
+MEDIA_ROOT que sirve la vista relecloud.media.serve.
+
+Uso:
+    python manage.py media_variants
+
+Para cada imagen JPEG/PNG escribe <fichero>.webp (con la calidad y el
+tamaño máximo de STATIC_BUILD) y para cada fichero de texto (SVG, JSON,
+CSS...) <fichero>.gz y, si Brotli está instalado, <fichero>.br. Solo se
+regeneran las variantes que faltan o son más antiguas que el original, así
+que puede ejecutarse tras cada despliegue o periódicamente.
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from relecloud.media import build_variants
+
+
+class Command(BaseCommand):
+    help = 'Genera las variantes .webp/.gz/.br de los ficheros de MEDIA_ROOT'
+
+    def handle(self, *args, **options):
+        written = build_variants(settings.MEDIA_ROOT)
+        for path in written:
+            self.stdout.write(f'  {os.path.relpath(path, settings.MEDIA_ROOT)} ({os.path.getsize(path):,} bytes)')
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(written)} variantes escritas'))
@@ -0,0 +1,117 @@
+"""
+Comando de gestión de Django para consultar los perfiles de ProfilingMiddleware.
+
+Uso:
+    python manage.py profiles list [--url destinations]
+    python manage.py profiles summary [--url destinations] [--limit 20]
+    python manage.py profiles token <usuario_staff>
+
+'summary' agrega todos los perfiles de cada URL: los .pstats se combinan con
+pstats.Stats y se ordenan por tiempo acumulado; los .collapsed se resumen por
+función (muestras propias y totales). Los .collapsed se pueden abrir tal cual
+en speedscope o pasar a flamegraph.pl.
+
+'token' genera el valor de la cabecera que fuerza el perfilado de una
+petición concreta:
+    curl -H "X-Relecloud-Profile: <token>" https://.../destinations/
+"""
+import io
+import pstats
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from relecloud.profiling import get_profiling_settings, list_profiles, make_profile_token, parse_profile_name
+
+
+class Command(BaseCommand):
+    help = 'Lista y resume los perfiles guardados por ProfilingMiddleware, o genera un token de profiling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['list', 'summary', 'token'], help='Acción a realizar')
+        parser.add_argument('username', nargs='?', help='Usuario staff (solo para token)')
+        parser.add_argument('--url', help='Filtrar por nombre de URL (p. ej. destinations o admin-index)')
+        parser.add_argument('--limit', type=int, default=20, help='Funciones a mostrar por URL (por defecto: 20)')
+
+    def handle(self, *args, **options):
+        if options['action'] == 'token':
+            self._token(options['username'])
+            return
+
+        config = get_profiling_settings()
+        profiles = [parse_profile_name(path) for path in list_profiles(config['DIRECTORY'])]
+        if options['url']:
+            profiles = [p for p in profiles if p['url_name'] == options['url']]
+        if not profiles:
+            self.stdout.write(f"No hay perfiles en {config['DIRECTORY']}")
+            return
+
+        if options['action'] == 'list':
+            for profile in profiles:
+                self.stdout.write(
+                    f"   {profile['url_name']:<30} {profile['timestamp']}  pid={profile['pid']:<7} {profile['path'].name}"
+                )
+            self.stdout.write(f'Total: {len(profiles)} perfiles')
+            return
+
+        by_url = defaultdict(list)
+        for profile in profiles:
+            by_url[profile['url_name']].append(profile['path'])
+        for url_name, paths in sorted(by_url.items()):
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{url_name} ({len(paths)} perfiles)'))
+            pstats_files = [str(p) for p in paths if p.suffix == '.pstats']
+            collapsed_files = [p for p in paths if p.suffix == '.collapsed']
+            if pstats_files:
+                self._summarize_pstats(pstats_files, options['limit'])
+            if collapsed_files:
+                self._summarize_collapsed(collapsed_files, options['limit'])
+
+    def _token(self, username):
+        """Genera un token firmado para un usuario staff"""
+        if not username:
+            raise CommandError('Indica el usuario: python manage.py profiles token <usuario>')
+        try:
+            user = get_user_model().objects.get(username=username)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"El usuario '{username}' no existe")
+        if not user.is_staff:
+            raise CommandError(f"El usuario '{username}' no es staff")
+
+        config = get_profiling_settings()
+        self.stdout.write(make_profile_token(username))
+        self.stderr.write(f"Cabecera: {config['HEADER']} (válido {config['TOKEN_MAX_AGE']}s)")
+
+    def _summarize_pstats(self, files, limit):
+        """Combina varios .pstats y muestra las funciones con más tiempo acumulado"""
+        stream = io.StringIO()
+        stats = pstats.Stats(*files, stream=stream)
+        stats.strip_dirs().sort_stats('cumulative').print_stats(limit)
+        self.stdout.write(stream.getvalue())
+
+    def _summarize_collapsed(self, files, limit):
+        """Resume pilas colapsadas: muestras totales y propias por función"""
+        inclusive = Counter()
+        exclusive = Counter()
+        samples = 0
+        for path in files:
+            with open(path, encoding='utf-8') as fh:
+                for line in fh:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    if not stack:
+                        continue
+                    count = int(count)
+                    frames = stack.split(';')
+                    samples += count
+                    exclusive[frames[-1]] += count
+                    for frame in set(frames):
+                        inclusive[frame] += count
+
+        self.stdout.write(f'   {samples} muestras')
+        if not samples:
+            return
+        self.stdout.write(f"   {'total %':>8} {'propio %':>9}  función")
+        for frame, count in inclusive.most_common(limit):
+            self.stdout.write(
+                f'   {100 * count / samples:>7.1f}% {100 * exclusive[frame] / samples:>8.1f}%  {frame}'
+            )
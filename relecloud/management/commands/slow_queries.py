@@ -0,0 +1,89 @@
+"""
+Comando de gestión de Django para resumir el log de consultas lentas.
+
+Uso:
+    python manage.py slow_queries [--top 20] [--sort total|count|max|mean] [--no-plans]
+    python manage.py slow_queries --path /ruta/slow_queries.jsonl
+
+Agrupa las entradas de SLOW_QUERY_LOG['PATH'] por fingerprint (forma de la
+consulta) y muestra las N peores con número de ejecuciones, tiempos, puntos
+de llamada más frecuentes y el plan de ejecución capturado.
+"""
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from relecloud.slow_queries import get_slow_query_settings, read_entries
+
+
+SORT_KEYS = {
+    'total': lambda stats: stats['total_ms'],
+    'count': lambda stats: stats['count'],
+    'max': lambda stats: stats['max_ms'],
+    'mean': lambda stats: stats['total_ms'] / stats['count'],
+}
+
+
+def aggregate(entries):
+    """Agrega las entradas del log por fingerprint"""
+    by_fingerprint = {}
+    for entry in entries:
+        stats = by_fingerprint.get(entry['fingerprint'])
+        if stats is None:
+            stats = by_fingerprint[entry['fingerprint']] = {
+                'fingerprint': entry['fingerprint'],
+                'sql': entry['sql'],
+                'durations': [],
+                'callsites': Counter(),
+                'params': entry.get('params'),
+                'plan': None,
+            }
+        stats['durations'].append(entry['duration_ms'])
+        stats['callsites'][entry.get('callsite') or 'desconocido'] += 1
+        if stats['plan'] is None and entry.get('plan'):
+            stats['plan'] = entry['plan']
+
+    for stats in by_fingerprint.values():
+        durations = sorted(stats.pop('durations'))
+        stats['count'] = len(durations)
+        stats['total_ms'] = sum(durations)
+        stats['max_ms'] = durations[-1]
+        stats['p95_ms'] = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+    return list(by_fingerprint.values())
+
+
+class Command(BaseCommand):
+    help = 'Muestra las consultas lentas más costosas agrupadas por fingerprint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help='Número de consultas a mostrar (por defecto: 20)')
+        parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='total',
+                            help='Criterio de ordenación (por defecto: total)')
+        parser.add_argument('--path', help='Fichero de log (por defecto: SLOW_QUERY_LOG["PATH"])')
+        parser.add_argument('--no-plans', action='store_true', help='No mostrar los planes de ejecución')
+
+    def handle(self, *args, **options):
+        path = options['path'] or get_slow_query_settings()['PATH']
+        report = aggregate(read_entries(path))
+        if not report:
+            self.stdout.write(f'No hay consultas lentas registradas en {path}')
+            return
+
+        report.sort(key=SORT_KEYS[options['sort']], reverse=True)
+        self.stdout.write(f'{len(report)} consultas distintas en {path}\n')
+
+        for position, stats in enumerate(report[:options['top']], start=1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"#{position} {stats['fingerprint']}  x{stats['count']}  "
+                f"total={stats['total_ms']:.1f}ms  media={stats['total_ms'] / stats['count']:.1f}ms  "
+                f"p95={stats['p95_ms']:.1f}ms  max={stats['max_ms']:.1f}ms"
+            ))
+            self.stdout.write(f"   {stats['sql']}")
+            self.stdout.write(f"   Parámetros: {stats['params']}")
+            for callsite, count in stats['callsites'].most_common(3):
+                self.stdout.write(f'   Llamada: {callsite} (x{count})')
+            if stats['plan'] and not options['no_plans']:
+                self.stdout.write('   Plan:')
+                for line in stats['plan']:
+                    self.stdout.write(f'      {line}')
+            self.stdout.write('')
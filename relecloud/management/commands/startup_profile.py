@@ -0,0 +1,118 @@
+"""
+Comando de gestión de Django que muestra en qué se va el tiempo de arranque:
+ejecuta un comando de manage.py (o solo django.setup(), lo que pagan los
+scripts sueltos como populate_images.py) con python -X importtime y agrupa
+el coste de los imports por app de INSTALLED_APPS y por paquete.
+
+Uso:
+    python manage.py startup_profile                    # manage.py check
+    python manage.py startup_profile --setup            # solo django.setup()
+    python manage.py startup_profile showmigrations --list
+    python manage.py startup_profile --limit 30         # más módulos en el top
+
+El comando se ejecuta en un subproceso nuevo (con los módulos sin importar)
+y su salida se descarta. Se muestran:
+
+    por app       tiempo propio (self) de los módulos de cada app de
+                  INSTALLED_APPS; los demás se agrupan por paquete raíz
+                  (stdlib incluida)
+    módulos       los --limit módulos con más tiempo acumulado (el propio
+                  más el de lo que importan), como en -X importtime
+
+Los tiempos de -X importtime incluyen su propia sobrecarga; sirven para
+comparar, no como tiempo absoluto (ver bench_startup).
+"""
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# import time: self [us] | cumulative | imported package
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\S+)$')
+
+SETUP_CODE = 'import django; django.setup()'
+
+
+def parse_importtime(stderr):
+    """Lista de (módulo, self µs, acumulado µs) de la salida de -X importtime"""
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us)))
+    return modules
+
+
+def owner(module, app_names):
+    """App de INSTALLED_APPS a la que pertenece module o, si no es de ninguna, su paquete raíz"""
+    for app_name in app_names:
+        if module == app_name or module.startswith(app_name + '.'):
+            return app_name
+    return module.partition('.')[0]
+
+
+def group_by_owner(modules, app_names):
+    """{app o paquete: (self µs, número de módulos)}, de más a menos tiempo"""
+    app_names = sorted(app_names, key=len, reverse=True)  # la más específica primero (django.contrib.auth antes que django)
+    totals = defaultdict(lambda: [0, 0])
+    for name, self_us, _ in modules:
+        total = totals[owner(name, app_names)]
+        total[0] += self_us
+        total[1] += 1
+    return dict(sorted(((key, tuple(value)) for key, value in totals.items()), key=lambda item: -item[1][0]))
+
+
+def profile(arguments):
+    """Ejecuta python -X importtime con arguments; retorna los módulos importados"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', *arguments],
+        cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    modules = parse_importtime(result.stderr)
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not IMPORTTIME_LINE.match(line)]
+        raise CommandError(f'El comando terminó con código {result.returncode}:\n' + '\n'.join(errors[-10:]))
+    return modules
+
+
+class Command(BaseCommand):
+    help = 'Coste de los imports al arrancar un comando de manage.py, por app y por módulo'
+    requires_system_checks = []  # el subproceso ya los ejecuta si el comando medido lo hace
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'target', nargs='*', default=['check'],
+            help='Comando de manage.py y sus argumentos (por defecto: check).',
+        )
+        parser.add_argument(
+            '--setup', action='store_true',
+            help='Mide solo django.setup(), como los scripts sueltos del proyecto.',
+        )
+        parser.add_argument('--limit', type=int, default=15, help='Módulos y grupos a mostrar (por defecto: 15).')
+
+    def handle(self, *args, **options):
+        if options['setup']:
+            label, arguments = 'django.setup()', ['-c', SETUP_CODE]
+        else:
+            label, arguments = f"manage.py {' '.join(options['target'])}", ['manage.py', *options['target']]
+        modules = profile(arguments)
+        if not modules:
+            raise CommandError('La salida de -X importtime no tiene ningún import')
+
+        total_us = sum(self_us for _, self_us, _ in modules)
+        self.stdout.write(f'{label}: {len(modules)} módulos, {total_us / 1000:.1f} ms en imports\n')
+
+        app_names = [app_config.name for app_config in apps.get_app_configs()]
+        self.stdout.write(f"{'app / paquete':<32} {'ms':>8} {'%':>6} {'módulos':>8}")
+        for key, (self_us, count) in list(group_by_owner(modules, app_names).items())[:options['limit']]:
+            self.stdout.write(f'{key:<32} {self_us / 1000:>8.1f} {self_us / total_us:>6.1%} {count:>8}')
+
+        self.stdout.write(f"\n{'módulo':<48} {'propio ms':>10} {'acumulado ms':>13}")
+        for name, self_us, cumulative_us in sorted(modules, key=lambda module: -module[2])[:options['limit']]:
+            self.stdout.write(f'{name:<48} {self_us / 1000:>10.1f} {cumulative_us / 1000:>13.1f}')
@@ -0,0 +1,174 @@
+"""
+Comando de gestión de Django que calcula los bytes que descarga un
+navegador en la primera carga de una página, con y sin el build de
+estáticos (ver relecloud/staticbuild.py).
+
+Uso:
+    python manage.py collectstatic --noinput
+    python manage.py static_weight                      # index.html
+    python manage.py static_weight --template about.html
+
+La página se renderiza para un usuario anónimo dos veces:
+
+    - sin build: ficheros de relecloud/static/ tal cual, sin comprimir
+    - con build: ficheros de STATIC_ROOT, con la versión .br o .gz si
+      existe (la que WhiteNoise envía a un navegador que la acepta)
+
+Se cuentan el HTML, las hojas de estilo enlazadas, las imágenes de la
+página (la fuente WebP de un <picture> si la hay) y las imágenes de fondo
+de las hojas de estilo (la WebP de un image-set()). Los recursos externos
+(p. ej. las fuentes de Typekit) no se cuentan.
+"""
+import os
+import re
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from relecloud.staticbuild import BuildStaticFilesStorage
+
+
+NO_BUILD_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+_IMAGE_SET = re.compile(r'image-set\(\s*url\(\s*["\']?([^"\')]+)["\']?\s*\)[^;}]*\)')
+_URL = re.compile(r'url\(\s*["\']?([^"\')]+)["\']?\s*\)')
+
+
+class PageResources(HTMLParser):
+    """Hojas de estilo, imágenes y CSS incrustado que descarga el navegador"""
+
+    def __init__(self):
+        super().__init__()
+        self.stylesheets, self.images, self.inline_css = [], [], []
+        # Imágenes con fetchpriority="high" (la fuente WebP si están en un <picture>)
+        self.priority_images = []
+        self._in_noscript = self._in_style = False
+        self._picture_source = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'noscript':
+            self._in_noscript = True
+        elif tag == 'style':
+            self._in_style = True
+        elif tag == 'link' and not self._in_noscript:
+            if attrs.get('rel') == 'stylesheet' or (attrs.get('rel') == 'preload' and attrs.get('as') == 'style'):
+                self.stylesheets.append(attrs['href'])
+        elif tag == 'picture':
+            self._picture_source = None
+        elif tag == 'source' and self._picture_source is None:
+            self._picture_source = attrs.get('srcset')
+            self.images.append(self._picture_source)
+        elif tag == 'img':
+            if self._picture_source is None:
+                self.images.append(attrs.get('src'))
+            if attrs.get('fetchpriority') == 'high':
+                self.priority_images.append(self._picture_source or attrs.get('src'))
+
+    def handle_endtag(self, tag):
+        if tag == 'noscript':
+            self._in_noscript = False
+        elif tag == 'style':
+            self._in_style = False
+        elif tag == 'picture':
+            self._picture_source = None
+
+    def handle_data(self, data):
+        if self._in_style:
+            self.inline_css.append(data)
+
+
+def background_images(css, base):
+    """URLs absolutas de las imágenes de fondo; de un image-set() solo la primera"""
+    urls = []
+    skipped = set()
+    for match in _IMAGE_SET.finditer(css):
+        urls.append(match.group(1))
+        skipped.update(_URL.findall(match.group(0))[1:])
+    urls += [url for url in _URL.findall(_IMAGE_SET.sub('', css)) if url not in skipped]
+    return [
+        os.path.normpath(os.path.join(base, url)).replace(os.sep, '/')
+        for url in urls if not url.startswith(('data:', 'http:', 'https:', '//'))
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Calcula los bytes de la primera carga de una página con y sin el build de estáticos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--template', default='index.html',
+            help='Plantilla de la página (por defecto: index.html).',
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(staticfiles_storage, BuildStaticFilesStorage):
+            raise CommandError('El storage de estáticos no es BuildStaticFilesStorage')
+        if not os.path.exists(os.path.join(settings.STATIC_ROOT, staticfiles_storage.manifest_name)):
+            raise CommandError('No hay build de estáticos: ejecuta antes python manage.py collectstatic')
+
+        with override_settings(DEBUG=False, STORAGES=NO_BUILD_STORAGES):
+            before = self._measure(options['template'], self._source_size)
+        with override_settings(DEBUG=False):
+            after = self._measure(options['template'], self._built_size)
+
+        self.stdout.write(f"{'recurso':<40} {'bytes':>12}")
+        for label, resources in (('sin build', before), ('con build', after)):
+            self.stdout.write(f'{label}:')
+            for name, size in resources.items():
+                self.stdout.write(f'  {name:<38} {size:>12,}')
+        total_before, total_after = sum(before.values()), sum(after.values())
+        self.stdout.write(
+            f'\nTotal: {total_before:,} -> {total_after:,} bytes '
+            f'({total_after / total_before - 1:+.1%})'
+        )
+
+    def _measure(self, template_name, file_size):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        html = render_to_string(template_name, request=request)
+        page = PageResources()
+        page.feed(html)
+
+        resources = {'(HTML)': len(html.encode('utf-8'))}
+        background = []
+        for css in page.inline_css:
+            background += background_images(css, settings.STATIC_URL)
+        for url in page.stylesheets:
+            name = self._static_name(url)
+            resources[name], path = file_size(name)
+            with open(path, encoding='utf-8') as fh:
+                background += background_images(fh.read(), os.path.dirname(url) + '/')
+        for url in [*page.images, *background]:
+            name = self._static_name(url)
+            if name not in resources:
+                resources[name] = file_size(name)[0]
+        return resources
+
+    def _static_name(self, url):
+        if not url.startswith(settings.STATIC_URL):
+            raise CommandError(f'{url} no es un fichero estático')
+        return url[len(settings.STATIC_URL):]
+
+    def _source_size(self, name):
+        path = finders.find(name)
+        if path is None:
+            raise CommandError(f'No se encuentra {name}')
+        return os.path.getsize(path), path
+
+    def _built_size(self, name):
+        path = os.path.join(settings.STATIC_ROOT, name)
+        for encoded in (f'{path}.br', f'{path}.gz', path):
+            if os.path.exists(encoded):
+                return os.path.getsize(encoded), path
+        raise CommandError(f'No se encuentra {name} en STATIC_ROOT')
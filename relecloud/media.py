@@ -0,0 +1,270 @@
+"""
+Servir MEDIA_ROOT en producción sin proxy inverso
+
+django.conf.urls.static.static() solo sirve ficheros con DEBUG=True. La
+vista serve de este módulo (ver project/urls.py) los sirve siempre:
+
+    - en streaming con FileResponse; con gunicorn el cuerpo se envía con
+      sendfile (wsgi.file_wrapper), también el de una petición Range
+    - peticiones Range de un solo rango (206, 416 si no se puede servir;
+      If-Range incluido) para vídeos y descargas reanudables
+    - peticiones condicionales con ETag y Last-Modified (304 / 412)
+    - Cache-Control: un año e immutable para los nombres con hash de
+      contenido (los de HashedMediaStorage, IMMUTABLE_NAMES), MAX_AGE para
+      el resto
+    - variantes opcionales junto al fichero (python manage.py media_variants):
+      <fichero>.webp si el navegador acepta WebP y <fichero>.br / .gz si
+      acepta la codificación, con Vary: Accept / Accept-Encoding
+
+Configuración en settings.MEDIA_SERVING (ENABLED, MAX_AGE,
+IMMUTABLE_MAX_AGE, IMMUTABLE_NAMES, VARIANTS).
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .staticbuild import get_static_build_settings, to_webp
+
+try:
+    import brotli
+except ImportError:  # Brotli no instalado: solo variantes .gz
+    brotli = None
+
+
+MEDIA_SERVING_DEFAULTS = {
+    'ENABLED': True,
+    'MAX_AGE': 3600,
+    'IMMUTABLE_MAX_AGE': 365 * 24 * 3600,
+    'IMMUTABLE_NAMES': r'\.[0-9a-f]{12}\.[^./]+$',
+    'VARIANTS': True,
+}
+
+# Variantes que se buscan junto al fichero: <fichero>.webp y, por preferencia, las codificadas
+ENCODED_VARIANTS = [('.br', 'br'), ('.gz', 'gzip')]
+VARIANT_SUFFIXES = ('.webp', '.br', '.gz')
+WEBP_SOURCES = {'image/jpeg', 'image/png'}
+COMPRESSIBLE_TYPES = {'image/svg+xml', 'application/json', 'application/xml', 'text/javascript', 'application/javascript'}
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def get_media_serving_settings():
+    """Combina settings.MEDIA_SERVING con los valores por defecto"""
+    return {**MEDIA_SERVING_DEFAULTS, **getattr(settings, 'MEDIA_SERVING', {})}
+
+
+def content_hash(content, length=12):
+    """Hash MD5 (hexadecimal, length caracteres) del contenido de un File"""
+    digest = hashlib.md5(usedforsecurity=False)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """
+    FileSystemStorage que guarda cada fichero subido como nombre.<hash>.ext
+
+    Un fichero nuevo siempre tiene un nombre nuevo, así que la vista serve
+    puede enviarlo con Cache-Control immutable.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        root, ext = posixpath.splitext(name)
+        name = f'{root}.{content_hash(content)}{ext}'
+        content.seek(0)
+        return super().save(name, content, max_length=max_length)
+
+
+def build_variants(root):
+    """
+    Genera las variantes de los ficheros de root que no las tengan o las
+    tengan más antiguas que el original: .webp de las imágenes JPEG/PNG
+    (calidad y tamaño de STATIC_BUILD) y .gz/.br de los ficheros de texto.
+    Retorna la lista de variantes escritas.
+    """
+    config = get_static_build_settings()
+    written = []
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if filename.endswith(VARIANT_SUFFIXES):
+                continue
+            content_type = mimetypes.guess_type(path)[0]
+            if content_type in WEBP_SOURCES and config['WEBP_QUALITY']:
+                encoders = {'.webp': lambda data: to_webp(data, config['WEBP_QUALITY'], config['WEBP_MAX_SIZE'])}
+            elif content_type in COMPRESSIBLE_TYPES or (content_type or '').startswith('text/'):
+                encoders = {'.gz': lambda data: gzip.compress(data, mtime=0)}
+                if brotli is not None:
+                    encoders['.br'] = brotli.compress
+            else:
+                continue
+            for suffix, encode in encoders.items():
+                target = path + suffix
+                if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                with open(path, 'rb') as fh:
+                    data = encode(fh.read())
+                with open(target, 'wb') as fh:
+                    fh.write(data)
+                written.append(target)
+    return written
+
+
+def parse_range(header, size):
+    """
+    (inicio, fin) inclusivos del rango pedido, None si no se puede servir o
+    False si la cabecera no es un rango de bytes simple (se ignora).
+    """
+    match = _RANGE.match(header.replace(' ', ''))
+    if match is None or match.groups() == ('', ''):
+        return False
+    first, last = match.groups()
+    if not first:
+        # bytes=-N: los N últimos
+        length = int(last)
+        return (max(size - length, 0), size - 1) if length and size else None
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return None
+    return start, end
+
+
+class FileRange:
+    """
+    Fichero limitado a length bytes desde start.
+
+    No expone seek() ni tell(): FileResponse no recalcula Content-Length.
+    fileno() permite que gunicorn use sendfile desde la posición actual y con
+    la longitud de Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _accepted_encodings(request):
+    return {
+        token.split(';')[0].strip()
+        for token in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')
+    }
+
+
+def select_file(request, path, content_type, variants):
+    """(ruta, Content-Type, Content-Encoding, cabeceras de Vary) de la representación a servir"""
+    vary = []
+    if not variants:
+        return path, content_type, None, vary
+    if content_type in WEBP_SOURCES:
+        vary.append('Accept')
+        if 'image/webp' in request.META.get('HTTP_ACCEPT', '') and os.path.isfile(path + '.webp'):
+            path, content_type = path + '.webp', 'image/webp'
+    encoded = [(suffix, encoding) for suffix, encoding in ENCODED_VARIANTS if os.path.isfile(path + suffix)]
+    if encoded:
+        vary.append('Accept-Encoding')
+    accepted = _accepted_encodings(request)
+    for suffix, encoding in encoded:
+        if encoding in accepted:
+            return path + suffix, content_type, encoding, vary
+    return path, content_type, None, vary
+
+
+@require_safe
+def serve(request, path):
+    """Sirve un fichero de MEDIA_ROOT (ver el docstring del módulo)"""
+    config = get_media_serving_settings()
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Ruta fuera de MEDIA_ROOT')
+    if not os.path.isfile(fullpath):
+        raise Http404(f'No existe {path}')
+
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+    fullpath, content_type, encoding, vary = select_file(request, fullpath, content_type, config['VARIANTS'])
+    stat = os.stat(fullpath)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': (
+            f'public, max-age={config["IMMUTABLE_MAX_AGE"]}, immutable'
+            if re.search(config['IMMUTABLE_NAMES'], path) else f'public, max-age={config["MAX_AGE"]}'
+        ),
+    }
+    if vary:
+        headers['Vary'] = ', '.join(vary)
+
+    # 304 / 412 según If-None-Match, If-Modified-Since, If-Match e If-Unmodified-Since
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=HttpResponse(headers=headers),
+    )
+    if response.status_code != 200:
+        return response
+
+    size = stat.st_size
+    status, start, length = 200, 0, size
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and _if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(range_header, size)
+        if byte_range is None:
+            return HttpResponse(status=416, headers={**headers, 'Content-Range': f'bytes */{size}'})
+        if byte_range:
+            status, start, length = 206, byte_range[0], byte_range[1] - byte_range[0] + 1
+
+    if request.method == 'HEAD':
+        response = HttpResponse(status=status, content_type=content_type, headers=headers)
+    else:
+        response = FileResponse(
+            FileRange(open(fullpath, 'rb'), start, length), status=status, content_type=content_type, headers=headers,
+        )
+    response['Content-Length'] = length
+    if status == 206:
+        response['Content-Range'] = f'bytes {start}-{start + length - 1}/{size}'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def _if_range_matches(request, etag, last_modified):
+    """Si el Range se aplica: sin If-Range, o con If-Range igual a la representación actual"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
@@ -0,0 +1,186 @@
+"""
+Métricas de rendimiento por petición para ReleCloud
+
+Contiene:
+    - RequestMetrics: contadores de una petición (tiempo total, consultas SQL,
+      render de plantillas y accesos a caché: aciertos, fallos y valores
+      obsoletos), accesibles desde cualquier punto del código a través de
+      una ContextVar
+    - Histogram: histograma de buckets fijos, seguro entre hilos
+    - Registro en memoria de histogramas agregados por nombre de URL
+
+Los histogramas viven en la memoria de cada proceso: con varios workers de
+gunicorn cada uno agrega solo las peticiones que atiende.
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+
+# Límites superiores (inclusive) de los buckets
+MS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+_current = ContextVar('relecloud_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Contadores de una petición; se rellenan mientras la petición está activa"""
+    __slots__ = ('started', 'db_queries', 'db_time', 'template_time', 'cache_hits', 'cache_misses', 'cache_stale')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_stale = 0
+
+    def elapsed(self):
+        """Segundos transcurridos desde el inicio de la petición"""
+        return time.perf_counter() - self.started
+
+    def __call__(self, execute, sql, params, many, context):
+        """execute_wrapper: cuenta y cronometra cada consulta SQL"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+
+def activate(metrics):
+    """Marca `metrics` como las métricas de la petición en curso; retorna el token para reset"""
+    return _current.set(metrics)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+def current():
+    """Retorna las métricas de la petición en curso, o None si no se está midiendo"""
+    return _current.get()
+
+
+def record_template_render(seconds):
+    """Suma tiempo de render de plantillas a la petición en curso (si se mide)"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.template_time += seconds
+
+
+def record_cache_lookup(hit):
+    """Registra un acierto o fallo de caché en la petición en curso (si se mide)"""
+    metrics = _current.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+def record_cache_stale():
+    """Registra que se ha servido un valor de caché obsoleto en la petición en curso (si se mide)"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_stale += 1
+
+
+class Histogram:
+    """
+    Histograma de buckets fijos con suma, mínimo y máximo.
+
+    Los percentiles se estiman con el límite superior del bucket donde cae
+    el percentil, suficiente para detectar regresiones de orden de magnitud.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q):
+        """Estimación del percentil q (0-100); None si no hay observaciones"""
+        if not self.count:
+            return None
+        target = self.count * q / 100
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'count': self.count,
+                'mean': round(self.total / self.count, 3) if self.count else None,
+                'min': self.min,
+                'max': self.max,
+                'p50': self.percentile(50),
+                'p95': self.percentile(95),
+                'p99': self.percentile(99),
+                'buckets': {
+                    (f'le_{bound}' if i < len(self.bounds) else 'inf'): count
+                    for i, (bound, count) in enumerate(zip(self.bounds + (None,), self.counts))
+                },
+            }
+
+
+# Métricas agregadas por nombre de URL: {url_name: {métrica: Histogram}}
+_registry = {}
+_registry_lock = threading.Lock()
+
+METRIC_BUCKETS = {
+    'wall_ms': MS_BUCKETS,
+    'db_ms': MS_BUCKETS,
+    'db_queries': COUNT_BUCKETS,
+    'template_ms': MS_BUCKETS,
+    'cache_hits': COUNT_BUCKETS,
+    'cache_misses': COUNT_BUCKETS,
+    'cache_stale': COUNT_BUCKETS,
+}
+
+
+def observe(url_name, values):
+    """Agrega los valores de una petición a los histogramas de su URL"""
+    histograms = _registry.get(url_name)
+    if histograms is None:
+        with _registry_lock:
+            histograms = _registry.setdefault(
+                url_name, {name: Histogram(bounds) for name, bounds in METRIC_BUCKETS.items()}
+            )
+    for name, value in values.items():
+        histograms[name].observe(value)
+
+
+def snapshot():
+    """Retorna una copia serializable de todos los histogramas"""
+    return {
+        url_name: {name: histogram.as_dict() for name, histogram in histograms.items()}
+        for url_name, histograms in sorted(_registry.items())
+    }
+
+
+def reset():
+    """Vacía el registro (útil en tests)"""
+    with _registry_lock:
+        _registry.clear()
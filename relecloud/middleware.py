@@ -0,0 +1,140 @@
+"""
+Middlewares de ReleCloud
+"""
+import json
+import logging
+import random
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+
+# Configurar logger para este módulo
+logger = logging.getLogger(__name__)
+
+PERF_METRICS_DEFAULTS = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 1.0,
+    'SERVER_TIMING': True,
+    'LOG': True,
+}
+
+
+def get_perf_metrics_settings():
+    """Combina settings.PERF_METRICS con los valores por defecto"""
+    return {**PERF_METRICS_DEFAULTS, **getattr(settings, 'PERF_METRICS', {})}
+
+
+class RequestMetricsMiddleware:
+    """
+    Mide cada petición muestreada y publica el resultado.
+
+    Por petición se registran: tiempo total, número y tiempo de consultas SQL
+    (con connection.execute_wrapper en todas las bases de datos), tiempo de
+    render de plantillas y accesos a caché (aciertos, fallos y valores
+    obsoletos). Los valores se emiten:
+
+        - en la cabecera Server-Timing (visible en las DevTools del navegador)
+        - como una línea de log JSON
+        - en histogramas en memoria agregados por nombre de URL
+          (ver la vista perf_metrics, solo para staff)
+
+    Se configura con settings.PERF_METRICS (ENABLED, SAMPLE_RATE, SERVER_TIMING,
+    LOG). Las peticiones no muestreadas solo pagan una llamada a random().
+
+    Funciona igual con WSGI y con ASGI: con vistas asíncronas (ver
+    relecloud/async_views.py) la cadena no pasa a un hilo por este middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = get_perf_metrics_settings()
+        self.enabled = config['ENABLED']
+        self.sample_rate = config['SAMPLE_RATE']
+        self.server_timing = config['SERVER_TIMING']
+        self.log = config['LOG']
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.activate(request_metrics)
+        try:
+            with ExitStack() as stack:
+                self._wrap_connections(stack, request_metrics)
+                response = self.get_response(request)
+        finally:
+            metrics.deactivate(token)
+
+        self._publish(request, response, request_metrics)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled or random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.activate(request_metrics)
+        try:
+            # Las consultas del ORM asíncrono se ejecutan en el hilo síncrono
+            # de la petición: los wrappers se instalan y se quitan en ese hilo
+            stack = ExitStack()
+            await sync_to_async(self._wrap_connections)(stack, request_metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            metrics.deactivate(token)
+
+        self._publish(request, response, request_metrics)
+        return response
+
+    def _wrap_connections(self, stack, request_metrics):
+        """Mide las consultas de todas las conexiones del hilo actual"""
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(request_metrics))
+
+    def _publish(self, request, response, request_metrics):
+        """Añade Server-Timing, escribe el log y actualiza los histogramas"""
+        match = request.resolver_match
+        url_name = (match.view_name if match else None) or 'unresolved'
+        values = {
+            'wall_ms': request_metrics.elapsed() * 1000,
+            'db_ms': request_metrics.db_time * 1000,
+            'db_queries': request_metrics.db_queries,
+            'template_ms': request_metrics.template_time * 1000,
+            'cache_hits': request_metrics.cache_hits,
+            'cache_misses': request_metrics.cache_misses,
+            'cache_stale': request_metrics.cache_stale,
+        }
+        metrics.observe(url_name, values)
+
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join([
+                f'total;dur={values["wall_ms"]:.1f}',
+                f'db;dur={values["db_ms"]:.1f};desc="{values["db_queries"]} queries"',
+                f'tpl;dur={values["template_ms"]:.1f}',
+                f'cache;desc="{values["cache_hits"]} hits {values["cache_misses"]} misses {values["cache_stale"]} stale"',
+            ])
+
+        if self.log:
+            logger.info(json.dumps({
+                'event': 'request',
+                'method': request.method,
+                'path': request.path,
+                'url_name': url_name,
+                'status': response.status_code,
+                **{name: round(value, 2) for name, value in values.items()},
+            }))
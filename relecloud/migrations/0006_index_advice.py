@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relecloud', '0005_alter_inforequest_options_alter_destination_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', 'destination'], name='relecloud_r_user_id_e5f399_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inforequest',
+            index=models.Index(fields=['email'], name='relecloud_i_email_656e98_idx'),
+        ),
+    ]
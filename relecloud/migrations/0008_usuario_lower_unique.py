@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:13
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('relecloud', '0007_catalog_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usuario',
+            name='email',
+            field=models.EmailField(max_length=254),
+        ),
+        migrations.AddConstraint(
+            model_name='usuario',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('username'), name='usuario_username_lower_unique', violation_error_message='Este nombre de usuario ya está en uso.'),
+        ),
+        migrations.AddConstraint(
+            model_name='usuario',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='usuario_email_lower_unique', violation_error_message='Este correo electrónico ya está registrado.'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:02
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def create_ratings_version(apps, schema_editor):
+    CatalogVersion = apps.get_model('relecloud', 'CatalogVersion')
+    CatalogVersion.objects.using(schema_editor.connection.alias).get_or_create(
+        pk=2, defaults={'changed_at': timezone.now()},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relecloud', '0008_usuario_lower_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_ratings_version, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.functions import Lower
 
 # Create your models here.
 class Usuario(AbstractUser):
@@ -8,9 +9,8 @@ class Usuario(AbstractUser):
     Modelo de usuario personalizado para ReleCloud
     """
     # AbstractUser ya incluye: username, first_name, last_name, email, password
-    # Hacemos que email sea obligatorio
+    # Hacemos que email sea obligatorio (único sin distinguir mayúsculas, ver Meta.constraints)
     email = models.EmailField(
-        unique=True,
         null=False,
         blank=False,
     )
@@ -26,6 +26,19 @@ class Usuario(AbstractUser):
     class Meta:
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
+        constraints = [
+            # Índices únicos funcionales: A@x.com y a@x.com son la misma cuenta. El
+            # registro inserta sin comprobar antes y traduce el IntegrityError
+            # (ver RegistroUsuarioForm.add_unique_error)
+            models.UniqueConstraint(
+                Lower('username'), name='usuario_username_lower_unique',
+                violation_error_message='Este nombre de usuario ya está en uso.',
+            ),
+            models.UniqueConstraint(
+                Lower('email'), name='usuario_email_lower_unique',
+                violation_error_message='Este correo electrónico ya está registrado.',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.username} - {self.get_full_name()}"
@@ -180,6 +193,10 @@ class InfoRequest(models.Model):
         verbose_name = 'Solicitud de información'
         verbose_name_plural = 'Solicitudes de información'
         ordering = ['-id']  # Más recientes primero
+        indexes = [
+            # Comprobación de compra en ReviewCreateView (email + cruise__destinations)
+            models.Index(fields=['email']),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.cruise.name}"
@@ -232,6 +249,8 @@ class Review(models.Model):
         indexes = [
             models.Index(fields=['-created_at']),
             models.Index(fields=['destination', '-created_at']),
+            # Comprobación de review duplicada en ReviewCreateView
+            models.Index(fields=['user', 'destination']),
         ]
     
     def __str__(self):
@@ -248,3 +267,23 @@ class Review(models.Model):
     def has_comment(self):
         """Retorna True si la review tiene comentario"""
         return bool(self.comment.strip())
+
+
+class CatalogVersion(models.Model):
+    """
+    Contadores de versión del catálogo: pk=1 para destinos, cruceros y sus
+    relaciones; pk=2 para las reviews (puntuaciones).
+
+    Se incrementan en la misma transacción que cada cambio (ver
+    relecloud/signals.py); cada proceso los consulta para saber si su
+    snapshot del catálogo sigue al día (ver relecloud/catalog.py).
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Versión del catálogo'
+        verbose_name_plural = 'Versiones del catálogo'
+
+    def __str__(self):
+        return f"v{self.version} ({self.changed_at:%Y-%m-%d %H:%M:%S})"
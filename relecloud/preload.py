@@ -0,0 +1,154 @@
+"""
+Precarga de los estáticos críticos de cada página: cabecera Link y 103 Early Hints
+
+Sin ayuda, el navegador descubre theme.css, site.css y las imágenes de la
+cabecera al leer el HTML, y la imagen de fondo de .main-header (en site.css)
+solo al leer esa hoja. PreloadMiddleware los anuncia antes:
+
+    - con la cabecera Link: rel=preload de la respuesta HTML, que el
+      navegador lee antes del cuerpo (y que un CDN puede convertir en 103)
+    - con una respuesta 103 Early Hints, enviada antes de ejecutar la vista,
+      si la aplicación corre con un servidor ASGI que admite la extensión
+      http.response.early_hint (ver EarlyHintsASGIMiddleware en project/asgi.py)
+
+Configuración en settings.PRELOAD:
+
+    TEMPLATES   estáticos críticos de cada plantilla
+    VIEWS       plantillas de cada vista (nombre de URL); las vistas que no
+                aparecen no reciben hints
+
+Las URLs salen del manifiesto del build (nombres con hash, ver
+relecloud/staticbuild.py) y, para las imágenes con versión WebP, se precarga
+esa versión con type="image/webp" (la que usa <picture> y el image-set() del
+CSS; un navegador sin WebP ignora el preload).
+"""
+import functools
+import posixpath
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+
+from .staticbuild import IMAGE_TYPES
+from .templatetags.static_build import webp_url
+
+
+PRELOAD_DEFAULTS = {
+    'ENABLED': True,
+    'EARLY_HINTS': True,
+    'TEMPLATES': {},
+    'VIEWS': {},
+}
+
+# Extensión ASGI para enviar un 103 y clave del scope con la que se pasa a Django
+EARLY_HINT = 'http.response.early_hint'
+EARLY_HINTS_SCOPE_KEY = 'relecloud.early_hints'
+
+_DESTINATIONS = {'.css': 'style', '.js': 'script'}
+
+
+def get_preload_settings():
+    """Combina settings.PRELOAD con los valores por defecto"""
+    return {**PRELOAD_DEFAULTS, **getattr(settings, 'PRELOAD', {})}
+
+
+def preload_link(name):
+    """Valor de la cabecera Link que precarga el estático name"""
+    extension = posixpath.splitext(name)[1].lower()
+    if extension in IMAGE_TYPES:
+        webp = webp_url(name)
+        if webp is not None:
+            return f'<{webp}>; rel=preload; as=image; type="image/webp"'
+        return f'<{staticfiles_storage.url(name)}>; rel=preload; as=image'
+    if extension in _DESTINATIONS:
+        return f'<{staticfiles_storage.url(name)}>; rel=preload; as={_DESTINATIONS[extension]}'
+    raise ValueError(f'No se sabe precargar {name}')
+
+
+@functools.cache
+def view_links(view_name):
+    """Links de preload de una vista (tupla vacía si no está en PRELOAD['VIEWS'])"""
+    config = get_preload_settings()
+    names = dict.fromkeys(
+        name
+        for template_name in config['VIEWS'].get(view_name, ())
+        for name in config['TEMPLATES'].get(template_name, ())
+    )
+    return tuple(preload_link(name) for name in names)
+
+
+def send_early_hints(request, links):
+    """Envía un 103 Early Hints con links si el servidor lo admite; retorna si se envió"""
+    sender = getattr(request, 'scope', {}).get(EARLY_HINTS_SCOPE_KEY)
+    if sender is None:
+        return False
+    async_to_sync(sender)(links)
+    return True
+
+
+class EarlyHintsASGIMiddleware:
+    """
+    Envuelve la aplicación ASGI de Django para que PreloadMiddleware pueda
+    enviar un 103 Early Hints.
+
+    Si el servidor anuncia la extensión http.response.early_hint en
+    scope['extensions'], añade al scope una corrutina que la envía. Con otros
+    servidores (o con WSGI) no cambia nada y solo se envía la cabecera Link.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and EARLY_HINT in scope.get('extensions', {}):
+            async def early_hints(links):
+                await send({'type': EARLY_HINT, 'links': [link.encode('latin-1') for link in links]})
+
+            scope = {**scope, EARLY_HINTS_SCOPE_KEY: early_hints}
+        await self.app(scope, receive, send)
+
+
+class PreloadMiddleware:
+    """
+    Anuncia los estáticos críticos de las vistas de PRELOAD['VIEWS'].
+
+    Antes de ejecutar la vista envía el 103 Early Hints (si EARLY_HINTS y el
+    servidor lo admite); si la respuesta es una página HTML, le añade la
+    cabecera Link con los mismos estáticos.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = get_preload_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed('Preload desactivado')
+        self.get_response = get_response
+        self.early_hints = config['EARLY_HINTS']
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._add_links(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._add_links(request, await self.get_response(request))
+
+    def _add_links(self, request, response):
+        links = getattr(request, 'preload_links', ())
+        if links and response.status_code == 200 and response.get('Content-Type', '').startswith('text/html'):
+            response['Link'] = ', '.join(filter(None, [response.get('Link'), *links]))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method != 'GET':
+            return None
+        links = view_links(request.resolver_match.view_name)
+        if links:
+            request.preload_links = links
+            if self.early_hints:
+                send_early_hints(request, links)
+        return None
@@ -0,0 +1,233 @@
+"""
+Profiling bajo demanda de peticiones para ReleCloud
+
+ProfilingMiddleware perfila una fracción configurable de las peticiones, o
+las que llevan una cabecera firmada emitida para un usuario staff
+(python manage.py profiles token <usuario>); al usar el token se comprueba
+que el usuario siga activo y siendo staff. Dos modos:
+
+    - 'cprofile': cProfile completo; se guarda un fichero .pstats. Solo una
+      petición a la vez por proceso: las que se solapan con ella usan el sampler
+    - 'sampler': muestreo ligero de la pila del hilo de la petición cada N ms;
+      se guarda un fichero .collapsed (formato de flamegraph.pl / speedscope)
+
+Los ficheros se escriben en settings.PROFILING['DIRECTORY'] con el nombre
+<url_name>__<timestamp>__<pid>.<ext> y solo se conservan los MAX_FILES más
+recientes. Con ENABLED=False el middleware se elimina de la cadena al
+arrancar (MiddlewareNotUsed), así que no tiene coste alguno.
+"""
+import cProfile
+import logging
+import os
+import random
+import re
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+
+# Configurar logger para este módulo
+logger = logging.getLogger(__name__)
+
+PROFILING_DEFAULTS = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.0,
+    'MODE': 'cprofile',
+    'DIRECTORY': None,
+    'MAX_FILES': 200,
+    'SAMPLER_INTERVAL_MS': 5,
+    'HEADER': 'X-Relecloud-Profile',
+    'TOKEN_MAX_AGE': 3600,
+}
+
+PROFILE_EXTENSIONS = {'cprofile': '.pstats', 'sampler': '.collapsed'}
+
+TOKEN_SALT = 'relecloud.profiling'
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9_.-]+')
+
+# cProfile admite un solo perfilador activo por proceso (en Python 3.12 un
+# segundo enable() lanza ValueError y el perfil recoge todos los hilos): con
+# gthread, una petición que se solapa con otra perfilada usa el sampler
+_cprofile_lock = threading.Lock()
+
+
+def get_profiling_settings():
+    """Combina settings.PROFILING con los valores por defecto"""
+    config = {**PROFILING_DEFAULTS, **getattr(settings, 'PROFILING', {})}
+    if config['DIRECTORY'] is None:
+        config['DIRECTORY'] = Path(settings.BASE_DIR) / 'profiles'
+    return config
+
+
+def make_profile_token(username):
+    """Firma un token de profiling para un usuario staff (caduca según TOKEN_MAX_AGE)"""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(username)
+
+
+def check_profile_token(token, max_age):
+    """Retorna el usuario del token si la firma es válida y no ha caducado, o None"""
+    try:
+        return signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=max_age)
+    except signing.BadSignature:
+        return None
+
+
+def is_profiling_user(username):
+    """El usuario de un token sigue existiendo, activo y staff (pudo dejar de serlo tras emitirlo)"""
+    return get_user_model()._default_manager.filter(username=username, is_active=True, is_staff=True).exists()
+
+
+class StackSampler:
+    """
+    Muestrea periódicamente la pila de un hilo y cuenta las pilas repetidas.
+
+    El resultado se escribe en formato "collapsed": una línea por pila
+    distinta, con los marcos separados por ';' (de la raíz a la hoja) y el
+    número de muestras al final.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='relecloud-stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                code = frame.f_code
+                labels.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(labels))] += 1
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f'{stack} {count}\n')
+
+
+def list_profiles(directory):
+    """Retorna los ficheros de perfil del directorio, del más antiguo al más reciente"""
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    files = [p for p in directory.iterdir() if p.suffix in PROFILE_EXTENSIONS.values()]
+    return sorted(files, key=lambda p: p.name.split('__')[1] if p.name.count('__') == 2 else '')
+
+
+def parse_profile_name(path):
+    """Descompone <url_name>__<timestamp>__<pid>.<ext> en un diccionario"""
+    url_name, timestamp, pid = Path(path).stem.split('__')
+    return {'url_name': url_name, 'timestamp': timestamp, 'pid': int(pid), 'path': Path(path)}
+
+
+class ProfilingMiddleware:
+    """
+    Perfila peticiones muestreadas o marcadas con una cabecera firmada.
+
+    Configuración: settings.PROFILING (ENABLED, SAMPLE_RATE, MODE, DIRECTORY,
+    MAX_FILES, SAMPLER_INTERVAL_MS, HEADER, TOKEN_MAX_AGE).
+    """
+
+    def __init__(self, get_response):
+        config = get_profiling_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed('Profiling desactivado')
+        if config['MODE'] not in PROFILE_EXTENSIONS:
+            raise ValueError(f"PROFILING['MODE'] debe ser uno de {sorted(PROFILE_EXTENSIONS)}")
+        if config['MAX_FILES'] < 1:
+            # list_profiles(...)[:-0] estaría vacío y no se borraría ningún perfil
+            raise ValueError("PROFILING['MAX_FILES'] debe ser 1 o más")
+
+        self.get_response = get_response
+        self.sample_rate = config['SAMPLE_RATE']
+        self.mode = config['MODE']
+        self.directory = Path(config['DIRECTORY'])
+        self.max_files = config['MAX_FILES']
+        self.interval = config['SAMPLER_INTERVAL_MS'] / 1000
+        self.meta_header = 'HTTP_' + config['HEADER'].upper().replace('-', '_')
+        self.token_max_age = config['TOKEN_MAX_AGE']
+
+    def __call__(self, request):
+        if not self._should_profile(request):
+            return self.get_response(request)
+
+        if self.mode == 'cprofile' and _cprofile_lock.acquire(blocking=False):
+            try:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+            finally:
+                _cprofile_lock.release()
+            mode = 'cprofile'
+        else:
+            profiler = StackSampler(threading.get_ident(), self.interval)
+            profiler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.stop()
+            mode = 'sampler'
+
+        path = self._save(request, profiler, mode)
+        response['X-Profile-Id'] = path.name
+        return response
+
+    def _should_profile(self, request):
+        token = request.META.get(self.meta_header)
+        if token is not None:
+            username = check_profile_token(token, self.token_max_age)
+            if username is None:
+                logger.warning(f'Cabecera de profiling con firma inválida o caducada en {request.path}')
+                return False
+            if not is_profiling_user(username):
+                logger.warning(f"Cabecera de profiling de '{username}', que ya no es staff, en {request.path}")
+                return False
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _save(self, request, profiler, mode):
+        """Escribe el perfil en disco y elimina los más antiguos por encima de MAX_FILES"""
+        match = request.resolver_match
+        url_name = _UNSAFE_CHARS.sub('-', (match.view_name if match else None) or 'unresolved')
+        timestamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f'{url_name}__{timestamp}__{os.getpid()}{PROFILE_EXTENSIONS[mode]}'
+
+        if mode == 'cprofile':
+            profiler.dump_stats(path)
+        else:
+            profiler.write(path)
+
+        for old in list_profiles(self.directory)[:-self.max_files]:
+            try:
+                old.unlink()
+            except FileNotFoundError:
+                # Otro worker lo ha borrado ya
+                pass
+
+        logger.info(f'Perfil guardado: {path.name}')
+        return path
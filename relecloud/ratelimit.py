@@ -0,0 +1,335 @@
+"""
+Límite de peticiones por token bucket para las vistas de escritura de ReleCloud
+
+info_request, review_create y registro aceptaban POSTs sin límite: un solo
+cliente podía llenar InfoRequest y provocar dos envíos SMTP por petición.
+Cada regla de settings.RATE_LIMIT['RATES'] ('N/periodo', p. ej. '10/h') es
+un token bucket de capacidad N que se rellena a N tokens por periodo. Hay un
+bucket por regla y cliente: el usuario autenticado o, si no lo hay, la IP
+(con PROXY_COUNT proxies de confianza delante, la de X-Forwarded-For).
+
+Estado compartido (GCRA con incrementos atómicos): cada bucket es una clave
+de la caché compartida (alias CACHE_ALIAS) con su TAT ("theoretical arrival
+time"), en milésimas de tick de period / N segundos. Tomar n tokens es un
+incr(); se conceden los que dejan el TAT a menos de N ticks de ahora y los
+que no caben se devuelven con decr(). Un bucket sin clave o con el TAT en el
+pasado está lleno. Con Redis o Memcached los workers comparten el límite sin
+leer y escribir por separado. FileBasedCache (el L2 de desarrollo) no tiene
+incr atómico: entre procesos el límite es aproximado. Tras cada escritura
+la clave vuelve a caducar a los key_timeout segundos (period + 1), también
+cuando incr()/decr() la reescriben con el timeout por defecto de la caché.
+
+L1 en memoria de cada proceso, para no ir a la caché en cada petición:
+    - un cliente rechazado queda rechazado en el L1 hasta su Retry-After
+    - cada viaje a la caché toma hasta max(1, N * L1_LEASE_FRACTION) tokens;
+      los sobrantes se gastan en el proceso durante L1_LEASE_TTL segundos.
+      Los que caducan sin usarse se pierden: el límite no se supera nunca,
+      pero un cliente puede quedarse algo por debajo
+
+Uso:
+    class Vista(RateLimitMixin, CreateView):    # rate_limit_scope = 'info_request'
+    @rate_limit('info_request')                 # vistas función, síncronas o async
+
+Solo se limitan los métodos de rate_limit_methods (POST por defecto). Al
+superar el límite se responde 429 con Retry-After (plantilla 429.html). Con
+ENABLED False, o sin regla para el scope, no se limita nada.
+"""
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.shortcuts import render
+
+
+RATE_LIMIT_DEFAULTS = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',
+    'PROXY_COUNT': 0,
+    'RATES': {},
+    'L1_MAX_ENTRIES': 10_000,
+    'L1_LEASE_FRACTION': 0.1,
+    'L1_LEASE_TTL': 1.0,
+}
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Unidades del TAT por tick: precisión de milésimas de token con enteros
+SCALE = 1000
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_rate_limit_settings():
+    """Combina settings.RATE_LIMIT con los valores por defecto"""
+    return {**RATE_LIMIT_DEFAULTS, **getattr(settings, 'RATE_LIMIT', {})}
+
+
+def parse_rate(rate):
+    """'10/h' -> (10, 3600.0): capacidad del bucket y segundos en rellenarlo"""
+    count, _, period = rate.partition('/')
+    try:
+        count = int(count)
+        seconds = float(period[:-1] or 1) * PERIODS[period[-1]]
+    except (ValueError, KeyError, IndexError):
+        raise ValueError(f"Límite '{rate}' no válido: se espera 'N/periodo' con periodo s, m, h o d (p. ej. '10/h')") from None
+    if count < 1 or seconds <= 0:
+        raise ValueError(f"Límite '{rate}' no válido: N y el periodo deben ser positivos")
+    return count, seconds
+
+
+def _count(scope, event):
+    with _stats_lock:
+        _stats[scope, event] += 1
+
+
+def rate_limit_stats():
+    """Contadores de este proceso por regla: {scope: {evento: n}}"""
+    with _stats_lock:
+        result = {}
+        for (scope, event), count in sorted(_stats.items()):
+            result.setdefault(scope, {})[event] = count
+        return result
+
+
+class _LocalState:
+    """Tokens prestados por la caché compartida y rechazo en curso de un bucket"""
+    __slots__ = ('tokens', 'expires', 'denied_until')
+
+    def __init__(self, tokens=0, expires=0.0, denied_until=0.0):
+        self.tokens = tokens
+        self.expires = expires
+        self.denied_until = denied_until
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets de capacidad `burst` que se rellenan en `period` segundos.
+
+    hit(key) retorna None si la petición pasa o los segundos que faltan para
+    que haya un token.
+    """
+
+    def __init__(self, scope, burst, period, cache_alias='default', lease_fraction=0.1,
+                 lease_ttl=1.0, max_entries=10_000):
+        self.scope = scope
+        self.burst = burst
+        self.period = period
+        self.tick = period / burst
+        self.cache_alias = cache_alias
+        self.lease = max(1, int(burst * lease_fraction))
+        self.lease_ttl = lease_ttl
+        self.max_entries = max_entries
+        # Tras `period` segundos sin peticiones el bucket vuelve a estar lleno
+        self.key_timeout = math.ceil(period) + 1
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, now=None):
+        now = time.time() if now is None else now
+        retry_after = self._hit_local(key, now)
+        if retry_after is not False:
+            return retry_after
+        return self._store(key, now, *self._acquire(key, now))
+
+    async def ahit(self, key, now=None):
+        """hit() sin bloquear el bucle de eventos: el viaje a la caché va a un hilo"""
+        now = time.time() if now is None else now
+        retry_after = self._hit_local(key, now)
+        if retry_after is not False:
+            return retry_after
+        granted, retry_after = await sync_to_async(self._acquire, thread_sensitive=False)(key, now)
+        return self._store(key, now, granted, retry_after)
+
+    def _hit_local(self, key, now):
+        """Decisión con el L1: None (pasa), segundos de espera o False (hay que ir a la caché)"""
+        with self._lock:
+            state = self._local.get(key)
+            if state is None:
+                return False
+            if state.denied_until > now:
+                _count(self.scope, 'denied_local')
+                return state.denied_until - now
+            if state.tokens and state.expires > now:
+                state.tokens -= 1
+                _count(self.scope, 'allowed_local')
+                return None
+            del self._local[key]
+        return False
+
+    def _store(self, key, now, granted, retry_after):
+        """Guarda en el L1 los tokens sobrantes o el rechazo; retorna la decisión de hit()"""
+        if granted > 1:
+            state = _LocalState(tokens=granted - 1, expires=now + self.lease_ttl)
+        elif not granted:
+            state = _LocalState(denied_until=now + retry_after)
+        else:
+            state = None
+        if state is not None:
+            with self._lock:
+                self._local[key] = state
+                self._local.move_to_end(key)
+                while len(self._local) > self.max_entries:
+                    self._local.popitem(last=False)
+        _count(self.scope, 'allowed_shared' if granted else 'denied_shared')
+        return None if granted else retry_after
+
+    def _acquire(self, key, now):
+        """Toma hasta self.lease tokens del bucket compartido: (concedidos, segundos de espera si 0)"""
+        cache = caches[self.cache_alias]
+        cache_key = f'ratelimit:{self.scope}:{key}'
+        wanted = self.lease * SCALE
+        now_units = int(now / self.tick * SCALE)
+        try:
+            tat = cache.incr(cache_key, wanted)
+        except ValueError:
+            tat = None
+        before = None if tat is None else tat - wanted
+        timeout_applied = before is None or before < now_units
+        if timeout_applied:
+            # Bucket lleno: el TAT parte de ahora. Dos workers a la vez pueden
+            # pisarse aquí; como mucho se conceden self.lease tokens de más
+            before = now_units
+            cache.set(cache_key, before + wanted, self.key_timeout)
+
+        granted = min(self.lease, max(0, (now_units + self.burst * SCALE - before) // SCALE))
+        if granted < self.lease:
+            try:
+                cache.decr(cache_key, (self.lease - granted) * SCALE)
+            except ValueError:
+                # La clave caducó entre medias: el bucket ya está lleno
+                pass
+            timeout_applied = False
+        if not timeout_applied:
+            # Sin incr nativo (BaseCache.incr, p. ej. FileBasedCache), incr() y
+            # decr() reescriben la clave con el timeout por defecto de la caché;
+            # si caducara antes de key_timeout el bucket volvería a estar lleno
+            cache.touch(cache_key, self.key_timeout)
+        if granted:
+            return granted, None
+        return 0, (before + SCALE - self.burst * SCALE - now_units) / SCALE * self.tick
+
+    def reset(self):
+        """Vacía el L1 de este proceso"""
+        with self._lock:
+            self._local.clear()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(scope):
+    """Limitador de la regla scope con la configuración actual, o None si no se limita"""
+    config = get_rate_limit_settings()
+    rate = config['RATES'].get(scope)
+    if not config['ENABLED'] or not rate:
+        return None
+    options = (
+        rate, config['CACHE_ALIAS'], config['L1_LEASE_FRACTION'], config['L1_LEASE_TTL'], config['L1_MAX_ENTRIES'],
+    )
+    limiter = _limiters.get((scope, options))
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.setdefault((scope, options), TokenBucketLimiter(
+                scope, *parse_rate(rate), cache_alias=config['CACHE_ALIAS'], lease_fraction=config['L1_LEASE_FRACTION'],
+                lease_ttl=config['L1_LEASE_TTL'], max_entries=config['L1_MAX_ENTRIES'],
+            ))
+    return limiter
+
+
+def reset_limiters():
+    """Olvida los limitadores, su L1 y los contadores de este proceso (útil en tests)"""
+    with _limiters_lock:
+        _limiters.clear()
+    with _stats_lock:
+        _stats.clear()
+
+
+def client_ip(request, proxy_count=0):
+    """IP del cliente: REMOTE_ADDR o, tras proxy_count proxies, la que añadió el más externo a X-Forwarded-For"""
+    if proxy_count:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            addresses = [address.strip() for address in forwarded.split(',')]
+            return addresses[-min(proxy_count, len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def client_key(request, user):
+    """Clave del bucket: el usuario autenticado o la IP"""
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f'ip:{client_ip(request, get_rate_limit_settings()["PROXY_COUNT"])}'
+
+
+def too_many_requests(request, retry_after):
+    """Respuesta 429 con Retry-After en segundos enteros"""
+    seconds = max(1, math.ceil(retry_after))
+    response = render(request, '429.html', {'retry_after': seconds}, status=429)
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+def check(request, scope):
+    """None si la petición pasa el límite de scope, o los segundos de espera"""
+    limiter = get_limiter(scope)
+    if limiter is None:
+        return None
+    return limiter.hit(client_key(request, getattr(request, 'user', None)))
+
+
+async def acheck(request, scope):
+    """check() para vistas asíncronas: carga request.user con el ORM asíncrono"""
+    limiter = get_limiter(scope)
+    if limiter is None:
+        return None
+    request.user = await request.auser()
+    return await limiter.ahit(client_key(request, request.user))
+
+
+def rate_limit(scope, methods=('POST',)):
+    """Decorador de vistas función (síncronas o async) con el límite de la regla scope"""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapped(request, *args, **kwargs):
+                if request.method in methods:
+                    retry_after = await acheck(request, scope)
+                    if retry_after is not None:
+                        return too_many_requests(request, retry_after)
+                return await view(request, *args, **kwargs)
+        else:
+            @wraps(view)
+            def wrapped(request, *args, **kwargs):
+                if request.method in methods:
+                    retry_after = check(request, scope)
+                    if retry_after is not None:
+                        return too_many_requests(request, retry_after)
+                return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
+
+
+class RateLimitMixin:
+    """
+    Límite de la regla rate_limit_scope para las vistas basadas en clases.
+
+    Detrás de LoginRequiredMixin, los anónimos se redirigen al login sin
+    gastar tokens y el bucket es el del usuario.
+    """
+    rate_limit_scope = None
+    rate_limit_methods = ('POST',)
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in self.rate_limit_methods:
+            retry_after = check(request, self.rate_limit_scope)
+            if retry_after is not None:
+                return too_many_requests(request, retry_after)
+        return super().dispatch(request, *args, **kwargs)
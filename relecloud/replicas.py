@@ -0,0 +1,230 @@
+"""
+Enrutado de lecturas del catálogo a réplicas de la base de datos
+
+Las páginas del catálogo (destinations, destination_detail, cruise_detail)
+solo leen; las reviews, solicitudes de información y registros escriben.
+ReplicaRouter envía a una réplica las lecturas de las vistas marcadas con
+ReplicaReadMixin o @read_from_replica, y todo lo demás a 'default':
+
+    - escrituras: siempre a 'default'
+    - lecturas fuera de las vistas marcadas (formularios, admin, comandos):
+      a 'default'
+    - lectura tras escritura: una petición que ya ha escrito, o que no es
+      GET/HEAD/OPTIONS, lee de 'default'; y ReplicaRoutingMiddleware deja una
+      cookie durante LAG_TOLERANCE_S segundos para que las siguientes
+      peticiones de la misma sesión también lean de 'default' mientras la
+      réplica se pone al día
+    - réplicas caídas o con más retraso que LAG_TOLERANCE_S (PostgreSQL) se
+      descartan durante HEALTH_CHECK_INTERVAL_S; si no queda ninguna, se lee
+      de 'default'
+
+Configuración: settings.REPLICA_ROUTING. Las réplicas son alias de
+settings.DATABASES (DATABASE_REPLICA_URLS en project/settings.py). Sin
+réplicas, el middleware se elimina de la cadena al arrancar y el router no
+interviene.
+"""
+import logging
+import math
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+# Configurar logger para este módulo
+logger = logging.getLogger(__name__)
+
+REPLICA_ROUTING_DEFAULTS = {
+    'REPLICAS': [],
+    'LAG_TOLERANCE_S': 5.0,
+    'HEALTH_CHECK_INTERVAL_S': 30.0,
+    'COOKIE_NAME': 'relecloud_primary',
+}
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Segundos de retraso de la réplica respecto al primario (0 si no es una réplica)
+POSTGRES_LAG_SQL = (
+    'SELECT CASE WHEN pg_is_in_recovery() '
+    'THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) ELSE 0 END'
+)
+
+
+def get_replica_settings():
+    """Combina settings.REPLICA_ROUTING con los valores por defecto"""
+    return {**REPLICA_ROUTING_DEFAULTS, **getattr(settings, 'REPLICA_ROUTING', {})}
+
+
+@dataclass
+class RoutingState:
+    """Estado de enrutado de la petición en curso"""
+    replica_allowed: bool = False
+    primary_pinned: bool = False
+    wrote: bool = False
+
+
+_state = ContextVar('relecloud_replica_routing', default=None)
+
+# alias -> (válido hasta, sana); por proceso
+_health = {}
+
+
+def reset_health():
+    """Olvida el resultado de las comprobaciones de salud (tests)"""
+    _health.clear()
+
+
+def check_replica(alias, lag_tolerance):
+    """Comprueba que la réplica responde y que su retraso está dentro de la tolerancia"""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(POSTGRES_LAG_SQL)
+                lag = float(cursor.fetchone()[0])
+                if lag > lag_tolerance:
+                    logger.warning(f'Réplica {alias} con {lag:.1f}s de retraso (tolerancia {lag_tolerance}s)')
+                    return False
+            else:
+                cursor.execute('SELECT 1')
+        return True
+    except DatabaseError as e:
+        logger.warning(f'Réplica {alias} no disponible: {e}')
+        connection.close()
+        return False
+
+
+def replica_is_healthy(alias):
+    """Resultado (en caché durante HEALTH_CHECK_INTERVAL_S) de check_replica"""
+    now = time.monotonic()
+    cached = _health.get(alias)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    config = get_replica_settings()
+    healthy = check_replica(alias, config['LAG_TOLERANCE_S'])
+    _health[alias] = (now + config['HEALTH_CHECK_INTERVAL_S'], healthy)
+    return healthy
+
+
+@contextmanager
+def routing_state(primary_pinned=False):
+    """Abre el estado de enrutado de una petición (lo usa ReplicaRoutingMiddleware)"""
+    state = RoutingState(primary_pinned=primary_pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    """Permite leer de una réplica dentro del bloque (si hay estado de petición)"""
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    previous = state.replica_allowed
+    state.replica_allowed = True
+    try:
+        yield
+    finally:
+        state.replica_allowed = previous
+
+
+class ReplicaReadMixin:
+    """
+    Vistas de solo lectura: sus consultas, incluidas las del render de la
+    plantilla, pueden ir a una réplica.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads():
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            return response
+
+
+def read_from_replica(view):
+    """Decorador para vistas función de solo lectura"""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapped
+
+
+class ReplicaRouter:
+    """
+    Router de settings.DATABASE_ROUTERS: lecturas del catálogo a réplicas
+    sanas y todo lo demás (escrituras, migraciones) a 'default'.
+    """
+
+    def _replicas(self):
+        return get_replica_settings()['REPLICAS']
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica_allowed or state.primary_pinned or state.wrote:
+            return None
+
+        replicas = [alias for alias in self._replicas() if replica_is_healthy(alias)]
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Todas las réplicas tienen los mismos datos que 'default'
+        databases = {DEFAULT_DB_ALIAS, *self._replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in self._replicas():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Fija el estado de enrutado de cada petición y mantiene la cookie de
+    lectura tras escritura.
+
+    Debe ir antes de SessionMiddleware para ver las escrituras de la sesión.
+    """
+
+    def __init__(self, get_response):
+        config = get_replica_settings()
+        if not config['REPLICAS']:
+            raise MiddlewareNotUsed('Sin réplicas de la base de datos')
+
+        self.get_response = get_response
+        self.cookie_name = config['COOKIE_NAME']
+        self.cookie_max_age = max(1, math.ceil(config['LAG_TOLERANCE_S']))
+
+    def __call__(self, request):
+        pinned = request.method not in SAFE_METHODS or self.cookie_name in request.COOKIES
+        with routing_state(primary_pinned=pinned) as state:
+            response = self.get_response(request)
+            wrote = state.wrote
+
+        if wrote:
+            response.set_cookie(
+                self.cookie_name, '1', max_age=self.cookie_max_age, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,85 @@
+"""
+Reintento de escrituras ante bloqueos de SQLite
+
+Con varios workers de gunicorn sobre el mismo fichero SQLite solo puede
+haber un escritor a la vez. Con transaction_mode='IMMEDIATE' (ver
+relecloud/db_profile.py) cada transacción reserva el bloqueo de escritura en
+el BEGIN, de modo que un conflicto se detecta al empezar y no a mitad de la
+transacción; si el bloqueo no se libera antes de busy_timeout, la
+transacción completa se reintenta con una espera exponencial con jitter.
+
+    @retry_on_locked                      # función o vista
+    class Vista(LockRetryMixin, CreateView)  # reintenta form_valid (el guardado)
+
+Dentro de una transacción ya abierta no se reintenta: el bloqueo lo tiene
+que resolver quien abrió la transacción externa.
+"""
+import logging
+import random
+import time
+from functools import wraps
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+
+# Configurar logger para este módulo
+logger = logging.getLogger(__name__)
+
+LOCK_ERRORS = ('database is locked', 'database table is locked', 'database schema is locked')
+
+DEFAULT_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 0.05
+DEFAULT_MAX_DELAY = 1.0
+
+
+def is_lock_error(error):
+    """True si la excepción es un bloqueo de SQLite (reintentable)"""
+    return isinstance(error, OperationalError) and any(message in str(error) for message in LOCK_ERRORS)
+
+
+def backoff_delay(attempt, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """Espera antes del reintento `attempt` (1, 2, ...): exponencial con jitter completo"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+def retry_on_locked(func=None, *, attempts=DEFAULT_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY,
+                    max_delay=DEFAULT_MAX_DELAY, using=DEFAULT_DB_ALIAS):
+    """Ejecuta `func` en una transacción y la reintenta si la base de datos está bloqueada"""
+    def decorator(func):
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            if connections[using].in_atomic_block:
+                return func(*args, **kwargs)
+
+            for attempt in range(1, attempts + 1):
+                try:
+                    with transaction.atomic(using=using):
+                        return func(*args, **kwargs)
+                except OperationalError as e:
+                    if not is_lock_error(e) or attempt == attempts:
+                        raise
+                    delay = backoff_delay(attempt, base_delay, max_delay)
+                    logger.warning(
+                        f'Base de datos bloqueada en {func.__qualname__} '
+                        f'(intento {attempt}/{attempts}), reintentando en {delay * 1000:.0f} ms'
+                    )
+                    time.sleep(delay)
+        return wrapped
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+class LockRetryMixin:
+    """
+    Reintenta el guardado de las vistas de formulario ante bloqueos.
+
+    Envuelve form_valid de las clases base (el form.save() de ModelFormMixin)
+    en una transacción reintentable. Lo que la vista haga en su propio
+    form_valid antes o después de llamar a super() queda fuera.
+    """
+    lock_retry_attempts = DEFAULT_ATTEMPTS
+
+    def form_valid(self, form):
+        return retry_on_locked(super().form_valid, attempts=self.lock_retry_attempts)(form)
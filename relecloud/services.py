@@ -1,11 +1,19 @@
 """
 Servicios de la aplicación ReleCloud
-Incluye funcionalidades para envío de correos electrónicos
+Incluye funcionalidades para envío de correos electrónicos y las reglas de
+negocio que comparten las vistas síncronas (relecloud/views.py) y las
+asíncronas (relecloud/async_views.py): quién puede publicar una review, el
+aviso cuando falla el correo de una solicitud de información y los errores
+de un registro con username o email repetidos
 """
 import logging
+from asgiref.sync import sync_to_async
+from django.contrib import messages
 from django.core.mail import send_mail
 from django.conf import settings
-from smtplib import SMTPException
+from django.db import IntegrityError
+
+from .models import InfoRequest, Review
 
 
 # Configurar logger para este módulo
@@ -65,6 +73,9 @@ def send_info_request_email(instance):
         ... else:
         ...     print("Error al enviar correo, revisa los logs")
     """
+    # smtplib solo hace falta al enviar: importarlo aquí no lo carga al arrancar cada comando
+    from smtplib import SMTPException
+
     try:
         # Extraer datos de la instancia InfoRequest
         # Estos campos son validados por el modelo antes de llegar aquí
@@ -176,3 +187,115 @@ Este es un mensaje automático, por favor no respondas a este correo.
         # Retornar False para indicar fallo
         # La instancia InfoRequest ya está guardada en la BD
         return False
+
+
+# Versión para las vistas asíncronas (ver relecloud/async_views.py): el envío
+# SMTP se hace en un hilo del pool, fuera del bucle de eventos y sin ocupar el
+# hilo síncrono de la petición. La instancia debe llegar con su crucero ya
+# cargado (como la deja el formulario), para que en ese hilo no haya consultas.
+asend_info_request_email = sync_to_async(send_info_request_email, thread_sensitive=False)
+
+
+INFO_REQUEST_EMAIL_WARNING = 'Tu solicitud ha sido guardada, pero hubo un problema al enviar la notificación por correo.'
+
+REVIEW_DUPLICATE_MESSAGE = 'Ya has enviado una review para este destino.'
+REVIEW_WITHOUT_PURCHASE_MESSAGE = 'No estás autorizado para dejar una review. Debes tener una compra para este destino.'
+REVIEW_SUCCESS_MESSAGE = 'Tu review ha sido publicada exitosamente.'
+
+
+def _info_request_email_result(request, instance, email_sent):
+    if email_sent:
+        logger.info(
+            f"Correo de notificación enviado para solicitud de información. "
+            f"ID: {instance.id}, Usuario: {instance.name}"
+        )
+    else:
+        # El fallo ya está en el log; el usuario sabe que su solicitud sí se guardó
+        messages.warning(request, INFO_REQUEST_EMAIL_WARNING)
+
+
+def _info_request_email_error(instance, error):
+    # send_info_request_email() no debería lanzar excepciones; esto es una red de seguridad
+    logger.error(
+        f"Error inesperado al intentar enviar correo de notificación. "
+        f"InfoRequest ID: {instance.id}. Error: {str(error)}"
+    )
+    return False
+
+
+def notify_info_request(request, instance):
+    """
+    Envía los correos de una solicitud ya guardada; si fallan, solo se avisa
+    al usuario con un mensaje (la solicitud no se pierde).
+    """
+    try:
+        email_sent = send_info_request_email(instance)
+    except Exception as e:
+        email_sent = _info_request_email_error(instance, e)
+    _info_request_email_result(request, instance, email_sent)
+
+
+async def anotify_info_request(request, instance):
+    """notify_info_request() con el envío en un hilo del pool (asend_info_request_email)"""
+    try:
+        email_sent = await asend_info_request_email(instance)
+    except Exception as e:
+        email_sent = _info_request_email_error(instance, e)
+    _info_request_email_result(request, instance, email_sent)
+
+
+def _review_rules(user, destination):
+    # (consulta, si debe tener filas, mensaje si no se cumple)
+    return (
+        (Review.objects.filter(user=user, destination=destination), False, REVIEW_DUPLICATE_MESSAGE),
+        (InfoRequest.objects.filter(email=user.email, cruise__destinations=destination), True,
+         REVIEW_WITHOUT_PURCHASE_MESSAGE),
+    )
+
+
+def review_denial(user, destination):
+    """
+    Motivo por el que user no puede publicar una review de destination, o
+    None: ya tiene una, o no tiene una compra (InfoRequest) de un crucero con
+    el destino
+    """
+    for queryset, required, message in _review_rules(user, destination):
+        if queryset.exists() != required:
+            return message
+    return None
+
+
+async def areview_denial(user, destination):
+    """review_denial() con el ORM asíncrono"""
+    for queryset, required, message in _review_rules(user, destination):
+        if await queryset.aexists() != required:
+            return message
+    return None
+
+
+def review_validation_error(form, user, destination):
+    """
+    Asigna usuario y destino a la review del formulario y la valida con
+    full_clean(); retorna el mensaje de error, o None si es válida
+    """
+    form.instance.user = user
+    form.instance.destination = destination
+    try:
+        form.instance.full_clean()
+    except Exception as e:
+        return f'Error de validación: {str(e)}'
+    return None
+
+
+def save_registration(form, save=None):
+    """
+    Guarda un registro con save() (por defecto form.save) sin comprobar antes
+    si el username o el email existen. Retorna lo que retorne save(), o None
+    si alguno está repetido: sus errores quedan en el formulario.
+    """
+    try:
+        return (save or form.save)()
+    except IntegrityError as e:
+        if not form.add_unique_error(e):
+            raise
+        return None
@@ -0,0 +1,51 @@
+"""
+Receptores de señales de ReleCloud
+
+Incrementan la versión del catálogo (ver relecloud/catalog.py) en la misma
+transacción que cualquier cambio de destinos, cruceros o sus relaciones,
+para que cada proceso reconstruya su snapshot, y la de las puntuaciones con
+cada cambio de reviews, para que solo recalcule las medias. Se conectan en
+RelecloudConfig.ready().
+
+Las inserciones en bloque (bulk_create) no envían señales: quien las hace
+debe llamar a bump_catalog_version() (ver relecloud/synthetic.py y
+relecloud/snapshots.py).
+
+También borran de la caché el usuario autenticado (ver
+relecloud/auth_backends.py) cuando se guarda o se borra un Usuario.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .auth_backends import invalidate_user
+from .catalog import bump_catalog_version, bump_ratings_version
+from .models import Cruise, Destination, Review, Usuario
+
+
+@receiver([post_save, post_delete], sender=Destination, dispatch_uid='relecloud.destination_catalog_version')
+@receiver([post_save, post_delete], sender=Cruise, dispatch_uid='relecloud.cruise_catalog_version')
+def catalog_changed(sender, instance, using, **kwargs):
+    # También con raw=True (loaddata): los fixtures cambian el catálogo igual
+    bump_catalog_version(using)
+
+
+@receiver([post_save, post_delete], sender=Review, dispatch_uid='relecloud.review_ratings_version')
+def ratings_changed(sender, instance, using, **kwargs):
+    bump_ratings_version(using)
+
+
+@receiver(m2m_changed, sender=Cruise.destinations.through, dispatch_uid='relecloud.cruise_destinations_catalog_version')
+def cruise_destinations_changed(sender, instance, action, using, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_catalog_version(using)
+
+
+@receiver([post_save, post_delete], sender=Usuario, dispatch_uid='relecloud.usuario_auth_cache')
+def user_changed(sender, instance, using, **kwargs):
+    # Ahora y otra vez al confirmar: una petición que lea el usuario antes del
+    # commit volvería a cachear la fila anterior
+    invalidate_user(instance.pk)
+    transaction.on_commit(partial(invalidate_user, instance.pk), using=using)
@@ -0,0 +1,254 @@
+"""
+Registro de consultas SQL lentas para ReleCloud
+
+SlowQueryLogger es un execute_wrapper que se instala en cada conexión nueva
+(señal connection_created, ver RelecloudConfig.ready). Las consultas que
+superan settings.SLOW_QUERY_LOG['THRESHOLD_MS'] se añaden como una línea JSON
+al fichero SLOW_QUERY_LOG['PATH'] con:
+
+    - fingerprint: hash del SQL normalizado (sin literales ni listas IN)
+    - sql: SQL normalizado
+    - params: forma de los parámetros (tipos, no valores)
+    - callsite: primer marco de la pila en código de la aplicación (vista,
+      formulario, comando...), no en la infraestructura de relecloud
+    - duration_ms
+    - plan: EXPLAIN QUERY PLAN (SQLite) o EXPLAIN (ANALYZE, BUFFERS) (PostgreSQL),
+      solo la primera vez que aparece cada fingerprint en el proceso
+
+El informe agregado por fingerprint se obtiene con:
+    python manage.py slow_queries --top 20
+"""
+import hashlib
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+
+# Configurar logger para este módulo
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_LOG_DEFAULTS = {
+    'ENABLED': True,
+    'THRESHOLD_MS': 200,
+    'PATH': None,
+    'EXPLAIN': True,
+}
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r'%s')
+_IN_LISTS = re.compile(r'IN \((?:\?, )*\?\)')
+_WHITESPACE = re.compile(r'\s+')
+
+# Módulos de relecloud con el código de la aplicación. El resto del paquete
+# (snapshot del catálogo, cachés, reintentos, réplicas, métricas...) es
+# infraestructura: sus consultas se atribuyen a quien la llamó
+_APP_MODULES = (
+    'views', 'async_views', 'forms', 'services', 'models', 'signals', 'admin', 'templatetags', 'management.commands',
+)
+
+# Evita que el EXPLAIN de una consulta lenta vuelva a pasar por el logger
+_explaining = ContextVar('relecloud_slow_query_explaining', default=False)
+
+_explained = set()
+_write_lock = threading.Lock()
+
+# (settings.SLOW_QUERY_LOG, BASE_DIR, configuración combinada): SlowQueryLogger
+# la consulta en cada sentencia y solo se vuelve a combinar si cambian los settings
+_settings_cache = (None, None, None)
+
+
+def get_slow_query_settings():
+    """Combina settings.SLOW_QUERY_LOG con los valores por defecto"""
+    global _settings_cache
+    raw = getattr(settings, 'SLOW_QUERY_LOG', {})
+    base_dir = settings.BASE_DIR
+    cached_raw, cached_base_dir, config = _settings_cache
+    if cached_raw is raw and cached_base_dir == base_dir:
+        return config
+    config = {**SLOW_QUERY_LOG_DEFAULTS, **raw}
+    if config['PATH'] is None:
+        config['PATH'] = Path(base_dir) / 'logs' / 'slow_queries.jsonl'
+    _settings_cache = (raw, base_dir, config)
+    return config
+
+
+def normalize_sql(sql):
+    """Sustituye los literales y marcadores por '?' para comparar la forma de las consultas"""
+    sql = _LITERALS.sub('?', _PLACEHOLDERS.sub('?', sql))
+    return _IN_LISTS.sub('IN (...)', _WHITESPACE.sub(' ', sql).strip())
+
+
+def fingerprint(sql):
+    """Identificador corto y estable de la forma de una consulta"""
+    return hashlib.sha1(normalize_sql(sql).encode()).hexdigest()[:12]
+
+
+def params_shape(params, many):
+    """Describe los parámetros por tipo, sin exponer sus valores"""
+    if many:
+        params = list(params or [])
+        first = params_shape(params[0], False) if params else []
+        return {'many': len(params), 'row': first}
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+def find_callsite():
+    """
+    Marco más interno de la pila que pertenece al código de la aplicación.
+
+    Los marcos de la infraestructura de relecloud (ver _APP_MODULES) se
+    saltan: una consulta de catalog.read_versions() se atribuye a la vista
+    que pidió el snapshot. Si la consulta se lanza desde código de Django
+    (p. ej. get_object de una DetailView), se atribuye al método de la clase
+    de la aplicación que lo ejecuta: relecloud.views.DestinationDetailView.get_object.
+    """
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if _is_project_file(filename, base_dir):
+            if _is_app_module(frame.f_globals.get('__name__', '')):
+                return f'{Path(filename).relative_to(base_dir)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        elif 'self' in frame.f_code.co_varnames:
+            cls = type(frame.f_locals.get('self'))
+            module_file = getattr(sys.modules.get(cls.__module__), '__file__', None) or ''
+            if _is_project_file(module_file, base_dir) and _is_app_module(cls.__module__):
+                return f'{cls.__module__}.{cls.__qualname__}.{frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def _is_project_file(filename, base_dir):
+    return filename.startswith(base_dir) and 'site-packages' not in filename
+
+
+def _is_app_module(name):
+    """Los módulos de relecloud de _APP_MODULES, o cualquier otro del proyecto (scripts, project/)"""
+    package, _, module = name.partition('.')
+    if package != 'relecloud':
+        return True
+    return any(module == app or module.startswith(app + '.') for app in _APP_MODULES)
+
+
+def explain(connection, sql, params):
+    """Retorna el plan de ejecución de una consulta SELECT como lista de líneas"""
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    elif connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) '
+    else:
+        return None
+
+    # Savepoint solo en PostgreSQL, donde un EXPLAIN fallido abortaría la
+    # transacción. En SQLite un atomic() fuera de una transacción abre un BEGIN
+    # IMMEDIATE (ver relecloud/db_profile.py) y tomaría el bloqueo de escritura
+    savepoint = transaction.atomic(using=connection.alias) if connection.vendor == 'postgresql' else nullcontext()
+    token = _explaining.set(True)
+    try:
+        with savepoint:
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+    except DatabaseError as e:
+        logger.warning(f'No se pudo obtener el plan de la consulta: {e}')
+        return None
+    finally:
+        _explaining.reset(token)
+
+    if connection.vendor == 'sqlite':
+        # (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+
+def write_entry(path, entry):
+    """Añade una entrada al log JSONL"""
+    path = Path(path)
+    line = json.dumps(entry, default=str) + '\n'
+    with _write_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as fh:
+            fh.write(line)
+
+
+def read_entries(path):
+    """Lee las entradas del log JSONL, ignorando líneas corruptas"""
+    path = Path(path)
+    if not path.exists():
+        return
+    with open(path, encoding='utf-8') as fh:
+        for line in fh:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def reset():
+    """Olvida qué fingerprints tienen ya plan capturado (útil en tests)"""
+    _explained.clear()
+
+
+class SlowQueryLogger:
+    """execute_wrapper que registra las consultas más lentas que el umbral"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __call__(self, execute, sql, params, many, context):
+        if _explaining.get():
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            config = get_slow_query_settings()
+            if duration_ms >= config['THRESHOLD_MS']:
+                self._log(config, sql, params, many, duration_ms)
+
+    def _log(self, config, sql, params, many, duration_ms):
+        key = fingerprint(sql)
+        entry = {
+            'ts': datetime.now(timezone.utc).isoformat(),
+            'fingerprint': key,
+            'database': self.connection.alias,
+            'vendor': self.connection.vendor,
+            'sql': normalize_sql(sql),
+            'params': params_shape(params, many),
+            'callsite': find_callsite(),
+            'duration_ms': round(duration_ms, 2),
+        }
+        if config['EXPLAIN'] and not many and key not in _explained:
+            _explained.add(key)
+            entry['plan'] = explain(self.connection, sql, params)
+
+        write_entry(config['PATH'], entry)
+        logger.warning(f"Consulta lenta ({entry['duration_ms']} ms) {key} en {entry['callsite']}")
+
+
+def install(sender, connection, **kwargs):
+    """Receptor de connection_created: instala el logger en la nueva conexión"""
+    if not get_slow_query_settings()['ENABLED']:
+        return
+    if not any(isinstance(wrapper, SlowQueryLogger) for wrapper in connection.execute_wrappers):
+        # Al principio de la lista: connection.execute_wrapper() añade y quita
+        # por el final, y la conexión puede abrirse dentro de uno de ellos
+        connection.execute_wrappers.insert(0, SlowQueryLogger(connection))
@@ -0,0 +1,310 @@
+"""
+Snapshots de base de datos y carga masiva de fixtures para ReleCloud
+
+Permite construir una base de datos sembrada una sola vez, guardarla junto
+con el árbol de media y restaurarla en un único paso:
+
+    - SQLite: se usa la API de backup en línea de sqlite3 (copia página a
+      página, consistente aunque haya conexiones abiertas)
+    - PostgreSQL: se usa pg_dump en formato custom (-Fc) y pg_restore
+
+Incluye además un cargador de fixtures JSONL en streaming que agrupa los
+objetos por modelo y los inserta con bulk_create, en lugar de guardar
+cada objeto por separado como hace loaddata.
+"""
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import subprocess
+import tarfile
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+from .catalog import bump_catalog_version
+
+
+# Configurar logger para este módulo
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+MEDIA_ARCHIVE_NAME = 'media.tar'
+SQLITE_DUMP_NAME = 'db.sqlite3'
+POSTGRES_DUMP_NAME = 'db.dump'
+
+
+class SnapshotError(Exception):
+    """Error al crear o restaurar un snapshot"""
+
+
+def get_snapshot_dir():
+    """Retorna el directorio raíz donde se guardan los snapshots"""
+    return Path(getattr(settings, 'SNAPSHOT_DIR', Path(settings.BASE_DIR) / 'snapshots'))
+
+
+def list_snapshots():
+    """Retorna los manifiestos de todos los snapshots disponibles, ordenados por nombre"""
+    root = get_snapshot_dir()
+    if not root.exists():
+        return []
+    manifests = []
+    for path in sorted(root.iterdir()):
+        manifest_path = path / MANIFEST_NAME
+        if manifest_path.exists():
+            manifests.append(json.loads(manifest_path.read_text(encoding='utf-8')))
+    return manifests
+
+
+def _applied_migrations(connection):
+    """Retorna la última migración aplicada de cada app (para detectar snapshots obsoletos)"""
+    from django.db.migrations.recorder import MigrationRecorder
+
+    heads = {}
+    for app, name in MigrationRecorder(connection).applied_migrations():
+        if name > heads.get(app, ''):
+            heads[app] = name
+    return heads
+
+
+def create_snapshot(name='seed', using='default', include_media=True):
+    """
+    Guarda la base de datos actual (y opcionalmente MEDIA_ROOT) como snapshot.
+
+    Parameters:
+        name (str): Nombre del snapshot (subdirectorio dentro de SNAPSHOT_DIR)
+        using (str): Alias de la base de datos a copiar
+        include_media (bool): Si True, empaqueta también el árbol de MEDIA_ROOT
+
+    Returns:
+        Path: Directorio del snapshot creado
+
+    Raises:
+        SnapshotError: Si el motor de base de datos no está soportado o el volcado falla
+    """
+    connection = connections[using]
+    target = get_snapshot_dir() / name
+    tmp_target = target.with_name(f'.{name}.tmp')
+    shutil.rmtree(tmp_target, ignore_errors=True)
+    tmp_target.mkdir(parents=True)
+
+    started = time.perf_counter()
+    if connection.vendor == 'sqlite':
+        _sqlite_backup(connection, tmp_target / SQLITE_DUMP_NAME)
+    elif connection.vendor == 'postgresql':
+        _pg_dump(connection, tmp_target / POSTGRES_DUMP_NAME)
+    else:
+        raise SnapshotError(f'Motor de base de datos no soportado: {connection.vendor}')
+
+    if include_media and os.path.isdir(settings.MEDIA_ROOT):
+        with tarfile.open(tmp_target / MEDIA_ARCHIVE_NAME, 'w') as archive:
+            archive.add(settings.MEDIA_ROOT, arcname='.')
+
+    manifest = {
+        'name': name,
+        'vendor': connection.vendor,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'migrations': _applied_migrations(connection),
+        'media': include_media and (tmp_target / MEDIA_ARCHIVE_NAME).exists(),
+    }
+    (tmp_target / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+
+    # Sustituir el snapshot anterior de forma atómica (rename en el mismo directorio)
+    shutil.rmtree(target, ignore_errors=True)
+    tmp_target.rename(target)
+
+    logger.info(f"Snapshot '{name}' creado en {time.perf_counter() - started:.2f}s")
+    return target
+
+
+def restore_snapshot(name='seed', using='default', include_media=True):
+    """
+    Restaura un snapshot sobre la base de datos indicada (y sobre MEDIA_ROOT).
+
+    Parameters:
+        name (str): Nombre del snapshot a restaurar
+        using (str): Alias de la base de datos destino
+        include_media (bool): Si True, restaura también los ficheros de media
+
+    Returns:
+        dict: Manifiesto del snapshot restaurado
+
+    Raises:
+        SnapshotError: Si el snapshot no existe o no es compatible con el motor actual
+    """
+    connection = connections[using]
+    source = get_snapshot_dir() / name
+    manifest_path = source / MANIFEST_NAME
+    if not manifest_path.exists():
+        raise SnapshotError(f"No existe el snapshot '{name}' en {source.parent}")
+    manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+    if manifest['vendor'] != connection.vendor:
+        raise SnapshotError(
+            f"El snapshot '{name}' es de {manifest['vendor']} y la base de datos es {connection.vendor}"
+        )
+
+    started = time.perf_counter()
+    if connection.vendor == 'sqlite':
+        _sqlite_restore(connection, source / SQLITE_DUMP_NAME)
+    else:
+        _pg_restore(connection, source / POSTGRES_DUMP_NAME)
+
+    archive_path = source / MEDIA_ARCHIVE_NAME
+    if include_media and archive_path.exists():
+        os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+        with tarfile.open(archive_path) as archive:
+            archive.extractall(settings.MEDIA_ROOT, filter='data')
+
+    current = _applied_migrations(connection)
+    if current != manifest['migrations']:
+        logger.warning(f"El snapshot '{name}' no incluye todas las migraciones; ejecute migrate")
+
+    logger.info(f"Snapshot '{name}' restaurado en {time.perf_counter() - started:.2f}s")
+    return manifest
+
+
+def _sqlite_backup(connection, path):
+    """Copia la base de datos SQLite con la API de backup en línea"""
+    connection.ensure_connection()
+    destination = sqlite3.connect(path)
+    try:
+        connection.connection.backup(destination)
+    finally:
+        destination.close()
+
+
+def _sqlite_restore(connection, path):
+    """Sobrescribe la base de datos SQLite con el contenido del snapshot"""
+    connection.ensure_connection()
+    if connection.in_atomic_block:
+        raise SnapshotError('No se puede restaurar un snapshot dentro de una transacción')
+    source = sqlite3.connect(path)
+    try:
+        source.backup(connection.connection)
+    finally:
+        source.close()
+
+
+def _pg_env(connection):
+    """Construye las variables de entorno de libpq a partir de settings.DATABASES"""
+    params = connection.settings_dict
+    env = os.environ.copy()
+    for key, var in (('HOST', 'PGHOST'), ('PORT', 'PGPORT'), ('USER', 'PGUSER'), ('PASSWORD', 'PGPASSWORD')):
+        if params.get(key):
+            env[var] = str(params[key])
+    return env
+
+
+def _run(command, env):
+    """Ejecuta una herramienta externa y traduce los fallos a SnapshotError"""
+    try:
+        subprocess.run(command, env=env, check=True, capture_output=True)
+    except FileNotFoundError:
+        raise SnapshotError(f'No se encontró {command[0]} en el PATH')
+    except subprocess.CalledProcessError as e:
+        raise SnapshotError(f'{command[0]} falló: {e.stderr.decode(errors="replace").strip()}')
+
+
+def _pg_dump(connection, path):
+    """Vuelca la base de datos PostgreSQL en formato custom"""
+    _run(
+        ['pg_dump', '--format=custom', '--no-owner', '--file', str(path), connection.settings_dict['NAME']],
+        _pg_env(connection),
+    )
+
+
+def _pg_restore(connection, path):
+    """Restaura un volcado custom de PostgreSQL en paralelo y reemplazando los objetos existentes"""
+    connection.close()
+    _run(
+        [
+            'pg_restore', '--clean', '--if-exists', '--no-owner', f'--jobs={os.cpu_count() or 1}',
+            '--dbname', connection.settings_dict['NAME'], str(path),
+        ],
+        _pg_env(connection),
+    )
+
+
+def _iter_jsonl(path):
+    """Itera los objetos de un fichero JSONL sin cargarlo entero en memoria"""
+    with open(path, encoding='utf-8') as fh:
+        for line_number, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise SnapshotError(f'{path}:{line_number}: JSON inválido ({e})')
+
+
+def bulk_load_jsonl(path, using='default', batch_size=1000):
+    """
+    Carga un fixture JSONL (formato de `dumpdata --format jsonl`) con bulk_create.
+
+    Los objetos se deserializan en streaming y se acumulan por modelo; cada
+    lote se inserta con un único INSERT y las relaciones M2M se insertan en
+    bloque sobre la tabla intermedia. Todo ocurre en una sola transacción.
+
+    Parameters:
+        path (str | Path): Ruta del fichero JSONL
+        using (str): Alias de la base de datos destino
+        batch_size (int): Número de objetos por INSERT
+
+    Returns:
+        dict: Número de objetos cargados por etiqueta de modelo ('app.model')
+    """
+    pending = {}
+    pending_m2m = {}
+    counts = {}
+
+    def flush(model):
+        objects = pending.pop(model, [])
+        if objects:
+            model._base_manager.using(using).bulk_create(objects, batch_size=batch_size)
+        for field_name, rows in pending_m2m.pop(model, {}).items():
+            through = model._meta.get_field(field_name).remote_field.through
+            through._base_manager.using(using).bulk_create(rows, batch_size=batch_size)
+
+    with transaction.atomic(using=using):
+        deserialized = serializers.deserialize('python', _iter_jsonl(path), using=using, ignorenonexistent=True)
+        for item in deserialized:
+            obj = item.object
+            model = type(obj)
+            pending.setdefault(model, []).append(obj)
+            for field_name, related_ids in (item.m2m_data or {}).items():
+                field = model._meta.get_field(field_name)
+                through = field.remote_field.through
+                source_attr = field.m2m_field_name()
+                target_attr = field.m2m_reverse_field_name()
+                pending_m2m.setdefault(model, {}).setdefault(field_name, []).extend(
+                    through(**{f'{source_attr}_id': obj.pk, f'{target_attr}_id': related_id})
+                    for related_id in related_ids
+                )
+            label = model._meta.label_lower
+            counts[label] = counts.get(label, 0) + 1
+            if len(pending[model]) >= batch_size:
+                flush(model)
+
+        # Las FK se comprueban al hacer commit (restricciones diferidas), así que
+        # basta con vaciar los restos en el orden en que aparecieron
+        for model in list(pending):
+            flush(model)
+
+        # Con PKs explícitas hay que reajustar las secuencias (PostgreSQL)
+        connection = connections[using]
+        models = [apps.get_model(label) for label in counts]
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
+
+        # bulk_create no envía señales (ver relecloud/signals.py)
+        bump_catalog_version(using)
+
+    return counts
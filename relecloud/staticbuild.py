@@ -0,0 +1,379 @@
+"""
+Build de ficheros estáticos integrado en collectstatic
+
+BuildStaticFilesStorage extiende el storage de WhiteNoise (nombres con
+hash en el manifiesto, ficheros .gz y .br precomprimidos) con estos pasos,
+que se ejecutan en collectstatic antes de calcular los hashes:
+
+    - SCSS: compila las hojas de STATIC_BUILD['SCSS'] con libsass
+      (opcional, COMPILE_SCSS=True; requiere pip install libsass y las
+      fuentes de Bootstrap en node_modules/)
+    - CSS: minifica cada .css (se conservan los comentarios /*! de licencia)
+    - Imágenes: quita los metadatos de los JPEG (EXIF, XMP, Photoshop) y
+      recomprime los PNG sin pérdida; genera una versión .webp de cada uno
+      (como mucho WEBP_MAX_SIZE px de lado) y añade a los background-image
+      de las hojas de estilo un image-set() que la usa
+    - CSS crítico: tras calcular los hashes, guarda en CRITICAL_CSS las
+      reglas de CRITICAL_STYLESHEETS que usan las plantillas de
+      CRITICAL_TEMPLATES (la cabecera común de todas las páginas), con las
+      URLs ya absolutas para poder incrustarlas en el HTML
+
+Las plantillas usan el resultado con {% critical_css %}, {% stylesheet %} y
+{% picture %} (ver relecloud/templatetags/static_build.py). Los ficheros de
+relecloud/static/ no se modifican: el build solo escribe en STATIC_ROOT, así
+que ejecutar collectstatic varias veces da el mismo resultado.
+"""
+import io
+import logging
+import posixpath
+import re
+import struct
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.template import engines
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+try:
+    import sass
+except ImportError:  # libsass no instalado
+    sass = None
+
+
+# Configurar logger para este módulo
+logger = logging.getLogger(__name__)
+
+STATIC_BUILD_DEFAULTS = {
+    'COMPILE_SCSS': False,
+    'SCSS': {},
+    'MINIFY_CSS': True,
+    'OPTIMIZE_IMAGES': True,
+    'WEBP_QUALITY': 80,
+    'WEBP_MAX_SIZE': 1920,
+    'CRITICAL_CSS': 'critical.css',
+    'CRITICAL_STYLESHEETS': [],
+    'CRITICAL_TEMPLATES': [],
+}
+
+IMAGE_TYPES = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png'}
+
+
+def get_static_build_settings():
+    """Combina settings.STATIC_BUILD con los valores por defecto"""
+    return {**STATIC_BUILD_DEFAULTS, **getattr(settings, 'STATIC_BUILD', {})}
+
+
+# --- CSS -------------------------------------------------------------------
+
+# Cadenas, url() sin comillas y comentarios: lo que el minificador no debe tocar por dentro
+_CSS_PROTECTED = re.compile(
+    r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|url\([^)"\']*\))|(/\*.*?\*/)',
+    re.DOTALL,
+)
+# \x00n\x00: cadena o url(); \x01n\x01: comentario de licencia
+_PLACEHOLDER = re.compile(r'[\x00\x01](\d+)[\x00\x01]')
+
+
+def minify_css(css, keep_license=True):
+    """
+    Retorna el CSS sin comentarios ni espacios innecesarios.
+
+    Las cadenas y las url() se copian tal cual; los comentarios /*! ... */
+    (licencias) se conservan salvo con keep_license=False.
+    """
+    protected = []
+
+    def protect(match):
+        if match.group(1):
+            protected.append(match.group(1))
+            return f'\x00{len(protected) - 1}\x00'
+        if keep_license and match.group(2).startswith('/*!'):
+            protected.append(match.group(2))
+            return f'\x01{len(protected) - 1}\x01'
+        return ' '
+
+    css = _CSS_PROTECTED.sub(protect, css)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*(\x01\d+\x01)\s*', r'\1', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}').strip()
+    return _PLACEHOLDER.sub(lambda match: protected[int(match.group(1))], css)
+
+
+_BACKGROUND_IMAGE = re.compile(r'background-image\s*:\s*url\(\s*(["\']?)([^"\')]+)\1\s*\)(?=\s*[;}])')
+
+
+def is_relative_url(url):
+    return not url.startswith(('data:', 'http:', 'https:', '//', '/', '#'))
+
+
+def add_webp_fallbacks(css, css_name, webp_names):
+    """
+    Añade tras cada background-image con una imagen que tiene versión WebP
+    (`webp_names`: imagen -> .webp) un image-set() que la prefiere. Los
+    navegadores sin image-set() ignoran la segunda declaración.
+    """
+    directory = posixpath.dirname(css_name)
+
+    def replace(match):
+        url = match.group(2)
+        if not is_relative_url(url):
+            return match.group(0)
+        webp = webp_names.get(posixpath.normpath(posixpath.join(directory, url)))
+        if webp is None:
+            return match.group(0)
+        webp_url = posixpath.relpath(webp, directory or '.')
+        image_type = IMAGE_TYPES[posixpath.splitext(url)[1].lower()]
+        return (
+            f'{match.group(0)};background-image:image-set('
+            f'url("{webp_url}") type("image/webp"),url("{url}") type("{image_type}"))'
+        )
+
+    return _BACKGROUND_IMAGE.sub(replace, css)
+
+
+def split_rules(css):
+    """
+    Lista de (prelude, cuerpo) de las reglas de primer nivel de un CSS sin
+    comentarios. Las sentencias sin bloque (@import, @charset) tienen
+    cuerpo None.
+    """
+    rules, depth, start, prelude, i = [], 0, 0, '', 0
+    while i < len(css):
+        char = css[i]
+        if char in '"\'':
+            i += 1
+            while i < len(css) and css[i] != char:
+                i += 2 if css[i] == '\\' else 1
+        elif char == '{':
+            if depth == 0:
+                prelude, start = css[start:i].strip(), i + 1
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append((prelude, css[start:i]))
+                start = i + 1
+        elif char == ';' and depth == 0:
+            rules.append((css[start:i].strip(), None))
+            start = i + 1
+        i += 1
+    return rules
+
+
+_SELECTOR_NOISE = re.compile(r'::?[\w-]+(\((?:[^()]|\([^()]*\))*\))?|\[[^\]]*\]')
+_COMPOUND_SPLIT = re.compile(r'[\s>+~]+')
+_ALWAYS_USED_TAGS = {'html', 'body', '*'}
+
+
+def _selector_is_used(selector, used):
+    for compound in _COMPOUND_SPLIT.split(_SELECTOR_NOISE.sub('', selector).strip()):
+        if not compound:
+            continue
+        tag = re.match(r'[a-zA-Z][\w-]*|\*', compound)
+        if tag and tag.group(0).lower() not in used['tags'] | _ALWAYS_USED_TAGS:
+            return False
+        if not set(re.findall(r'\.([\w-]+)', compound)) <= used['classes']:
+            return False
+        if not set(re.findall(r'#([\w-]+)', compound)) <= used['ids']:
+            return False
+    return True
+
+
+def extract_critical_css(css, used):
+    """
+    Reglas de `css` (minificado) cuyos selectores solo usan etiquetas,
+    clases e ids de `used` (ver used_selectors()). Dentro de @media y
+    @supports se filtra igual; el resto de reglas @ se descarta.
+    """
+    output = []
+    for prelude, body in split_rules(css):
+        if body is None:
+            continue
+        if prelude.startswith(('@media', '@supports')):
+            inner = extract_critical_css(body, used)
+            if inner:
+                output.append(f'{prelude}{{{inner}}}')
+        elif not prelude.startswith('@'):
+            selectors = [selector for selector in prelude.split(',') if _selector_is_used(selector, used)]
+            if selectors:
+                output.append(f'{",".join(selectors)}{{{body}}}')
+    return ''.join(output)
+
+
+_ATTRIBUTE = re.compile(r'\b(class|id)=(?:"([^"]*)"|\'([^\']*)\')')
+
+
+def used_selectors(template_names):
+    """Etiquetas, clases e ids que aparecen en el código de las plantillas"""
+    used = {'tags': set(), 'classes': set(), 'ids': set()}
+    for name in template_names:
+        source = engines['django'].get_template(name).template.source
+        used['tags'].update(tag.lower() for tag in re.findall(r'<([a-zA-Z][\w-]*)', source))
+        if '{% picture' in source:
+            used['tags'].update({'picture', 'source', 'img'})
+        for match in _ATTRIBUTE.finditer(source):
+            values = match.group(2) if match.group(2) is not None else match.group(3)
+            tokens = {token for token in values.split() if re.fullmatch(r'[\w-]+', token)}
+            used['classes' if match.group(1) == 'class' else 'ids'].update(tokens)
+    return used
+
+
+def absolute_urls(css, css_name, base_url):
+    """Convierte las url() relativas de una hoja de estilo en absolutas"""
+    directory = posixpath.dirname(css_name)
+
+    def replace(match):
+        url = match.group(2)
+        if not is_relative_url(url):
+            return match.group(0)
+        return f'url("{base_url}{posixpath.normpath(posixpath.join(directory, url))}")'
+
+    return re.sub(r'url\(\s*(["\']?)([^"\')]+)\1\s*\)', replace, css)
+
+
+# --- Imágenes --------------------------------------------------------------
+
+# Segmentos APP1 (EXIF/XMP), APP13 (Photoshop/IPTC) y COM: no afectan a la imagen
+_JPEG_METADATA_MARKERS = {0xE1, 0xED, 0xFE}
+
+
+def strip_jpeg_metadata(data):
+    """
+    Retorna el JPEG sin metadatos. Los datos de la imagen se copian byte a
+    byte (sin recomprimir); se conservan JFIF, el perfil ICC y Adobe.
+    """
+    if data[:2] != b'\xff\xd8':
+        return data
+    output, i = [data[:2]], 2
+    while i + 4 <= len(data) and data[i] == 0xFF:
+        marker = data[i + 1]
+        if marker == 0xDA:  # inicio de los datos comprimidos
+            break
+        length = struct.unpack('>H', data[i + 2:i + 4])[0]
+        if marker not in _JPEG_METADATA_MARKERS:
+            output.append(data[i:i + 2 + length])
+        i += 2 + length
+    output.append(data[i:])
+    return b''.join(output)
+
+
+def optimize_png(data):
+    """Retorna el PNG recomprimido sin pérdida (mismos píxeles y perfil ICC)"""
+    from PIL import Image  # al procesar imágenes (collectstatic, media), no al arrancar: Pillow cuesta ~30 ms
+
+    image = Image.open(io.BytesIO(data))
+    buffer = io.BytesIO()
+    options = {key: image.info[key] for key in ('icc_profile', 'transparency', 'dpi') if key in image.info}
+    image.save(buffer, 'PNG', optimize=True, **options)
+    return buffer.getvalue()
+
+
+def to_webp(data, quality, max_size):
+    """Versión WebP de una imagen, reducida a `max_size` px de lado como mucho"""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    image.thumbnail((max_size, max_size))
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, 'WEBP', quality=quality, method=6, icc_profile=image.info.get('icc_profile'))
+    return buffer.getvalue()
+
+
+# --- Storage ---------------------------------------------------------------
+
+class BuildStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Storage de WhiteNoise (manifiesto con hashes, gzip y Brotli) con los
+    pasos de build de este módulo.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            yield from super().post_process(paths, dry_run=dry_run, **options)
+            return
+
+        config = get_static_build_settings()
+        for name, error in self._build(paths, config):
+            yield name, name, error or True
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if config['CRITICAL_CSS'] and config['CRITICAL_STYLESHEETS']:
+            yield config['CRITICAL_CSS'], config['CRITICAL_CSS'], self._write_critical_css(config)
+
+    def _replace(self, paths, name, content):
+        """Guarda `content` como `name` en STATIC_ROOT y lo usa en lugar del original"""
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
+        paths[name] = (self, name)
+
+    def _read(self, paths, name):
+        storage, path = paths[name]
+        with storage.open(path) as fh:
+            return fh.read()
+
+    def _build(self, paths, config):
+        """Compila, minifica y optimiza; retorna (nombre, error o None) de cada fichero generado"""
+        results = []
+        if config['COMPILE_SCSS']:
+            for source, target in config['SCSS'].items():
+                results.append((target, self._compile_scss(paths, source, target)))
+
+        webp_names = {}
+        for name in list(paths):
+            extension = posixpath.splitext(name)[1].lower()
+            if extension not in IMAGE_TYPES:
+                continue
+            data = self._read(paths, name)
+            if config['OPTIMIZE_IMAGES']:
+                optimized = strip_jpeg_metadata(data) if extension != '.png' else optimize_png(data)
+                if len(optimized) < len(data):
+                    self._replace(paths, name, optimized)
+                    results.append((name, None))
+            webp = posixpath.splitext(name)[0] + '.webp'
+            if config['WEBP_QUALITY'] and webp not in paths:
+                self._replace(paths, webp, to_webp(data, config['WEBP_QUALITY'], config['WEBP_MAX_SIZE']))
+                webp_names[name] = webp
+                results.append((webp, None))
+
+        for name in list(paths):
+            if not name.endswith('.css') or name.endswith('.min.css'):
+                continue
+            css = original = self._read(paths, name).decode('utf-8')
+            if config['MINIFY_CSS']:
+                css = minify_css(css)
+            css = add_webp_fallbacks(css, name, webp_names)
+            if css != original:
+                self._replace(paths, name, css.encode('utf-8'))
+                results.append((name, None))
+        return results
+
+    def _compile_scss(self, paths, source, target):
+        if sass is None:
+            return RuntimeError('COMPILE_SCSS requiere libsass (pip install libsass)')
+        if source not in paths:
+            return ValueError(f'No se encuentra la hoja SCSS {source}')
+        storage, path = paths[source]
+        try:
+            css = sass.compile(filename=storage.path(path), output_style='expanded')
+        except sass.CompileError as e:
+            return e
+        self._replace(paths, target, css.encode('utf-8'))
+        return None
+
+    def _write_critical_css(self, config):
+        used = used_selectors(config['CRITICAL_TEMPLATES'])
+        parts = []
+        for name in config['CRITICAL_STYLESHEETS']:
+            hashed_name = self.hashed_files.get(self.hash_key(name))
+            if hashed_name is None:
+                return ValueError(f'{name} (CRITICAL_STYLESHEETS) no está en los ficheros estáticos')
+            with self.open(hashed_name) as fh:
+                css = minify_css(fh.read().decode('utf-8'), keep_license=False)
+            parts.append(absolute_urls(extract_critical_css(css, used), hashed_name, self.base_url))
+        self._replace({}, config['CRITICAL_CSS'], ''.join(parts).encode('utf-8'))
+        logger.info(f"CSS crítico: {len(''.join(parts))} bytes en {config['CRITICAL_CSS']}")
+        return True
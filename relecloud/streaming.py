@@ -0,0 +1,152 @@
+"""
+Render en streaming de páginas de listado
+
+stream_template() parte la página en tres trozos: la cabecera (todo lo que
+va antes de {{ rows }}: CSS, barra de navegación, mensajes...), las filas y
+el pie. La cabecera y el pie se renderizan en la vista, así que el primer
+byte sale en cuanto termina la cabecera; las filas se renderizan después,
+de CHUNK_SIZE en CHUNK_SIZE, mientras se envía la respuesta:
+
+    return streaming.stream_template(
+        request, 'destinations.html', {'catalog_snapshot': snapshot},
+        rows=snapshot.ranking, row_template='partials/destination_rows.html',
+    )
+
+La plantilla de la página marca con {{ rows }} dónde van las filas. La
+plantilla de filas recibe el contexto de la página más `rows` (las filas
+del trozo) y `first_row` (índice de la primera), útil como clave de
+{% catalogcache %}. Se renderiza sin request, así que no ejecuta los
+context processors en cada trozo.
+
+Las filas se consumen de un iterador: un QuerySet se recorre con
+.iterator(chunk_size) (cursor de servidor donde la base de datos lo
+permite) y nunca hay más de un trozo en memoria, tenga el listado las filas
+que tenga. Las métricas de la petición (relecloud.metrics) solo incluyen la
+cabecera: el resto se renderiza cuando el middleware ya ha terminado.
+
+Las filas se generan cuando la vista ya ha retornado, fuera de
+@read_from_replica y de @with_statement_timeout. Por eso el QuerySet se fija
+al alias que elige el router durante la vista (la réplica, si la hay) y el
+bloque statement_timeout() en curso se vuelve a abrir mientras se generan
+las filas (timeouts.current_statement_timeout()).
+
+astream_template() es la versión para las vistas asíncronas (ver
+relecloud/async_views.py): la respuesta lleva un iterador asíncrono y un
+QuerySet se recorre con .aiterator(), sin ocupar un hilo durante el envío.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from django.template import loader
+from django.utils.safestring import mark_safe
+
+from .timeouts import current_statement_timeout
+
+
+STREAMING_DEFAULTS = {
+    'CHUNK_SIZE': 100,
+}
+
+# Marca que la plantilla de la página imprime con {{ rows }}
+ROWS_MARKER = mark_safe('<!-- relecloud:rows -->')
+
+
+def get_streaming_settings():
+    """Combina settings.STREAMING con los valores por defecto"""
+    return {**STREAMING_DEFAULTS, **getattr(settings, 'STREAMING', {})}
+
+
+def iter_template(request, template_name, context, rows, row_template, chunk_size=None, using=None):
+    """
+    Retorna un iterador con el HTML de la página en trozos.
+
+    La cabecera y el pie se renderizan al llamar a la función; las filas,
+    al recorrer el iterador.
+    """
+    return iter_page(
+        request,
+        loader.get_template(template_name, using=using),
+        loader.get_template(row_template, using=using),
+        context, rows, chunk_size,
+    )
+
+
+def iter_page(request, page, row_template, context, rows, chunk_size=None):
+    """iter_template() con las plantillas ya cargadas (p. ej. de un motor concreto)"""
+    chunk_size = chunk_size or get_streaming_settings()['CHUNK_SIZE']
+    head, marker, tail = page.render({**context, 'rows': ROWS_MARKER}, request).partition(ROWS_MARKER)
+    if not marker:
+        raise ImproperlyConfigured(f'{page.template.name} no incluye {{{{ rows }}}}')
+
+    if isinstance(rows, QuerySet):
+        rows = rows.using(rows.db).iterator(chunk_size=chunk_size)
+    return _chunks(head, tail, row_template, context, iter(rows), chunk_size, current_statement_timeout())
+
+
+def _chunks(head, tail, row_template, context, rows, chunk_size, timeout):
+    yield head
+    with timeout():
+        first_row = 0
+        while chunk := list(islice(rows, chunk_size)):
+            yield row_template.render({**context, 'rows': chunk, 'first_row': first_row})
+            first_row += len(chunk)
+    yield tail
+
+
+def aiter_page(request, page, row_template, context, rows, chunk_size=None):
+    """iter_page() con un iterador asíncrono (QuerySet recorrido con .aiterator())"""
+    chunk_size = chunk_size or get_streaming_settings()['CHUNK_SIZE']
+    head, marker, tail = page.render({**context, 'rows': ROWS_MARKER}, request).partition(ROWS_MARKER)
+    if not marker:
+        raise ImproperlyConfigured(f'{page.template.name} no incluye {{{{ rows }}}}')
+
+    if isinstance(rows, QuerySet):
+        rows = rows.using(rows.db).aiterator(chunk_size=chunk_size)
+    else:
+        rows = _aiter(rows)
+    return _achunks(head, tail, row_template, context, rows, chunk_size, current_statement_timeout())
+
+
+async def _aiter(rows):
+    for row in rows:
+        yield row
+
+
+async def _achunks(head, tail, row_template, context, rows, chunk_size, timeout):
+    yield head
+    with timeout():
+        first_row = 0
+        chunk = []
+        async for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield row_template.render({**context, 'rows': chunk, 'first_row': first_row})
+                first_row += len(chunk)
+                chunk = []
+        if chunk:
+            yield row_template.render({**context, 'rows': chunk, 'first_row': first_row})
+    yield tail
+
+
+def stream_template(request, template_name, context, rows, row_template, chunk_size=None, using=None):
+    """StreamingHttpResponse con la página de iter_template()"""
+    return StreamingHttpResponse(
+        iter_template(request, template_name, context, rows, row_template, chunk_size, using),
+        content_type='text/html; charset=utf-8',
+    )
+
+
+def astream_template(request, template_name, context, rows, row_template, chunk_size=None, using=None):
+    """StreamingHttpResponse con un iterador asíncrono, para servidores ASGI"""
+    return StreamingHttpResponse(
+        aiter_page(
+            request,
+            loader.get_template(template_name, using=using),
+            loader.get_template(row_template, using=using),
+            context, rows, chunk_size,
+        ),
+        content_type='text/html; charset=utf-8',
+    )
@@ -0,0 +1,122 @@
+"""
+Generador de datos sintéticos para ReleCloud
+
+Construye catálogos realistas (destinos, cruceros, usuarios, solicitudes de
+información y reviews) de un tamaño arbitrario usando bulk_create, para los
+tests de presupuesto de consultas, el asesor de índices y los benchmarks.
+
+Los datos son deterministas para un mismo tamaño y semilla.
+"""
+import random
+from dataclasses import dataclass, field
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .catalog import bump_catalog_version, bump_ratings_version
+from .models import Cruise, Destination, InfoRequest, Review, Usuario
+
+
+# Hash común para todos los usuarios sintéticos: calcularlo una vez por
+# usuario dominaría el tiempo de generación
+SYNTHETIC_PASSWORD = 'synthetic-pass-123'
+
+
+@dataclass
+class SyntheticCatalog:
+    """Objetos creados por build_catalog, para que los llamadores elijan muestras"""
+    destinations: list = field(default_factory=list)
+    cruises: list = field(default_factory=list)
+    users: list = field(default_factory=list)
+    staff: Usuario = None
+
+
+def build_catalog(destinations=10, cruises=5, users=20, reviews_per_destination=5,
+                  destinations_per_cruise=3, seed=0, prefix='synthetic'):
+    """
+    Crea un catálogo sintético completo con inserciones en bloque.
+
+    Cada usuario tiene una solicitud de información (una "compra") para un
+    crucero, y las reviews se reparten entre usuarios distintos de forma que
+    no hay dos reviews del mismo usuario para el mismo destino.
+
+    Parameters:
+        destinations (int): Número de destinos
+        cruises (int): Número de cruceros
+        users (int): Número de usuarios normales (se crea además un superusuario)
+        reviews_per_destination (int): Reviews por destino (máximo: users)
+        destinations_per_cruise (int): Destinos enlazados a cada crucero
+        seed (int): Semilla del generador aleatorio
+        prefix (str): Prefijo de nombres, para poder crear varios catálogos
+
+    Returns:
+        SyntheticCatalog: Objetos creados (con PK asignada)
+    """
+    rng = random.Random(seed)
+    password = make_password(SYNTHETIC_PASSWORD)
+    catalog = SyntheticCatalog()
+
+    with transaction.atomic():
+        Destination.objects.bulk_create([
+            Destination(name=f'{prefix}-destino-{i}', description=f'Destino sintético número {i}')
+            for i in range(destinations)
+        ])
+        catalog.destinations = list(Destination.objects.filter(name__startswith=f'{prefix}-destino-').order_by('pk'))
+
+        Cruise.objects.bulk_create([
+            Cruise(name=f'{prefix}-crucero-{i}', description=f'Crucero sintético número {i}')
+            for i in range(cruises)
+        ])
+        catalog.cruises = list(Cruise.objects.filter(name__startswith=f'{prefix}-crucero-').order_by('pk'))
+
+        links = []
+        for cruise in catalog.cruises:
+            for destination in rng.sample(catalog.destinations, min(destinations_per_cruise, destinations)):
+                links.append(Cruise.destinations.through(cruise_id=cruise.pk, destination_id=destination.pk))
+        Cruise.destinations.through.objects.bulk_create(links)
+
+        Usuario.objects.bulk_create([
+            Usuario(
+                username=f'{prefix}-user-{i}',
+                email=f'{prefix}-user-{i}@example.com',
+                first_name='Usuario',
+                last_name=f'Sintético {i}',
+                password=password,
+            )
+            for i in range(users)
+        ])
+        catalog.users = list(Usuario.objects.filter(username__startswith=f'{prefix}-user-').order_by('pk'))
+        catalog.staff = Usuario.objects.create(
+            username=f'{prefix}-admin',
+            email=f'{prefix}-admin@example.com',
+            password=password,
+            is_staff=True,
+            is_superuser=True,
+        )
+
+        if catalog.cruises:
+            InfoRequest.objects.bulk_create([
+                InfoRequest(
+                    name=user.get_full_name(),
+                    email=user.email,
+                    cruise=rng.choice(catalog.cruises),
+                    notes='Solicitud sintética',
+                )
+                for user in catalog.users
+            ])
+
+        reviews = []
+        for destination in catalog.destinations:
+            for user in rng.sample(catalog.users, min(reviews_per_destination, users)):
+                reviews.append(Review(
+                    destination=destination,
+                    user=user,
+                    rating=rng.randint(Review.MIN_RATING, Review.MAX_RATING),
+                    comment=rng.choice(['', 'Muy recomendable', 'Una experiencia única']),
+                ))
+        Review.objects.bulk_create(reviews, batch_size=500)
+        # bulk_create no envía señales
+        bump_catalog_version()
+        bump_ratings_version()
+
+    return catalog
@@ -0,0 +1,88 @@
+"""
+Backends de plantillas de ReleCloud
+
+InstrumentedDjangoTemplates es el backend de Django estándar con una única
+diferencia: cronometra cada render de plantilla de primer nivel (las
+plantillas incluidas o heredadas se renderizan dentro de ese tiempo) y lo
+suma a las métricas de la petición en curso (ver relecloud.metrics).
+
+InstrumentedJinja2 hace lo mismo con el backend Jinja2 de Django. Jinja2 es
+opcional (TEMPLATE_ENGINE=jinja2 en project/settings.py): sirve las
+plantillas del catálogo de relecloud/jinja2/, equivalentes a las de
+relecloud/templates/, y el resto de plantillas sigue en el backend de Django.
+
+Las plantillas compiladas se guardan en memoria (cached.Loader de Django,
+caché interna de Jinja2). reset_template_caches() las descarta en todos los
+backends; se llama cuando el autoreloader de runserver detecta cambios en
+los ficheros de plantillas. En producción, las plantillas nuevas se cargan
+al reiniciar los workers (kill -HUP al maestro de gunicorn).
+"""
+import time
+
+from django.dispatch import receiver
+from django.template import engines
+from django.template.autoreload import reset_loaders
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils.autoreload import file_changed
+
+from . import metrics
+
+try:
+    from django.template.backends.jinja2 import Jinja2, Template as Jinja2Template
+except ImportError:  # Jinja2 no instalado
+    Jinja2 = None
+
+
+class TimedRenderMixin:
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.record_template_render(time.perf_counter() - started)
+
+
+class InstrumentedTemplate(TimedRenderMixin, Template):
+    pass
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
+
+
+if Jinja2 is not None:
+    class InstrumentedJinja2Template(TimedRenderMixin, Jinja2Template):
+        pass
+
+    class InstrumentedJinja2(Jinja2):
+        def from_string(self, template_code):
+            return InstrumentedJinja2Template(self.env.from_string(template_code), self)
+
+        def get_template(self, template_name):
+            template = super().get_template(template_name)
+            return InstrumentedJinja2Template(template.template, self)
+
+
+def reset_template_caches():
+    """Descarta las plantillas compiladas de todos los backends y la versión de los fragmentos cacheados"""
+    from .templatetags.catalog_cache import reset_template_version
+
+    reset_loaders()
+    reset_template_version()
+    if Jinja2 is None:
+        return
+    for backend in engines.all():
+        if isinstance(backend, Jinja2) and backend.env.cache is not None:
+            backend.env.cache.clear()
+
+
+@receiver(file_changed, dispatch_uid='relecloud.template_caches_file_changed')
+def template_file_changed(sender, file_path, **kwargs):
+    # Django ya vacía sus loaders (django.template.autoreload); aquí se vacía también Jinja2
+    if file_path.suffix == '.html':
+        reset_template_caches()
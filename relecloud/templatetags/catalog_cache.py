@@ -0,0 +1,148 @@
+"""
+Caché de fragmentos de plantilla versionada por el catálogo
+
+    {% load catalog_cache %}
+    {% catalogcache destination_detail destination.id %}
+        ... HTML que solo depende del catálogo ...
+    {% endcatalogcache %}
+
+Como {% cache %} de Django, pero la clave incluye la versión del snapshot
+del catálogo (ver relecloud/catalog.py): cualquier cambio del catálogo
+produce claves nuevas, sin invalidar nada. La clave incluye también
+template_version(), un hash de las plantillas del proyecto y del manifiesto
+de estáticos: tras un despliegue que cambie el HTML o los nombres con hash
+de los estáticos no se sirven fragmentos antiguos de la caché persistente.
+El contenido del fragmento no
+debe depender del usuario; la barra de navegación y los mensajes se
+renderizan fuera, en la plantilla base (partials/navbar.html y
+partials/messages.html).
+
+El fragmento se guarda con caching.get_or_recompute() en la caché
+'default' durante CATALOG_SNAPSHOT['FRAGMENT_TIMEOUT'] segundos; sus
+aciertos y fallos se cuentan como 'fragment' en /perf/metrics/. Si la vista
+pasa catalog_snapshot None (no pudo obtener el snapshot y renderiza filas de
+otra fuente), el fragmento se renderiza sin caché.
+"""
+import hashlib
+import logging
+import os
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import DatabaseError
+from django.template import engines
+from django.utils.safestring import mark_safe
+
+from relecloud import caching, catalog
+from relecloud.warmup import template_directories
+
+
+# Configurar logger para este módulo
+logger = logging.getLogger(__name__)
+
+register = template.Library()
+
+# Valor por defecto de `snapshot`: la plantilla no tiene 'catalog_snapshot'
+CURRENT_SNAPSHOT = object()
+
+# Resultado de template_version(); se calcula una vez por proceso
+_template_version = None
+
+
+def template_version():
+    """
+    Hash corto de las plantillas del proyecto (todos los motores) y del
+    manifiesto de estáticos. Las plantillas solo cambian al desplegar (o con
+    el autoreloader de runserver, que llama a reset_template_version()).
+    """
+    global _template_version
+    if _template_version is None:
+        digest = hashlib.md5(usedforsecurity=False)
+        base_dir = os.path.realpath(settings.BASE_DIR)
+        directories = {
+            directory for engine in engines.all() for directory in template_directories(engine)
+            if directory.startswith(base_dir + os.sep)
+        }
+        for directory in sorted(directories):
+            for root, dirnames, filenames in os.walk(directory):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    path = os.path.join(root, filename)
+                    digest.update(path.encode())
+                    with open(path, 'rb') as fh:
+                        digest.update(fh.read())
+        for name, hashed_name in sorted(getattr(staticfiles_storage, 'hashed_files', {}).items()):
+            digest.update(f'{name}={hashed_name}'.encode())
+        _template_version = digest.hexdigest()[:12]
+    return _template_version
+
+
+def reset_template_version():
+    """Olvida template_version() (plantillas cambiadas en desarrollo, tests)"""
+    global _template_version
+    _template_version = None
+
+
+def fragment_key(name, version_key, vary_on=()):
+    """Clave de caché de un fragmento para una versión del catálogo y de las plantillas"""
+    digest = hashlib.md5(':'.join(str(value) for value in vary_on).encode(), usedforsecurity=False)
+    return f'fragment:{name}:{template_version()}:{version_key}:{digest.hexdigest()}'
+
+
+def render_fragment(name, vary_on, render, snapshot=CURRENT_SNAPSHOT):
+    """
+    Retorna el HTML del fragmento `name` para la versión del catálogo,
+    llamando a `render()` solo si no está en caché.
+
+    `snapshot` es el de la vista (contexto 'catalog_snapshot'); sin él se
+    obtiene el vigente. Con None (la vista no tiene snapshot) o si la base de
+    datos no responde, se renderiza sin caché: el contenido no corresponde a
+    ninguna versión del catálogo.
+    """
+    if snapshot is None:
+        return mark_safe(render())
+    if snapshot is CURRENT_SNAPSHOT:
+        try:
+            snapshot = catalog.get_snapshot()
+        except DatabaseError as e:
+            logger.warning(f'Fragmento {name} sin caché: {e}')
+            return mark_safe(render())
+
+    return mark_safe(caching.get_or_recompute(
+        fragment_key(name, snapshot.version_key, vary_on),
+        lambda: str(render()),
+        timeout=catalog.get_catalog_snapshot_settings()['FRAGMENT_TIMEOUT'],
+    ))
+
+
+class CatalogCacheNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        # Las vistas del catálogo pasan su snapshot para no volver a comprobar la versión
+        return render_fragment(
+            self.name,
+            [var.resolve(context) for var in self.vary_on],
+            lambda: self.nodelist.render(context),
+            snapshot=context.get('catalog_snapshot', CURRENT_SNAPSHOT),
+        )
+
+
+@register.tag('catalogcache')
+def do_catalogcache(parser, token):
+    """
+    {% catalogcache nombre [vary_on ...] %} ... {% endcatalogcache %}
+
+    `nombre` identifica el fragmento; los argumentos siguientes (variables
+    o literales) distinguen sus variantes, p. ej. el id del objeto.
+    """
+    nodelist = parser.parse(('endcatalogcache',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' necesita al menos el nombre del fragmento")
+    return CatalogCacheNode(nodelist, bits[1], [parser.compile_filter(bit) for bit in bits[2:]])
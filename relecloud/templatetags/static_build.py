@@ -0,0 +1,122 @@
+"""
+Etiquetas para usar el resultado del build de estáticos (relecloud.staticbuild)
+
+    {% load static_build %}
+    {% critical_css %}                         <style> con el CSS crítico
+    {% stylesheet 'res/css/theme.css' %}       <link> a la hoja de estilo
+    {% picture 'res/img/astronaut.jpeg' class='img-fluid' alt='...' %}
+
+Con un build (collectstatic con BuildStaticFilesStorage y DEBUG=False),
+critical_css incrusta el CSS crítico y stylesheet carga sin bloquear el
+render las hojas de CRITICAL_STYLESHEETS; picture añade la versión WebP
+de la imagen. Sin build (desarrollo, tests) generan un <link> y un <img>
+normales.
+
+picture completa width y height con el tamaño de la imagen (si solo se da
+width, height se calcula con la proporción) para que el navegador reserve
+su hueco antes de descargarla.
+"""
+import functools
+import os
+import posixpath
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from relecloud.staticbuild import BuildStaticFilesStorage, get_static_build_settings
+
+
+register = template.Library()
+
+
+def _build_storage():
+    """El storage de estáticos si sirve un build, o None"""
+    if settings.DEBUG or not isinstance(staticfiles_storage, BuildStaticFilesStorage):
+        return None
+    return staticfiles_storage
+
+
+@functools.cache
+def _read_critical_css(path):
+    if not os.path.exists(path):
+        return ''
+    with open(path, encoding='utf-8') as fh:
+        # Un </style> dentro del CSS cerraría la etiqueta
+        return fh.read().replace('</', '<\\/')
+
+
+def get_critical_css():
+    """CSS crítico del build en curso ('' si no hay build)"""
+    storage = _build_storage()
+    name = get_static_build_settings()['CRITICAL_CSS']
+    if storage is None or not name:
+        return ''
+    return _read_critical_css(storage.path(name))
+
+
+@register.simple_tag
+def critical_css():
+    css = get_critical_css()
+    # El CSS no se escapa como HTML (comillas de selectores y url()); ya no contiene </
+    return mark_safe(f'<style>{css}</style>') if css else ''
+
+
+@register.simple_tag
+def stylesheet(name):
+    url = staticfiles_storage.url(name)
+    if get_critical_css() and name in get_static_build_settings()['CRITICAL_STYLESHEETS']:
+        # Las reglas necesarias ya están en el <style>: la hoja completa se carga sin bloquear
+        return format_html(
+            '<link rel="preload" href="{0}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'" />'
+            '<noscript><link rel="stylesheet" href="{0}" /></noscript>',
+            url,
+        )
+    return format_html('<link rel="stylesheet" href="{}" />', url)
+
+
+def webp_url(name):
+    """URL de la versión WebP de la imagen en el build, o None"""
+    storage = _build_storage()
+    webp = posixpath.splitext(name)[0] + '.webp'
+    if storage is None or storage.hash_key(webp) not in storage.hashed_files:
+        return None
+    return storage.url(webp)
+
+
+@functools.cache
+def image_size(name):
+    """(ancho, alto) de la imagen original, o None si no se encuentra"""
+    from PIL import Image  # al renderizar el primer {% picture %}, no al cargar las librerías de plantillas
+
+    path = finders.find(name)
+    if path is None:
+        return None
+    with Image.open(path) as image:
+        return image.size
+
+
+def _with_size(name, attrs):
+    size = image_size(name)
+    if size is None or 'height' in attrs:
+        return attrs
+    width, height = size
+    if 'width' in attrs:
+        # Un ancho no entero ('100%', 'auto') no da un alto en píxeles: se deja como está
+        if not str(attrs['width']).isdigit():
+            return attrs
+        return {**attrs, 'height': round(int(attrs['width']) * height / width)}
+    return {**attrs, 'width': width, 'height': height}
+
+
+@register.simple_tag
+def picture(name, **attrs):
+    image = format_html('<img src="{}"{} />', staticfiles_storage.url(name), flatatt(_with_size(name, attrs)))
+    webp = webp_url(name)
+    if webp is None:
+        return image
+    return format_html('<picture><source srcset="{}" type="image/webp" />{}</picture>', webp, image)
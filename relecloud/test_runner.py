@@ -0,0 +1,251 @@
+"""
+Test runner de ReleCloud
+
+Acelera la suite de tests respecto al DiscoverRunner por defecto:
+
+    - Usa un hasher de contraseñas rápido (MD5) durante los tests; el PBKDF2
+      de producción domina el tiempo de cualquier test que cree usuarios
+    - Migra una única vez a una base de datos plantilla cuyo nombre incluye
+      una huella de los ficheros de migración; las ejecuciones siguientes la
+      reutilizan (keepdb) y solo se regenera cuando cambian las migraciones
+    - Ejecuta en paralelo por defecto (--parallel auto); cada proceso trabaja
+      sobre su propio clon de la base de datos plantilla
+    - Muestra al final un informe con los tests más lentos (--slowest N)
+    - Mantiene los PRAGMAs de SQLite de producción salvo WAL, que no es
+      compatible con la clonación de la base de datos por copia de fichero
+    - Desactiva el enrutado de lecturas a réplicas y la caché salvo en sus
+      propios tests, y comprueba la versión del snapshot del catálogo en
+      cada petición
+    - Sirve los estáticos sin manifiesto: los tests no dependen de un
+      collectstatic previo
+
+Se activa con TEST_RUNNER = 'relecloud.test_runner.FastTestRunner'.
+"""
+import hashlib
+import sys
+import time
+import unittest
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.test.runner import DiscoverRunner, ParallelTestSuite, RemoteTestResult, RemoteTestRunner
+from django.test.utils import override_settings
+
+from .db_profile import sqlite_init_command
+
+
+PY312 = sys.version_info >= (3, 12)
+
+FAST_PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+TEST_STATICFILES_STORAGE = {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}
+
+TEMPLATE_DB_DIR = Path(settings.BASE_DIR) / '.test_databases'
+
+
+def migrations_fingerprint():
+    """
+    Retorna una huella corta del estado de las migraciones en disco.
+
+    Cambia cuando se añade, elimina o modifica cualquier fichero de migración
+    (o cuando cambia la versión de Django), lo que invalida la plantilla.
+    """
+    digest = hashlib.sha256(django.get_version().encode())
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    for key in sorted(loader.disk_migrations):
+        module = sys.modules[loader.disk_migrations[key].__module__]
+        digest.update('.'.join(key).encode())
+        digest.update(Path(module.__file__).read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def _enable_test_settings():
+    """
+    Activa el hasher rápido, desactiva el enrutado a réplicas y la caché
+    y comprueba siempre la versión del catálogo (también en procesos
+    creados con spawn). Los estáticos se sirven sin el manifiesto del build.
+
+    Las réplicas son espejos de 'default' (TEST MIRROR) con su propia
+    conexión, que no ve los datos de la transacción de cada TestCase; los
+    tests de relecloud.replicas lo activan explícitamente. La caché
+    sobreviviría al rollback de cada test (y el L2 en fichero se compartiría
+    entre procesos paralelos); los tests de relecloud.caching configuran la
+    suya. El snapshot del catálogo comprueba su versión en cada petición:
+    cada test deshace sus cambios y, con ellos, la versión.
+    """
+    replica_routing = {**getattr(settings, 'REPLICA_ROUTING', {}), 'REPLICAS': []}
+    override = override_settings(
+        PASSWORD_HASHERS=FAST_PASSWORD_HASHERS,
+        REPLICA_ROUTING=replica_routing,
+        CACHES=TEST_CACHES,
+        CATALOG_SNAPSHOT={**getattr(settings, 'CATALOG_SNAPSHOT', {}), 'CHECK_INTERVAL_MS': 0},
+        STORAGES={**settings.STORAGES, 'staticfiles': TEST_STATICFILES_STORAGE},
+    )
+    override.enable()
+    return override
+
+
+class TimedTextTestResult(unittest.TextTestResult):
+    """
+    Resultado que registra la duración de cada test.
+
+    En Python 3.12+ unittest informa las duraciones con addDuration (también
+    desde los procesos paralelos); en versiones anteriores se miden aquí.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.test_timings = []
+        self._test_started_at = None
+        self._duration_reported = False
+
+    def startTest(self, test):
+        self._test_started_at = time.perf_counter()
+        self._duration_reported = False
+        super().startTest(test)
+
+    def addDuration(self, test, elapsed):
+        self._duration_reported = True
+        self.test_timings.append((test.id(), elapsed))
+        if PY312:
+            super().addDuration(test, elapsed)
+
+    def stopTest(self, test):
+        if not self._duration_reported and self._test_started_at is not None:
+            self.addDuration(test, time.perf_counter() - self._test_started_at)
+        super().stopTest(test)
+
+
+class TimedRemoteTestResult(RemoteTestResult):
+    """Envía la duración de cada test desde los procesos paralelos (Python < 3.12)"""
+
+    def startTest(self, test):
+        self._test_started_at = time.perf_counter()
+        super().startTest(test)
+
+    def stopTest(self, test):
+        if not PY312:
+            self.events.append(('addDuration', self.test_index, time.perf_counter() - self._test_started_at))
+        super().stopTest(test)
+
+
+class TimedRemoteTestRunner(RemoteTestRunner):
+    resultclass = TimedRemoteTestResult
+
+
+class FastParallelTestSuite(ParallelTestSuite):
+    runner_class = TimedRemoteTestRunner
+    process_setup = _enable_test_settings
+
+
+class FastTestRunner(DiscoverRunner):
+    """
+    DiscoverRunner con hasher rápido, base de datos plantilla, ejecución
+    paralela por defecto e informe de los tests más lentos.
+    """
+    parallel_test_suite = FastParallelTestSuite
+
+    def __init__(self, slowest=10, template_db=True, **kwargs):
+        super().__init__(**kwargs)
+        self.slowest = slowest
+        self.template_db = template_db
+        self._settings_override = None
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(parallel='auto')
+        parser.add_argument(
+            '--slowest',
+            type=int,
+            default=10,
+            metavar='N',
+            help='Muestra los N tests más lentos al terminar (0 para desactivar).',
+        )
+        parser.add_argument(
+            '--no-template-db',
+            action='store_false',
+            dest='template_db',
+            help='Crea y migra la base de datos de test desde cero en cada ejecución.',
+        )
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._settings_override = _enable_test_settings()
+
+    def teardown_test_environment(self, **kwargs):
+        if self._settings_override is not None:
+            self._settings_override.disable()
+        super().teardown_test_environment(**kwargs)
+
+    def setup_databases(self, **kwargs):
+        self._disable_sqlite_wal()
+        if self.template_db:
+            self._use_template_databases()
+        return super().setup_databases(**kwargs)
+
+    def _disable_sqlite_wal(self):
+        """
+        Usa journal_mode=DELETE en las bases de datos SQLite de test.
+
+        Django clona la base de datos de test para cada proceso paralelo
+        copiando el fichero; en WAL las páginas aún no volcadas al fichero
+        principal (en el -wal) se perderían en la copia.
+        """
+        for alias in connections:
+            options = connections[alias].settings_dict['OPTIONS']
+            if options.get('init_command') == sqlite_init_command():
+                options['init_command'] = sqlite_init_command(journal_mode='DELETE')
+
+    def _use_template_databases(self):
+        """
+        Apunta las bases de datos de test a plantillas persistentes.
+
+        SQLite: un fichero en .test_databases/ por alias y huella (los clones
+        de cada proceso paralelo se crean junto a él). PostgreSQL: una base de
+        datos test_<nombre>_<huella>. Con keepdb, Django solo aplica las
+        migraciones pendientes (ninguna si la plantilla está al día).
+        """
+        fingerprint = migrations_fingerprint()
+        TEMPLATE_DB_DIR.mkdir(exist_ok=True)
+        for stale in TEMPLATE_DB_DIR.iterdir():
+            if fingerprint not in stale.name:
+                stale.unlink()
+
+        for alias in connections:
+            connection = connections[alias]
+            test_settings = connection.settings_dict['TEST']
+            if test_settings.get('NAME') or test_settings.get('MIRROR'):
+                continue
+            if connection.vendor == 'sqlite':
+                test_settings['NAME'] = str(TEMPLATE_DB_DIR / f'{alias}_{fingerprint}.sqlite3')
+            else:
+                test_settings['NAME'] = f"test_{connection.settings_dict['NAME']}_{fingerprint}"
+        self.keepdb = True
+
+    def get_resultclass(self):
+        return super().get_resultclass() or TimedTextTestResult
+
+    def suite_result(self, suite, result, **kwargs):
+        if self.slowest and hasattr(result, 'test_timings'):
+            self._print_slowest(result.test_timings)
+        return super().suite_result(suite, result, **kwargs)
+
+    def _print_slowest(self, timings):
+        """Muestra los tests más lentos y, aparte, el tiempo total de todos los tests"""
+        if not timings:
+            return
+        slowest = sorted(timings, key=lambda item: item[1], reverse=True)[:self.slowest]
+        total = sum(elapsed for _, elapsed in timings)
+        self.log(f'\nTests más lentos ({len(slowest)} de {len(timings)}):')
+        for test_id, elapsed in slowest:
+            self.log(f'  {elapsed:8.3f}s  {test_id}')
+        self.log(f'  Total de los {len(timings)} tests: {total:.2f}s')
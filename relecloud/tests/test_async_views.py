@@ -0,0 +1,126 @@
+"""
+Tests de las vistas asíncronas para el despliegue ASGI (relecloud.async_views)
+"""
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase, override_settings
+from relecloud import catalog
+from relecloud.models import Cruise, Destination, InfoRequest, Review, Usuario
+
+
+@override_settings(ROOT_URLCONF='relecloud.async_urls')
+class AsyncViewsTest(TestCase):
+    """
+    Tests de las páginas del catálogo y los formularios con el cliente asíncrono
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Usuario.objects.create_user(
+            username='viajero', email='viajero@example.com', password='testpass123',
+            first_name='Ana', last_name='Viajera',
+        )
+        cls.destination = Destination.objects.create(name='Marte', description='El planeta rojo')
+        cls.cruise = Cruise.objects.create(name='Expedición a Marte', description='Dos semanas')
+        cls.cruise.destinations.add(cls.destination)
+
+    def setUp(self):
+        catalog.reset_snapshot()
+        self.addCleanup(catalog.reset_snapshot)
+
+    async def test_catalog_pages(self):
+        """
+        Test: Listado y detalles se sirven desde el snapshot; un id inexistente da 404
+        """
+        response = await self.async_client.get('/destinations/')
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Marte', body)
+
+        response = await self.async_client.get(f'/destination/{self.destination.pk}')
+        self.assertContains(response, 'El planeta rojo')
+        response = await self.async_client.get(f'/cruise/{self.cruise.pk}')
+        self.assertContains(response, 'Expedición a Marte')
+        self.assertEqual((await self.async_client.get('/destination/999')).status_code, 404)
+
+    async def test_user_in_navbar(self):
+        """
+        Test: El usuario de la sesión se resuelve con el ORM asíncrono antes de renderizar
+        """
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/')
+        self.assertContains(response, 'viajero')
+
+    async def test_info_request_requires_login(self):
+        """
+        Test: Sin sesión, info_request redirige al login
+        """
+        response = await self.async_client.get('/info_request')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/login/', response.url)
+
+    @override_settings(NOTIFY_EMAIL='admin@example.com', EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    async def test_info_request_saves_and_sends_email(self):
+        """
+        Test: La solicitud se guarda, se envían los dos correos y se redirige al índice
+        """
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post('/info_request', {
+            'name': 'Ana Viajera', 'email': 'ana@example.com', 'cruise': self.cruise.pk, 'notes': 'Fechas',
+        })
+
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertEqual(await InfoRequest.objects.filter(email='ana@example.com').acount(), 1)
+        self.assertEqual(len(mail.outbox), 2)
+
+    async def test_info_request_email_failure_keeps_request(self):
+        """
+        Test: Si el correo falla, la solicitud queda guardada y se avisa al usuario
+        """
+        await self.async_client.aforce_login(self.user)
+        with mock.patch('relecloud.services.asend_info_request_email', return_value=False):
+            response = await self.async_client.post('/info_request', {
+                'name': 'Ana Viajera', 'email': 'ana@example.com', 'cruise': self.cruise.pk, 'notes': 'Fechas',
+            })
+
+        self.assertEqual(await InfoRequest.objects.acount(), 1)
+        self.assertIn('problema al enviar', ' '.join(str(m) for m in response.asgi_request._messages))
+
+    async def test_review_requires_purchase(self):
+        """
+        Test: Sin compra no se crea la review; con compra se crea y se redirige al destino
+        """
+        url = f'/destination/{self.destination.pk}/review/create/'
+        await self.async_client.aforce_login(self.user)
+
+        await self.async_client.post(url, {'rating': 5, 'comment': 'Sin compra'})
+        self.assertEqual(await Review.objects.acount(), 0)
+
+        await InfoRequest.objects.acreate(name='Ana', email=self.user.email, cruise=self.cruise, notes='')
+        response = await self.async_client.post(url, {'rating': 4, 'comment': 'Muy rojo'})
+        self.assertRedirects(response, f'/destination/{self.destination.pk}', fetch_redirect_response=False)
+        self.assertEqual(await Review.objects.filter(user=self.user, rating=4).acount(), 1)
+
+    async def test_registro(self):
+        """
+        Test: El registro valida contra la base de datos y crea el usuario
+        """
+        data = {
+            'username': 'nuevo', 'first_name': 'Nuevo', 'last_name': 'Usuario', 'email': 'nuevo@example.com',
+            'telefono': '600000000', 'password1': 'Cohete.2024!', 'password2': 'Cohete.2024!',
+        }
+        response = await self.async_client.post('/registro/', data)
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertTrue(await Usuario.objects.filter(username='nuevo').aexists())
+
+        response = await self.async_client.post('/registro/', data)
+        self.assertContains(response, 'Este nombre de usuario ya está en uso.')
+
+    async def test_metrics_count_async_queries(self):
+        """
+        Test: Server-Timing cuenta las consultas del ORM asíncrono, que se ejecutan en otro hilo
+        """
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(f'/destination/{self.destination.pk}')
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
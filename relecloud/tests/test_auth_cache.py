@@ -0,0 +1,205 @@
+"""
+Tests de las sesiones en caché y del usuario autenticado en caché
+(relecloud/auth_backends.py)
+"""
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from project import settings as project_settings
+from relecloud import caching, catalog
+from relecloud.auth_backends import CachedModelBackend, user_cache_key
+from relecloud.models import Destination, Usuario
+
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth-tests'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth-tests-shared'},
+}
+
+TIERED_CACHES = {
+    'default': {
+        'BACKEND': 'relecloud.caching.TieredCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {'L1_TIMEOUT': 60},
+    },
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth-tests-tiered'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CachedAuthTest(TestCase):
+    """
+    Tests de CachedModelBackend y de su invalidación
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Usuario.objects.create_user(username='astronauta', password='secreta-123', first_name='Ana')
+        cls.destination = Destination.objects.create(name='Luna', description='Satélite')
+
+    def setUp(self):
+        caches['shared'].clear()
+        catalog.reset_snapshot()
+        self.addCleanup(catalog.reset_snapshot)
+
+    def test_authenticated_request_without_session_and_user_queries(self):
+        """
+        Test: Con sesión y usuario en caché, el detalle de un destino solo consulta la versión del catálogo
+        """
+        self.client.force_login(self.user)
+        url = reverse('destination_detail', args=[self.destination.pk])
+        self.client.get(url)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.wsgi_request.user, self.user)
+
+    def test_user_cached_and_invalidated_on_save(self):
+        """
+        Test: get_user cachea el usuario y guardarlo lo borra de la caché
+        """
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.user.pk).first_name, 'Ana')
+
+        self.user.first_name = 'Ana María'
+        self.user.save()
+
+        self.assertIsNone(caches['shared'].get(user_cache_key(self.user.pk)))
+        self.assertEqual(backend.get_user(self.user.pk).first_name, 'Ana María')
+
+    def test_password_change_logs_out_other_sessions(self):
+        """
+        Test: Tras cambiar la contraseña, la sesión anterior deja de ser válida aunque el usuario estuviera en caché
+        """
+        self.client.force_login(self.user)
+        url = reverse('destination_detail', args=[self.destination.pk])
+        self.assertTrue(self.client.get(url).wsgi_request.user.is_authenticated)
+
+        user = Usuario.objects.get(pk=self.user.pk)
+        user.set_password('otra-secreta-456')
+        user.save()
+
+        self.assertFalse(self.client.get(url).wsgi_request.user.is_authenticated)
+
+    def test_inactive_user_not_cached(self):
+        """
+        Test: Un usuario inactivo no se autentica ni se guarda en la caché
+        """
+        Usuario.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        self.assertIsNone(CachedModelBackend().get_user(self.user.pk))
+        self.assertIsNone(caches['shared'].get(user_cache_key(self.user.pk)))
+
+    async def test_aget_user(self):
+        """
+        Test: aget_user usa la misma caché que get_user
+        """
+        user = await CachedModelBackend().aget_user(self.user.pk)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(await caches['shared'].aget(user_cache_key(self.user.pk)), self.user)
+
+
+@override_settings(CACHES=TIERED_CACHES)
+class SharedAuthCacheTest(TestCase):
+    """
+    Tests de las sesiones y el usuario en caché con dos workers: dos
+    TieredCache con su propio L1 sobre el mismo L2
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Usuario.objects.create_user(username='astronauta', password='secreta-123')
+        cls.destination = Destination.objects.create(name='Luna', description='Satélite')
+
+    def setUp(self):
+        caches['default'].clear()
+        self.worker_a = caches['default']
+        self.worker_b = caching.TieredCache('shared', TIERED_CACHES['default'])
+        catalog.reset_snapshot()
+        self.addCleanup(catalog.reset_snapshot)
+
+    @contextmanager
+    def worker(self, cache):
+        """Atiende las peticiones del bloque con la caché 'default' de otro worker"""
+        previous = caches['default']
+        caches['default'] = cache
+        try:
+            yield
+        finally:
+            caches['default'] = previous
+
+    def test_l1_of_other_worker_is_stale(self):
+        """
+        Test: delete() solo vacía el L1 del worker que lo ejecuta; el otro sigue sirviendo el valor
+        """
+        self.worker_a.set('clave', 'valor')
+        self.assertEqual(self.worker_b.get('clave'), 'valor')
+
+        self.worker_a.delete('clave')
+
+        self.assertIsNone(caches['shared'].get('clave'))
+        self.assertEqual(self.worker_b.get('clave'), 'valor')
+
+    def test_logout_in_one_worker_ends_session_in_the_other(self):
+        """
+        Test: Tras cerrar sesión en un worker, el otro ya no acepta la cookie de esa sesión (no hay L1 de por medio)
+        """
+        url = reverse('destination_detail', args=[self.destination.pk])
+        self.client.force_login(self.user)
+        session_key = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        with self.worker(self.worker_b):
+            self.assertTrue(self.client.get(url).wsgi_request.user.is_authenticated)
+
+        with self.worker(self.worker_a):
+            self.client.post(reverse('logout'))
+
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        with self.worker(self.worker_b):
+            self.assertFalse(self.client.get(url).wsgi_request.user.is_authenticated)
+
+    def test_deactivated_user_rejected_by_other_worker(self):
+        """
+        Test: Al desactivar al usuario en un worker, el otro deja de autenticarlo en la siguiente petición
+        """
+        url = reverse('destination_detail', args=[self.destination.pk])
+        self.client.force_login(self.user)
+        with self.worker(self.worker_b):
+            self.assertTrue(self.client.get(url).wsgi_request.user.is_authenticated)
+
+        with self.worker(self.worker_a):
+            self.user.is_active = False
+            self.user.save()
+
+        with self.worker(self.worker_b):
+            self.assertFalse(self.client.get(url).wsgi_request.user.is_authenticated)
+
+
+class SharedFileCacheSizeTest(SimpleTestCase):
+    """
+    Tests del tamaño de la caché 'shared' en ficheros del proyecto (el runner usa DummyCache)
+    """
+
+    def test_sessions_beyond_default_max_entries_are_kept(self):
+        """
+        Test: Con la configuración del proyecto, más de 300 sesiones (el MAX_ENTRIES de Django) no se descartan
+        """
+        shared = project_settings.CACHES['shared']
+        if not shared['BACKEND'].endswith('FileBasedCache'):
+            self.skipTest('CACHE_BACKEND no es FileBasedCache')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        cache = FileBasedCache(directory, {'TIMEOUT': shared['TIMEOUT'], 'OPTIONS': shared['OPTIONS']})
+
+        for index in range(400):
+            cache.set(f'django.contrib.sessions.cached_db{index}', {'_auth_user_id': index})
+
+        self.assertEqual(sum(cache.has_key(f'django.contrib.sessions.cached_db{index}') for index in range(400)), 400)
@@ -0,0 +1,195 @@
+"""
+Tests de la caché en dos niveles y del recálculo single-flight
+(relecloud.caching)
+
+El test runner desactiva la caché en el resto de la suite; aquí se usa un
+TieredCache sobre un LocMemCache que hace de L2 compartido.
+"""
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, override_settings
+from relecloud import caching, metrics
+
+
+TIERED_CACHES = {
+    'default': {
+        'BACKEND': 'relecloud.caching.TieredCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {'L1_MAX_ENTRIES': 100, 'L1_TIMEOUT': 60},
+    },
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'relecloud-tests'},
+}
+
+
+class LRUCacheTest(SimpleTestCase):
+    """
+    Tests del L1 (LRU acotado con TTL)
+    """
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """
+        Test: Al superar max_entries se descarta la entrada usada hace más tiempo
+        """
+        lru = caching.LRUCache(max_entries=2)
+        lru.set('a', 1, ttl=60)
+        lru.set('b', 2, ttl=60)
+        lru.get('a')
+        lru.set('c', 3, ttl=60)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(len(lru), 2)
+
+    def test_entries_expire(self):
+        """
+        Test: Las entradas caducan tras su TTL y los valores no se comparten
+        """
+        lru = caching.LRUCache()
+        value = ['x']
+        lru.set('k', value, ttl=10)
+        value.append('y')
+        self.assertEqual(lru.get('k'), ['x'])
+
+        with mock.patch('relecloud.caching.time.monotonic', return_value=time.monotonic() + 11):
+            self.assertEqual(lru.get('k', 'default'), 'default')
+
+
+@override_settings(CACHES=TIERED_CACHES)
+class TieredCacheTest(SimpleTestCase):
+    """
+    Tests del backend TieredCache
+    """
+
+    def setUp(self):
+        cache.clear()
+        caching.reset_cache_stats()
+
+    def test_l2_hit_is_promoted_to_l1(self):
+        """
+        Test: Un valor del L2 se copia al L1 y las siguientes lecturas no llegan al L2
+        """
+        caches['shared'].set('clave', 'valor')
+
+        self.assertEqual(cache.get('clave'), 'valor')
+        caches['shared'].delete('clave')
+        self.assertEqual(cache.get('clave'), 'valor')
+        self.assertEqual(caching.cache_stats()['shared'], {'l1_hit': 1, 'l2_hit': 1})
+
+    def test_set_and_delete_reach_both_levels(self):
+        """
+        Test: set y delete escriben en L1 y L2
+        """
+        cache.set('clave', {'a': 1}, 30)
+        self.assertEqual(caches['shared'].get('clave'), {'a': 1})
+
+        cache.delete('clave')
+        self.assertIsNone(cache.get('clave'))
+        self.assertIsNone(caches['shared'].get('clave'))
+
+    def test_add_is_resolved_in_l2(self):
+        """
+        Test: add solo tiene éxito si la clave no existe en el L2 compartido
+        """
+        caches['shared'].set('cerrojo', 'otro-worker')
+
+        self.assertFalse(cache.add('cerrojo', 'yo'))
+        self.assertTrue(cache.add('libre', 'yo'))
+
+
+@override_settings(CACHES=TIERED_CACHES)
+class GetOrRecomputeTest(SimpleTestCase):
+    """
+    Tests de get_or_recompute: single-flight, valores obsoletos y caducidad anticipada
+    """
+
+    def setUp(self):
+        cache.clear()
+        caching.reset_cache_stats()
+
+    def _expire(self, key):
+        entry = cache.get(key)
+        cache.set(key, caching.CachedValue(entry.value, time.time() - 1, entry.delta), 300)
+
+    def test_miss_then_hit(self):
+        """
+        Test: El primer acceso calcula el valor y el siguiente lo lee de caché
+        """
+        compute = mock.Mock(return_value=[1, 2, 3])
+
+        self.assertEqual(caching.get_or_recompute('test:k', compute, timeout=60), [1, 2, 3])
+        self.assertEqual(caching.get_or_recompute('test:k', compute, timeout=60), [1, 2, 3])
+        self.assertEqual(compute.call_count, 1)
+        self.assertEqual(caching.cache_stats()['test'], {'hit': 1, 'miss': 1})
+
+    def test_stale_value_served_while_another_worker_recomputes(self):
+        """
+        Test: Con el cerrojo en manos de otro worker se sirve el valor caducado
+        """
+        caching.get_or_recompute('test:k', lambda: 'viejo', timeout=60)
+        self._expire('test:k')
+        caches['shared'].add('test:k:lock', 'otro-worker')
+
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.activate(request_metrics)
+        try:
+            value = caching.get_or_recompute('test:k', lambda: 'nuevo', timeout=60)
+        finally:
+            metrics.deactivate(token)
+
+        self.assertEqual(value, 'viejo')
+        self.assertEqual(request_metrics.cache_stale, 1)
+        self.assertEqual(caching.cache_stats()['test']['stale'], 1)
+
+    def test_expired_value_is_recomputed_and_lock_released(self):
+        """
+        Test: Sin otro worker recalculando, el valor caducado se recalcula
+        """
+        caching.get_or_recompute('test:k', lambda: 'viejo', timeout=60)
+        self._expire('test:k')
+
+        self.assertEqual(caching.get_or_recompute('test:k', lambda: 'nuevo', timeout=60), 'nuevo')
+        self.assertIsNone(cache.get('test:k:lock'))
+        self.assertEqual(caching.get_or_recompute('test:k', lambda: 'otro', timeout=60), 'nuevo')
+
+    def test_only_one_thread_recomputes(self):
+        """
+        Test: Con muchas peticiones concurrentes sobre un valor caducado, solo una recalcula
+        """
+        caching.get_or_recompute('test:k', lambda: 'viejo', timeout=60)
+        self._expire('test:k')
+        calls = []
+
+        def slow_compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'nuevo'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                caching.get_or_recompute('test:k', slow_compute, timeout=60)
+            ))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), ['nuevo'] + ['viejo'] * 7)
+
+    def test_probabilistic_early_expiry(self):
+        """
+        Test: Un valor caro y próximo a caducar se recalcula antes de tiempo; con beta=0 nunca
+        """
+        cache.set('test:k', caching.CachedValue('viejo', time.time() + 1, delta=5.0), 300)
+
+        self.assertEqual(caching.get_or_recompute('test:k', lambda: 'nuevo', timeout=60, beta=0), 'viejo')
+        with mock.patch('relecloud.caching.random.random', return_value=0.9):
+            self.assertEqual(caching.get_or_recompute('test:k', lambda: 'nuevo', timeout=60), 'nuevo')
+        self.assertEqual(caching.cache_stats()['test']['early_refresh'], 1)
+
@@ -0,0 +1,380 @@
+"""
+Tests del snapshot del catálogo en memoria (relecloud.catalog)
+
+El test runner comprueba la versión del catálogo en cada petición
+(CHECK_INTERVAL_MS=0); cada test parte de un snapshot vacío. Los tests de
+{% catalogcache %} usan una LocMemCache (el runner desactiva la caché).
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.template import Context, Template, TemplateSyntaxError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from relecloud import caching, catalog
+from relecloud.models import Cruise, Destination, Review, Usuario
+from relecloud.template_backends import reset_template_caches
+from relecloud.templatetags import catalog_cache
+
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'catalog-tests'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'catalog-tests-shared'},
+}
+
+
+class CatalogSnapshotTest(TestCase):
+    """
+    Tests de la construcción y el refresco del snapshot
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mars = Destination.objects.create(name='Marte', description='El planeta rojo')
+        cls.moon = Destination.objects.create(name='Luna', description='Nuestro satélite natural')
+        cls.saturn = Destination.objects.create(name='Saturno', description='El de los anillos')
+        cls.cruise = Cruise.objects.create(name='Ruta interior', description='Del satélite al planeta rojo')
+        cls.cruise.destinations.set([cls.mars, cls.moon])
+        users = [
+            Usuario.objects.create_user(username=f'viajero{i}', email=f'viajero{i}@example.com', password='x')
+            for i in range(3)
+        ]
+        Review.objects.create(destination=cls.moon, user=users[0], rating=3)
+        Review.objects.create(destination=cls.saturn, user=users[0], rating=5)
+        Review.objects.create(destination=cls.saturn, user=users[1], rating=4)
+
+    def setUp(self):
+        catalog.reset_snapshot()
+        self.addCleanup(catalog.reset_snapshot)
+
+    def test_records_are_linked_and_immutable(self):
+        """
+        Test: Los registros enlazan cruceros y destinos y no se pueden modificar
+        """
+        snapshot = catalog.get_snapshot()
+        mars = snapshot.destination(self.mars.pk)
+        cruise = snapshot.cruise(self.cruise.pk)
+
+        self.assertEqual(str(mars), 'Marte')
+        self.assertEqual(mars.cruises, (cruise,))
+        self.assertEqual([d.pk for d in cruise.destinations], [self.mars.pk, self.moon.pk])
+        self.assertIsNone(snapshot.destination(9999))
+        self.assertIsNone(snapshot.cruise('abc'))
+        with self.assertRaises(AttributeError):
+            mars.name = 'Otro'
+        with self.assertRaises(AttributeError):
+            mars.extra = 1
+
+    def test_ranking_matches_reviews(self):
+        """
+        Test: El ranking ordena por número de reviews y puntuación media
+        """
+        ranking = catalog.get_snapshot().ranking
+
+        self.assertEqual([d.name for d in ranking], ['Saturno', 'Luna', 'Marte'])
+        self.assertEqual((ranking[0].avg_rating, ranking[0].review_count), (4.5, 2))
+        self.assertEqual((ranking[2].avg_rating, ranking[2].review_count), (None, 0))
+
+    def test_build_uses_fixed_number_of_queries(self):
+        """
+        Test: Reconstruir el snapshot cuesta las mismas consultas con cualquier tamaño
+        """
+        tokens = catalog.read_versions()
+        with self.assertNumQueries(4):
+            catalog.build_snapshot(tokens)
+
+        Destination.objects.bulk_create([Destination(name=f'Extra {i}', description='x') for i in range(20)])
+        with self.assertNumQueries(4):
+            snapshot = catalog.build_snapshot(tokens)
+        self.assertEqual(len(snapshot.ranking), 23)
+
+    def test_sparse_ids(self):
+        """
+        Test: Un id muy alto no reserva memoria para los huecos
+        """
+        far = Destination.objects.create(pk=10 ** 9, name='Plutón', description='Lejos')
+        snapshot = catalog.get_snapshot()
+
+        self.assertEqual(len(snapshot.destinations), 4)
+        self.assertEqual(snapshot.destination(str(far.pk)).name, 'Plutón')
+        self.assertIsNone(snapshot.destination(-1))
+
+    def test_changes_bump_version(self):
+        """
+        Test: Destinos, cruceros y sus relaciones incrementan la versión del catálogo; las reviews, solo la de puntuaciones
+        """
+        changes = [
+            lambda: Destination.objects.filter(pk=self.saturn.pk).first().save(),
+            lambda: self.cruise.destinations.add(self.saturn),
+            lambda: self.cruise.destinations.clear(),
+            lambda: Cruise.objects.create(name='Nuevo', description='x').delete(),
+        ]
+        for change in changes:
+            before, _ = catalog.read_versions()
+            change()
+            self.assertGreater(catalog.read_versions()[0][0], before[0])
+
+        before = catalog.read_versions()
+        Review.objects.create(destination=self.mars, user=Usuario.objects.get(username='viajero2'), rating=2)
+        token, ratings_token = catalog.read_versions()
+        self.assertEqual(token, before[0])
+        self.assertGreater(ratings_token[0], before[1][0])
+
+    def test_new_review_only_recomputes_ratings(self):
+        """
+        Test: Tras una review, el snapshot se copia con las puntuaciones nuevas con una sola consulta más
+        """
+        first = catalog.get_snapshot()
+        Review.objects.create(destination=self.mars, user=Usuario.objects.get(username='viajero2'), rating=2)
+
+        with self.assertNumQueries(2):
+            second = catalog.get_snapshot()
+
+        self.assertIsNot(second, first)
+        self.assertNotEqual(second.version_key, first.version_key)
+        self.assertEqual((second.destination(self.mars.pk).avg_rating, second.destination(self.mars.pk).review_count), (2, 1))
+        self.assertEqual((first.destination(self.mars.pk).avg_rating, first.destination(self.mars.pk).review_count), (None, 0))
+        self.assertEqual([d.name for d in second.ranking], ['Saturno', 'Luna', 'Marte'])
+        cruise = second.cruise(self.cruise.pk)
+        self.assertEqual([d.pk for d in cruise.destinations], [self.mars.pk, self.moon.pk])
+        self.assertIs(cruise.destinations[0], second.destination(self.mars.pk))
+        self.assertEqual(second.destination(self.mars.pk).cruises, (cruise,))
+
+    def test_snapshot_is_reused_until_version_changes(self):
+        """
+        Test: Sin cambios se reutiliza el mismo snapshot; tras un cambio se reconstruye
+        """
+        first = catalog.get_snapshot()
+        with self.assertNumQueries(1):
+            self.assertIs(catalog.get_snapshot(), first)
+
+        Destination.objects.create(name='Júpiter', description='El gigante gaseoso')
+        second = catalog.get_snapshot()
+
+        self.assertIsNot(second, first)
+        self.assertEqual(len(second.ranking), 4)
+        self.assertIsNone(first.destination(second.ranking[-1].pk))
+
+    @override_settings(CATALOG_SNAPSHOT={'CHECK_INTERVAL_MS': 60000})
+    def test_version_checked_once_per_interval(self):
+        """
+        Test: Dentro del intervalo no se consulta la base de datos
+        """
+        snapshot = catalog.get_snapshot()
+        Destination.objects.create(name='Júpiter', description='El gigante gaseoso')
+
+        with self.assertNumQueries(0):
+            self.assertIs(catalog.get_snapshot(), snapshot)
+
+    def test_database_error_serves_previous_snapshot(self):
+        """
+        Test: Si la reconstrucción falla, se sigue sirviendo el snapshot anterior
+        """
+        snapshot = catalog.get_snapshot()
+        Destination.objects.create(name='Júpiter', description='El gigante gaseoso')
+
+        with mock.patch('relecloud.catalog.build_snapshot', side_effect=DatabaseError('caída')):
+            with self.assertLogs('relecloud.catalog', 'WARNING'):
+                self.assertIs(catalog.get_snapshot(), snapshot)
+
+        catalog.reset_snapshot()
+        with mock.patch('relecloud.catalog.build_snapshot', side_effect=DatabaseError('caída')):
+            with self.assertRaises(DatabaseError):
+                catalog.get_snapshot()
+
+    def test_preload_builds_and_freezes(self):
+        """
+        Test: La precarga construye el snapshot, cierra las conexiones y congela el GC
+        """
+        with mock.patch('relecloud.catalog.connections') as connections, \
+                mock.patch('relecloud.catalog.gc') as gc:
+            snapshot = catalog.preload_snapshot()
+
+        self.assertEqual(len(snapshot.ranking), 3)
+        connections.close_all.assert_called_once_with()
+        gc.freeze.assert_called_once_with()
+
+        with override_settings(CATALOG_SNAPSHOT={'PRELOAD': False}):
+            self.assertIsNone(catalog.preload_snapshot())
+
+
+class CatalogPagesTest(TestCase):
+    """
+    Tests de las páginas del catálogo servidas desde el snapshot
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.destination = Destination.objects.create(name='Marte', description='El planeta rojo')
+        cls.cruise = Cruise.objects.create(name='Ruta roja', description='Directo a Marte')
+        cls.cruise.destinations.add(cls.destination)
+        cls.user = Usuario.objects.create_user(username='viajero', email='viajero@example.com', password='x')
+
+    def setUp(self):
+        catalog.reset_snapshot()
+        self.addCleanup(catalog.reset_snapshot)
+
+    def test_pages_only_check_version(self):
+        """
+        Test: Con el snapshot construido, cada página solo consulta la versión
+        """
+        urls = [
+            reverse('destinations'),
+            reverse('destination_detail', args=[self.destination.pk]),
+            reverse('cruise_detail', args=[self.cruise.pk]),
+        ]
+        self.client.get(urls[0])
+        for url in urls:
+            with self.subTest(url=url):
+                with self.assertNumQueries(1):
+                    response = self.client.get(url)
+                self.assertContains(response, 'Marte')
+        self.assertContains(response, 'Ruta roja')
+
+    def test_unknown_objects_return_404(self):
+        """
+        Test: Un id que no está en el catálogo responde 404
+        """
+        self.assertEqual(self.client.get(reverse('destination_detail', args=[9999])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('cruise_detail', args=[9999])).status_code, 404)
+
+    def test_new_review_is_shown(self):
+        """
+        Test: Una review nueva se refleja en el detalle de su destino
+        """
+        self.client.get(reverse('destination_detail', args=[self.destination.pk]))
+        Review.objects.create(destination=self.destination, user=self.user, rating=4, comment='Muy bien')
+
+        response = self.client.get(reverse('destination_detail', args=[self.destination.pk]))
+        self.assertEqual(response.context['destination'].review_count, 1)
+        self.assertContains(response, 'basado en 1 opiniones')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CatalogFragmentCacheTest(TestCase):
+    """
+    Tests de {% catalogcache %}: fragmentos compartidos entre usuarios y
+    versionados por el catálogo
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.destination = Destination.objects.create(name='Marte', description='El planeta rojo')
+        cls.cruise = Cruise.objects.create(name='Ruta roja', description='Directo a Marte')
+        cls.cruise.destinations.add(cls.destination)
+        cls.ana = Usuario.objects.create_user(username='ana', email='ana@example.com', password='x')
+        cls.luis = Usuario.objects.create_user(username='luis', email='luis@example.com', password='x')
+
+    def setUp(self):
+        cache.clear()
+        catalog.reset_snapshot()
+        caching.reset_cache_stats()
+        self.addCleanup(catalog.reset_snapshot)
+
+    def test_fragments_are_shared_between_users(self):
+        """
+        Test: El cuerpo se renderiza una vez y la barra de navegación es la de cada usuario
+        """
+        url = reverse('destination_detail', args=[self.destination.pk])
+        pages = {}
+        for user in (self.ana, self.luis, None):
+            if user:
+                self.client.force_login(user)
+            else:
+                self.client.logout()
+            pages[user and user.username] = self.client.get(url)
+
+        self.assertEqual(caching.cache_stats()['fragment'], {'hit': 4, 'miss': 2})
+        self.assertContains(pages['ana'], 'Hola, ana')
+        self.assertContains(pages['luis'], 'Hola, luis')
+        self.assertNotContains(pages['luis'], 'Hola, ana')
+        self.assertContains(pages[None], 'Login to Request Information')
+        for response in pages.values():
+            self.assertContains(response, 'El planeta rojo')
+            self.assertContains(response, 'Ruta roja')
+
+    def test_catalog_change_uses_new_fragments(self):
+        """
+        Test: Tras un cambio del catálogo, los fragmentos se renderizan de nuevo
+        """
+        url = reverse('cruise_detail', args=[self.cruise.pk])
+        self.client.get(url)
+        self.cruise.destinations.add(Destination.objects.create(name='Luna', description='El satélite'))
+
+        response = self.client.get(url)
+
+        self.assertContains(response, 'Luna')
+        self.assertEqual(caching.cache_stats()['fragment'], {'miss': 4})
+
+    def test_messages_are_not_cached(self):
+        """
+        Test: Los mensajes de la sesión se muestran aunque el cuerpo salga de caché
+        """
+        url = reverse('destination_detail', args=[self.destination.pk])
+        self.client.force_login(self.ana)
+        self.client.get(url)
+
+        response = self.client.post(reverse('review_create', args=[self.destination.pk]), {'rating': 5}, follow=True)
+
+        self.assertContains(response, 'No estás autorizado para dejar una review')
+        self.assertEqual(caching.cache_stats()['fragment']['hit'], 2)
+
+    def test_fallback_rows_are_not_cached(self):
+        """
+        Test: Si la vista no obtiene el snapshot, sus filas sin valoraciones no se guardan como fragmento
+        """
+        Review.objects.create(destination=self.destination, user=self.ana, rating=5)
+        get_snapshot = catalog.get_snapshot
+        calls = []
+
+        def first_call_fails():
+            calls.append(None)
+            if len(calls) == 1:
+                raise DatabaseError('base de datos bloqueada')
+            return get_snapshot()
+
+        with mock.patch('relecloud.catalog.get_snapshot', first_call_fails):
+            response = self.client.get(reverse('destinations'))
+            fallback = b''.join(response.streaming_content).decode()
+        self.assertIn('Sin opiniones', fallback)
+        self.assertNotIn('fragment', caching.cache_stats())
+
+        response = self.client.get(reverse('destinations'))
+        page = b''.join(response.streaming_content).decode()
+        self.assertNotIn('Sin opiniones', page)
+        self.assertIn('5.0', page)
+
+    def test_template_change_uses_new_fragments(self):
+        """
+        Test: Tras un despliegue que cambia las plantillas o el manifiesto de estáticos, los fragmentos se renderizan de nuevo
+        """
+        url = reverse('destination_detail', args=[self.destination.pk])
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(caching.cache_stats()['fragment'], {'hit': 2, 'miss': 2})
+
+        with mock.patch('relecloud.templatetags.catalog_cache._template_version', 'nuevo-despliegue'):
+            self.client.get(url)
+        self.assertEqual(caching.cache_stats()['fragment'], {'hit': 2, 'miss': 4})
+
+    def test_template_version_is_reset_with_template_caches(self):
+        """
+        Test: reset_template_caches() (autoreloader de runserver) recalcula la versión de las plantillas
+        """
+        version = catalog_cache.template_version()
+        with mock.patch('relecloud.templatetags.catalog_cache._template_version', 'antigua'):
+            reset_template_caches()
+            self.assertEqual(catalog_cache.template_version(), version)
+
+    def test_tag_requires_fragment_name(self):
+        """
+        Test: {% catalogcache %} sin nombre es un error de sintaxis
+        """
+        with self.assertRaises(TemplateSyntaxError):
+            Template('{% load catalog_cache %}{% catalogcache %}x{% endcatalogcache %}')
+
+        rendered = Template(
+            '{% load catalog_cache %}{% catalogcache prueba pk %}{{ pk }}{% endcatalogcache %}'
+        ).render(Context({'pk': 7}))
+        self.assertEqual(rendered, '7')
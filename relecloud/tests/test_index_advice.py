@@ -0,0 +1,119 @@
+"""
+Tests del asesor de índices (relecloud.index_advisor y comando index_advice)
+con el catálogo sintético grande de los tests de presupuesto de consultas
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from relecloud import index_advisor
+from relecloud.models import InfoRequest, Review
+from relecloud.synthetic import build_catalog
+from relecloud.tests.test_query_budget import SIZES
+
+
+class AnalyzePlanTest(TestCase):
+    """
+    Tests de la interpretación de planes de SQLite y PostgreSQL
+    """
+
+    def test_sqlite_plan(self):
+        """
+        Test: Se distinguen recorridos completos, búsquedas y ordenaciones
+        """
+        findings = index_advisor.analyze_plan([
+            '3 0 0 SCAN relecloud_inforequest',
+            '5 0 0 SCAN relecloud_review USING INDEX relecloud_r_created_df46dc_idx',
+            '7 0 0 SEARCH relecloud_review USING INDEX relecloud_r_user_id_e5f399_idx (user_id=? AND destination_id=?)',
+            '9 0 0 USE TEMP B-TREE FOR ORDER BY',
+            '11 0 0 USE TEMP B-TREE FOR RIGHT PART OF ORDER BY',
+            '13 0 0 USE TEMP B-TREE FOR GROUP BY',
+        ], 'sqlite')
+
+        self.assertEqual(
+            [(f.kind, f.table) for f in findings],
+            [('scan', 'relecloud_inforequest'), ('search', 'relecloud_review'),
+             ('sort', None), ('partial-sort', None), ('group', None)],
+        )
+        self.assertEqual(findings[1].columns, ('user_id', 'destination_id'))
+
+    def test_postgresql_plan(self):
+        """
+        Test: En PostgreSQL se detectan Seq Scan y nodos Sort
+        """
+        findings = index_advisor.analyze_plan([
+            'Sort  (cost=10.1..10.2 rows=3 width=8)',
+            '  ->  Seq Scan on relecloud_inforequest  (cost=0.00..10.00 rows=3 width=8)',
+        ], 'postgresql')
+
+        self.assertEqual([(f.kind, f.table) for f in findings], [('sort', None), ('scan', 'relecloud_inforequest')])
+
+
+class IndexAdviceTest(TestCase):
+    """
+    Tests del asesor contra el catálogo sintético grande
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        build_catalog(**SIZES['large'])
+
+    def test_catalogue_needs_no_new_indexes(self):
+        """
+        Test: Con los índices de la migración 0006 no se propone ningún índice
+        """
+        results, proposals = index_advisor.advise()
+
+        self.assertEqual(len(results), len(index_advisor.query_catalogue()))
+        self.assertEqual([(p.model.__name__, p.fields) for p in proposals], [])
+
+    def test_review_authorization_path_uses_new_indexes(self):
+        """
+        Test: Las comprobaciones de ReviewCreateView buscan por los índices nuevos
+        """
+        results = {advice.name: advice for advice in index_advisor.advise()[0]}
+
+        duplicate_plan = '\n'.join(results['review_duplicate_check'].plan)
+        self.assertIn('user_id=? AND destination_id=?', duplicate_plan)
+        self.assertEqual(results['review_duplicate_check'].notes, [])
+        self.assertEqual(results['review_purchase_check'].notes, [])
+
+    def test_residual_filter_is_reported_without_index(self):
+        """
+        Test: Sin el índice (user, destination) se propone para la review duplicada
+        """
+        index = next(i for i in Review._meta.indexes if i.fields == ['user', 'destination'])
+        Review._meta.indexes.remove(index)
+        self.addCleanup(Review._meta.indexes.append, index)
+        user, destination = Review.objects.values_list('user', 'destination').first()
+
+        advice, wanted = index_advisor.advise_query(
+            'review_duplicate_check', 'views.ReviewCreateView',
+            Review.objects.filter(user=user, destination=destination).order_by()[:1],
+            ['4 0 0 SEARCH relecloud_review USING INDEX relecloud_review_user_id_f145a9f8 (user_id=?)'],
+            'sqlite',
+        )
+
+        self.assertEqual(advice.notes, ['relecloud_review: filtro residual fuera del índice usado'])
+        self.assertEqual([(model, fields) for model, fields, _ in wanted], [(Review, ('user', 'destination'))])
+
+    def test_emitted_migration_adds_indexes(self):
+        """
+        Test: La migración generada contiene un AddIndex por propuesta con nombre
+        """
+        proposal = index_advisor.Proposal(InfoRequest, ('email', 'cruise'))
+        code = index_advisor.build_migration([proposal]).as_string()
+
+        self.assertIn("migrations.AddIndex(", code)
+        self.assertIn("fields=['email', 'cruise']", code)
+        self.assertIn("name='relecloud_i_email_", code)
+
+    def test_command_reports_each_query(self):
+        """
+        Test: El comando muestra una línea por consulta del catálogo
+        """
+        out = StringIO()
+        call_command('index_advice', stdout=out)
+
+        self.assertIn('review_purchase_check', out.getvalue())
+        self.assertIn('No se proponen índices nuevos', out.getvalue())
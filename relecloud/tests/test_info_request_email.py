@@ -14,15 +14,13 @@ class InfoRequestEmailTest(TestCase):
     envía el formulario de solicitud de información
     """
     
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         """
-        Configuración inicial para cada test
+        Datos compartidos por todos los tests de la clase
         """
-        self.client = Client()
-        self.url = reverse('info_request')
-        
         # Crear un usuario de prueba (requerido por LoginRequiredMixin)
-        self.user = Usuario.objects.create_user(
+        cls.user = Usuario.objects.create_user(
             username='testuser',
             email='testuser@example.com',
             password='testpass123',
@@ -30,29 +28,36 @@ class InfoRequestEmailTest(TestCase):
             last_name='User'
         )
         
-        # Autenticar al usuario
-        self.client.login(username='testuser', password='testpass123')
-        
         # Crear un destino de prueba
-        self.destination = Destination.objects.create(
+        cls.destination = Destination.objects.create(
             name='Marte',
             description='El planeta rojo'
         )
         
         # Crear un crucero de prueba
-        self.cruise = Cruise.objects.create(
+        cls.cruise = Cruise.objects.create(
             name='Viaje a Marte',
             description='Un increíble viaje al planeta rojo'
         )
-        self.cruise.destinations.add(self.destination)
+        cls.cruise.destinations.add(cls.destination)
         
         # Datos válidos para el formulario
-        self.valid_data = {
+        cls.valid_data = {
             'name': 'Juan Pérez',
             'email': 'juan.perez@example.com',
-            'cruise': self.cruise.id,
+            'cruise': cls.cruise.id,
             'notes': 'Estoy interesado en el crucero a Marte. ¿Podrían enviarme más información sobre fechas y precios?'
         }
+
+    def setUp(self):
+        """
+        Configuración inicial para cada test
+        """
+        self.client = Client()
+        self.url = reverse('info_request')
+        
+        # Autenticar al usuario
+        self.client.login(username='testuser', password='testpass123')
     
     def test_email_sent_when_form_submitted_with_valid_data(self):
         """
@@ -14,28 +14,29 @@ class InfoRequestValidationTest(TestCase):
     mensajes de error apropiados
     """
     
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         """
-        Configuración inicial para cada test
+        Datos compartidos por todos los tests de la clase
         """
         # Crear un destino de prueba
-        self.destination = Destination.objects.create(
+        cls.destination = Destination.objects.create(
             name='Marte',
             description='El planeta rojo'
         )
         
         # Crear un crucero de prueba
-        self.cruise = Cruise.objects.create(
+        cls.cruise = Cruise.objects.create(
             name='Viaje a Marte',
             description='Un increíble viaje al planeta rojo'
         )
-        self.cruise.destinations.add(self.destination)
+        cls.cruise.destinations.add(cls.destination)
         
         # Datos válidos para comparación
-        self.valid_data = {
+        cls.valid_data = {
             'name': 'Juan Pérez',
             'email': 'juan.perez@example.com',
-            'cruise': self.cruise,
+            'cruise': cls.cruise,
             'notes': 'Estoy interesado en el crucero a Marte.'
         }
     
@@ -0,0 +1,188 @@
+"""
+Tests del servidor de media para producción (relecloud.media)
+"""
+import gzip
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from relecloud.media import HashedMediaStorage, build_variants, parse_range
+
+
+CONTENT = bytes(range(256)) * 4
+
+
+class MediaTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write(self, name, data):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as fh:
+            fh.write(data)
+        return path
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+
+class ServeMediaTest(MediaTestCase):
+    """
+    Tests de la vista serve
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.write('videos/intro.mp4', CONTENT)
+
+    def test_full_file(self):
+        """
+        Test: Sin Range se envía el fichero entero con validadores y caché corta
+        """
+        response = self.client.get('/media/videos/intro.mp4')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), CONTENT)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_range_requests(self):
+        """
+        Test: Un rango devuelve 206 con Content-Range; uno imposible, 416
+        """
+        response = self.client.get('/media/videos/intro.mp4', HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), CONTENT[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+        self.assertEqual(response['Content-Length'], '10')
+
+        response = self.client.get('/media/videos/intro.mp4', HTTP_RANGE='bytes=-5')
+        self.assertEqual(self.body(response), CONTENT[-5:])
+
+        response = self.client.get('/media/videos/intro.mp4', HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+        # Varios rangos: se ignora la cabecera y se envía el fichero entero
+        response = self.client.get('/media/videos/intro.mp4', HTTP_RANGE='bytes=0-1,5-6')
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_requests(self):
+        """
+        Test: If-None-Match con el ETag actual da 304; If-Range con otro ETag ignora el Range
+        """
+        etag = self.client.get('/media/videos/intro.mp4')['ETag']
+
+        response = self.client.get('/media/videos/intro.mp4', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+        response = self.client.get('/media/videos/intro.mp4', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        response = self.client.get('/media/videos/intro.mp4', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"otro"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_head_and_methods(self):
+        """
+        Test: HEAD devuelve las cabeceras sin cuerpo; POST no está permitido
+        """
+        response = self.client.head('/media/videos/intro.mp4')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.client.post('/media/videos/intro.mp4').status_code, 405)
+
+    def test_missing_and_outside_files(self):
+        """
+        Test: Los ficheros que no existen, los directorios y las rutas fuera de MEDIA_ROOT dan 404
+        """
+        self.assertEqual(self.client.get('/media/videos/otro.mp4').status_code, 404)
+        self.assertEqual(self.client.get('/media/videos/').status_code, 404)
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/%2e%2e/manage.py').status_code, 404)
+
+    def test_hashed_names_are_immutable(self):
+        """
+        Test: Los nombres con hash de contenido (HashedMediaStorage) se cachean un año como immutable
+        """
+        with override_settings(STORAGES={'default': {'BACKEND': 'relecloud.media.HashedMediaStorage'}}):
+            name = HashedMediaStorage().save('destinations/Luna.jpeg', ContentFile(b'luna'))
+        self.assertRegex(name, r'^destinations/Luna\.[0-9a-f]{12}\.jpeg$')
+
+        response = self.client.get(f'/media/{name}')
+        self.assertEqual(self.body(response), b'luna')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_range_helper(self):
+        """
+        Test: parse_range distingue rangos válidos, imposibles (None) e ignorados (False)
+        """
+        self.assertEqual(parse_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(parse_range('bytes=5-100', 10), (5, 9))
+        self.assertEqual(parse_range('bytes=-100', 10), (0, 9))
+        self.assertIsNone(parse_range('bytes=10-', 10))
+        self.assertIsNone(parse_range('bytes=5-4', 10))
+        self.assertFalse(parse_range('bytes=-', 10))
+        self.assertFalse(parse_range('items=0-1', 10))
+
+
+class MediaVariantsTest(MediaTestCase):
+    """
+    Tests de las variantes .webp/.gz y su selección según Accept y Accept-Encoding
+    """
+
+    def setUp(self):
+        super().setUp()
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 30), (200, 10, 10)).save(buffer, 'JPEG')
+        self.write('destinations/Marte.jpeg', buffer.getvalue())
+        self.write('docs/rutas.json', b'{"rutas": []}' * 50)
+        self.write('videos/intro.mp4', CONTENT)
+
+    def test_build_variants(self):
+        """
+        Test: Se generan la WebP de las imágenes y el .gz del texto, y solo una vez
+        """
+        written = {os.path.relpath(path, self.media_root) for path in build_variants(self.media_root)}
+
+        self.assertTrue({'destinations/Marte.jpeg.webp', 'docs/rutas.json.gz'} <= written)
+        self.assertFalse(any(name.startswith('videos/') for name in written))
+        self.assertEqual(build_variants(self.media_root), [])
+
+    def test_variant_selection(self):
+        """
+        Test: Se sirve la WebP a quien la acepta y el .gz a quien acepta gzip, con Vary
+        """
+        build_variants(self.media_root)
+
+        response = self.client.get('/media/destinations/Marte.jpeg', HTTP_ACCEPT='image/avif,image/webp,*/*')
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['Vary'], 'Accept')
+        self.assertEqual(Image.open(io.BytesIO(self.body(response))).format, 'WEBP')
+
+        response = self.client.get('/media/destinations/Marte.jpeg', HTTP_ACCEPT='image/*')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+        response = self.client.get('/media/docs/rutas.json', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(self.body(response)), b'{"rutas": []}' * 50)
+
+        with override_settings(MEDIA_SERVING={'VARIANTS': False}):
+            response = self.client.get('/media/docs/rutas.json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
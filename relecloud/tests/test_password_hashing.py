@@ -0,0 +1,203 @@
+"""
+Tests de la política de hash de contraseñas (relecloud/hashers.py), del
+login asíncrono y de bench_password_hashing
+"""
+import threading
+from unittest import mock
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, ScryptPasswordHasher, identify_hasher, verify_password
+from django.core.checks import run_checks
+from django.test import SimpleTestCase, TestCase, override_settings
+from relecloud import catalog, hashers
+from relecloud.management.commands.bench_password_hashing import recommend
+from relecloud.models import Usuario
+
+
+PASSWORD = 'Cohete.2024!'
+
+TUNED_HASHERS = ['relecloud.hashers.TunedPBKDF2PasswordHasher', 'relecloud.hashers.TunedScryptPasswordHasher']
+
+# Costes bajos para que los tests sean rápidos
+FAST_HASHING = {'ALGORITHM': 'pbkdf2_sha256', 'PBKDF2_ITERATIONS': 1000, 'SCRYPT_WORK_FACTOR': 2 ** 10}
+
+
+def hashing(**changes):
+    """override_settings con los hashers de ReleCloud y FAST_HASHING cambiado con changes"""
+    config = {**FAST_HASHING, **changes}
+    return override_settings(
+        PASSWORD_HASHING=config, PASSWORD_HASHERS=hashers.preferred_first(TUNED_HASHERS, config['ALGORITHM']),
+    )
+
+
+@hashing()
+class HashUpgradeTest(TestCase):
+    """
+    Tests de la actualización de los hashes guardados al iniciar sesión
+    """
+
+    def setUp(self):
+        self.user = Usuario.objects.create_user(username='astronauta', email='ana@example.com', password=PASSWORD)
+        catalog.reset_snapshot()
+        self.addCleanup(catalog.reset_snapshot)
+
+    def stored_hash(self):
+        return Usuario.objects.get(pk=self.user.pk).password
+
+    def test_iterations_from_settings(self):
+        """
+        Test: TunedPBKDF2PasswordHasher usa las iteraciones de PASSWORD_HASHING
+        """
+        self.assertTrue(self.stored_hash().startswith('pbkdf2_sha256$1000$'))
+
+    def test_login_upgrades_iterations(self):
+        """
+        Test: Al iniciar sesión, un hash con otras iteraciones se recalcula con las configuradas
+        """
+        with hashing(PBKDF2_ITERATIONS=2000):
+            response = self.client.post('/login/', {'username': 'astronauta', 'password': PASSWORD})
+
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertTrue(self.stored_hash().startswith('pbkdf2_sha256$2000$'))
+
+    def test_login_upgrades_algorithm(self):
+        """
+        Test: Al cambiar ALGORITHM, los hashes PBKDF2 se verifican y se recalculan con scrypt
+        """
+        with hashing(ALGORITHM='scrypt'):
+            self.client.post('/login/', {'username': 'astronauta', 'password': PASSWORD})
+            encoded = self.stored_hash()
+
+            self.assertEqual(identify_hasher(encoded).algorithm, 'scrypt')
+            self.assertTrue(encoded.startswith('scrypt$1024$'))
+
+    def test_wrong_password_keeps_hash(self):
+        """
+        Test: Con una contraseña incorrecta no se inicia sesión ni se cambia el hash
+        """
+        encoded = self.stored_hash()
+        with hashing(PBKDF2_ITERATIONS=2000):
+            response = self.client.post('/login/', {'username': 'astronauta', 'password': 'otra'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stored_hash(), encoded)
+
+
+@hashing()
+@override_settings(ROOT_URLCONF='relecloud.async_urls')
+class AsyncLoginTest(TestCase):
+    """
+    Tests del login y el registro de las vistas asíncronas
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        with hashing():
+            cls.user = Usuario.objects.create_user(username='astronauta', email='ana@example.com', password=PASSWORD)
+
+    def setUp(self):
+        catalog.reset_snapshot()
+        self.addCleanup(catalog.reset_snapshot)
+
+    async def test_login_hashes_off_event_loop(self):
+        """
+        Test: El login asíncrono verifica la contraseña en otro hilo y actualiza el hash
+        """
+        loop_thread = threading.get_ident()
+        threads = []
+
+        def verify(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return verify_password(*args, **kwargs)
+
+        with mock.patch('relecloud.hashers.verify_password', verify), hashing(PBKDF2_ITERATIONS=2000):
+            response = await self.async_client.post('/login/', {'username': 'astronauta', 'password': PASSWORD})
+
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], loop_thread)
+        user = await Usuario.objects.aget(pk=self.user.pk)
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+
+    async def test_login_next_and_errors(self):
+        """
+        Test: Una contraseña incorrecta muestra el error; con next se redirige solo a URLs del sitio
+        """
+        response = await self.async_client.post('/login/', {'username': 'astronauta', 'password': 'otra'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].non_field_errors())
+
+        data = {'username': 'astronauta', 'password': PASSWORD}
+        response = await self.async_client.post('/login/?next=/destinations/', data)
+        self.assertRedirects(response, '/destinations/', fetch_redirect_response=False)
+        response = await self.async_client.post('/login/?next=https://example.com/', data)
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+
+    async def test_registro_hashes_off_event_loop(self):
+        """
+        Test: El registro asíncrono calcula el hash en otro hilo y save() lo reutiliza
+        """
+        loop_thread = threading.get_ident()
+        threads = []
+        make_password = hashers.make_password
+
+        def hash_password(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return make_password(*args, **kwargs)
+
+        data = {
+            'username': 'nuevo', 'first_name': 'Nuevo', 'last_name': 'Usuario', 'email': 'nuevo@example.com',
+            'password1': PASSWORD, 'password2': PASSWORD,
+        }
+        with mock.patch('relecloud.hashers.make_password', hash_password):
+            response = await self.async_client.post('/registro/', data)
+
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], loop_thread)
+        user = await Usuario.objects.aget(username='nuevo')
+        self.assertTrue(user.check_password(PASSWORD))
+
+
+class HashingPolicyTest(SimpleTestCase):
+    """
+    Tests de la comprobación relecloud.W002 y de la recomendación de bench_password_hashing
+    """
+
+    def test_minimum_work_check(self):
+        """
+        Test: Un coste por debajo del mínimo del algoritmo preferido da el aviso relecloud.W002
+        """
+        with override_settings(PASSWORD_HASHING=FAST_HASHING):
+            ids = [message.id for message in run_checks(tags=['security'])]
+        self.assertIn('relecloud.W002', ids)
+
+        with override_settings(PASSWORD_HASHING={**FAST_HASHING, 'PBKDF2_ITERATIONS': 600_000}):
+            ids = [message.id for message in run_checks(tags=['security'])]
+        self.assertNotIn('relecloud.W002', ids)
+
+    def test_defaults_keep_django_costs(self):
+        """
+        Test: Sin configuración se usan los costes de Django; los hashes guardados no bajan de coste
+        """
+        with override_settings(PASSWORD_HASHING={}):
+            self.assertEqual(hashers.TunedPBKDF2PasswordHasher().iterations, PBKDF2PasswordHasher.iterations)
+            self.assertEqual(hashers.TunedScryptPasswordHasher().work_factor, ScryptPasswordHasher.work_factor)
+            self.assertFalse(hashers.TunedPBKDF2PasswordHasher().must_update(
+                PBKDF2PasswordHasher().encode(PASSWORD, PBKDF2PasswordHasher().salt())
+            ))
+
+    def test_recommend(self):
+        """
+        Test: La recomendación escala el coste mínimo al objetivo, redondea y nunca baja del mínimo
+        """
+        self.assertEqual(recommend('pbkdf2_sha256', 100, 250), 1_500_000)
+        self.assertEqual(recommend('pbkdf2_sha256', 300, 250), 600_000)
+        self.assertEqual(recommend('scrypt', 50, 250), 2 ** 16)
+        self.assertEqual(recommend('scrypt', 300, 250), 2 ** 14)
+
+    def test_preferred_first(self):
+        """
+        Test: El hasher del algoritmo preferido pasa al principio y los demás siguen para verificar
+        """
+        self.assertEqual(hashers.preferred_first(TUNED_HASHERS, 'scrypt'), TUNED_HASHERS[::-1])
+        self.assertEqual(hashers.preferred_first(TUNED_HASHERS, 'pbkdf2_sha256'), TUNED_HASHERS)
@@ -0,0 +1,119 @@
+"""
+Tests de la precarga de estáticos críticos: cabecera Link y 103 Early Hints (relecloud.preload)
+"""
+from asgiref.testing import ApplicationCommunicator
+from django.core.asgi import get_asgi_application
+from django.test import SimpleTestCase, override_settings
+from relecloud import preload
+from relecloud.management.commands.bench_preload import parse_link_header
+from relecloud.preload import EARLY_HINT, EarlyHintsASGIMiddleware
+
+
+PRELOAD_TEST_SETTINGS = {
+    'TEMPLATES': {
+        'base.html': ['res/css/theme.css', 'res/img/cosmos-db.jpeg'],
+        'about.html': ['res/css/theme.css', 'res/js/about.js'],
+    },
+    'VIEWS': {'index': ['base.html'], 'about': ['base.html', 'about.html']},
+}
+
+BASE_LINKS = [
+    '</static/res/css/theme.css>; rel=preload; as=style',
+    '</static/res/img/cosmos-db.jpeg>; rel=preload; as=image',
+]
+
+
+def http_scope(path, extensions=None):
+    return {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'testserver')], 'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        'extensions': extensions or {},
+    }
+
+
+@override_settings(PRELOAD=PRELOAD_TEST_SETTINGS)
+class PreloadTest(SimpleTestCase):
+    """
+    Tests de PreloadMiddleware
+    """
+
+    def setUp(self):
+        preload.view_links.cache_clear()
+        self.addCleanup(preload.view_links.cache_clear)
+
+    def test_view_links(self):
+        """
+        Test: Los links de una vista juntan los estáticos de sus plantillas sin repetirlos
+        """
+        self.assertEqual(list(preload.view_links('index')), BASE_LINKS)
+        self.assertEqual(
+            list(preload.view_links('about')),
+            [*BASE_LINKS, '</static/res/js/about.js>; rel=preload; as=script'],
+        )
+        self.assertEqual(preload.view_links('perf_metrics'), ())
+
+    def test_bench_reads_link_header(self):
+        """
+        Test: El harness de medida lee de la cabecera Link las URLs que se precargan
+        """
+        header = ', '.join([*BASE_LINKS, '</otra>; rel=next'])
+        self.assertEqual(parse_link_header(header), ['/static/res/css/theme.css', '/static/res/img/cosmos-db.jpeg'])
+
+    def test_link_header_on_html_pages(self):
+        """
+        Test: La página HTML de una vista configurada lleva la cabecera Link
+        """
+        response = self.client.get('/')
+        self.assertEqual(response['Link'], ', '.join(BASE_LINKS))
+
+    def test_no_link_header_outside_configured_views(self):
+        """
+        Test: Las vistas sin plantillas en PRELOAD['VIEWS'] y las peticiones POST no llevan Link
+        """
+        self.assertFalse(self.client.get('/login/').has_header('Link'))
+        with override_settings(PRELOAD={**PRELOAD_TEST_SETTINGS, 'VIEWS': {'login': ['base.html']}}):
+            preload.view_links.cache_clear()
+            self.assertTrue(self.client.get('/login/').has_header('Link'))
+            self.assertFalse(self.client.post('/login/', {}).has_header('Link'))
+
+
+@override_settings(PRELOAD=PRELOAD_TEST_SETTINGS)
+class EarlyHintsTest(SimpleTestCase):
+    """
+    Tests del 103 Early Hints con la aplicación ASGI
+    """
+
+    def setUp(self):
+        preload.view_links.cache_clear()
+        self.addCleanup(preload.view_links.cache_clear)
+        self.application = EarlyHintsASGIMiddleware(get_asgi_application())
+
+    async def _messages(self, scope):
+        communicator = ApplicationCommunicator(self.application, scope)
+        await communicator.send_input({'type': 'http.request', 'body': b'', 'more_body': False})
+        messages = [await communicator.receive_output(5)]
+        while messages[-1]['type'] != 'http.response.body' or messages[-1].get('more_body'):
+            messages.append(await communicator.receive_output(5))
+        await communicator.wait()
+        return messages
+
+    async def test_early_hints_before_response(self):
+        """
+        Test: Con la extensión del servidor, el 103 sale antes de la respuesta y con los mismos links
+        """
+        messages = await self._messages(http_scope('/', {EARLY_HINT: {}}))
+
+        self.assertEqual(messages[0], {'type': EARLY_HINT, 'links': [link.encode() for link in BASE_LINKS]})
+        self.assertEqual(messages[1]['type'], 'http.response.start')
+        self.assertEqual(messages[1]['status'], 200)
+        self.assertIn((b'Link', ', '.join(BASE_LINKS).encode()), messages[1]['headers'])
+
+    async def test_no_early_hints_without_server_support(self):
+        """
+        Test: Sin la extensión en el scope no se envía el 103, pero sí la cabecera Link
+        """
+        messages = await self._messages(http_scope('/'))
+
+        self.assertEqual(messages[0]['type'], 'http.response.start')
+        self.assertIn((b'Link', ', '.join(BASE_LINKS).encode()), messages[0]['headers'])
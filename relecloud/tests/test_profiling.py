@@ -0,0 +1,238 @@
+"""
+Tests del profiling bajo demanda (ProfilingMiddleware y comando profiles)
+"""
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from relecloud.models import Usuario
+from relecloud.profiling import ProfilingMiddleware, StackSampler, list_profiles, make_profile_token
+
+
+class ProfilingMiddlewareTest(TestCase):
+    """
+    Tests del middleware ProfilingMiddleware
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = Usuario.objects.create_user(
+            username='staff', email='staff@example.com', password='testpass123', is_staff=True
+        )
+        cls.user = Usuario.objects.create_user(
+            username='cliente', email='cliente@example.com', password='testpass123'
+        )
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def profiling(self, **overrides):
+        return override_settings(PROFILING={'ENABLED': True, 'DIRECTORY': self.directory, **overrides})
+
+    def test_disabled_middleware_is_removed(self):
+        """
+        Test: Con ENABLED=False el middleware se descarta al arrancar
+        """
+        with override_settings(PROFILING={'ENABLED': False}):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(lambda request: None)
+
+    def test_sampled_request_writes_pstats_keyed_by_url_name(self):
+        """
+        Test: Una petición muestreada genera un .pstats con el nombre de URL
+        """
+        with self.profiling(SAMPLE_RATE=1.0):
+            response = self.client.get(reverse('about'))
+
+        files = list_profiles(self.directory)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].name.startswith('about__'))
+        self.assertEqual(files[0].suffix, '.pstats')
+        self.assertEqual(response['X-Profile-Id'], files[0].name)
+
+    def test_unsampled_request_is_not_profiled(self):
+        """
+        Test: Sin muestreo ni cabecera no se escribe ningún perfil
+        """
+        with self.profiling(SAMPLE_RATE=0.0):
+            response = self.client.get(reverse('about'))
+
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(list_profiles(self.directory), [])
+
+    def test_signed_header_forces_profiling(self):
+        """
+        Test: Una cabecera firmada válida fuerza el perfilado
+        """
+        with self.profiling(SAMPLE_RATE=0.0):
+            self.client.get(reverse('about'), HTTP_X_RELECLOUD_PROFILE=make_profile_token('staff'))
+
+        self.assertEqual(len(list_profiles(self.directory)), 1)
+
+    def test_token_of_demoted_user_is_ignored(self):
+        """
+        Test: Un token firmado deja de valer si el usuario ya no es staff
+        """
+        token = make_profile_token('staff')
+        Usuario.objects.filter(pk=self.staff.pk).update(is_staff=False)
+
+        with self.profiling(SAMPLE_RATE=0.0):
+            with self.assertLogs('relecloud.profiling', level='WARNING'):
+                self.client.get(reverse('about'), HTTP_X_RELECLOUD_PROFILE=token)
+
+        self.assertEqual(list_profiles(self.directory), [])
+
+    def test_forged_header_is_ignored(self):
+        """
+        Test: Una cabecera con firma inválida no activa el perfilado
+        """
+        with self.profiling(SAMPLE_RATE=0.0):
+            with self.assertLogs('relecloud.profiling', level='WARNING'):
+                self.client.get(reverse('about'), HTTP_X_RELECLOUD_PROFILE='staff:forged:signature')
+
+        self.assertEqual(list_profiles(self.directory), [])
+
+    def test_directory_is_rotated(self):
+        """
+        Test: Solo se conservan los MAX_FILES perfiles más recientes
+        """
+        with self.profiling(SAMPLE_RATE=1.0, MAX_FILES=2):
+            for _ in range(4):
+                self.client.get(reverse('about'))
+
+        self.assertEqual(len(list_profiles(self.directory)), 2)
+
+    def test_max_files_must_be_positive(self):
+        """
+        Test: MAX_FILES=0 se rechaza al arrancar (desactivaría la rotación)
+        """
+        with self.profiling(MAX_FILES=0), self.assertRaises(ValueError):
+            ProfilingMiddleware(lambda request: None)
+
+    def test_sampler_mode_writes_collapsed_stacks(self):
+        """
+        Test: En modo 'sampler' se genera un fichero .collapsed
+        """
+        with self.profiling(SAMPLE_RATE=1.0, MODE='sampler', SAMPLER_INTERVAL_MS=1):
+            self.client.get(reverse('destinations'))
+
+        files = list_profiles(self.directory)
+        self.assertEqual(files[0].suffix, '.collapsed')
+
+
+    def test_overlapping_cprofile_requests_fall_back_to_sampler(self):
+        """
+        Test: Con una petición perfilada con cProfile en curso, otra concurrente usa el sampler en vez de fallar
+        """
+        started, release = threading.Event(), threading.Event()
+
+        def slow_view(request):
+            started.set()
+            release.wait(5)
+            return HttpResponse()
+
+        with self.profiling(SAMPLE_RATE=1.0, SAMPLER_INTERVAL_MS=1):
+            middleware = ProfilingMiddleware(slow_view)
+            responses = []
+            first = threading.Thread(target=lambda: responses.append(middleware(RequestFactory().get('/'))))
+            first.start()
+            self.assertTrue(started.wait(5))
+            try:
+                second = ProfilingMiddleware(lambda request: HttpResponse())(RequestFactory().get('/'))
+            finally:
+                release.set()
+                first.join(5)
+
+        self.assertEqual(responses[0].status_code, 200)
+        self.assertTrue(responses[0]['X-Profile-Id'].endswith('.pstats'))
+        self.assertTrue(second['X-Profile-Id'].endswith('.collapsed'))
+        self.assertEqual(len(list_profiles(self.directory)), 2)
+
+
+class StackSamplerTest(TestCase):
+    """
+    Tests del muestreador de pilas
+    """
+
+    def test_samples_are_collapsed_root_to_leaf(self):
+        """
+        Test: Las pilas se guardan de la raíz a la hoja separadas por ';'
+        """
+        def busy_leaf():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        sampler = StackSampler(threading.get_ident(), 0.001)
+        sampler.start()
+        busy_leaf()
+        sampler.stop()
+
+        self.assertTrue(sampler.stacks)
+        stack = sampler.stacks.most_common(1)[0][0]
+        self.assertIn('busy_leaf', stack.split(';')[-1])
+        self.assertIn('test_samples_are_collapsed_root_to_leaf', stack)
+
+
+class ProfilesCommandTest(TestCase):
+    """
+    Tests del comando profiles
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = Usuario.objects.create_user(
+            username='staff', email='staff@example.com', password='testpass123', is_staff=True
+        )
+        cls.user = Usuario.objects.create_user(
+            username='cliente', email='cliente@example.com', password='testpass123'
+        )
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings_override = override_settings(PROFILING={'ENABLED': True, 'SAMPLE_RATE': 1.0, 'DIRECTORY': self.directory})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_list_and_summary(self):
+        """
+        Test: list muestra los perfiles y summary los agrega por URL
+        """
+        self.client.get(reverse('about'))
+        self.client.get(reverse('about'))
+        (self.directory / 'destinations__20260101T000000000000__1.collapsed').write_text(
+            'main (a.py:1);view (b.py:2) 3\nmain (a.py:1) 1\n'
+        )
+
+        out = StringIO()
+        call_command('profiles', 'list', stdout=out)
+        self.assertIn('Total: 3 perfiles', out.getvalue())
+
+        out = StringIO()
+        call_command('profiles', 'summary', stdout=out)
+        self.assertIn('about (2 perfiles)', out.getvalue())
+        self.assertIn('cumulative', out.getvalue())
+        self.assertIn('4 muestras', out.getvalue())
+        self.assertRegex(out.getvalue(), r'75\.0%\s+75\.0%\s+view \(b\.py:2\)')
+
+    def test_token_requires_staff(self):
+        """
+        Test: Solo se generan tokens para usuarios staff
+        """
+        out = StringIO()
+        call_command('profiles', 'token', 'staff', stdout=out, stderr=StringIO())
+        self.assertTrue(out.getvalue().startswith('staff:'))
+
+        with self.assertRaises(CommandError):
+            call_command('profiles', 'token', 'cliente', stdout=StringIO())
@@ -0,0 +1,213 @@
+"""
+Presupuesto de consultas SQL por vista
+
+Recorre todas las URLs de relecloud/urls.py y del admin con dos catálogos
+sintéticos de distinto tamaño y, para cada vista, registra el número de
+consultas y su tiempo total. Un test falla si:
+
+    - el número de consultas crece con el tamaño de los datos (N+1), o
+    - supera el presupuesto guardado en query_budgets.json
+
+Los mensajes de fallo incluyen un diff legible del SQL (normalizado, sin
+literales) entre ambos tamaños, o la lista completa de consultas.
+
+Para regenerar el presupuesto tras un cambio intencionado:
+    QUERY_BUDGET_UPDATE=1 python manage.py test relecloud.tests.test_query_budget
+Para ver el informe de consultas y tiempos:
+    QUERY_BUDGET_REPORT=1 python manage.py test relecloud.tests.test_query_budget
+"""
+import difflib
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+from django.contrib import admin
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from relecloud import urls as relecloud_urls
+from relecloud.catalog import get_snapshot
+from relecloud.models import InfoRequest, Usuario
+from relecloud.slow_queries import normalize_sql
+from relecloud.synthetic import SYNTHETIC_PASSWORD, build_catalog
+
+
+BUDGET_FILE = Path(__file__).with_name('query_budgets.json')
+
+SIZES = {
+    'small': dict(destinations=3, cruises=2, users=4, reviews_per_destination=2),
+    'large': dict(destinations=40, cruises=12, users=40, reviews_per_destination=10),
+}
+
+_SAVEPOINTS = re.compile(r'^(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT) ')
+
+
+class _QueryTimer:
+    """execute_wrapper que acumula el tiempo real de las consultas (sin redondeo)"""
+
+    def __init__(self):
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - started
+
+
+def _relecloud_scenarios(data):
+    """Escenarios para cada URL con nombre de relecloud/urls.py"""
+    destination = data['destination']
+    return {
+        'index': ('get', reverse('index'), 'anon', None),
+        'about': ('get', reverse('about'), 'anon', None),
+        'destinations': ('get', reverse('destinations'), 'anon', None),
+        'destination_detail': ('get', reverse('destination_detail', args=[destination.pk]), 'user', None),
+        'review_create': ('get', reverse('review_create', args=[destination.pk]), 'user', None),
+        'review_create [POST]': (
+            'post', reverse('review_create', args=[destination.pk]), 'user',
+            {'rating': 5, 'comment': 'Presupuesto de consultas'},
+        ),
+        'cruise_detail': ('get', reverse('cruise_detail', args=[data['cruise'].pk]), 'anon', None),
+        'info_request': ('get', reverse('info_request'), 'user', None),
+        'info_request [POST]': (
+            'post', reverse('info_request'), 'user',
+            {'name': 'Sonda', 'email': 'sonda@example.com', 'cruise': data['cruise'].pk, 'notes': 'Hola'},
+        ),
+        'registro': ('get', reverse('registro'), 'anon', None),
+        'registro [POST]': (
+            'post', reverse('registro'), 'anon',
+            {
+                'username': 'nuevo', 'first_name': 'Nuevo', 'last_name': 'Usuario',
+                'email': 'nuevo@example.com', 'telefono': '',
+                'password1': 'UnaClave-Segura-123', 'password2': 'UnaClave-Segura-123',
+            },
+        ),
+        'login': ('get', reverse('login'), 'anon', None),
+        'login [POST]': (
+            'post', reverse('login'), 'anon',
+            {'username': data['user'].username, 'password': SYNTHETIC_PASSWORD},
+        ),
+        'logout [POST]': ('post', reverse('logout'), 'user', None),
+        'perf_metrics': ('get', reverse('perf_metrics'), 'staff', None),
+    }
+
+
+def _admin_scenarios(data):
+    """Escenarios para el índice del admin y las vistas de cada modelo registrado"""
+    scenarios = {'admin:index': ('get', reverse('admin:index'), 'staff', None)}
+    for model in admin.site._registry:
+        info = (model._meta.app_label, model._meta.model_name)
+        scenarios['admin:%s_%s_changelist' % info] = (
+            'get', reverse('admin:%s_%s_changelist' % info), 'staff', None
+        )
+        scenarios['admin:%s_%s_add' % info] = ('get', reverse('admin:%s_%s_add' % info), 'staff', None)
+        obj = model._default_manager.order_by('pk').first()
+        if obj is not None:
+            scenarios['admin:%s_%s_change' % info] = (
+                'get', reverse('admin:%s_%s_change' % info, args=[obj.pk]), 'staff', None
+            )
+    return scenarios
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Ejecuta cada vista con un catálogo pequeño y otro grande y compara
+    el número de consultas contra el presupuesto versionado
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.results = {}
+        for size, params in SIZES.items():
+            sid = transaction.savepoint()
+            cls.results[size] = cls._measure_all(build_catalog(prefix=size, **params))
+            transaction.savepoint_rollback(sid)
+
+        if os.environ.get('QUERY_BUDGET_UPDATE'):
+            budgets = {name: {'max_queries': len(queries)} for name, (queries, _) in sorted(cls.results['large'].items())}
+            BUDGET_FILE.write_text(json.dumps(budgets, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+
+    @classmethod
+    def _measure_all(cls, catalog):
+        """Mide todas las vistas; cada petición se deshace con un savepoint"""
+        # Usuario con una compra de un crucero y sin reviews, para que las
+        # vistas sigan el mismo camino con cualquier tamaño de catálogo
+        cruise = catalog.cruises[0]
+        probe = Usuario.objects.create_user(
+            username=f'{catalog.staff.username}-sonda', email=f'{catalog.staff.username}-sonda@example.com',
+            password=SYNTHETIC_PASSWORD,
+        )
+        InfoRequest.objects.create(name='Sonda', email=probe.email, cruise=cruise, notes='Compra')
+        data = {'cruise': cruise, 'destination': cruise.destinations.order_by('pk').first(), 'user': probe}
+
+        # Se mide el estado estable: el snapshot del catálogo se reconstruye una
+        # vez por cambio del catálogo, no por petición (ver test_catalog)
+        get_snapshot()
+
+        clients = {'anon': Client(), 'user': Client(), 'staff': Client()}
+        clients['user'].force_login(probe)
+        clients['staff'].force_login(catalog.staff)
+
+        scenarios = {**_relecloud_scenarios(data), **_admin_scenarios(data)}
+        measured = {}
+        for name, (method, url, who, payload) in scenarios.items():
+            timer = _QueryTimer()
+            sid = transaction.savepoint()
+            with CaptureQueriesContext(connection) as ctx, connection.execute_wrapper(timer):
+                response = getattr(clients[who], method)(url, payload or {})
+            transaction.savepoint_rollback(sid)
+            assert response.status_code < 400, f'{name}: {url} respondió {response.status_code}'
+            queries = [q for q in ctx.captured_queries if not _SAVEPOINTS.match(q['sql'])]
+            measured[name] = (queries, timer.elapsed)
+        return measured
+
+    def test_every_url_has_a_scenario(self):
+        """
+        Test: Cada URL con nombre de relecloud/urls.py se mide en el harness
+        """
+        names = {p.name for p in relecloud_urls.urlpatterns if isinstance(p, URLPattern) and p.name}
+        measured = {name.split(' ')[0] for name in self.results['small']}
+        self.assertEqual(names - measured, set(), 'Añada un escenario para las URLs nuevas')
+
+    def test_query_count_does_not_grow_with_data(self):
+        """
+        Test: Ninguna vista ejecuta más consultas con más datos (sin N+1)
+        """
+        for name, (large, _) in self.results['large'].items():
+            small, _ = self.results['small'][name]
+            with self.subTest(view=name):
+                if len(large) > len(small):
+                    diff = difflib.unified_diff(
+                        [normalize_sql(q['sql']) for q in small],
+                        [normalize_sql(q['sql']) for q in large],
+                        fromfile=f'{name} (small)', tofile=f'{name} (large)', lineterm='',
+                    )
+                    self.fail(
+                        f'{name}: {len(small)} consultas con el catálogo pequeño y {len(large)} con el '
+                        f'grande.\n' + '\n'.join(diff)
+                    )
+
+    def test_query_count_within_budget(self):
+        """
+        Test: Ninguna vista supera el presupuesto de consultas de query_budgets.json
+        """
+        budgets = json.loads(BUDGET_FILE.read_text(encoding='utf-8'))
+        report = os.environ.get('QUERY_BUDGET_REPORT')
+        for name, (queries, elapsed) in self.results['large'].items():
+            if report:
+                print(f'{len(queries):4d} consultas  {elapsed * 1000:8.2f} ms  {name}')
+            with self.subTest(view=name):
+                self.assertIn(name, budgets, f'{name}: falta su presupuesto en {BUDGET_FILE.name}')
+                budget = budgets[name]['max_queries']
+                if len(queries) > budget:
+                    listing = '\n'.join(f'  {i}. {q["sql"]}' for i, q in enumerate(queries, 1))
+                    self.fail(
+                        f'{name}: {len(queries)} consultas ({elapsed * 1000:.1f} ms), presupuesto {budget}.\n'
+                        f'{listing}'
+                    )
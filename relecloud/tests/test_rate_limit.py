@@ -0,0 +1,310 @@
+"""
+Tests del límite de peticiones (relecloud/ratelimit.py) en las vistas de
+escritura, síncronas y asíncronas
+"""
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.checks import run_checks
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from relecloud import catalog, ratelimit
+from relecloud.models import Cruise, Destination, InfoRequest, Usuario
+
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ratelimit-tests'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ratelimit-tests-shared'},
+}
+
+RATE_LIMIT = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',
+    'PROXY_COUNT': 0,
+    'RATES': {'info_request': '2/h', 'registro': '2/h', 'review_create': '2/h'},
+}
+
+
+class RateLimitTestMixin:
+    """Caché y limitadores vacíos en cada test"""
+
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        ratelimit.reset_limiters()
+        catalog.reset_snapshot()
+        self.addCleanup(ratelimit.reset_limiters)
+        self.addCleanup(catalog.reset_snapshot)
+
+
+def signup(username):
+    return {
+        'username': username, 'first_name': 'Nuevo', 'last_name': 'Usuario', 'email': f'{username}@example.com',
+        'password1': 'Cohete.2024!', 'password2': 'Cohete.2024!',
+    }
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TokenBucketLimiterTest(RateLimitTestMixin, SimpleTestCase):
+    """
+    Tests del token bucket compartido y del L1 de cada proceso
+    """
+
+    def test_burst_then_retry_after(self):
+        """
+        Test: Se conceden burst tokens; después se rechaza con la espera hasta el siguiente token
+        """
+        limiter = ratelimit.TokenBucketLimiter('test', 3, 60, lease_fraction=0)
+
+        self.assertEqual([limiter.hit('a', now=1000) for _ in range(3)], [None, None, None])
+        self.assertAlmostEqual(limiter.hit('a', now=1000), 20)
+        self.assertIsNone(limiter.hit('b', now=1000))
+        self.assertIsNone(limiter.hit('a', now=1020))
+
+    def test_bucket_shared_between_processes(self):
+        """
+        Test: Dos limitadores (dos workers) con la misma caché comparten los tokens
+        """
+        first = ratelimit.TokenBucketLimiter('test', 3, 60, lease_fraction=0)
+        second = ratelimit.TokenBucketLimiter('test', 3, 60, lease_fraction=0)
+
+        self.assertIsNone(first.hit('a', now=1000))
+        self.assertIsNone(first.hit('a', now=1000))
+        self.assertIsNone(second.hit('a', now=1000))
+        self.assertIsNotNone(second.hit('a', now=1000))
+        self.assertIsNotNone(first.hit('a', now=1000))
+
+    def test_lease_serves_from_l1(self):
+        """
+        Test: Un viaje a la caché presta varios tokens y los siguientes hits no vuelven a ella
+        """
+        limiter = ratelimit.TokenBucketLimiter('test', 10, 60, lease_fraction=0.5, lease_ttl=5)
+        self.assertIsNone(limiter.hit('a', now=1000))
+
+        with mock.patch.object(limiter, '_acquire') as acquire:
+            for _ in range(4):
+                self.assertIsNone(limiter.hit('a', now=1001))
+        acquire.assert_not_called()
+
+        # Los préstamos de ambos viajes cuentan contra el mismo límite
+        self.assertIsNone(limiter.hit('a', now=1001))
+        self.assertIsNotNone(ratelimit.TokenBucketLimiter('test', 10, 60, lease_fraction=0).hit('a', now=1001))
+        self.assertEqual(ratelimit.rate_limit_stats()['test'], {'allowed_local': 4, 'allowed_shared': 2, 'denied_shared': 1})
+
+    def test_denial_cached_in_l1(self):
+        """
+        Test: Un cliente rechazado no vuelve a la caché hasta su Retry-After
+        """
+        limiter = ratelimit.TokenBucketLimiter('test', 1, 60)
+        limiter.hit('a', now=1000)
+        self.assertAlmostEqual(limiter.hit('a', now=1000), 60)
+
+        with mock.patch.object(limiter, '_acquire') as acquire:
+            self.assertAlmostEqual(limiter.hit('a', now=1030), 30)
+        acquire.assert_not_called()
+        self.assertIsNone(limiter.hit('a', now=1060))
+
+    def test_expired_lease_is_not_reused(self):
+        """
+        Test: Los tokens prestados caducan tras L1_LEASE_TTL y no permiten superar el límite
+        """
+        limiter = ratelimit.TokenBucketLimiter('test', 4, 3600, lease_fraction=1, lease_ttl=1)
+        self.assertIsNone(limiter.hit('a', now=1000))
+        self.assertIsNotNone(limiter.hit('a', now=1002))
+
+    async def test_async_hit(self):
+        """
+        Test: ahit() decide igual que hit() con el viaje a la caché en otro hilo
+        """
+        limiter = ratelimit.TokenBucketLimiter('test', 1, 60)
+        self.assertIsNone(await limiter.ahit('a', now=1000))
+        self.assertAlmostEqual(await limiter.ahit('a', now=1000), 60)
+
+
+class FileBasedBucketTest(SimpleTestCase):
+    """
+    Tests del token bucket sobre FileBasedCache (el L2 por defecto), cuyo incr()/decr() no es nativo
+    """
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        caches_setting = {
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory},
+        }
+        override = override_settings(CACHES=caches_setting)
+        override.enable()
+        self.addCleanup(override.disable)
+        ratelimit.reset_limiters()
+        self.addCleanup(ratelimit.reset_limiters)
+
+    def test_denied_bucket_outlives_default_cache_timeout(self):
+        """
+        Test: Tras un rechazo la clave dura key_timeout y no los 300 s por defecto de la caché
+        """
+        with mock.patch('time.time', return_value=1000):
+            limiter = ratelimit.TokenBucketLimiter('test', 10, 3600, lease_fraction=0)
+            self.assertEqual([limiter.hit('a', now=1000) for _ in range(10)], [None] * 10)
+            self.assertIsNotNone(limiter.hit('a', now=1000))
+
+        # 400 s después solo se ha rellenado un token (uno cada 360 s); otro
+        # worker, sin el rechazo en su L1, no debe encontrar el bucket lleno
+        with mock.patch('time.time', return_value=1400):
+            other = ratelimit.TokenBucketLimiter('test', 10, 3600, lease_fraction=0)
+            self.assertIsNone(other.hit('a', now=1400))
+            self.assertIsNotNone(other.hit('a', now=1400))
+
+
+class RateLimitConfigTest(SimpleTestCase):
+    """
+    Tests de las reglas, la IP del cliente y la comprobación relecloud.E001
+    """
+
+    def test_parse_rate(self):
+        """
+        Test: 'N/periodo' da la capacidad y los segundos; los formatos no válidos lanzan ValueError
+        """
+        self.assertEqual(ratelimit.parse_rate('10/h'), (10, 3600.0))
+        self.assertEqual(ratelimit.parse_rate('5/30s'), (5, 30.0))
+        for rate in ('10', '10/x', 'diez/h', '0/h', '10/0m', ''):
+            with self.subTest(rate=rate), self.assertRaises(ValueError):
+                ratelimit.parse_rate(rate)
+
+    def test_invalid_rate_check(self):
+        """
+        Test: Una regla no válida en RATE_LIMIT da el error relecloud.E001
+        """
+        with override_settings(RATE_LIMIT={**RATE_LIMIT, 'RATES': {'registro': '20/semana'}}):
+            ids = [message.id for message in run_checks()]
+        self.assertIn('relecloud.E001', ids)
+
+        with override_settings(RATE_LIMIT=RATE_LIMIT):
+            ids = [message.id for message in run_checks()]
+        self.assertNotIn('relecloud.E001', ids)
+
+    def test_client_ip(self):
+        """
+        Test: Sin proxies se usa REMOTE_ADDR; con PROXY_COUNT, la IP que añadió el proxy más externo
+        """
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.7')
+
+        self.assertEqual(ratelimit.client_ip(request), '10.0.0.1')
+        self.assertEqual(ratelimit.client_ip(request, proxy_count=1), '203.0.113.7')
+        self.assertEqual(ratelimit.client_ip(request, proxy_count=2), '1.1.1.1')
+        self.assertEqual(ratelimit.client_ip(request, proxy_count=5), '1.1.1.1')
+
+    def test_disabled(self):
+        """
+        Test: Con ENABLED False o sin regla para el scope no hay limitador
+        """
+        with override_settings(RATE_LIMIT={**RATE_LIMIT, 'ENABLED': False}):
+            self.assertIsNone(ratelimit.get_limiter('registro'))
+        with override_settings(RATE_LIMIT=RATE_LIMIT):
+            self.assertIsNone(ratelimit.get_limiter('otra'))
+            self.assertIsNotNone(ratelimit.get_limiter('registro'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, RATE_LIMIT=RATE_LIMIT)
+class RateLimitViewsTest(RateLimitTestMixin, TestCase):
+    """
+    Tests de RateLimitMixin en las vistas de escritura
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Usuario.objects.create_user(username='viajero', email='viajero@example.com', password='Cohete.2024!')
+        cls.other = Usuario.objects.create_user(username='otro', email='otro@example.com', password='Cohete.2024!')
+        cls.destination = Destination.objects.create(name='Marte', description='El planeta rojo')
+        cls.cruise = Cruise.objects.create(name='Expedición a Marte', description='Viaje')
+        cls.cruise.destinations.add(cls.destination)
+
+    def info_request(self):
+        return self.client.post('/info_request', {
+            'name': 'Ana Viajera', 'email': 'ana@example.com', 'cruise': self.cruise.pk, 'notes': 'Fechas',
+        })
+
+    def test_info_request_limited_per_user(self):
+        """
+        Test: Tras la ráfaga, info_request responde 429 con Retry-After sin guardar la solicitud
+        """
+        self.client.force_login(self.user)
+        self.assertEqual([self.info_request().status_code for _ in range(2)], [302, 302])
+
+        response = self.info_request()
+        self.assertEqual(response.status_code, 429)
+        # Retry-After se calcula con el reloj real: admite lo que tarden las peticiones
+        self.assertAlmostEqual(int(response['Retry-After']), 1800, delta=5)
+        self.assertContains(response, 'Demasiadas solicitudes', status_code=429)
+        self.assertEqual(InfoRequest.objects.count(), 2)
+
+        # El bucket es del usuario: otro usuario desde la misma IP no está limitado
+        self.client.force_login(self.other)
+        self.assertEqual(self.info_request().status_code, 302)
+
+    def test_get_not_limited(self):
+        """
+        Test: Solo se limitan los POST; el formulario se sigue mostrando
+        """
+        self.client.force_login(self.user)
+        for _ in range(3):
+            self.info_request()
+        self.assertEqual(self.client.get('/info_request').status_code, 200)
+
+    def test_anonymous_redirected_without_spending_tokens(self):
+        """
+        Test: Un anónimo se redirige al login antes de gastar tokens de su IP
+        """
+        for _ in range(3):
+            self.assertEqual(self.info_request().status_code, 302)
+        self.assertNotIn('info_request', ratelimit.rate_limit_stats())
+
+    def test_registro_limited_per_ip(self):
+        """
+        Test: El registro se limita por IP y las reglas de cada vista son independientes
+        """
+        for username in ('uno', 'dos'):
+            self.assertEqual(self.client.post('/registro/', signup(username)).status_code, 302)
+        self.assertEqual(self.client.post('/registro/', signup('tres')).status_code, 429)
+        self.assertFalse(Usuario.objects.filter(username='tres').exists())
+
+        response = self.client.post('/registro/', signup('tres'), REMOTE_ADDR='203.0.113.7')
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.info_request().status_code, 302)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, RATE_LIMIT=RATE_LIMIT, ROOT_URLCONF='relecloud.async_urls')
+class AsyncRateLimitTest(RateLimitTestMixin, TestCase):
+    """
+    Tests de @rate_limit en las vistas asíncronas
+    """
+
+    async def test_registro_limited(self):
+        """
+        Test: El registro asíncrono responde 429 con Retry-After tras la ráfaga
+        """
+        for username in ('uno', 'dos'):
+            response = await self.async_client.post('/registro/', signup(username))
+            self.assertEqual(response.status_code, 302)
+
+        response = await self.async_client.post('/registro/', signup('tres'))
+        self.assertEqual(response.status_code, 429)
+        # Retry-After se calcula con el reloj real: admite lo que tarden las peticiones
+        self.assertAlmostEqual(int(response['Retry-After']), 1800, delta=5)
+        self.assertFalse(await Usuario.objects.filter(username='tres').aexists())
+
+    async def test_anonymous_redirected_without_spending_tokens(self):
+        """
+        Test: Como en las vistas síncronas, un anónimo se redirige al login antes de gastar tokens de su IP
+        """
+        destination = await Destination.objects.acreate(name='Marte', description='El planeta rojo')
+        for _ in range(3):
+            response = await self.async_client.post('/info_request', {'name': 'Ana', 'email': 'ana@example.com'})
+            self.assertEqual(response.status_code, 302)
+            self.assertIn('/login/', response.url)
+            response = await self.async_client.post(f'/destination/{destination.pk}/review/create/', {'rating': 5})
+            self.assertEqual(response.status_code, 302)
+            self.assertIn('/login/', response.url)
+        self.assertEqual(ratelimit.rate_limit_stats(), {})
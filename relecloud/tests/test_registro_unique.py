@@ -0,0 +1,92 @@
+"""
+Tests de la unicidad de username y email en el registro sin distinguir
+mayúsculas (índices únicos de Usuario y RegistroUsuarioForm.add_unique_error)
+"""
+from django.db import IntegrityError, connection, transaction
+from django.db.models.functions import Lower
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from relecloud.forms import RegistroUsuarioForm
+from relecloud.models import Usuario
+
+
+PASSWORD = 'Cohete.2024!'
+
+
+def signup_data(username, email):
+    return {
+        'username': username, 'first_name': 'Nuevo', 'last_name': 'Usuario', 'email': email,
+        'telefono': '600000000', 'password1': PASSWORD, 'password2': PASSWORD,
+    }
+
+
+class RegistroUniqueTest(TestCase):
+    """
+    Tests del registro con usuarios ya existentes
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Usuario.objects.create_user(username='astronauta', email='ana@example.com', password=PASSWORD)
+
+    def test_case_variant_email_rejected(self):
+        """
+        Test: Un email que solo cambia en mayúsculas se rechaza con el error del campo
+        """
+        response = self.client.post('/registro/', signup_data('nuevo', 'Ana@Example.COM'))
+
+        self.assertFormError(response.context['form'], 'email', 'Este correo electrónico ya está registrado.')
+        self.assertFormError(response.context['form'], 'username', [])
+        self.assertEqual(Usuario.objects.count(), 1)
+
+    def test_case_variant_username_rejected(self):
+        """
+        Test: Un username que solo cambia en mayúsculas se rechaza con el error del campo
+        """
+        response = self.client.post('/registro/', signup_data('ASTRONAUTA', 'otra@example.com'))
+
+        self.assertFormError(response.context['form'], 'username', 'Este nombre de usuario ya está en uso.')
+        self.assertFormError(response.context['form'], 'email', [])
+
+    def test_both_fields_taken(self):
+        """
+        Test: Si chocan los dos campos se muestran los dos errores, aunque la base de datos informe solo de uno
+        """
+        response = self.client.post('/registro/', signup_data('astronauta', 'ANA@example.com'))
+
+        self.assertFormError(response.context['form'], 'username', 'Este nombre de usuario ya está en uso.')
+        self.assertFormError(response.context['form'], 'email', 'Este correo electrónico ya está registrado.')
+
+    def test_signup_without_precheck_queries(self):
+        """
+        Test: Un registro válido no consulta la tabla de usuarios antes del INSERT
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/registro/', signup_data('nuevo', 'nuevo@example.com'))
+
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertFalse([q['sql'] for q in queries if q['sql'].startswith('SELECT')])
+        self.assertTrue(Usuario.objects.filter(username='nuevo').exists())
+
+    def test_database_rejects_case_variant(self):
+        """
+        Test: Los índices únicos son de lower(username) y lower(email)
+        """
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Usuario.objects.create(username='otro', email='ANA@EXAMPLE.COM')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Usuario.objects.create(username='Astronauta', email='otro@example.com')
+        self.assertEqual(Usuario.objects.filter(email__iexact='ana@example.com').count(), 1)
+        self.assertEqual(
+            Usuario.objects.alias(lower=Lower('username')).filter(lower='astronauta').count(), 1,
+        )
+
+    def test_unrelated_integrity_error(self):
+        """
+        Test: add_unique_error retorna False y no añade errores para otros IntegrityError
+        """
+        form = RegistroUsuarioForm(signup_data('nuevo', 'nuevo@example.com'))
+        self.assertTrue(form.is_valid())
+
+        self.assertFalse(form.add_unique_error(IntegrityError('NOT NULL constraint failed: relecloud_review.user_id')))
+        self.assertEqual(form.errors, {})
@@ -0,0 +1,269 @@
+"""
+Tests del enrutado de lecturas a réplicas (relecloud.replicas)
+
+Sin réplicas configuradas, los tests de integración usan 'default' como si
+fuera la réplica y observan las decisiones del router. Con
+DATABASE_REPLICA_URLS (p. ej. sqlite:///db-replica.sqlite3) se ejecutan
+también los tests contra la réplica real, que en tests es un espejo de
+'default' (TEST MIRROR).
+"""
+from unittest import mock, skipUnless
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, OperationalError, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from relecloud import replicas
+from relecloud.models import Destination
+from relecloud.replicas import ReplicaRouter, ReplicaRoutingMiddleware, replica_reads, routing_state
+from relecloud.tests.test_db_profile import SLOW_SQL
+from relecloud.timeouts import statement_timeout
+
+
+REPLICA_ALIASES = [alias for alias in connections if alias != 'default']
+
+
+def routing(replicas_list, **overrides):
+    return override_settings(REPLICA_ROUTING={
+        'REPLICAS': replicas_list, 'LAG_TOLERANCE_S': 5, 'HEALTH_CHECK_INTERVAL_S': 30, **overrides,
+    })
+
+
+class ReplicaRouterTest(SimpleTestCase):
+    """
+    Tests de las decisiones de ReplicaRouter
+    """
+
+    def setUp(self):
+        replicas.reset_health()
+        self.router = ReplicaRouter()
+        patcher = mock.patch('relecloud.replicas.check_replica', return_value=True)
+        self.check_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @routing(['replica1'])
+    def test_only_marked_reads_go_to_replica(self):
+        """
+        Test: Solo las lecturas dentro de replica_reads() van a la réplica
+        """
+        self.assertIsNone(self.router.db_for_read(Destination))
+        with routing_state():
+            self.assertIsNone(self.router.db_for_read(Destination))
+            with replica_reads():
+                self.assertEqual(self.router.db_for_read(Destination), 'replica1')
+            self.assertIsNone(self.router.db_for_read(Destination))
+
+    @routing(['replica1'])
+    def test_read_after_write_uses_primary(self):
+        """
+        Test: Tras una escritura, o con la petición fijada al primario, se lee de 'default'
+        """
+        with routing_state(), replica_reads():
+            self.assertEqual(self.router.db_for_write(Destination), 'default')
+            self.assertIsNone(self.router.db_for_read(Destination))
+
+        with routing_state(primary_pinned=True), replica_reads():
+            self.assertIsNone(self.router.db_for_read(Destination))
+
+    @routing(['replica1', 'replica2'])
+    def test_unhealthy_replicas_are_skipped(self):
+        """
+        Test: Las réplicas caídas se descartan y sin ninguna sana se lee de 'default'
+        """
+        self.check_replica.side_effect = lambda alias, lag: alias == 'replica2'
+        with routing_state(), replica_reads():
+            self.assertEqual({self.router.db_for_read(Destination) for _ in range(10)}, {'replica2'})
+
+        replicas.reset_health()
+        self.check_replica.side_effect = None
+        self.check_replica.return_value = False
+        with routing_state(), replica_reads():
+            self.assertEqual(self.router.db_for_read(Destination), 'default')
+
+    @routing(['replica1'], HEALTH_CHECK_INTERVAL_S=30)
+    def test_health_is_cached(self):
+        """
+        Test: La salud de cada réplica se comprueba una vez por intervalo
+        """
+        for _ in range(5):
+            self.assertTrue(replicas.replica_is_healthy('replica1'))
+        self.assertEqual(self.check_replica.call_count, 1)
+        self.check_replica.assert_called_with('replica1', 5)
+
+    @routing(['replica1'])
+    def test_migrations_only_on_primary(self):
+        """
+        Test: No se migra en las réplicas
+        """
+        self.assertFalse(self.router.allow_migrate('replica1', 'relecloud'))
+        self.assertIsNone(self.router.allow_migrate('default', 'relecloud'))
+
+
+class ReplicaRoutingMiddlewareTest(SimpleTestCase):
+    """
+    Tests de ReplicaRoutingMiddleware
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    @routing([])
+    def test_disabled_without_replicas(self):
+        """
+        Test: Sin réplicas el middleware se elimina de la cadena
+        """
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+    @routing(['replica1'], LAG_TOLERANCE_S=2.5)
+    def test_write_sets_primary_cookie(self):
+        """
+        Test: Una petición que escribe deja la cookie durante la tolerancia de retraso
+        """
+        def view(request):
+            ReplicaRouter().db_for_write(Destination)
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(view)(self.factory.get('/'))
+
+        cookie = response.cookies['relecloud_primary']
+        self.assertEqual(cookie['max-age'], 3)
+        self.assertTrue(cookie['httponly'])
+
+        read_only = ReplicaRoutingMiddleware(lambda request: HttpResponse())(self.factory.get('/'))
+        self.assertNotIn('relecloud_primary', read_only.cookies)
+
+    @routing(['replica1'])
+    def test_cookie_and_unsafe_methods_pin_primary(self):
+        """
+        Test: Con la cookie o en un POST, toda la petición lee del primario
+        """
+        seen = []
+
+        def view(request):
+            seen.append(replicas._state.get().primary_pinned)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        middleware(self.factory.get('/'))
+        middleware(self.factory.post('/'))
+        request = self.factory.get('/')
+        request.COOKIES['relecloud_primary'] = '1'
+        middleware(request)
+
+        self.assertEqual(seen, [False, True, True])
+
+
+class CatalogRoutingTest(TestCase):
+    """
+    Tests de integración: 'default' hace de réplica y se registran las
+    decisiones del router
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.destination = Destination.objects.create(name='Marte', description='El planeta rojo')
+
+    def setUp(self):
+        replicas.reset_health()
+        self.decisions = []
+        original = ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            decision = original(router, model, **hints)
+            self.decisions.append(decision)
+            return decision
+
+        patcher = mock.patch.object(ReplicaRouter, 'db_for_read', spy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @routing(['default'])
+    def test_catalog_pages_read_from_replica(self):
+        """
+        Test: Las páginas del catálogo leen de la réplica
+        """
+        for url in (reverse('destinations'), reverse('destination_detail', args=[self.destination.pk])):
+            with self.subTest(url=url):
+                self.decisions.clear()
+                self.assertEqual(self.client.get(url).status_code, 200)
+                self.assertTrue(self.decisions)
+                self.assertEqual(set(self.decisions), {'default'})
+
+    @routing(['default'])
+    def test_streamed_fallback_rows_read_from_replica(self):
+        """
+        Test: Sin snapshot, las filas que se leen al enviar el listado en streaming también van a la réplica
+        """
+        with mock.patch('relecloud.catalog.get_snapshot', side_effect=DatabaseError('caída')), \
+                self.assertLogs('relecloud.views', 'ERROR'):
+            response = self.client.get(reverse('destinations'))
+            content = b''.join(response.streaming_content).decode()
+
+        self.assertIn('Marte', content)
+        self.assertEqual(set(self.decisions), {'default'})
+
+    @routing(['default'])
+    def test_session_reads_primary_after_write(self):
+        """
+        Test: Tras una escritura, la siguiente petición de la sesión no usa la réplica
+        """
+        url = reverse('destinations')
+        response = self.client.post(reverse('registro'), {
+            'username': 'nuevo', 'first_name': 'Nuevo', 'last_name': 'Usuario',
+            'email': 'nuevo@example.com', 'telefono': '',
+            'password1': 'UnaClave-Segura-123', 'password2': 'UnaClave-Segura-123',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('relecloud_primary', self.client.cookies)
+
+        self.decisions.clear()
+        self.client.get(url)
+        self.assertEqual(set(self.decisions), {None})
+
+        del self.client.cookies['relecloud_primary']
+        self.decisions.clear()
+        self.client.get(url)
+        self.assertEqual(set(self.decisions), {'default'})
+
+
+@skipUnless(REPLICA_ALIASES, 'requiere DATABASE_REPLICA_URLS')
+class RealReplicaTest(TransactionTestCase):
+    """
+    Tests contra una réplica configurada (espejo de 'default' en tests)
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        replicas.reset_health()
+
+    def test_catalog_queries_run_on_replica(self):
+        """
+        Test: El listado de destinos ejecuta sus consultas en la réplica
+        """
+        Destination.objects.create(name='Marte', description='El planeta rojo')
+        replica = REPLICA_ALIASES[0]
+
+        with routing([replica]), CaptureQueriesContext(connections[replica]) as queries:
+            response = self.client.get(reverse('destinations'))
+
+        self.assertContains(response, 'Marte')
+        self.assertTrue(queries.captured_queries)
+
+    def test_catalog_views_limit_replica_statements(self):
+        """
+        Test: Las sentencias en la réplica también se cortan con el statement_timeout de la vista
+        """
+        replica = connections[REPLICA_ALIASES[0]]
+        slow_sql = SLOW_SQL if replica.vendor == 'sqlite' else 'SELECT pg_sleep(1)'
+        with self.assertLogs('relecloud.timeouts', level='WARNING'), self.assertRaises(OperationalError):
+            with statement_timeout(20), replica.cursor() as cursor:
+                cursor.execute(slow_sql)
+
+    def test_replica_health_check(self):
+        """
+        Test: La réplica configurada responde a la comprobación de salud
+        """
+        self.assertTrue(replicas.check_replica(REPLICA_ALIASES[0], lag_tolerance=5))
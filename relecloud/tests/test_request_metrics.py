@@ -0,0 +1,111 @@
+"""
+Tests del middleware de métricas por petición y de los histogramas
+"""
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from relecloud import metrics
+from relecloud.models import Destination, Usuario
+
+
+class HistogramTest(TestCase):
+    """
+    Tests del histograma de buckets fijos
+    """
+
+    def test_percentiles_use_bucket_upper_bound(self):
+        """
+        Test: Los percentiles se estiman con el límite superior del bucket
+        """
+        histogram = metrics.Histogram((1, 10, 100))
+        for value in [0.5] * 90 + [50] * 10:
+            histogram.observe(value)
+
+        self.assertEqual(histogram.percentile(50), 1)
+        self.assertEqual(histogram.percentile(95), 100)
+        self.assertEqual(histogram.as_dict()['count'], 100)
+
+    def test_values_above_last_bound_go_to_overflow_bucket(self):
+        """
+        Test: Los valores mayores que el último límite se cuentan en 'inf'
+        """
+        histogram = metrics.Histogram((1, 10))
+        histogram.observe(500)
+
+        self.assertEqual(histogram.as_dict()['buckets']['inf'], 1)
+        self.assertEqual(histogram.percentile(99), 500)
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+    """
+    Tests del middleware RequestMetricsMiddleware
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.destination = Destination.objects.create(name='Marte', description='El planeta rojo')
+        cls.staff = Usuario.objects.create_user(
+            username='staff', email='staff@example.com', password='testpass123', is_staff=True
+        )
+
+    def setUp(self):
+        metrics.reset()
+
+    def test_server_timing_header_reports_queries_and_template(self):
+        """
+        Test: La respuesta incluye Server-Timing con total, db y tpl
+        """
+        response = self.client.get(reverse('destination_detail', args=[self.destination.pk]))
+
+        header = response['Server-Timing']
+        self.assertIn('total;dur=', header)
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn('tpl;dur=', header)
+
+    def test_histograms_are_aggregated_by_url_name(self):
+        """
+        Test: Cada petición se agrega a los histogramas de su nombre de URL
+        """
+        self.client.get(reverse('destinations'))
+        self.client.get(reverse('destinations'))
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['destinations']['wall_ms']['count'], 2)
+        self.assertGreaterEqual(snapshot['destinations']['db_queries']['min'], 1)
+        self.assertGreater(snapshot['destinations']['template_ms']['max'], 0)
+
+    def test_structured_log_line_is_json(self):
+        """
+        Test: Se escribe una línea de log JSON por petición
+        """
+        with self.assertLogs('relecloud.middleware', level='INFO') as logs:
+            self.client.get(reverse('about'))
+
+        entry = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(entry['url_name'], 'about')
+        self.assertEqual(entry['status'], 200)
+
+    @override_settings(PERF_METRICS={'SAMPLE_RATE': 0.0})
+    def test_unsampled_requests_are_not_measured(self):
+        """
+        Test: Con SAMPLE_RATE=0 no hay cabecera ni histogramas
+        """
+        response = self.client.get(reverse('about'))
+
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_metrics_endpoint_is_staff_only(self):
+        """
+        Test: El endpoint de métricas redirige a usuarios no staff
+        """
+        response = self.client.get(reverse('perf_metrics'))
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(self.staff)
+        self.client.get(reverse('about'))
+        response = self.client.get(reverse('perf_metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('about', response.json()['metrics'])
@@ -2,7 +2,7 @@ from django.test import TestCase
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 from django.urls import reverse
-from .models import Destination, Review, Usuario, Cruise, InfoRequest
+from relecloud.models import Destination, Review, Usuario, Cruise, InfoRequest
 from datetime import datetime
 
 # Create your tests here.
@@ -10,10 +10,11 @@ from datetime import datetime
 class ReviewModelTest(TestCase):
     """Tests para el modelo Review"""
     
-    def setUp(self):
-        """Configuración inicial para cada test"""
+    @classmethod
+    def setUpTestData(cls):
+        """Datos compartidos por todos los tests de la clase"""
         # Crear un usuario de prueba
-        self.user = Usuario.objects.create_user(
+        cls.user = Usuario.objects.create_user(
             username='testuser',
             email='test@example.com',
             password='testpass123',
@@ -22,7 +23,7 @@ class ReviewModelTest(TestCase):
         )
         
         # Crear un destino de prueba
-        self.destination = Destination.objects.create(
+        cls.destination = Destination.objects.create(
             name='Luna',
             description='Nuestro satélite natural'
         )
@@ -193,10 +194,11 @@ class ReviewModelTest(TestCase):
 class ReviewViewTest(TestCase):
     """Tests para las vistas de Review"""
     
-    def setUp(self):
-        """Configuración inicial para cada test"""
+    @classmethod
+    def setUpTestData(cls):
+        """Datos compartidos por todos los tests de la clase"""
         # Crear usuarios
-        self.user_without_purchase = Usuario.objects.create_user(
+        cls.user_without_purchase = Usuario.objects.create_user(
             username='user_no_compra',
             email='nocompra@example.com',
             password='testpass123',
@@ -204,7 +206,7 @@ class ReviewViewTest(TestCase):
             last_name='Sin Compra'
         )
         
-        self.user_with_purchase = Usuario.objects.create_user(
+        cls.user_with_purchase = Usuario.objects.create_user(
             username='user_con_compra',
             email='concompra@example.com',
             password='testpass123',
@@ -213,28 +215,28 @@ class ReviewViewTest(TestCase):
         )
         
         # Crear destino
-        self.destination = Destination.objects.create(
+        cls.destination = Destination.objects.create(
             name='Marte',
             description='El planeta rojo'
         )
         
         # Crear crucero
-        self.cruise = Cruise.objects.create(
+        cls.cruise = Cruise.objects.create(
             name='Expedición a Marte',
             description='Viaje de 2 semanas al planeta rojo'
         )
-        self.cruise.destinations.add(self.destination)
+        cls.cruise.destinations.add(cls.destination)
         
         # Crear InfoRequest (simulando compra) para user_with_purchase
-        self.info_request = InfoRequest.objects.create(
-            name=self.user_with_purchase.get_full_name(),
-            email=self.user_with_purchase.email,
-            cruise=self.cruise,
+        cls.info_request = InfoRequest.objects.create(
+            name=cls.user_with_purchase.get_full_name(),
+            email=cls.user_with_purchase.email,
+            cruise=cls.cruise,
             notes='Quiero información'
         )
         
         # URL para crear review
-        self.create_review_url = f'/destination/{self.destination.id}/review/create/'
+        cls.create_review_url = f'/destination/{cls.destination.id}/review/create/'
     
     def test_unauthenticated_user_redirected_to_login(self):
         """Test: Usuario no autenticado es redirigido al login"""
@@ -357,10 +359,11 @@ class ReviewViewTest(TestCase):
 class ReviewCalculationTest(TestCase):
     """Tests para cálculos y conteos de reviews"""
     
-    def setUp(self):
-        """Configuración inicial para cada test"""
+    @classmethod
+    def setUpTestData(cls):
+        """Datos compartidos por todos los tests de la clase"""
         # Crear usuarios
-        self.user1 = Usuario.objects.create_user(
+        cls.user1 = Usuario.objects.create_user(
             username='user1',
             email='user1@example.com',
             password='testpass123',
@@ -368,7 +371,7 @@ class ReviewCalculationTest(TestCase):
             last_name='One'
         )
         
-        self.user2 = Usuario.objects.create_user(
+        cls.user2 = Usuario.objects.create_user(
             username='user2',
             email='user2@example.com',
             password='testpass123',
@@ -376,7 +379,7 @@ class ReviewCalculationTest(TestCase):
             last_name='Two'
         )
         
-        self.user3 = Usuario.objects.create_user(
+        cls.user3 = Usuario.objects.create_user(
             username='user3',
             email='user3@example.com',
             password='testpass123',
@@ -385,12 +388,12 @@ class ReviewCalculationTest(TestCase):
         )
         
         # Crear destinos
-        self.destination_with_reviews = Destination.objects.create(
+        cls.destination_with_reviews = Destination.objects.create(
             name='Luna',
             description='Nuestro satélite natural'
         )
         
-        self.destination_without_reviews = Destination.objects.create(
+        cls.destination_without_reviews = Destination.objects.create(
             name='Marte',
             description='El planeta rojo'
         )
@@ -559,10 +562,11 @@ class ReviewTemplateTest(TestCase):
     Tests para verificar la presentación de reviews en templates
     """
     
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         """Configurar datos de prueba"""
         # Crear usuario
-        self.user = Usuario.objects.create_user(
+        cls.user = Usuario.objects.create_user(
             username='testuser',
             email='test@example.com',
             password='testpass123',
@@ -571,26 +575,26 @@ class ReviewTemplateTest(TestCase):
         )
         
         # Crear destinos
-        self.destination_with_reviews = Destination.objects.create(
+        cls.destination_with_reviews = Destination.objects.create(
             name='Marte',
             description='El planeta rojo'
         )
         
-        self.destination_without_reviews = Destination.objects.create(
+        cls.destination_without_reviews = Destination.objects.create(
             name='Venus',
             description='El planeta del amor'
         )
         
         # Crear reviews para el primer destino
         Review.objects.create(
-            destination=self.destination_with_reviews,
-            user=self.user,
+            destination=cls.destination_with_reviews,
+            user=cls.user,
             rating=4,
             comment='Excelente destino'
         )
         
         Review.objects.create(
-            destination=self.destination_with_reviews,
+            destination=cls.destination_with_reviews,
             user=Usuario.objects.create_user(
                 username='user2',
                 email='user2@example.com',
@@ -601,7 +605,7 @@ class ReviewTemplateTest(TestCase):
         )
         
         Review.objects.create(
-            destination=self.destination_with_reviews,
+            destination=cls.destination_with_reviews,
             user=Usuario.objects.create_user(
                 username='user3',
                 email='user3@example.com',
@@ -617,12 +621,14 @@ class ReviewTemplateTest(TestCase):
         """
         response = self.client.get(reverse('destinations'))
         self.assertEqual(response.status_code, 200)
+        # El listado se envía en streaming: el contenido solo se puede leer una vez
+        content = b''.join(response.streaming_content).decode()
         
         # Verificar que se muestra el rating promedio (4.0)
-        self.assertContains(response, '4.0')
+        self.assertIn('4.0', content)
         
-        # Verificar que se muestra el conteo de opiniones
-        self.assertContains(response, '3 opiniones')
+        # Verificar que se muestra el conteo de opiniones (el número va en negrita)
+        self.assertRegex(content, r'<strong>3</strong>\s+opiniones')
     
     def test_destinations_list_shows_no_reviews_message(self):
         """
@@ -0,0 +1,175 @@
+"""
+Tests del log de consultas lentas y del comando slow_queries
+"""
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from relecloud import slow_queries
+from relecloud.models import Destination
+
+
+class NormalizeSqlTest(TestCase):
+    """
+    Tests de la normalización y el fingerprint de consultas
+    """
+
+    def test_literals_and_in_lists_share_fingerprint(self):
+        """
+        Test: Consultas que solo difieren en literales tienen el mismo fingerprint
+        """
+        a = "SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'Marte'"
+        b = "SELECT * FROM t WHERE id IN (7)  AND name = 'Luna'"
+
+        self.assertEqual(slow_queries.normalize_sql(a), 'SELECT * FROM t WHERE id IN (...) AND name = ?')
+        self.assertEqual(slow_queries.fingerprint(a), slow_queries.fingerprint(b))
+
+    def test_placeholders_are_normalized(self):
+        """
+        Test: Los marcadores %s del ORM se tratan como literales
+        """
+        self.assertEqual(
+            slow_queries.fingerprint('SELECT * FROM t WHERE id = %s'),
+            slow_queries.fingerprint('SELECT * FROM t WHERE id = 5'),
+        )
+
+    def test_params_shape_hides_values(self):
+        """
+        Test: De los parámetros solo se guardan los tipos
+        """
+        self.assertEqual(slow_queries.params_shape(('secreto', 3), False), ['str', 'int'])
+        self.assertEqual(slow_queries.params_shape([(1,), (2,)], True), {'many': 2, 'row': ['int']})
+
+
+class SlowQueryLoggerTest(TestCase):
+    """
+    Tests del execute_wrapper SlowQueryLogger
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.destination = Destination.objects.create(name='Marte', description='El planeta rojo')
+
+    def setUp(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.log_path = directory / 'slow.jsonl'
+        slow_queries.reset()
+
+    def slow_query_log(self, threshold_ms):
+        return override_settings(SLOW_QUERY_LOG={'THRESHOLD_MS': threshold_ms, 'PATH': self.log_path})
+
+    def test_logger_is_installed_once_on_connection(self):
+        """
+        Test: La conexión tiene un único SlowQueryLogger instalado
+        """
+        slow_queries.install(sender=None, connection=connection)
+        installed = [w for w in connection.execute_wrappers if isinstance(w, slow_queries.SlowQueryLogger)]
+        self.assertEqual(len(installed), 1)
+
+    def test_fast_queries_are_not_logged(self):
+        """
+        Test: Las consultas por debajo del umbral no se registran
+        """
+        with self.slow_query_log(threshold_ms=10_000):
+            list(Destination.objects.all())
+
+        self.assertEqual(list(slow_queries.read_entries(self.log_path)), [])
+
+    def test_slow_query_entry_has_callsite_and_plan(self):
+        """
+        Test: Cada entrada incluye SQL normalizado, forma de parámetros, punto de llamada y plan
+        """
+        with self.slow_query_log(threshold_ms=0):
+            with self.assertLogs('relecloud.slow_queries', level='WARNING'):
+                self.client.get(reverse('destination_detail', args=[self.destination.pk]))
+
+        entries = list(slow_queries.read_entries(self.log_path))
+        # El detalle sale del snapshot del catálogo; en cada petición se consulta su versión
+        version = next(e for e in entries if 'relecloud_catalogversion' in e['sql'])
+        self.assertIn('IN (...)', version['sql'])
+        self.assertEqual(version['params'], ['int', 'int'])
+        # catalog.py es infraestructura: la consulta es de la vista que pidió el snapshot
+        self.assertRegex(version['callsite'], r'^relecloud/views\.py:\d+ in get_object$')
+        self.assertTrue(version['plan'])
+
+    def test_settings_merged_once_until_they_change(self):
+        """
+        Test: La configuración combinada se reutiliza entre consultas y se recalcula al cambiar los settings
+        """
+        with self.slow_query_log(threshold_ms=50):
+            config = slow_queries.get_slow_query_settings()
+            self.assertIs(slow_queries.get_slow_query_settings(), config)
+        with self.slow_query_log(threshold_ms=75):
+            self.assertEqual(slow_queries.get_slow_query_settings()['THRESHOLD_MS'], 75)
+
+    @skipUnless(connection.vendor == 'sqlite', 'Solo SQLite abre las transacciones con BEGIN IMMEDIATE')
+    def test_sqlite_explain_does_not_open_a_transaction(self):
+        """
+        Test: En SQLite el EXPLAIN no va en un atomic(), que tomaría el bloqueo de escritura
+        """
+        with mock.patch('relecloud.slow_queries.transaction.atomic') as atomic:
+            plan = slow_queries.explain(connection, 'SELECT * FROM relecloud_destination WHERE id = %s', [1])
+        self.assertTrue(plan)
+        atomic.assert_not_called()
+
+    def test_plan_is_captured_once_per_fingerprint(self):
+        """
+        Test: El plan solo se captura la primera vez que aparece un fingerprint
+        """
+        with self.slow_query_log(threshold_ms=0):
+            with self.assertLogs('relecloud.slow_queries', level='WARNING'):
+                Destination.objects.filter(name='Marte').count()
+                Destination.objects.filter(name='Luna').count()
+
+        entries = [e for e in slow_queries.read_entries(self.log_path) if 'COUNT' in e['sql']]
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0]['fingerprint'], entries[1]['fingerprint'])
+        self.assertIn('plan', entries[0])
+        self.assertNotIn('plan', entries[1])
+        self.assertNotIn('Marte', self.log_path.read_text())
+
+
+class SlowQueriesCommandTest(TestCase):
+    """
+    Tests del comando slow_queries
+    """
+
+    def setUp(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.log_path = directory / 'slow.jsonl'
+
+    def test_report_aggregates_by_fingerprint(self):
+        """
+        Test: El informe agrupa por fingerprint y ordena por tiempo total
+        """
+        for duration, fp, callsite in [(300, 'aaa', 'views.py:1'), (500, 'aaa', 'views.py:1'), (250, 'bbb', 'forms.py:9')]:
+            slow_queries.write_entry(self.log_path, {
+                'fingerprint': fp, 'sql': f'SELECT {fp}', 'params': [], 'callsite': callsite,
+                'duration_ms': duration, 'plan': ['SCAN t'] if fp == 'aaa' else None,
+            })
+
+        out = StringIO()
+        call_command('slow_queries', '--path', str(self.log_path), '--top', '1', stdout=out)
+        report = out.getvalue()
+
+        self.assertIn('2 consultas distintas', report)
+        self.assertIn('#1 aaa  x2  total=800.0ms', report)
+        self.assertIn('Llamada: views.py:1 (x2)', report)
+        self.assertIn('SCAN t', report)
+        self.assertNotIn('bbb', report)
+
+    def test_empty_log(self):
+        """
+        Test: Sin entradas se informa de que no hay consultas lentas
+        """
+        out = StringIO()
+        call_command('slow_queries', '--path', str(self.log_path), stdout=out)
+        self.assertIn('No hay consultas lentas', out.getvalue())
@@ -0,0 +1,133 @@
+"""
+Tests para los snapshots de base de datos y el cargador JSONL en bloque
+"""
+import json
+import os
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from relecloud.models import Cruise, Destination
+from relecloud.snapshots import SnapshotError, bulk_load_jsonl, create_snapshot, list_snapshots, restore_snapshot
+
+
+class BulkLoadJsonlTest(TestCase):
+    """
+    Tests del cargador de fixtures JSONL con bulk_create
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def _write_fixture(self, objects):
+        path = os.path.join(self.tmp_dir, 'fixture.jsonl')
+        with open(path, 'w', encoding='utf-8') as fh:
+            for obj in objects:
+                fh.write(json.dumps(obj) + '\n')
+        return path
+
+    def test_loads_objects_and_m2m_relations(self):
+        """
+        Test: Se cargan destinos y cruceros con sus relaciones M2M
+        """
+        destinations = [
+            {'model': 'relecloud.destination', 'pk': i, 'fields': {'name': f'Destino {i}', 'description': 'x', 'image': ''}}
+            for i in range(1, 26)
+        ]
+        cruise = {
+            'model': 'relecloud.cruise', 'pk': 1,
+            'fields': {'name': 'Gran Tour', 'description': 'y', 'destinations': [1, 2, 3]},
+        }
+        path = self._write_fixture(destinations + [cruise])
+
+        counts = bulk_load_jsonl(path, batch_size=10)
+
+        self.assertEqual(counts, {'relecloud.destination': 25, 'relecloud.cruise': 1})
+        self.assertEqual(Destination.objects.count(), 25)
+        self.assertEqual(
+            sorted(Cruise.objects.get(pk=1).destinations.values_list('pk', flat=True)),
+            [1, 2, 3]
+        )
+
+    def test_uses_few_queries_for_many_objects(self):
+        """
+        Test: El número de consultas no crece con cada objeto (inserción por lotes)
+        """
+        destinations = [
+            {'model': 'relecloud.destination', 'pk': i, 'fields': {'name': f'Destino {i}', 'description': 'x', 'image': ''}}
+            for i in range(1, 201)
+        ]
+        path = self._write_fixture(destinations)
+
+        with CaptureQueriesContext(connection) as queries:
+            bulk_load_jsonl(path, batch_size=100)
+
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "relecloud_destination"')]
+        self.assertEqual(len(inserts), 2)
+
+    def test_invalid_line_raises_snapshot_error(self):
+        """
+        Test: Una línea con JSON inválido produce un error con el número de línea
+        """
+        path = os.path.join(self.tmp_dir, 'broken.jsonl')
+        with open(path, 'w', encoding='utf-8') as fh:
+            fh.write('{"model": "relecloud.destination"\n')
+
+        with self.assertRaisesMessage(SnapshotError, 'broken.jsonl:1'):
+            bulk_load_jsonl(path)
+
+
+class SnapshotRoundTripTest(TransactionTestCase):
+    """
+    Tests de creación y restauración de snapshots (SQLite + media)
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.media_root = os.path.join(self.tmp_dir, 'media')
+        os.makedirs(os.path.join(self.media_root, 'destinations'))
+        with open(os.path.join(self.media_root, 'destinations', 'luna.jpeg'), 'wb') as fh:
+            fh.write(b'imagen')
+
+        settings_override = override_settings(
+            SNAPSHOT_DIR=os.path.join(self.tmp_dir, 'snapshots'),
+            MEDIA_ROOT=self.media_root,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_restore_brings_back_database_and_media(self):
+        """
+        Test: Restaurar un snapshot recupera los datos y los ficheros de media
+        """
+        Destination.objects.create(name='Luna', description='Nuestro satélite natural')
+        create_snapshot('prueba')
+
+        Destination.objects.all().delete()
+        os.remove(os.path.join(self.media_root, 'destinations', 'luna.jpeg'))
+
+        manifest = restore_snapshot('prueba')
+
+        self.assertEqual(manifest['vendor'], 'sqlite')
+        self.assertTrue(Destination.objects.filter(name='Luna').exists())
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, 'destinations', 'luna.jpeg')))
+
+    def test_list_snapshots_returns_manifests(self):
+        """
+        Test: list_snapshots devuelve el manifiesto de cada snapshot creado
+        """
+        create_snapshot('uno', include_media=False)
+        create_snapshot('dos', include_media=False)
+
+        self.assertEqual([m['name'] for m in list_snapshots()], ['dos', 'uno'])
+
+    def test_restore_missing_snapshot_raises(self):
+        """
+        Test: Restaurar un snapshot inexistente produce SnapshotError
+        """
+        with self.assertRaises(SnapshotError):
+            restore_snapshot('no-existe')
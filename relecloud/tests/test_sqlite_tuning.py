@@ -0,0 +1,158 @@
+"""
+Tests del perfil ajustado de SQLite (PRAGMAs, BEGIN IMMEDIATE), del
+reintento de escrituras ante bloqueos y del benchmark de concurrencia.
+"""
+import sqlite3
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import SimpleTestCase, TransactionTestCase
+from relecloud.db_profile import SQLITE_PRAGMAS, parse_database_url, sqlite_init_command
+from relecloud.models import Cruise, Destination, InfoRequest
+from relecloud.retry import backoff_delay, is_lock_error, retry_on_locked
+
+
+class SQLiteProfileTest(SimpleTestCase):
+    """
+    Tests de la configuración de SQLite generada por parse_database_url
+    """
+
+    def test_tuned_profile_by_default(self):
+        """
+        Test: Por defecto se aplican los PRAGMAs y BEGIN IMMEDIATE
+        """
+        database = parse_database_url('sqlite:///db.sqlite3', base_dir='/srv/app')
+
+        self.assertEqual(database['OPTIONS']['init_command'], sqlite_init_command())
+        self.assertIn('PRAGMA journal_mode=WAL', database['OPTIONS']['init_command'])
+        self.assertEqual(database['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+    def test_tuned_profile_can_be_disabled_or_overridden(self):
+        """
+        Test: sqlite_tuned=0 deja SQLite por defecto y las OPTIONS de la URL tienen prioridad
+        """
+        plain = parse_database_url('sqlite:///db.sqlite3?sqlite_tuned=0')
+        custom = parse_database_url('sqlite:///db.sqlite3?transaction_mode=EXCLUSIVE')
+
+        self.assertEqual(plain['OPTIONS'], {})
+        self.assertEqual(custom['OPTIONS']['transaction_mode'], 'EXCLUSIVE')
+
+    def test_postgres_is_not_affected(self):
+        """
+        Test: Los PRAGMAs solo se aplican a SQLite
+        """
+        database = parse_database_url('postgres://localhost/relecloud')
+        self.assertNotIn('init_command', database['OPTIONS'])
+
+    def test_init_command_applies_pragmas(self):
+        """
+        Test: El init_command deja la conexión con WAL, synchronous=NORMAL, mmap y busy_timeout
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            conn = sqlite3.connect(Path(directory) / 'tuned.sqlite3')
+            try:
+                conn.executescript(sqlite_init_command())
+                pragma = lambda name: conn.execute(f'PRAGMA {name}').fetchone()[0]  # noqa: E731
+
+                self.assertEqual(pragma('journal_mode'), 'wal')
+                self.assertEqual(pragma('synchronous'), 1)  # NORMAL
+                self.assertEqual(pragma('mmap_size'), SQLITE_PRAGMAS['mmap_size'])
+                self.assertEqual(pragma('cache_size'), SQLITE_PRAGMAS['cache_size'])
+                self.assertEqual(pragma('busy_timeout'), SQLITE_PRAGMAS['busy_timeout'])
+            finally:
+                conn.close()
+
+
+class RetryOnLockedTest(TransactionTestCase):
+    """
+    Tests de retry_on_locked (fuera de la transacción de cada test)
+    """
+
+    def test_lock_errors_are_retried(self):
+        """
+        Test: Un bloqueo se reintenta en una transacción nueva hasta que funciona
+        """
+        calls = []
+
+        @retry_on_locked(attempts=3)
+        def save():
+            calls.append(connection.in_atomic_block)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'ok'
+
+        with mock.patch('relecloud.retry.time.sleep') as sleep:
+            with self.assertLogs('relecloud.retry', level='WARNING') as logs:
+                self.assertEqual(save(), 'ok')
+
+        self.assertEqual(calls, [True, True, True])
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(len(logs.records), 2)
+
+    def test_gives_up_after_attempts(self):
+        """
+        Test: Tras agotar los intentos se propaga el error de bloqueo
+        """
+        save = mock.Mock(side_effect=OperationalError('database is locked'), __qualname__='save')
+
+        with mock.patch('relecloud.retry.time.sleep'), self.assertLogs('relecloud.retry', level='WARNING'):
+            with self.assertRaises(OperationalError):
+                retry_on_locked(save, attempts=2)()
+        self.assertEqual(save.call_count, 2)
+
+    def test_other_errors_and_nested_transactions_are_not_retried(self):
+        """
+        Test: Errores que no son bloqueos, o dentro de una transacción ya abierta, no se reintentan
+        """
+        other = mock.Mock(side_effect=OperationalError('no such table: x'), __qualname__='other')
+        with self.assertRaises(OperationalError):
+            retry_on_locked(other)()
+        self.assertEqual(other.call_count, 1)
+
+        locked = mock.Mock(side_effect=OperationalError('database is locked'), __qualname__='locked')
+        with transaction.atomic(), self.assertRaises(OperationalError):
+            retry_on_locked(locked)()
+        self.assertEqual(locked.call_count, 1)
+
+    def test_helpers(self):
+        """
+        Test: is_lock_error reconoce los bloqueos y la espera está acotada
+        """
+        self.assertTrue(is_lock_error(OperationalError('database is locked')))
+        self.assertFalse(is_lock_error(OperationalError('disk I/O error')))
+        self.assertFalse(is_lock_error(ValueError('database is locked')))
+        for attempt in range(1, 10):
+            self.assertLessEqual(backoff_delay(attempt, base_delay=0.05, max_delay=1.0), 1.0)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite')
+class BenchSQLiteConcurrencyTest(TransactionTestCase):
+    """
+    Tests del comando bench_sqlite_concurrency (ejecución corta) y del modo de journal de test
+    """
+
+    def test_command_reports_both_profiles(self):
+        """
+        Test: El comando mide ambos perfiles sobre una copia y no modifica la base de datos
+        """
+        destination = Destination.objects.create(name='Marte', description='El planeta rojo')
+        Cruise.objects.create(name='Crucero rojo', description='Viaje a Marte').destinations.add(destination)
+
+        out = StringIO()
+        call_command('bench_sqlite_concurrency', workers=2, seconds=0.3, write_ratio=0.5, stdout=out)
+
+        self.assertIn('baseline', out.getvalue())
+        self.assertIn('tuned', out.getvalue())
+        self.assertFalse(InfoRequest.objects.exists())
+
+    def test_test_databases_do_not_use_wal(self):
+        """
+        Test: Las bases de datos de test usan journal_mode=DELETE (se clonan copiando el fichero)
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertNotEqual(cursor.fetchone()[0], 'wal')
@@ -0,0 +1,93 @@
+"""
+Tests del arranque: imports diferidos, variables de correo opcionales
+(relecloud/checks.py) y análisis de -X importtime (startup_profile).
+"""
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.checks import Warning, run_checks
+from django.test import SimpleTestCase, override_settings
+from relecloud.management.commands.startup_profile import SETUP_CODE, group_by_owner, parse_importtime
+
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      5000 |       5000 |     PIL._imaging
+import time:      2000 |       7000 |   PIL.Image
+import time:       300 |       7300 | relecloud.staticbuild
+import time:       800 |        800 |   django.contrib.auth.models
+import time:       400 |       1200 | django.db
+Traceback (most recent call last):
+"""
+
+
+class DeferredImportsTest(SimpleTestCase):
+    """
+    Tests de los imports que relecloud solo hace al usarlos
+    """
+
+    def test_setup_and_urlconf_do_not_import_pillow_or_smtplib(self):
+        """
+        Test: django.setup() y cargar las URLs y las vistas no importan PIL ni smtplib
+        """
+        code = (
+            f'{SETUP_CODE}; import sys, project.urls, relecloud.async_views, relecloud.templatetags.static_build; '
+            "print(sorted({'PIL', 'smtplib'} & set(sys.modules)))"
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+
+        self.assertEqual(result.stdout.strip(), '[]')
+
+
+class EmailSettingsCheckTest(SimpleTestCase):
+    """
+    Tests de la comprobación relecloud.W001
+    """
+
+    def test_missing_email_settings(self):
+        """
+        Test: Sin variables de correo hay un aviso que las nombra, no un error al importar settings
+        """
+        with override_settings(EMAIL_HOST_PASSWORD='', NOTIFY_EMAIL=''):
+            messages = [message for message in run_checks(tags=['email']) if message.id == 'relecloud.W001']
+
+        self.assertEqual(len(messages), 1)
+        self.assertIsInstance(messages[0], Warning)
+        self.assertIn('EMAIL_HOST_PASSWORD, NOTIFY_EMAIL', messages[0].msg)
+
+    def test_email_settings_present(self):
+        """
+        Test: Con todas las variables de correo no hay aviso
+        """
+        with override_settings(EMAIL_HOST_USER='a@gmail.com', EMAIL_HOST_PASSWORD='x', NOTIFY_EMAIL='b@gmail.com'):
+            self.assertEqual(run_checks(tags=['email']), [])
+
+
+class ImportTimeParserTest(SimpleTestCase):
+    """
+    Tests del análisis de la salida de -X importtime
+    """
+
+    def test_parse_importtime(self):
+        """
+        Test: Se leen módulo, tiempo propio y acumulado, y se ignoran las demás líneas
+        """
+        modules = parse_importtime(IMPORTTIME_OUTPUT)
+
+        self.assertEqual(len(modules), 6)
+        self.assertEqual(modules[1], ('PIL._imaging', 5000, 5000))
+        self.assertEqual(modules[2], ('PIL.Image', 2000, 7000))
+
+    def test_group_by_owner(self):
+        """
+        Test: Cada módulo cuenta para su app más específica o, si no es de ninguna, para su paquete raíz
+        """
+        groups = group_by_owner(parse_importtime(IMPORTTIME_OUTPUT), ['relecloud', 'django.contrib.auth'])
+
+        self.assertEqual(list(groups), ['PIL', 'django.contrib.auth', 'django', 'relecloud', '_io'])
+        self.assertEqual(groups['PIL'], (7000, 2))
+        self.assertEqual(groups['django.contrib.auth'], (800, 1))
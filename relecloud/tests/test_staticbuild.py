@@ -0,0 +1,254 @@
+"""
+Tests del build de estáticos en collectstatic (relecloud.staticbuild) y de
+las etiquetas que lo usan (relecloud.templatetags.static_build)
+"""
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from relecloud.staticbuild import (
+    add_webp_fallbacks, extract_critical_css, minify_css, optimize_png, split_rules, strip_jpeg_metadata,
+)
+from relecloud.templatetags import static_build
+
+
+def make_image(fmt, **options):
+    buffer = io.BytesIO()
+    image = Image.new('RGB' if fmt == 'JPEG' else 'RGBA', (64, 48))
+    for x in range(64):
+        image.putpixel((x, x % 48), (x * 4, 255 - x * 4, 120) + (() if fmt == 'JPEG' else (200,)))
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def pixels(data):
+    return Image.open(io.BytesIO(data)).tobytes()
+
+
+class StaticBuildHelpersTest(SimpleTestCase):
+    """
+    Tests de los pasos del build
+    """
+
+    def test_minify_css(self):
+        """
+        Test: Quita comentarios y espacios sin tocar cadenas, url() ni licencias
+        """
+        css = '''/*! Licencia */
+        /* comentario */
+        .a > .b ,  .c {
+            content: "  a , b ; } ";
+            background: url( ../img/a b.png );
+            margin : 0 ;
+        }
+        @media (min-width: 576px) { .a { color: red; } }
+        '''
+        self.assertEqual(
+            minify_css(css),
+            '/*! Licencia */.a>.b,.c{content:"  a , b ; } ";background:url( ../img/a b.png );margin :0}'
+            '@media (min-width:576px){.a{color:red}}',
+        )
+        self.assertNotIn('Licencia', minify_css(css, keep_license=False))
+
+    def test_split_rules(self):
+        """
+        Test: Separa sentencias y reglas de primer nivel, con @media anidado
+        """
+        rules = split_rules('@import url("x.css");.a{content:"}"}@media print{.b{c:d}}')
+        self.assertEqual(rules, [
+            ('@import url("x.css")', None),
+            ('.a', 'content:"}"'),
+            ('@media print', '.b{c:d}'),
+        ])
+
+    def test_critical_css_keeps_used_rules(self):
+        """
+        Test: El CSS crítico solo conserva las reglas cuyos selectores usa la cabecera
+        """
+        used = {'tags': {'nav', 'a'}, 'classes': {'navbar', 'brand'}, 'ids': set()}
+        css = minify_css('''
+            @import url("https://fuentes.example.com/x.css");
+            :root { --azul: #00f; }
+            .navbar { display: flex; }
+            .navbar a:hover, .footer a { color: red; }
+            .card { border: 1px; }
+            nav > .brand::before { content: ""; }
+            @media (min-width: 768px) { .navbar { padding: 0; } .card { margin: 0; } }
+            @media print { .card { display: none; } }
+            @font-face { font-family: x; }
+        ''')
+
+        critical = extract_critical_css(css, used)
+
+        self.assertEqual(
+            critical,
+            ':root{--azul:#00f}.navbar{display:flex}.navbar a:hover{color:red}'
+            'nav>.brand::before{content:""}@media (min-width:768px){.navbar{padding:0}}',
+        )
+
+    def test_webp_fallback(self):
+        """
+        Test: Los background-image con versión WebP reciben un image-set() que la prefiere
+        """
+        css = '.a{background-image:url("../img/x.jpeg")}.b{background-image:url(data:image/png;base64,AA)}'
+        result = add_webp_fallbacks(css, 'res/css/site.css', {'res/img/x.jpeg': 'res/img/x.webp'})
+
+        self.assertEqual(
+            result,
+            '.a{background-image:url("../img/x.jpeg");background-image:image-set('
+            'url("../img/x.webp") type("image/webp"),url("../img/x.jpeg") type("image/jpeg"))}'
+            '.b{background-image:url(data:image/png;base64,AA)}',
+        )
+
+    def test_image_optimization_is_lossless(self):
+        """
+        Test: Sin metadatos el JPEG ocupa menos y tiene los mismos bytes de imagen; el PNG, los mismos píxeles
+        """
+        exif = Image.Exif()
+        exif[0x010E] = 'Foto de prueba ' * 50
+        jpeg = make_image('JPEG', exif=exif.tobytes(), quality=90)
+        stripped = strip_jpeg_metadata(jpeg)
+
+        self.assertLess(len(stripped), len(jpeg))
+        self.assertTrue(jpeg.endswith(stripped[stripped.index(b'\xff\xda'):]))
+        self.assertEqual(pixels(stripped), pixels(jpeg))
+        self.assertNotIn('exif', Image.open(io.BytesIO(stripped)).info)
+
+        png = make_image('PNG', compress_level=0)
+        optimized = optimize_png(png)
+        self.assertLess(len(optimized), len(png))
+        self.assertEqual(pixels(optimized), pixels(png))
+
+
+class CollectStaticBuildTest(SimpleTestCase):
+    """
+    Tests de collectstatic con BuildStaticFilesStorage sobre unos estáticos de prueba
+    """
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.static_root, ignore_errors=True)
+        static_build._read_critical_css.cache_clear()
+        self.addCleanup(static_build._read_critical_css.cache_clear)
+        static_build.image_size.cache_clear()
+        self.addCleanup(static_build.image_size.cache_clear)
+
+        os.makedirs(os.path.join(self.source, 'res', 'css'))
+        os.makedirs(os.path.join(self.source, 'res', 'img'))
+        with open(os.path.join(self.source, 'res', 'img', 'hero.jpeg'), 'wb') as fh:
+            fh.write(make_image('JPEG'))
+        with open(os.path.join(self.source, 'res', 'css', 'app.css'), 'w', encoding='utf-8') as fh:
+            fh.write('/* Cabecera */\n.main-header {\n    background-image: url("../img/hero.jpeg");\n}\n')
+            fh.write(''.join(f'.sin-uso-{i} {{\n    margin: {i}px;\n}}\n' for i in range(100)))
+
+        self.settings_override = override_settings(
+            STATIC_ROOT=self.static_root,
+            STATICFILES_DIRS=[self.source],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'relecloud.staticbuild.BuildStaticFilesStorage'},
+            },
+            STATIC_BUILD={
+                'CRITICAL_STYLESHEETS': ['res/css/app.css'],
+                'CRITICAL_TEMPLATES': ['base.html'],
+            },
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def _collect(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(self.static_root, 'staticfiles.json'), encoding='utf-8') as fh:
+            return json.load(fh)['paths']
+
+    def _read(self, name):
+        with open(os.path.join(self.static_root, name), encoding='utf-8') as fh:
+            return fh.read()
+
+    def test_collectstatic_builds_assets(self):
+        """
+        Test: collectstatic minifica, genera la WebP, precomprime y guarda el CSS crítico
+        """
+        manifest = self._collect()
+
+        self.assertIn('res/img/hero.webp', manifest)
+        css = self._read(manifest['res/css/app.css'])
+        self.assertNotIn('/* Cabecera */', css)
+        webp = os.path.basename(manifest['res/img/hero.webp'])
+        self.assertIn(f'image-set(url("../img/{webp}") type("image/webp")', css)
+        self.assertTrue(os.path.exists(os.path.join(self.static_root, manifest['res/css/app.css'] + '.gz')))
+
+        critical = self._read('critical.css')
+        self.assertIn(f'.main-header{{background-image:url("/static/{manifest["res/img/hero.jpeg"]}")', critical)
+        self.assertNotIn('sin-uso', critical)
+
+        # Repetir el build da el mismo resultado
+        self.assertEqual(self._collect(), manifest)
+
+    def test_tags_use_the_build(self):
+        """
+        Test: Con build, el CSS crítico se incrusta, la hoja se carga sin bloquear y la imagen ofrece WebP
+        """
+        manifest = self._collect()
+
+        html = Template(
+            "{% load static_build %}{% critical_css %}{% stylesheet 'res/css/app.css' %}"
+            "{% picture 'res/img/hero.jpeg' alt='Héroe' %}"
+        ).render(Context())
+
+        self.assertIn('<style>.main-header{background-image:url("/static/', html)
+        self.assertIn(f'<link rel="preload" href="/static/{manifest["res/css/app.css"]}" as="style"', html)
+        self.assertIn(f'<source srcset="/static/{manifest["res/img/hero.webp"]}" type="image/webp" />', html)
+        self.assertIn(f'<img src="/static/{manifest["res/img/hero.jpeg"]}" alt="Héroe" height="48" width="64" />', html)
+
+    def test_tags_without_build(self):
+        """
+        Test: Sin build (storage sin manifiesto) las etiquetas generan un <link> y un <img> normales
+        """
+        with override_settings(STORAGES={
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        }):
+            html = Template(
+                "{% load static_build %}{% critical_css %}{% stylesheet 'res/css/app.css' %}"
+                "{% picture 'res/img/hero.jpeg' class='img-fluid' %}"
+            ).render(Context())
+
+        self.assertEqual(
+            html,
+            '<link rel="stylesheet" href="/static/res/css/app.css" />'
+            '<img src="/static/res/img/hero.jpeg" class="img-fluid" height="48" width="64" />',
+        )
+
+    def test_picture_size(self):
+        """
+        Test: picture completa width y height con el tamaño de la imagen, respetando los que se den
+        """
+        self._collect()
+
+        def render(attrs):
+            return Template("{% load static_build %}{% picture 'res/img/hero.jpeg' " + attrs + " %}").render(Context())
+
+        self.assertIn('height="24" width="32"', render('width=32'))
+        self.assertIn('height="10" width="32"', render('width=32 height=10'))
+        self.assertIn('fetchpriority="high" height="48" width="64"', render("fetchpriority='high'"))
+
+    def test_picture_non_integer_width(self):
+        """
+        Test: picture deja tal cual un width no entero, sin calcular el alto
+        """
+        self._collect()
+
+        html = Template("{% load static_build %}{% picture 'res/img/hero.jpeg' width='100%' %}").render(Context())
+
+        self.assertIn('width="100%"', html)
+        self.assertNotIn('height=', html)
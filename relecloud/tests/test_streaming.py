@@ -0,0 +1,128 @@
+"""
+Tests del render en streaming de listados (relecloud.streaming)
+"""
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError
+from django.template import engines
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from relecloud import catalog
+from relecloud.models import Destination
+from relecloud.streaming import iter_page
+from relecloud.timeouts import current_statement_timeout, statement_timeout
+
+
+def page_templates(page='<h1>{{ title }}</h1><ul>{{ rows }}</ul><footer>fin</footer>'):
+    engine = engines['django']
+    return (
+        engine.from_string(page),
+        engine.from_string('{% for row in rows %}<li>{{ first_row }}:{{ row }}</li>{% endfor %}'),
+    )
+
+
+class IterPageTest(SimpleTestCase):
+    """
+    Tests del troceado de la página
+    """
+
+    def test_head_is_sent_before_rows_are_read(self):
+        """
+        Test: La cabecera sale antes de leer ninguna fila y las filas van por trozos
+        """
+        consumed = []
+
+        def rows():
+            for row in 'abcde':
+                consumed.append(row)
+                yield row
+
+        page, row_template = page_templates()
+        chunks = iter_page(None, page, row_template, {'title': 'Destinos'}, rows(), chunk_size=2)
+
+        self.assertEqual(next(chunks), '<h1>Destinos</h1><ul>')
+        self.assertEqual(consumed, [])
+        self.assertEqual(list(chunks), [
+            '<li>0:a</li><li>0:b</li>',
+            '<li>2:c</li><li>2:d</li>',
+            '<li>4:e</li>',
+            '</ul><footer>fin</footer>',
+        ])
+
+    def test_empty_listing(self):
+        """
+        Test: Sin filas se envían solo la cabecera y el pie
+        """
+        page, row_template = page_templates()
+        self.assertEqual(list(iter_page(None, page, row_template, {}, [])), ['<h1></h1><ul>', '</ul><footer>fin</footer>'])
+
+    def test_page_without_rows_marker(self):
+        """
+        Test: Una plantilla de página sin {{ rows }} es un error de configuración
+        """
+        page, row_template = page_templates('<h1>{{ title }}</h1>')
+        with self.assertRaises(ImproperlyConfigured):
+            iter_page(None, page, row_template, {}, [])
+
+    def test_rows_are_generated_under_the_view_statement_timeout(self):
+        """
+        Test: Las filas se generan con el statement_timeout de la vista aunque el bloque ya se haya cerrado
+        """
+        seen = []
+
+        def rows():
+            seen.append(current_statement_timeout())
+            yield 'Marte'
+
+        page, row_template = page_templates()
+        with statement_timeout(1234):
+            chunks = iter_page(None, page, row_template, {}, rows())
+        self.assertIn('Marte', ''.join(chunks))
+        self.assertEqual(seen[0].args, (1234, None))
+
+
+class DestinationsStreamingTest(TestCase):
+    """
+    Tests del listado de destinos en streaming
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Destination.objects.bulk_create([Destination(name=f'Destino {i}', description='x') for i in range(5)])
+        catalog.bump_catalog_version()
+
+    def setUp(self):
+        catalog.reset_snapshot()
+        self.addCleanup(catalog.reset_snapshot)
+
+    @override_settings(STREAMING={'CHUNK_SIZE': 2})
+    def test_listing_is_streamed_in_chunks(self):
+        """
+        Test: El listado es una respuesta en streaming con la cabecera, un trozo por cada 2 destinos y el pie
+        """
+        response = self.client.get(reverse('destinations'))
+
+        self.assertTrue(response.streaming)
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 5)
+        self.assertIn('Cruise destinations', chunks[0])
+        self.assertNotIn('Destino', chunks[0])
+        self.assertIn('</html>', chunks[-1])
+        self.assertEqual(sum(chunk.count('destination-card') for chunk in chunks[1:-1]), 5)
+
+    @override_settings(STREAMING={'CHUNK_SIZE': 2})
+    def test_queryset_rows_are_read_while_streaming(self):
+        """
+        Test: Sin snapshot, los destinos se leen de la base de datos al enviar las filas, en una sola consulta
+        """
+        with mock.patch('relecloud.catalog.get_snapshot', side_effect=DatabaseError('caída')):
+            with self.assertLogs('relecloud.views', 'ERROR'), self.assertNumQueries(0):
+                response = self.client.get(reverse('destinations'))
+                chunks = iter(response.streaming_content)
+                next(chunks)
+
+            with self.assertNumQueries(1):
+                content = b''.join(chunks).decode()
+
+        self.assertEqual(content.count('destination-card'), 5)
@@ -0,0 +1,157 @@
+"""
+Tests del loader de plantillas en caché, del motor Jinja2 opcional y del
+benchmark de render (relecloud.template_backends, bench_templates)
+"""
+import json
+import re
+import shutil
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.template import engines
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from relecloud import catalog
+from relecloud.management.commands.bench_templates import available_engines, get_engine
+from relecloud.models import Cruise, Destination, Review, Usuario
+from relecloud.streaming import iter_page
+from relecloud.template_backends import reset_template_caches
+
+
+HAS_JINJA2 = 'jinja2' in available_engines()
+
+_CSRF = re.compile(r'name="csrfmiddlewaretoken" value="[^"]+"')
+# MarkupSafe y Django escapan las comillas con entidades distintas
+_ENTITIES = {'&#34;': '&quot;', '&#39;': '&#x27;'}
+
+
+def normalize_html(html):
+    """HTML sin diferencias de espacios en blanco, entidades ni el token CSRF (distinto en cada render)"""
+    html = _CSRF.sub('name="csrfmiddlewaretoken" value=""', html)
+    for entity, replacement in _ENTITIES.items():
+        html = html.replace(entity, replacement)
+    html = re.sub(r'\s+', ' ', html)
+    return re.sub(r'>\s+<', '><', html).strip()
+
+
+class CachedLoaderTest(SimpleTestCase):
+    """
+    Tests del loader en caché y su invalidación
+    """
+
+    def test_cached_loader_is_configured(self):
+        """
+        Test: El motor de Django usa el cached.Loader
+        """
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertEqual(type(loader).__module__, 'django.template.loaders.cached')
+
+    def test_reset_discards_compiled_templates(self):
+        """
+        Test: reset_template_caches() vacía la caché del loader
+        """
+        loader = engines['django'].engine.template_loaders[0]
+        engines['django'].get_template('destinations.html')
+        self.assertTrue(loader.get_template_cache)
+
+        reset_template_caches()
+
+        self.assertFalse(loader.get_template_cache)
+
+
+@skipUnless(HAS_JINJA2, 'requiere Jinja2')
+class Jinja2EquivalenceTest(TestCase):
+    """
+    Tests: las plantillas Jinja2 del catálogo producen el mismo HTML que las de Django
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mars = Destination.objects.create(name='Marte', description='El planeta rojo')
+        cls.moon = Destination.objects.create(name='Luna', description='Nuestro satélite <natural> & "cercano"')
+        cls.cruise = Cruise.objects.create(name='Ruta interior', description='Del satélite al planeta rojo')
+        cls.cruise.destinations.set([cls.mars, cls.moon])
+        cls.user = Usuario.objects.create_user(username='viajero', email='viajero@example.com', password='x')
+        Review.objects.create(destination=cls.moon, user=cls.user, rating=4)
+
+    def setUp(self):
+        catalog.reset_snapshot()
+        self.addCleanup(catalog.reset_snapshot)
+        self.snapshot = catalog.get_snapshot()
+
+    def _render_both(self, template_name, context, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        context = {**context, 'catalog_snapshot': self.snapshot}
+        rendered = []
+        for name in ('django', 'jinja2'):
+            engine = get_engine(name)
+            if template_name == 'destinations.html':
+                page = engine.get_template(template_name)
+                row_template = engine.get_template('partials/destination_rows.html')
+                html = ''.join(iter_page(request, page, row_template, context, self.snapshot.ranking, chunk_size=1))
+            else:
+                html = engine.get_template(template_name).render(context, request)
+            rendered.append(normalize_html(html))
+        return rendered
+
+    def test_catalog_templates_match(self):
+        """
+        Test: destinations, destination_detail y cruise_detail son equivalentes en ambos motores
+        """
+        pages = {
+            'destinations.html': {},
+            'destination_detail.html': {'destination': self.snapshot.destination(self.moon.pk)},
+            'cruise_detail.html': {'cruise': self.snapshot.cruise(self.cruise.pk)},
+        }
+        for template_name, context in pages.items():
+            for user in (AnonymousUser(), self.user):
+                with self.subTest(template=template_name, user=str(user)):
+                    django_html, jinja2_html = self._render_both(template_name, context, user)
+                    self.assertEqual(jinja2_html, django_html)
+                    self.assertIn('Luna', django_html)
+
+    @override_settings(TEMPLATES=[settings.JINJA2_TEMPLATES, *settings.TEMPLATES])
+    def test_views_use_jinja2_when_enabled(self):
+        """
+        Test: Con el motor Jinja2 delante, las vistas del catálogo lo usan y el resto sigue en Django
+        """
+        response = self.client.get(f'/destination/{self.mars.pk}')
+        self.assertEqual(response.templates, [])
+        self.assertContains(response, 'El planeta rojo')
+
+        response = self.client.get('/destinations/')
+        self.assertEqual(response.templates, [])
+        self.assertContains(response, 'Marte')
+
+        response = self.client.get('/about')
+        self.assertTemplateUsed(response, 'about.html')
+
+
+class BenchTemplatesCommandTest(SimpleTestCase):
+    """
+    Tests del comando bench_templates
+    """
+
+    def setUp(self):
+        self.benchmark_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.benchmark_dir, ignore_errors=True)
+
+    def test_reports_per_row_cost_and_records_history(self):
+        """
+        Test: Muestra el coste por fila de cada motor y lo guarda en el histórico
+        """
+        out = StringIO()
+        with override_settings(BENCHMARK_DIR=self.benchmark_dir):
+            call_command('bench_templates', sizes=[5, 20], repeat=1, engine='django', record='v1', stdout=out)
+            call_command('bench_templates', sizes=[5, 20], repeat=1, engine='django', record='v2', stdout=out)
+
+        self.assertIn('µs/fila', out.getvalue())
+        self.assertIn("respecto a 'v1'", out.getvalue())
+        with open(f'{self.benchmark_dir}/template_render.json', encoding='utf-8') as fh:
+            history = json.load(fh)
+        self.assertEqual([entry['label'] for entry in history], ['v1', 'v2'])
+        self.assertEqual(set(history[0]['engines']['django']['median_ms']), {'5', '20'})
@@ -0,0 +1,91 @@
+"""
+Tests del calentamiento antes de atender peticiones (relecloud.warmup)
+"""
+from unittest import mock
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.template import engines
+from django.test import TestCase, override_settings
+from relecloud import catalog, metrics, warmup
+from relecloud.models import Destination
+
+
+class WarmupTest(TestCase):
+    """
+    Tests de warm_up y sus pasos
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Destination.objects.create(name='Luna', description='Satélite')
+
+    def setUp(self):
+        catalog.reset_snapshot()
+        self.addCleanup(catalog.reset_snapshot)
+        # Como el cliente de tests: que las peticiones no cierren la conexión de la transacción del test
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+        patcher = mock.patch.multiple('relecloud.catalog', connections=mock.DEFAULT, gc=mock.DEFAULT)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('relecloud.warmup.connections')
+        self.connections = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_project_templates_only(self):
+        """
+        Test: Se compilan las plantillas del proyecto y no las de Django ni las de otras apps
+        """
+        names = set(warmup.project_templates(engines['django']))
+
+        self.assertTrue({'index.html', 'partials/navbar.html'} <= names)
+        self.assertFalse(any(name.startswith('admin/') for name in names))
+
+    def test_warm_up_steps(self):
+        """
+        Test: Sin aplicación WSGI se ejecutan todos los pasos menos pages y el snapshot queda listo
+        """
+        report = warmup.warm_up()
+
+        self.assertEqual(list(report), ['urls', 'templates', 'static', 'catalog'])
+        self.assertIs(warmup.report, report)
+        self.assertEqual(len(catalog.get_snapshot().ranking), 1)
+
+    def test_warm_pages(self):
+        """
+        Test: Las páginas de URLS se piden a la aplicación WSGI y sus métricas se descartan
+        """
+        with override_settings(WARMUP={'URLS': ['index', 'destinations']}):
+            self.assertEqual(warmup.warm_pages(WSGIHandler()), ['200', '200'])
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_failed_step_does_not_stop_warmup(self):
+        """
+        Test: Un paso que falla se registra y el resto se ejecuta
+        """
+        with mock.patch('relecloud.warmup.warm_static', side_effect=ValueError('sin manifiesto')), \
+                self.assertLogs('relecloud.warmup', 'WARNING'):
+            report = warmup.warm_up()
+        self.assertEqual(list(report), ['urls', 'templates', 'catalog'])
+
+    @override_settings(CATALOG_SNAPSHOT={'PRELOAD': False}, WARMUP={'URLS': ['index']})
+    def test_connections_closed_without_catalog_preload(self):
+        """
+        Test: Sin precargar el catálogo, las conexiones que abre pages se cierran igualmente antes del fork
+        """
+        with mock.patch('relecloud.warmup.warm_templates', side_effect=ValueError('plantilla rota')), \
+                self.assertLogs('relecloud.warmup', 'WARNING'):
+            report = warmup.warm_up(WSGIHandler())
+
+        self.assertEqual(list(report), ['urls', 'static', 'pages', 'catalog'])
+        self.connections.close_all.assert_called_once_with()
+
+    def test_disabled(self):
+        """
+        Test: Con WARMUP['ENABLED'] = False no se hace nada
+        """
+        with override_settings(WARMUP={'ENABLED': False}):
+            self.assertEqual(warmup.warm_up(), {})
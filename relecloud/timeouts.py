@@ -0,0 +1,168 @@
+"""
+Límite de tiempo por sentencia SQL para las vistas de ReleCloud
+
+Una consulta que se degrada (p. ej. por crecimiento de datos) no debe dejar
+un worker de gunicorn bloqueado indefinidamente. statement_timeout() limita
+cada sentencia ejecutada dentro del bloque.
+
+El límite se aplica de forma perezosa: StatementTimeout es un execute_wrapper
+que se instala en cada conexión nueva (señal connection_created, ver
+RelecloudConfig.ready) y solo actúa cuando se ejecuta una sentencia dentro de
+un bloque. Un bloque sin consultas (p. ej. una página servida desde el
+snapshot del catálogo) no abre la conexión ni hace viajes a la base de datos:
+
+    - PostgreSQL: SET statement_timeout antes de la primera sentencia del
+      bloque y RESET al salir, solo si se llegó a aplicar
+    - SQLite: progress handler que interrumpe la sentencia en curso cuando
+      supera el límite (el plazo se reinicia en cada execute)
+
+Por defecto el límite vale para todos los alias: las vistas del catálogo
+leen de la réplica que elija ReplicaRouter (ver relecloud/replicas.py), no
+de 'default'.
+
+Las sentencias que superan el límite lanzan django.db.OperationalError.
+
+Para vistas basadas en clases: StatementTimeoutMixin (atributo
+statement_timeout en ms). Para vistas función: @with_statement_timeout().
+El valor por defecto es settings.STATEMENT_TIMEOUT_MS (None o 0 desactiva).
+"""
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import partial, wraps
+
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, connections
+
+
+# Configurar logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Instrucciones de la máquina virtual de SQLite entre llamadas al progress handler
+SQLITE_PROGRESS_STEPS = 10_000
+
+
+class _Block:
+    """Bloque statement_timeout() en curso: límite, alias a los que aplica (None = todos) y dónde se hizo SET"""
+    __slots__ = ('ms', 'using', 'applied')
+
+    def __init__(self, ms, using):
+        self.ms = ms
+        self.using = using
+        self.applied = set()
+
+
+_block = ContextVar('relecloud_statement_timeout', default=None)
+
+
+class StatementTimeout:
+    """execute_wrapper que aplica el límite del bloque en curso a las sentencias de su conexión"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __call__(self, execute, sql, params, many, context):
+        block = _block.get()
+        if block is None or block.using not in (None, self.connection.alias):
+            return execute(sql, params, many, context)
+
+        if self.connection.vendor == 'postgresql':
+            if self.connection.alias not in block.applied:
+                # Con el cursor del driver, para no volver a pasar por los execute_wrappers
+                context['cursor'].cursor.execute(f'SET statement_timeout = {int(block.ms)}')
+                block.applied.add(self.connection.alias)
+            return execute(sql, params, many, context)
+
+        if self.connection.vendor == 'sqlite':
+            deadline = time.monotonic() + block.ms / 1000
+            raw = self.connection.connection
+            # Un valor verdadero hace que SQLite interrumpa la sentencia
+            raw.set_progress_handler(lambda: time.monotonic() > deadline, SQLITE_PROGRESS_STEPS)
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                raw.set_progress_handler(None, 0)
+
+        return execute(sql, params, many, context)
+
+
+def install(sender, connection, **kwargs):
+    """Receptor de connection_created: instala StatementTimeout en la nueva conexión"""
+    if not any(isinstance(wrapper, StatementTimeout) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.insert(0, StatementTimeout(connection))
+
+
+def get_default_timeout():
+    return getattr(settings, 'STATEMENT_TIMEOUT_MS', None)
+
+
+@contextmanager
+def statement_timeout(ms, using=None):
+    """Limita a `ms` milisegundos cada sentencia SQL ejecutada en el bloque (en `using` o en cualquier alias)"""
+    if not ms:
+        yield
+        return
+
+    block = _Block(ms, using)
+    token = _block.set(block)
+    try:
+        yield
+    except OperationalError as e:
+        logger.warning(f'Sentencia SQL interrumpida o fallida con statement_timeout={ms}ms: {e}')
+        raise
+    finally:
+        _block.reset(token)
+        for alias in block.applied:
+            _postgresql_reset(connections[alias])
+
+
+def current_statement_timeout():
+    """
+    Función que vuelve a abrir el bloque statement_timeout() en curso (o que
+    no hace nada si no hay ninguno). Sirve para el código que se ejecuta
+    cuando el bloque ya se ha cerrado, como las filas de una respuesta en
+    streaming (ver relecloud/streaming.py).
+    """
+    block = _block.get()
+    if block is None:
+        return nullcontext
+    return partial(statement_timeout, block.ms, block.using)
+
+
+def _postgresql_reset(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('RESET statement_timeout')
+    except DatabaseError:
+        # Transacción abortada: no se puede restaurar, se cierra al terminar la petición
+        connection.close_at = time.monotonic()
+
+
+class StatementTimeoutMixin:
+    """
+    Limita el tiempo de cada sentencia SQL de la vista, incluido el render de
+    la plantilla (que es donde se evalúan muchos querysets perezosos).
+    """
+    statement_timeout = None  # ms; None = settings.STATEMENT_TIMEOUT_MS
+
+    def get_statement_timeout(self):
+        return self.statement_timeout if self.statement_timeout is not None else get_default_timeout()
+
+    def dispatch(self, request, *args, **kwargs):
+        with statement_timeout(self.get_statement_timeout()):
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            return response
+
+
+def with_statement_timeout(ms=None):
+    """Decorador para vistas función; ms=None usa settings.STATEMENT_TIMEOUT_MS"""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            with statement_timeout(ms if ms is not None else get_default_timeout()):
+                return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
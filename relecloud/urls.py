@@ -14,4 +14,5 @@ urlpatterns = [
     path('registro/', views.RegistroUsuarioCreate.as_view(), name='registro'),
     path('login/', auth_views.LoginView.as_view(template_name='login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
-]
\ No newline at end of file
+    path('perf/metrics/', views.perf_metrics, name='perf_metrics'),
+]
@@ -1,15 +1,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, JsonResponse
 from django.urls import reverse_lazy, reverse
-from . import models
+from . import caching, catalog, metrics, models, ratelimit, services, streaming
 from .forms import RegistroUsuarioForm, ReviewForm
-from .services import send_info_request_email
+from .ratelimit import RateLimitMixin
+from .replicas import ReplicaReadMixin, read_from_replica
+from .retry import LockRetryMixin
+from .timeouts import StatementTimeoutMixin, with_statement_timeout
 from django.views import generic
 from django.contrib.messages.views import SuccessMessageMixin
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.db.models import Avg, Count
 import logging
+import os
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -21,45 +26,69 @@ def index(request):
 def about(request):
     return render(request, 'about.html')
 
+@read_from_replica
+@with_statement_timeout()
 def destinations(request):
     """
     Vista de listado de destinos con calificaciones y conteo de reviews.
     Maneja errores de base de datos para evitar crashes.
+
+    La página se envía en streaming (ver relecloud/streaming.py): la
+    cabecera sale en cuanto se renderiza y los destinos, por trozos.
     """
+    snapshot = None
     try:
-        all_destinations = models.Destination.objects.annotate(
-            avg_rating=Avg('reviews__rating'),
-            review_count=Count('reviews')
-        ).order_by('-review_count', '-avg_rating')
+        # Ranking precalculado en el snapshot del catálogo (ver relecloud/catalog.py)
+        snapshot = catalog.get_snapshot()
+        all_destinations = snapshot.ranking
     except Exception as e:
         # Si hay error (ej: tabla no existe), obtener destinos sin anotaciones
-        logger.error(f"Error al obtener destinos con anotaciones: {e}")
+        logger.error(f"Error al obtener el snapshot del catálogo: {e}")
         all_destinations = models.Destination.objects.all()
-    
-    return render(request, 'destinations.html', {'destinations': all_destinations})
 
-class DestinationDetailView(generic.DetailView):
+    return streaming.stream_template(
+        request, 'destinations.html', {'catalog_snapshot': snapshot},
+        rows=all_destinations, row_template='partials/destination_rows.html',
+    )
+
+
+class CatalogSnapshotMixin:
+    """
+    Vistas de detalle del catálogo: el objeto sale del snapshot en memoria
+    (ver relecloud/catalog.py) en lugar de consultarse en cada petición.
+    """
+    snapshot_lookup = None
+
+    def get_object(self, queryset=None):
+        self.snapshot = catalog.get_snapshot()
+        record = getattr(self.snapshot, self.snapshot_lookup)(self.kwargs['pk'])
+        if record is None:
+            raise Http404(f'No existe {self.model._meta.verbose_name} con id {self.kwargs["pk"]}')
+        return record
+
+    def get_context_data(self, **kwargs):
+        """El snapshot fija la versión de los fragmentos cacheados de la plantilla"""
+        return super().get_context_data(catalog_snapshot=self.snapshot, **kwargs)
+
+
+class DestinationDetailView(ReplicaReadMixin, StatementTimeoutMixin, CatalogSnapshotMixin, generic.DetailView):
     template_name = 'destination_detail.html'
     model = models.Destination
     context_object_name = 'destination'
-    
-    def get_queryset(self):
-        """Optimizar query con prefetch de reviews para evitar N+1"""
-        return models.Destination.objects.prefetch_related('reviews__user').annotate(
-            avg_rating=Avg('reviews__rating'),
-            review_count=Count('reviews')
-        )
-
-class CruiseDetailView(generic.DetailView):
+    snapshot_lookup = 'destination'
+
+class CruiseDetailView(ReplicaReadMixin, StatementTimeoutMixin, CatalogSnapshotMixin, generic.DetailView):
     template_name = 'cruise_detail.html'
     model = models.Cruise
     context_object_name = 'cruise'
+    snapshot_lookup = 'cruise'
 
-class InfoRequestCreate(LoginRequiredMixin, SuccessMessageMixin, generic.CreateView):
+class InfoRequestCreate(LoginRequiredMixin, RateLimitMixin, StatementTimeoutMixin, SuccessMessageMixin, LockRetryMixin, generic.CreateView):
     """
     Vista para crear solicitudes de información sobre cruceros.
     
-    Requiere que el usuario esté autenticado (LoginRequiredMixin).
+    Requiere que el usuario esté autenticado (LoginRequiredMixin) y limita
+    los envíos por usuario (RateLimitMixin, regla 'info_request').
     Después de guardar la solicitud, envía un correo de notificación
     al administrador con los datos proporcionados por el usuario.
     
@@ -82,6 +111,7 @@ class InfoRequestCreate(LoginRequiredMixin, SuccessMessageMixin, generic.CreateV
     fields = ['name', 'email', 'cruise', 'notes']
     success_url = reverse_lazy('index')
     success_message = 'Thank you, %(name)s! We will email you when we have more information about %(cruise)s!'
+    rate_limit_scope = 'info_request'
     
     def form_valid(self, form):
         """
@@ -89,7 +119,7 @@ class InfoRequestCreate(LoginRequiredMixin, SuccessMessageMixin, generic.CreateV
         
         Flujo de ejecución:
             1. Guardar el formulario en la base de datos (super().form_valid())
-            2. Intentar enviar correo de notificación al administrador
+            2. Intentar enviar correo de notificación al administrador (services.notify_info_request())
             3. Registrar resultado en logs
             4. Mostrar mensaje de advertencia si el envío falla
             5. Retornar respuesta (redirección) independientemente del resultado del correo
@@ -104,61 +134,29 @@ class InfoRequestCreate(LoginRequiredMixin, SuccessMessageMixin, generic.CreateV
         Returns:
             HttpResponse: Redirección a success_url con mensaje de éxito
         """
-        # Guardar el formulario y obtener la instancia creada
         # super().form_valid() ejecuta form.save() y guarda la instancia en self.object
         response = super().form_valid(form)
-        
-        # Intentar enviar el correo de notificación
-        # El envío NO debe afectar el guardado de la solicitud
-        try:
-            # Llamar al servicio de envío de correo
-            # send_info_request_email() retorna True/False sin lanzar excepciones
-            email_sent = send_info_request_email(self.object)
-            
-            if email_sent:
-                # Correo enviado exitosamente
-                # El log ya fue registrado por la función send_info_request_email()
-                logger.info(
-                    f"Correo de notificación enviado para solicitud de información. "
-                    f"ID: {self.object.id}, Usuario: {self.object.name}"
-                )
-            else:
-                # El envío falló pero ya está registrado en el log por el servicio
-                # Mostrar mensaje de advertencia al usuario para que sepa que
-                # su solicitud fue guardada pero la notificación falló
-                messages.warning(
-                    self.request,
-                    'Tu solicitud ha sido guardada, pero hubo un problema al enviar la notificación por correo.'
-                )
-                
-        except Exception as e:
-            # Error inesperado al intentar enviar el correo
-            # Este bloque solo se ejecuta si send_info_request_email() lanza una excepción
-            # (aunque está diseñado para NO lanzarlas, este es un safety net)
-            # La solicitud ya está guardada en la BD, solo notificamos el problema
-            logger.error(
-                f"Error inesperado al intentar enviar correo de notificación. "
-                f"InfoRequest ID: {self.object.id}. Error: {str(e)}"
-            )
-            messages.warning(
-                self.request,
-                'Tu solicitud ha sido guardada, pero hubo un problema al enviar la notificación por correo.'
-            )
-        
-        # Retornar la respuesta original (redirección a success_url)
-        # El modelo ya está guardado independientemente del resultado del envío de correo
-        # El usuario verá el success_message en la página de destino
+
+        # El envío NO debe afectar el guardado de la solicitud: si falla, solo
+        # se avisa al usuario (reglas compartidas con la vista asíncrona)
+        services.notify_info_request(self.request, self.object)
         return response
 
 
-class RegistroUsuarioCreate(SuccessMessageMixin, generic.CreateView):
+class RegistroUsuarioCreate(RateLimitMixin, StatementTimeoutMixin, SuccessMessageMixin, LockRetryMixin, generic.CreateView):
     template_name = 'registro.html'
     form_class = RegistroUsuarioForm
     success_url = reverse_lazy('index')
     success_message = '¡Registro exitoso! Bienvenido %(username)s.'
+    rate_limit_scope = 'registro'
+
+    def form_valid(self, form):
+        """Inserta sin comprobar antes; un username o email repetido vuelve al formulario con su error"""
+        response = services.save_registration(form, lambda: super(RegistroUsuarioCreate, self).form_valid(form))
+        return self.form_invalid(form) if response is None else response
 
 
-class ReviewCreateView(LoginRequiredMixin, generic.CreateView):
+class ReviewCreateView(LoginRequiredMixin, RateLimitMixin, StatementTimeoutMixin, LockRetryMixin, generic.CreateView):
     """
     Vista para crear reviews de destinos
     Requiere que el usuario esté autenticado y tenga una compra (InfoRequest)
@@ -166,6 +164,7 @@ class ReviewCreateView(LoginRequiredMixin, generic.CreateView):
     model = models.Review
     form_class = ReviewForm
     template_name = 'review_create.html'
+    rate_limit_scope = 'review_create'
     
     def dispatch(self, request, *args, **kwargs):
         """Obtener el destino antes de procesar la petición"""
@@ -179,44 +178,34 @@ class ReviewCreateView(LoginRequiredMixin, generic.CreateView):
         return context
     
     def form_valid(self, form):
-        """Validar que el usuario tenga compra y no tenga review duplicada"""
-        # Verificar si el usuario ya tiene una review para este destino
-        existing_review = models.Review.objects.filter(
-            user=self.request.user,
-            destination=self.destination
-        ).first()
-        
-        if existing_review:
-            messages.error(self.request, 'Ya has enviado una review para este destino.')
-            return redirect('destination_detail', pk=self.destination.pk)
-        
-        # Verificar si el usuario tiene una compra (InfoRequest) para un crucero que incluya este destino
-        has_purchase = models.InfoRequest.objects.filter(
-            email=self.request.user.email,
-            cruise__destinations=self.destination
-        ).exists()
-        
-        if not has_purchase:
-            messages.error(
-                self.request,
-                'No estás autorizado para dejar una review. Debes tener una compra para este destino.'
-            )
+        """Validar que el usuario tenga compra y no tenga review duplicada (ver services.review_denial)"""
+        denial = services.review_denial(self.request.user, self.destination)
+        if denial:
+            messages.error(self.request, denial)
             return redirect('destination_detail', pk=self.destination.pk)
-        
-        # Asignar usuario y destino
-        form.instance.user = self.request.user
-        form.instance.destination = self.destination
-        
-        # Llamar a full_clean() para validar el modelo
-        try:
-            form.instance.full_clean()
-        except Exception as e:
-            messages.error(self.request, f'Error de validación: {str(e)}')
+
+        error = services.review_validation_error(form, self.request.user, self.destination)
+        if error:
+            messages.error(self.request, error)
             return self.form_invalid(form)
-        
-        messages.success(self.request, 'Tu review ha sido publicada exitosamente.')
+
+        messages.success(self.request, services.REVIEW_SUCCESS_MESSAGE)
         return super().form_valid(form)
     
     def get_success_url(self):
         """Redirigir al detalle del destino"""
         return reverse('destination_detail', kwargs={'pk': self.destination.pk})
+
+
+@staff_member_required
+def perf_metrics(request):
+    """
+    Histogramas de rendimiento por nombre de URL (solo staff).
+
+    Los datos son los del proceso que atiende la petición; con varios
+    workers cada uno devuelve sus propias peticiones (ver 'pid').
+    """
+    return JsonResponse({
+        'pid': os.getpid(), 'metrics': metrics.snapshot(), 'cache': caching.cache_stats(),
+        'rate_limit': ratelimit.rate_limit_stats(),
+    })
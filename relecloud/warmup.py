@@ -0,0 +1,162 @@
+"""
+Calentamiento del proceso antes de atender peticiones
+
+Sin calentar, la primera petición de cada worker paga la construcción del
+resolver de URLs, la compilación de las plantillas que usa, la lectura del
+manifiesto de estáticos y la construcción del snapshot del catálogo. warm_up()
+hace todo eso al cargar la aplicación (project/wsgi.py y project/asgi.py):
+
+    urls        resolver de URLs poblado (patrones compilados, reverse())
+    templates   plantillas del proyecto compiladas en la caché del loader de
+                cada motor (las de los directorios bajo BASE_DIR; las del
+                admin se compilan al usarse)
+    static      manifiesto de estáticos y links de preload de cada vista
+                (ver relecloud/preload.py)
+    pages       un GET a cada página de URLS a través de la aplicación WSGI:
+                lo que solo se prepara al renderizar (imports perezosos,
+                tamaños de imagen, fragmentos de {% catalogcache %}...). Las
+                métricas de estas peticiones se descartan
+    catalog     snapshot del catálogo; congela el recolector (ver
+                catalog.preload_snapshot())
+
+Al terminar, fallen o no los pasos y aunque no se precargue el catálogo, se
+cierran las conexiones a la base de datos que hayan abierto (pages hace
+consultas): los workers no deben heredar los sockets del maestro.
+
+Con gunicorn y preload_app (ver gunicorn.conf.py) todo se hace una vez en el
+proceso maestro y los workers, también los que se reciclan con max_requests,
+arrancan ya calientes. Un paso que falla se registra y no impide arrancar.
+
+Configuración en settings.WARMUP (ENABLED, URLS).
+"""
+import io
+import logging
+import os
+import sys
+import time
+from functools import partial
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import connections
+from django.template import engines
+from django.urls import get_resolver, reverse
+
+from . import catalog, metrics, preload
+
+
+# Configurar logger para este módulo
+logger = logging.getLogger(__name__)
+
+WARMUP_DEFAULTS = {
+    'ENABLED': True,
+    'URLS': ['index', 'destinations', 'about', 'registro'],
+}
+
+# Resultado del último warm_up(): {paso: ms}, para el log de gunicorn.conf.py
+report = {}
+
+
+def get_warmup_settings():
+    """Combina settings.WARMUP con los valores por defecto"""
+    return {**WARMUP_DEFAULTS, **getattr(settings, 'WARMUP', {})}
+
+
+def warm_urls():
+    """Puebla el resolver de URLs; retorna el número de nombres de URL"""
+    return len(get_resolver().reverse_dict)
+
+
+def template_directories(engine):
+    """Directorios de plantillas de engine, también los de sus loaders (p. ej. el cached)"""
+    directories = list(engine.template_dirs)
+    for loader in getattr(getattr(engine, 'engine', None), 'template_loaders', ()):
+        for inner in getattr(loader, 'loaders', [loader]):
+            directories.extend(inner.get_dirs() if hasattr(inner, 'get_dirs') else ())
+    return list(dict.fromkeys(os.path.realpath(directory) for directory in directories))
+
+
+def project_templates(engine):
+    """Nombres de las plantillas de engine que están en directorios del proyecto"""
+    base_dir = os.path.realpath(settings.BASE_DIR)
+    for directory in template_directories(engine):
+        if not directory.startswith(base_dir + os.sep):
+            continue
+        for root, _, filenames in os.walk(directory):
+            for filename in filenames:
+                yield os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/')
+
+
+def warm_templates():
+    """Compila las plantillas del proyecto en todos los motores; retorna cuántas"""
+    count = 0
+    for engine in engines.all():
+        for name in project_templates(engine):
+            engine.get_template(name)
+            count += 1
+    return count
+
+
+def warm_static():
+    """Carga el manifiesto de estáticos y los links de preload; retorna cuántos links"""
+    getattr(staticfiles_storage, 'hashed_files', None)
+    return sum(len(preload.view_links(view_name)) for view_name in preload.get_preload_settings()['VIEWS'])
+
+
+def warm_pages(application):
+    """GET de las páginas de URLS con la aplicación WSGI; retorna los códigos de estado"""
+    host = next((host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')), 'localhost')
+    statuses = []
+    for url_name in get_warmup_settings()['URLS']:
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': reverse(url_name), 'QUERY_STRING': '',
+            'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host, 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1', 'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+            'wsgi.multithread': False, 'wsgi.multiprocess': True, 'wsgi.run_once': False,
+        }
+        status = []
+        response = application(environ, lambda code, headers, exc_info=None: status.append(code))
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+        statuses.append(status[0].split()[0])
+    metrics.reset()
+    return statuses
+
+
+def warm_catalog():
+    """Construye el snapshot del catálogo; retorna su versión"""
+    snapshot = catalog.preload_snapshot()
+    return snapshot.token[0] if snapshot is not None and snapshot.token else None
+
+
+def warm_up(application=None):
+    """
+    Ejecuta los pasos de calentamiento; retorna {paso: ms}.
+
+    pages solo se ejecuta si se pasa la aplicación WSGI (project/wsgi.py).
+    """
+    report.clear()
+    if not get_warmup_settings()['ENABLED']:
+        return report
+    steps = [('urls', warm_urls), ('templates', warm_templates), ('static', warm_static)]
+    if application is not None:
+        steps.append(('pages', partial(warm_pages, application)))
+    steps.append(('catalog', warm_catalog))
+
+    try:
+        for name, step in steps:
+            started = time.perf_counter()
+            try:
+                result = step()
+            except Exception as e:
+                logger.warning(f'Warmup: falló el paso {name}: {e}')
+                continue
+            report[name] = (time.perf_counter() - started) * 1000
+            logger.info(f'Warmup: {name} ({result}) en {report[name]:.1f} ms')
+    finally:
+        connections.close_all()
+    return report
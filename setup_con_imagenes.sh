@@ -1,6 +1,10 @@
 #!/bin/bash
 
 # Script para cargar datos con imágenes desde Imagenes_Destinos/
+#
+# Uso:
+#   ./setup_con_imagenes.sh            Restaura el snapshot 'seed' si existe (~1s)
+#   ./setup_con_imagenes.sh --rebuild  Reconstruye la base de datos desde los fixtures
 
 echo "🚀 Iniciando carga de datos con imágenes..."
 
@@ -10,6 +14,16 @@ if [ -d ".venv" ]; then
     source .venv/bin/activate
 fi
 
+# 0. Camino rápido: restaurar el snapshot ya sembrado (base de datos + media)
+if [ "$1" != "--rebuild" ] && [ -f "snapshots/seed/manifest.json" ]; then
+    echo ""
+    echo "📝 Restaurando snapshot 'seed'..."
+    python manage.py db_snapshot restore --name seed
+    python manage.py migrate --noinput
+    echo "✅ ¡Todo listo! (use --rebuild para regenerar desde los fixtures)"
+    exit 0
+fi
+
 # 1. Limpiar base de datos
 echo ""
 echo "📝 Paso 1: Limpiando base de datos anterior..."
@@ -53,6 +67,12 @@ else:
     print('✓ Superusuario ya existe');
 "
 
+# 7. Guardar snapshot para que los próximos arranques sean inmediatos
+echo ""
+echo "📝 Paso 7: Guardando snapshot 'seed'..."
+python manage.py db_snapshot create --name seed
+echo "✓ Snapshot guardado en snapshots/seed"
+
 echo ""
 echo "✅ ¡Todo listo! Base de datos poblada con imágenes."
 echo ""